@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analytics'
+
+    def ready(self):
+        # Conectar el búfer de analítica de escaneos
+        import analytics.signals  # noqa: F401
+
+        # Anotar los días del cubo que afectan ediciones, borrados y cambios de lotes
+        from analytics.cube import connect_cube_signals
+        connect_cube_signals()
+
+        # Versión de datos de las tablas de pronósticos (decide si reajustar)
+        from analytics.forecasting import FAMILIES
+        from core.data_versions import track_data_versions
+        track_data_versions(*(family.model for family in FAMILIES.values()))
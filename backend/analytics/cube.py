@@ -0,0 +1,549 @@
+# backend/analytics/cube.py
+"""
+Cubo analítico diario.
+
+Los hechos se agregan por día y por las dimensiones (raza, productor, estado
+del lote, tipo de evento, red) en ``AnalyticsDailyFact``. El refresco es
+incremental: cada tabla origen tiene una marca de agua (último ``id`` para
+tablas de solo inserción, último ``updated_at`` para tablas mutables) y solo
+se recalculan los días afectados por filas nuevas o modificadas. Cada pasada
+vuelve a leer un margen detrás de la marca para recoger filas confirmadas
+fuera de orden.
+
+Las ediciones y borrados en origen, los cambios de pertenencia a lotes y los
+cambios de las dimensiones que otras fuentes toman del animal o del lote
+(raza, productor, estado del lote) anotan sus días en
+``AnalyticsCubeDirtyDay`` al confirmar la transacción, y el siguiente refresco
+los recalcula. Las escrituras que no emiten señales (``QuerySet.update``) solo
+se recogen con un refresco completo (``refresh_cube(full=True)``).
+
+Un hilo refresca el cubo por intervalos desde la primera consulta, de modo
+que las vistas no dependen de que alguien ejecute el comando.
+
+Ajustes:
+    ANALYTICS_CUBE_REFRESH_INTERVAL: segundos entre refrescos (None = sin hilo).
+    ANALYTICS_CUBE_ID_OVERLAP: ids releídos detrás de la marca de las tablas
+        de solo inserción.
+    ANALYTICS_CUBE_TIME_OVERLAP: segundos releídos detrás de la marca de las
+        tablas con ``updated_at``.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.utils import timezone
+
+from blockchain.models import BlockchainEvent, ContractInteraction
+from cattle.models import Animal, AnimalHealthRecord, Batch
+from iot.models import GPSData, HealthSensorData
+from core.background import PeriodicThread
+from users.models import UserActivityLog
+from .cube_models import AnalyticsCubeDirtyDay, AnalyticsCubeWatermark, AnalyticsDailyFact
+
+logger = logging.getLogger(__name__)
+
+FACT_KEY = ('date', 'breed', 'farm_id', 'batch_status', 'event_type', 'network')
+
+ADDITIVE_MEASURES = (
+    'record_count', 'alert_count', 'success_count', 'failed_count',
+    'temperature_sum', 'temperature_count', 'heart_rate_sum', 'heart_rate_count',
+    'movement_sum', 'movement_count', 'gas_used_sum', 'gas_used_count',
+    'gas_cost_wei_sum', 'birth_day_sum', 'size_sum',
+    'duration_seconds_sum', 'duration_count',
+)
+
+EXTREMA_MEASURES = {
+    'size_min': Min,
+    'size_max': Max,
+    'duration_seconds_min': Min,
+    'duration_seconds_max': Max,
+}
+
+# Medias derivadas: nombre -> (medida suma, medida conteo)
+DERIVED_AVERAGES = {
+    'avg_temperature': ('temperature_sum', 'temperature_count'),
+    'avg_heart_rate': ('heart_rate_sum', 'heart_rate_count'),
+    'avg_movement': ('movement_sum', 'movement_count'),
+    'avg_gas_used': ('gas_used_sum', 'gas_used_count'),
+    'avg_size': ('size_sum', 'record_count'),
+    'avg_duration_seconds': ('duration_seconds_sum', 'duration_count'),
+}
+
+
+def _network_name():
+    return getattr(settings, 'BLOCKCHAIN_NETWORK', 'polygon-amoy')
+
+
+@dataclass(frozen=True)
+class FactSource:
+    """Tabla origen del cubo y cómo se proyecta sobre sus dimensiones."""
+    key: str
+    model: type
+    date_field: str
+    dimensions: dict
+    measures: dict = field(default_factory=dict)
+    updated_field: Optional[str] = None
+    network: bool = False
+    builder: Optional[Callable] = None
+
+
+def _fact_key(day, values, network=''):
+    return (
+        day,
+        values.get('breed') or '',
+        values.get('farm_id') or 0,
+        values.get('batch_status') or '',
+        values.get('event_type') or '',
+        network,
+    )
+
+
+def _aggregate_sql(source, queryset):
+    """Agregar en la base de datos con un único GROUP BY por partición."""
+    network = _network_name() if source.network else ''
+    paths = list(source.dimensions.values())
+    rows = queryset.annotate(
+        cube_date=TruncDate(source.date_field)
+    ).values('cube_date', *paths).annotate(**source.measures).order_by()
+
+    for row in rows.iterator(chunk_size=2000):
+        values = {dim: row[path] for dim, path in source.dimensions.items()}
+        yield _fact_key(row['cube_date'], values, network), {
+            measure: row[measure] for measure in source.measures
+        }
+
+
+def _aggregate_animals(source, queryset):
+    """Animales: la edad media requiere sumar fechas como ordinales."""
+    facts = defaultdict(lambda: defaultdict(int))
+    rows = queryset.annotate(cube_date=TruncDate('created_at')).values_list(
+        'cube_date', 'breed', 'owner_id', 'current_batch__status', 'health_status', 'birth_date'
+    ).order_by()
+
+    for day, breed, owner_id, batch_status, health_status, birth_date in rows.iterator(chunk_size=2000):
+        measures = facts[_fact_key(day, {
+            'breed': breed, 'farm_id': owner_id,
+            'batch_status': batch_status, 'event_type': health_status,
+        })]
+        measures['record_count'] += 1
+        measures['birth_day_sum'] += birth_date.toordinal() if birth_date else 0
+    return facts.items()
+
+
+def _aggregate_batches(source, queryset):
+    """Lotes: tamaño por lote y tiempo de tránsito de los entregados."""
+    sizes = dict(
+        Batch.animals.through.objects.filter(batch_id__in=queryset.values('pk'))
+        .values('batch_id').annotate(size=Count('animal_id'))
+        .values_list('batch_id', 'size').order_by()
+    )
+    facts = defaultdict(lambda: defaultdict(int))
+    rows = queryset.annotate(cube_date=TruncDate('created_at')).values_list(
+        'pk', 'cube_date', 'status', 'created_by_id', 'created_at', 'updated_at'
+    ).order_by()
+
+    for pk, day, batch_status, created_by_id, created_at, updated_at in rows.iterator(chunk_size=2000):
+        measures = facts[_fact_key(day, {'farm_id': created_by_id, 'batch_status': batch_status})]
+        size = sizes.get(pk, 0)
+        measures['record_count'] += 1
+        measures['size_sum'] += size
+        measures['size_min'] = min(measures.get('size_min', size), size)
+        measures['size_max'] = max(measures.get('size_max', size), size)
+
+        if batch_status == 'DELIVERED' and created_at and updated_at:
+            seconds = (updated_at - created_at).total_seconds()
+            measures['duration_seconds_sum'] += seconds
+            measures['duration_count'] += 1
+            measures['duration_seconds_min'] = min(measures.get('duration_seconds_min', seconds), seconds)
+            measures['duration_seconds_max'] = max(measures.get('duration_seconds_max', seconds), seconds)
+    return facts.items()
+
+
+SOURCES = {
+    source.key: source for source in (
+        FactSource(
+            key='ANIMAL',
+            model=Animal,
+            date_field='created_at',
+            dimensions={},
+            updated_field='updated_at',
+            builder=_aggregate_animals,
+        ),
+        FactSource(
+            key='HEALTH_RECORD',
+            model=AnimalHealthRecord,
+            date_field='created_at',
+            dimensions={
+                'breed': 'animal__breed',
+                'farm_id': 'animal__owner_id',
+                'batch_status': 'animal__current_batch__status',
+                'event_type': 'health_status',
+            },
+            measures={
+                'record_count': Count('id'),
+                'temperature_sum': Sum('temperature'),
+                'temperature_count': Count('temperature'),
+                'heart_rate_sum': Sum('heart_rate'),
+                'heart_rate_count': Count('heart_rate'),
+                'movement_sum': Sum('movement_activity'),
+                'movement_count': Count('movement_activity'),
+            },
+        ),
+        FactSource(
+            key='SENSOR',
+            model=HealthSensorData,
+            date_field='timestamp',
+            dimensions={
+                'breed': 'animal__breed',
+                'farm_id': 'animal__owner_id',
+                'batch_status': 'animal__current_batch__status',
+            },
+            measures={
+                'record_count': Count('id'),
+                'alert_count': Count('id', filter=Q(health_alert=True)),
+                'temperature_sum': Sum('temperature'),
+                'temperature_count': Count('temperature'),
+                'heart_rate_sum': Sum('heart_rate'),
+                'heart_rate_count': Count('heart_rate'),
+                'movement_sum': Sum('movement_activity'),
+                'movement_count': Count('movement_activity'),
+            },
+        ),
+        FactSource(
+            key='BLOCKCHAIN_EVENT',
+            model=BlockchainEvent,
+            date_field='created_at',
+            dimensions={
+                'breed': 'animal__breed',
+                'farm_id': 'animal__owner_id',
+                'batch_status': 'batch__status',
+                'event_type': 'event_type',
+            },
+            measures={'record_count': Count('id')},
+            network=True,
+        ),
+        FactSource(
+            key='CONTRACT_TX',
+            model=ContractInteraction,
+            date_field='created_at',
+            dimensions={'event_type': 'contract_type'},
+            measures={
+                'record_count': Count('id'),
+                'success_count': Count('id', filter=Q(status='SUCCESS')),
+                'failed_count': Count('id', filter=Q(status='FAILED')),
+                'gas_used_sum': Sum('gas_used'),
+                'gas_used_count': Count('gas_used'),
+                'gas_cost_wei_sum': Sum(F('gas_used') * F('gas_price')),
+            },
+            updated_field='updated_at',
+            network=True,
+        ),
+        FactSource(
+            key='BATCH',
+            model=Batch,
+            date_field='created_at',
+            dimensions={},
+            updated_field='updated_at',
+            builder=_aggregate_batches,
+        ),
+        FactSource(
+            key='GPS',
+            model=GPSData,
+            date_field='timestamp',
+            dimensions={
+                'breed': 'animal__breed',
+                'farm_id': 'animal__owner_id',
+            },
+            measures={'record_count': Count('id')},
+        ),
+        FactSource(
+            key='USER_ACTIVITY',
+            model=UserActivityLog,
+            date_field='timestamp',
+            dimensions={'event_type': 'action'},
+            measures={'record_count': Count('id')},
+        ),
+    )
+}
+
+
+# ==============================================================================
+# REFRESCO
+# ==============================================================================
+
+def refresh_source(key, full=False):
+    """Recalcular los días afectados desde la última marca de agua.
+
+    Devuelve el número de hechos escritos.
+    """
+    source = SOURCES[key]
+    queryset = source.model._base_manager.all()
+    AnalyticsCubeWatermark.objects.get_or_create(source=key)
+
+    with transaction.atomic():
+        # Bloquear la marca serializa los refrescos concurrentes de una misma fuente
+        watermark = AnalyticsCubeWatermark.objects.select_for_update().get(source=key)
+        dirty = list(AnalyticsCubeDirtyDay.objects.filter(source=key).values_list('pk', 'date'))
+
+        if full:
+            changed = queryset
+        elif source.updated_field:
+            changed = queryset
+            if watermark.last_updated_at:
+                overlap = timedelta(seconds=getattr(settings, 'ANALYTICS_CUBE_TIME_OVERLAP', 300))
+                changed = queryset.filter(
+                    **{f'{source.updated_field}__gte': watermark.last_updated_at - overlap}
+                )
+        else:
+            # Las filas confirmadas fuera de orden quedan por debajo de la marca
+            overlap = getattr(settings, 'ANALYTICS_CUBE_ID_OVERLAP', 1000)
+            changed = queryset.filter(pk__gt=watermark.last_id - overlap)
+
+        # Las marcas se capturan antes de agregar: lo que llegue después entra en la próxima pasada
+        marks = {'last_id': Max('pk')}
+        if source.updated_field:
+            marks['last_updated_at'] = Max(source.updated_field)
+        marks = changed.aggregate(**marks)
+
+        if marks['last_id'] is None and not dirty and not full:
+            watermark.save(update_fields=['refreshed_at'])
+            return 0
+
+        dates = None
+        partition = queryset
+        if not full:
+            dates = {day for _, day in dirty}
+            if marks['last_id'] is not None:
+                dates.update(
+                    changed.annotate(cube_date=TruncDate(source.date_field))
+                    .order_by().values_list('cube_date', flat=True).distinct()
+                )
+            dates = sorted(dates)
+            partition = queryset.filter(**{f'{source.date_field}__date__in': dates})
+
+        builder = source.builder or _aggregate_sql
+        stale = AnalyticsDailyFact.objects.filter(source=key)
+        if dates is not None:
+            stale = stale.filter(date__in=dates)
+        stale.delete()
+
+        facts = [
+            AnalyticsDailyFact(source=key, **dict(zip(FACT_KEY, fact_key)), **{
+                measure: value for measure, value in measures.items() if value is not None
+            })
+            for fact_key, measures in builder(source, partition)
+        ]
+        AnalyticsDailyFact.objects.bulk_create(facts, batch_size=1000)
+
+        watermark.last_id = max(watermark.last_id, marks['last_id'] or 0)
+        if source.updated_field and marks.get('last_updated_at'):
+            watermark.last_updated_at = max(
+                filter(None, (watermark.last_updated_at, marks['last_updated_at']))
+            )
+        watermark.save()
+        AnalyticsCubeDirtyDay.objects.filter(pk__in=[pk for pk, _ in dirty]).delete()
+
+    logger.info(f"Cubo {key}: {len(facts)} hechos en {len(dates) if dates is not None else 'todos los'} días")
+    return len(facts)
+
+
+def refresh_cube(sources=None, full=False):
+    """Refrescar el cubo para las fuentes indicadas (todas por defecto)."""
+    return {key: refresh_source(key, full=full) for key in (sources or SOURCES)}
+
+
+# Primer refresco inmediato: un despliegue nuevo no sirve ceros hasta el primer intervalo
+cube_refresher = PeriodicThread(
+    'analytics-cube-refresh', refresh_cube, 'ANALYTICS_CUBE_REFRESH_INTERVAL', default=300,
+    error='Error refrescando el cubo analítico', run_at_start=True,
+)
+
+
+# ==============================================================================
+# DÍAS PENDIENTES
+# ==============================================================================
+
+def _cube_day(value):
+    """Día de cubo de una fecha u hora, con el mismo criterio que ``TruncDate``."""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def mark_dirty(key, days):
+    """Anotar días de una fuente para que el siguiente refresco los recalcule."""
+    AnalyticsCubeDirtyDay.objects.bulk_create(
+        [AnalyticsCubeDirtyDay(source=key, date=day) for day in set(days) if day],
+        ignore_conflicts=True,
+    )
+
+
+_sources_by_model = defaultdict(list)
+
+# Dimensiones que otras fuentes toman de un modelo: campos que las determinan
+# y, por fuente, la ruta desde sus filas hasta la instancia modificada
+DIMENSION_LINKS = {
+    Animal: (('breed', 'owner_id', 'current_batch_id'), {
+        'HEALTH_RECORD': 'animal',
+        'SENSOR': 'animal',
+        'BLOCKCHAIN_EVENT': 'animal',
+        'GPS': 'animal',
+    }),
+    Batch: (('status',), {
+        'ANIMAL': 'current_batch',
+        'HEALTH_RECORD': 'animal__current_batch',
+        'SENSOR': 'animal__current_batch',
+        'BLOCKCHAIN_EVENT': 'batch',
+    }),
+}
+
+
+def _tracked_fields(model):
+    fields = {source.date_field for source in _sources_by_model[model]}
+    fields.update(DIMENSION_LINKS.get(model, ((), {}))[0])
+    return sorted(fields)
+
+
+def _mark_linked(pk, links):
+    """Anotar los días de las filas que heredan dimensiones de la instancia ``pk``."""
+    for key, path in links.items():
+        source = SOURCES[key]
+        days = (
+            source.model._base_manager.filter(**{path: pk})
+            .annotate(cube_date=TruncDate(source.date_field))
+            .order_by().values_list('cube_date', flat=True).distinct()
+        )
+        mark_dirty(key, days)
+
+
+def _on_source_pre_save(sender, instance, raw=False, **kwargs):
+    """Leer los valores previos que ubican la fila (y sus dependientes) en el cubo."""
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._cube_previous = (
+        sender._base_manager.filter(pk=instance.pk).values(*_tracked_fields(sender)).first()
+    )
+
+
+def _on_source_save(sender, instance, created, raw=False, **kwargs):
+    """Una edición recalcula el día de la fila, antes y después del cambio."""
+    previous = instance.__dict__.pop('_cube_previous', None)
+    if raw or created or previous is None:
+        return
+
+    for source in _sources_by_model[sender]:
+        days = [
+            _cube_day(value)
+            for value in (getattr(instance, source.date_field, None), previous.get(source.date_field))
+        ]
+        transaction.on_commit(partial(mark_dirty, source.key, days))
+
+    fields, links = DIMENSION_LINKS.get(sender, ((), {}))
+    if any(previous[name] != getattr(instance, name) for name in fields):
+        transaction.on_commit(partial(_mark_linked, instance.pk, links))
+
+
+def _on_source_delete(sender, instance, **kwargs):
+    for source in _sources_by_model[sender]:
+        day = _cube_day(getattr(instance, source.date_field, None))
+        if day:
+            transaction.on_commit(partial(mark_dirty, source.key, [day]))
+
+
+def _on_batch_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    """El tamaño de un lote depende de sus animales: recalcular el día del lote."""
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        # Desde el lote: solo cambia el día del propio lote
+        if action != 'pre_clear':
+            transaction.on_commit(partial(mark_dirty, 'BATCH', [_cube_day(instance.created_at)]))
+        return
+
+    # Desde el animal: los lotes vienen en pk_set o, al vaciar, se leen antes de borrar
+    if action == 'post_clear':
+        return
+    batches = instance.batches.all() if action == 'pre_clear' else Batch.objects.filter(pk__in=pk_set)
+    days = [_cube_day(created_at) for created_at in batches.values_list('created_at', flat=True)]
+    if days:
+        transaction.on_commit(partial(mark_dirty, 'BATCH', days))
+
+
+def connect_cube_signals():
+    """Conectar las señales que anotan días pendientes del cubo."""
+    _sources_by_model.clear()
+    for source in SOURCES.values():
+        _sources_by_model[source.model].append(source)
+
+    for model in _sources_by_model:
+        label = model._meta.label_lower
+        pre_save.connect(
+            _on_source_pre_save, sender=model, dispatch_uid=f'analytics.cube.{label}.pre_save'
+        )
+        post_save.connect(
+            _on_source_save, sender=model, dispatch_uid=f'analytics.cube.{label}.post_save'
+        )
+        post_delete.connect(
+            _on_source_delete, sender=model,
+            dispatch_uid=f'analytics.cube.{label}.post_delete'
+        )
+    m2m_changed.connect(
+        _on_batch_membership, sender=Batch.animals.through,
+        dispatch_uid='analytics.cube.batch_animals.m2m_changed'
+    )
+
+
+# ==============================================================================
+# CONSULTAS
+# ==============================================================================
+
+def _finalize(row):
+    result = dict(row)
+    for measure in ADDITIVE_MEASURES:
+        result[measure] = result.pop(f'sum_{measure}', None) or 0
+    for measure in EXTREMA_MEASURES:
+        result[measure] = result.pop(f'ext_{measure}', None)
+    for name, (total, count) in DERIVED_AVERAGES.items():
+        result[name] = (result[total] / result[count]) if result[count] else None
+    return result
+
+
+class AnalyticsCube:
+    """Cortes (slice) y agregaciones (roll-up) sobre los hechos de una fuente."""
+
+    def __init__(self, source):
+        if source not in SOURCES:
+            raise ValueError(f"Fuente de cubo desconocida: {source}")
+        self.source = source
+        cube_refresher.ensure()
+
+    def slice(self, date_from=None, date_to=None, **filters):
+        queryset = AnalyticsDailyFact.objects.filter(source=self.source, **filters)
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        return queryset
+
+    def rollup(self, *dimensions, date_from=None, date_to=None, **filters):
+        """Agregar las medidas por las dimensiones dadas.
+
+        Sin dimensiones devuelve un único diccionario con los totales; con
+        dimensiones, una lista de diccionarios ordenada por ellas.
+        """
+        aggregates = {f'sum_{measure}': Sum(measure) for measure in ADDITIVE_MEASURES}
+        aggregates.update({f'ext_{measure}': agg(measure) for measure, agg in EXTREMA_MEASURES.items()})
+        queryset = self.slice(date_from=date_from, date_to=date_to, **filters)
+
+        if not dimensions:
+            return _finalize(queryset.aggregate(**aggregates))
+        rows = queryset.values(*dimensions).annotate(**aggregates).order_by(*dimensions)
+        return [_finalize(row) for row in rows]
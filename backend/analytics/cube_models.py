@@ -0,0 +1,107 @@
+# backend/analytics/cube_models.py
+from django.db import models
+
+
+class AnalyticsDailyFact(models.Model):
+    """Tabla de hechos diaria del cubo analítico.
+
+    Cada fila agrega las filas de una tabla origen (``source``) para un día y
+    una combinación de dimensiones. Las medidas son sumas, conteos, mínimos y
+    máximos, de modo que cualquier corte o roll-up se resuelve con SUM/MIN/MAX
+    sobre esta tabla. La mantiene ``analytics.cube.refresh_cube``.
+    """
+    SOURCES = [
+        ('ANIMAL', 'Animales'),
+        ('HEALTH_RECORD', 'Registros de Salud'),
+        ('SENSOR', 'Lecturas de Sensores'),
+        ('BLOCKCHAIN_EVENT', 'Eventos Blockchain'),
+        ('CONTRACT_TX', 'Interacciones con Contratos'),
+        ('BATCH', 'Lotes'),
+        ('GPS', 'Lecturas GPS'),
+        ('USER_ACTIVITY', 'Actividad de Usuarios'),
+    ]
+
+    # Dimensiones
+    date = models.DateField()
+    source = models.CharField(max_length=20, choices=SOURCES)
+    breed = models.CharField(max_length=100, blank=True, default='')
+    farm_id = models.BigIntegerField(default=0, help_text="ID del productor propietario; 0 = sin asignar")
+    batch_status = models.CharField(max_length=20, blank=True, default='')
+    event_type = models.CharField(max_length=30, blank=True, default='')
+    network = models.CharField(max_length=50, blank=True, default='')
+
+    # Medidas aditivas
+    record_count = models.BigIntegerField(default=0)
+    alert_count = models.BigIntegerField(default=0)
+    success_count = models.BigIntegerField(default=0)
+    failed_count = models.BigIntegerField(default=0)
+    temperature_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    temperature_count = models.BigIntegerField(default=0)
+    heart_rate_sum = models.BigIntegerField(default=0)
+    heart_rate_count = models.BigIntegerField(default=0)
+    movement_sum = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    movement_count = models.BigIntegerField(default=0)
+    gas_used_sum = models.DecimalField(max_digits=30, decimal_places=0, default=0)
+    gas_used_count = models.BigIntegerField(default=0)
+    gas_cost_wei_sum = models.DecimalField(max_digits=40, decimal_places=0, default=0)
+    birth_day_sum = models.BigIntegerField(default=0, help_text="Suma de fechas de nacimiento (ordinal)")
+    size_sum = models.BigIntegerField(default=0)
+    duration_seconds_sum = models.FloatField(default=0)
+    duration_count = models.BigIntegerField(default=0)
+
+    # Medidas semi-aditivas (roll-up con MIN/MAX)
+    size_min = models.BigIntegerField(null=True, blank=True)
+    size_max = models.BigIntegerField(null=True, blank=True)
+    duration_seconds_min = models.FloatField(null=True, blank=True)
+    duration_seconds_max = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'analytics_daily_fact'
+        verbose_name = "Hecho Analítico Diario"
+        verbose_name_plural = "Hechos Analíticos Diarios"
+        indexes = [
+            models.Index(fields=['source', 'date'], name='analytics_fact_source_date'),
+            models.Index(fields=['source', 'breed', 'date'], name='analytics_fact_breed'),
+            models.Index(fields=['source', 'farm_id', 'date'], name='analytics_fact_farm'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.date} ({self.record_count})"
+
+
+class AnalyticsCubeWatermark(models.Model):
+    """Marca de agua de refresco incremental por tabla origen"""
+    source = models.CharField(max_length=20, unique=True, choices=AnalyticsDailyFact.SOURCES)
+    last_id = models.BigIntegerField(default=0)
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'analytics_cube_watermark'
+        verbose_name = "Marca de Agua del Cubo"
+        verbose_name_plural = "Marcas de Agua del Cubo"
+
+    def __str__(self):
+        return f"{self.source} - {self.refreshed_at}"
+
+
+class AnalyticsCubeDirtyDay(models.Model):
+    """Día del cubo pendiente de recalcular.
+
+    Las marcas de agua solo ven altas y cambios; los borrados y los cambios
+    de pertenencia a lotes se anotan aquí y el siguiente refresco los consume.
+    """
+    source = models.CharField(max_length=20, choices=AnalyticsDailyFact.SOURCES)
+    date = models.DateField()
+    marked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'analytics_cube_dirty_day'
+        verbose_name = "Día Pendiente del Cubo"
+        verbose_name_plural = "Días Pendientes del Cubo"
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'date'], name='unique_analytics_cube_dirty_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.date}"
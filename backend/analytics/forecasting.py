@@ -0,0 +1,278 @@
+# backend/analytics/forecasting.py
+"""
+Pronósticos vectorizados con caché de modelos.
+
+Cada familia de series (temperatura por animal, precio por raza, peso por
+raza) se ajusta con regresión lineal por mínimos cuadrados resuelta en forma
+cerrada para todas las series a la vez. Se guardan solo los estadísticos
+suficientes por serie (n, Σx, Σy, Σx², Σxy), que son aditivos: las tablas de
+solo inserción se reajustan cargando únicamente las filas posteriores al
+último id ajustado; las mutables se reajustan completas cuando cambian.
+
+Una fila con id menor que el último ajustado puede confirmarse después del
+ajuste (transacciones que se confirman fuera de orden). Por eso se guardan
+también los ids ya sumados de los últimos ``ANALYTICS_FORECAST_ID_OVERLAP``
+ids, y el ajuste incremental relee esa ventana sumando solo los que faltan.
+
+Si hay que reajustar se decide con la versión de datos de cada tabla
+(``core.data_versions``), leída de la caché sin consultas: si solo cambió
+la versión de altas basta un ajuste incremental; si cambió la de
+reescrituras (cambios o bajas), el ajuste es completo.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from blockchain.market_models import Trade
+from cattle.models import Animal, AnimalHealthRecord
+from core.data_versions import data_versions
+
+logger = logging.getLogger(__name__)
+
+# Origen fijo del eje x (días): necesario para que los estadísticos sean acumulables
+ORIGIN = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+SECONDS_PER_DAY = 86400.0
+CACHE_PREFIX = 'analytics:forecast:'
+CACHE_TIMEOUT = None
+
+
+def days_since_origin(values):
+    return np.fromiter(
+        ((value - ORIGIN).total_seconds() / SECONDS_PER_DAY for value in values),
+        dtype=np.float64,
+        count=len(values)
+    )
+
+
+class SeriesStats:
+    """Estadísticos suficientes de regresión lineal para muchas series."""
+    N, SX, SY, SXX, SXY = range(5)
+
+    def __init__(self, keys=(), stats=None):
+        self.keys = list(keys)
+        self.index = {key: position for position, key in enumerate(self.keys)}
+        self.stats = stats if stats is not None else np.zeros((5, len(self.keys)))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, keys, x, y):
+        """Acumular observaciones ``(x, y)`` de las series ``keys`` (arrays alineados)."""
+        if len(keys) == 0:
+            return self
+        unique, inverse = np.unique(np.asarray(keys), return_inverse=True)
+
+        new_keys = [key for key in unique.tolist() if key not in self.index]
+        if new_keys:
+            for key in new_keys:
+                self.index[key] = len(self.keys)
+                self.keys.append(key)
+            self.stats = np.hstack([self.stats, np.zeros((5, len(new_keys)))])
+
+        positions = np.fromiter((self.index[key] for key in unique.tolist()), dtype=np.int64, count=len(unique))
+        size = len(unique)
+        self.stats[:, positions] += np.vstack([
+            np.bincount(inverse, minlength=size),
+            np.bincount(inverse, weights=x, minlength=size),
+            np.bincount(inverse, weights=y, minlength=size),
+            np.bincount(inverse, weights=x * x, minlength=size),
+            np.bincount(inverse, weights=x * y, minlength=size),
+        ])
+        return self
+
+    def coefficients(self):
+        """Pendiente e intercepto por serie; NaN si la serie no es ajustable."""
+        n, sx, sy, sxx, sxy = self.stats
+        denominator = n * sxx - sx * sx
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(np.abs(denominator) > 1e-9, (n * sxy - sx * sy) / denominator, np.nan)
+            intercept = (sy - np.nan_to_num(slope) * sx) / n
+        return slope, intercept
+
+    def mean_x(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.stats[self.SX] / self.stats[self.N]
+
+    def predict(self, x):
+        """Predicción en ``x`` (escalar o array por serie); sin pendiente, la media."""
+        slope, intercept = self.coefficients()
+        return intercept + np.nan_to_num(slope) * x
+
+
+@dataclass(frozen=True)
+class ForecastFamily:
+    """Familia de series: de dónde salen los puntos y cómo se refresca."""
+    key: str
+    load: Callable
+    append_only: bool
+    model: type
+    updated_field: Optional[str] = None
+
+
+def _load_temperatures(queryset):
+    rows = list(queryset.filter(temperature__isnull=False).values_list('animal_id', 'created_at', 'temperature'))
+    if not rows:
+        return [], np.empty(0), np.empty(0)
+    animal_ids, created, temperatures = zip(*rows)
+    return animal_ids, days_since_origin(created), np.asarray(temperatures, dtype=np.float64)
+
+
+def _load_prices(queryset):
+    rows = list(queryset.values_list('listing__animal__breed', 'trade_date', 'price'))
+    if not rows:
+        return [], np.empty(0), np.empty(0)
+    breeds, traded, prices = zip(*rows)
+    return breeds, days_since_origin(traded), np.asarray(prices, dtype=np.float64)
+
+
+def _load_weights(queryset):
+    """Peso frente a edad (días) en la última actualización del animal."""
+    rows = list(queryset.values_list('breed', 'birth_date', 'updated_at', 'weight'))
+    if not rows:
+        return [], np.empty(0), np.empty(0)
+    breeds, born, updated, weights = zip(*rows)
+    ages = np.fromiter(
+        ((timezone.localtime(moment).date() - birth).days for birth, moment in zip(born, updated)),
+        dtype=np.float64,
+        count=len(rows)
+    )
+    return breeds, ages, np.asarray(weights, dtype=np.float64)
+
+
+FAMILIES = {
+    family.key: family for family in (
+        ForecastFamily('health_temperature', _load_temperatures, append_only=True, model=AnimalHealthRecord),
+        ForecastFamily('breed_price', _load_prices, append_only=True, model=Trade),
+        ForecastFamily('breed_weight', _load_weights, append_only=False, model=Animal, updated_field='updated_at'),
+    )
+}
+
+
+def fitted_series(key):
+    """Estadísticos ajustados de una familia, reajustando solo lo necesario.
+
+    Devuelve ``(SeriesStats, info)`` donde ``info`` describe el reajuste.
+    """
+    family = FAMILIES[key]
+    inserts, rewrites = data_versions([family.model])[family.model._meta.label]
+    cached = cache.get(CACHE_PREFIX + key)
+
+    if cached and cached['version'] == [inserts, rewrites]:
+        return SeriesStats(cached['keys'], cached['stats']), {'refit': 'none', 'series': len(cached['keys'])}
+
+    base = family.model._base_manager.all()
+    last_id = base.aggregate(last_id=Max('pk'))['last_id']
+    # Si además de inserciones hubo cambios o borrados, los estadísticos acumulados no sirven
+    incremental = bool(
+        family.append_only and cached and 'tail' in cached
+        and last_id is not None and cached['version'][1] == rewrites
+    )
+
+    # Ventana final por ids explícitos: lo que se suma de ella es justo lo que se recuerda
+    overlap = getattr(settings, 'ANALYTICS_FORECAST_ID_OVERLAP', 500)
+    tail_floor = max((last_id or 0) - overlap, 0)
+    tail = list(base.filter(pk__gt=tail_floor, pk__lte=last_id or 0).values_list('pk', flat=True))
+
+    if incremental:
+        series = SeriesStats(cached['keys'], cached['stats'].copy())
+        folded = set(cached['tail'])
+        start = max((cached['last_id'] or 0) - overlap, 0)
+        older = base.filter(pk__gt=start, pk__lte=tail_floor).exclude(pk__in=folded)
+        recent = [pk for pk in tail if pk not in folded]
+    else:
+        series = SeriesStats()
+        older = base.filter(pk__lte=tail_floor)
+        recent = tail
+
+    new_points = 0
+    for queryset in (older, base.filter(pk__in=recent)):
+        keys, x, y = family.load(queryset)
+        series.add(keys, x, y)
+        new_points += len(keys)
+
+    cache.set(CACHE_PREFIX + key, {
+        'version': [inserts, rewrites],
+        'last_id': last_id,
+        'tail': tail,
+        'keys': series.keys,
+        'stats': series.stats,
+    }, CACHE_TIMEOUT)
+    return series, {
+        'refit': 'incremental' if incremental else 'full',
+        'series': len(series),
+        'new_points': new_points,
+    }
+
+
+def temperature_forecast(horizon_days=7, threshold=39.5):
+    """Animales cuya temperatura proyectada supera el umbral en ``horizon_days``."""
+    series, info = fitted_series('health_temperature')
+    if not len(series):
+        return {'animals_at_risk': [], 'series': 0, 'model': info}
+
+    target = (timezone.now() - ORIGIN).total_seconds() / SECONDS_PER_DAY + horizon_days
+    predicted = series.predict(target)
+    at_risk = np.flatnonzero(predicted > threshold)
+    ordered = at_risk[np.argsort(-predicted[at_risk])]
+    return {
+        'animals_at_risk': [
+            {'animal_id': series.keys[position], 'predicted_temperature': round(float(predicted[position]), 2)}
+            for position in ordered
+        ],
+        'series': len(series),
+        'model': info,
+    }
+
+
+def price_forecast(horizon_days=30):
+    """Precio proyectado por raza a ``horizon_days`` a partir de las operaciones."""
+    series, info = fitted_series('breed_price')
+    if not len(series):
+        return {'by_breed': [], 'model': info}
+
+    today = (timezone.now() - ORIGIN).total_seconds() / SECONDS_PER_DAY
+    slope, _ = series.coefficients()
+    current = series.predict(today)
+    predicted = series.predict(today + horizon_days)
+    return {
+        'by_breed': [
+            {
+                'breed': breed,
+                'predicted_price': round(float(predicted[position]), 2),
+                'change_pct': round(float((predicted[position] - current[position]) * 100.0 / current[position]), 2) if current[position] else 0,
+                'trades': int(series.stats[SeriesStats.N, position]),
+                'trend': 'UP' if slope[position] > 0 else 'DOWN' if slope[position] < 0 else 'FLAT',
+            }
+            for position, breed in enumerate(series.keys)
+        ],
+        'model': info,
+    }
+
+
+def weight_forecast(horizon_days=30):
+    """Ganancia diaria y peso medio esperado por raza a ``horizon_days``."""
+    series, info = fitted_series('breed_weight')
+    if not len(series):
+        return {'by_breed': [], 'model': info}
+
+    slope, _ = series.coefficients()
+    expected = series.predict(series.mean_x() + horizon_days)
+    return {
+        'by_breed': [
+            {
+                'breed': breed,
+                'animals': int(series.stats[SeriesStats.N, position]),
+                'daily_gain_kg': round(float(slope[position]), 3) if not np.isnan(slope[position]) else None,
+                'expected_avg_weight_kg': round(float(expected[position]), 2),
+            }
+            for position, breed in enumerate(series.keys)
+        ],
+        'model': info,
+    }
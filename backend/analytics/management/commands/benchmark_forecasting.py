@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from analytics.forecasting import SeriesStats
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de ajuste vectorizado de series de pronóstico (sin base de datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--series', type=int, default=10_000, help='Número de series')
+        parser.add_argument('--points', type=int, default=50, help='Puntos por serie')
+        parser.add_argument('--increment', type=int, default=1, help='Puntos nuevos por serie en el reajuste incremental')
+
+    def handle(self, *args, **options):
+        series, points, increment = options['series'], options['points'], options['increment']
+        rng = np.random.default_rng(42)
+
+        keys = np.repeat(np.arange(series), points)
+        x = np.tile(np.arange(points, dtype=np.float64), series)
+        slopes = rng.normal(size=series)
+        y = slopes[keys] * x + rng.normal(scale=0.5, size=keys.size)
+
+        started = time.perf_counter()
+        stats = SeriesStats().add(keys, x, y)
+        fitted_slopes, _ = stats.coefficients()
+        full_elapsed = time.perf_counter() - started
+
+        new_keys = np.repeat(np.arange(series), increment)
+        new_x = np.tile(np.arange(points, points + increment, dtype=np.float64), series)
+        new_y = slopes[new_keys] * new_x
+
+        started = time.perf_counter()
+        stats.add(new_keys, new_x, new_y).coefficients()
+        incremental_elapsed = time.perf_counter() - started
+
+        sample = min(series, 200)
+        started = time.perf_counter()
+        for index in range(sample):
+            np.polyfit(x[:points], y[index * points:(index + 1) * points], 1)
+        polyfit_elapsed = (time.perf_counter() - started) * series / sample
+
+        self.stdout.write(f'  ajuste completo: {series} series x {points} puntos en {full_elapsed * 1000:.1f} ms')
+        self.stdout.write(f'  reajuste incremental (+{increment} puntos/serie): {incremental_elapsed * 1000:.1f} ms')
+        self.stdout.write(f'  np.polyfit por serie (estimado): {polyfit_elapsed * 1000:.1f} ms')
+        self.stdout.write(f'  error máximo de pendiente: {float(np.max(np.abs(fitted_slopes - slopes))):.4f}')
+        self.stdout.write(self.style.SUCCESS('Benchmark de pronósticos completado.'))
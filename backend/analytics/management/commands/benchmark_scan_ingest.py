@@ -0,0 +1,61 @@
+# analytics/management/commands/benchmark_scan_ingest.py
+import random
+import threading
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from analytics.scans import HyperLogLog, ScanBuffer, visitor_hash
+
+
+class Command(BaseCommand):
+    help = 'Mide la ingesta de escaneos en el búfer y la agregación previa al volcado (sin base de datos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scans', type=int, default=200000, help='Escaneos a registrar')
+        parser.add_argument('--threads', type=int, default=8, help='Hilos concurrentes')
+        parser.add_argument('--animals', type=int, default=1000, help='Animales distintos')
+        parser.add_argument('--visitors', type=int, default=50000, help='Visitantes distintos')
+
+    def handle(self, *args, **options):
+        buffer = ScanBuffer()
+        buffer._ensure_flusher = lambda: None
+        per_thread = options['scans'] // options['threads']
+        regions = ['AR', 'UY', 'BR', 'PY', '']
+        tiers = ['PUBLIC', 'BASIC', 'PREMIUM']
+        today = date.today()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            for _ in range(per_thread):
+                buffer.record(
+                    rng.randrange(options['animals']), region=rng.choice(regions), tier=rng.choice(tiers),
+                    visitor=rng.randrange(options['visitors']), day=today
+                )
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ingest = time.perf_counter() - started
+        total = per_thread * options['threads']
+
+        started = time.perf_counter()
+        with buffer._lock:
+            counts, visitors = dict(buffer._counts), dict(buffer._visitors)
+        sketches = {key: HyperLogLog().add_hashes(visitors.get(key, ())) for key in counts}
+        aggregate = time.perf_counter() - started
+
+        assert sum(counts.values()) == total
+        merged = HyperLogLog()
+        for sketch in sketches.values():
+            merged.merge(sketch)
+        exact = len({visitor_hash(value) for values in visitors.values() for value in values})
+
+        self.stdout.write(f'Ingesta: {total} escaneos en {ingest:.2f}s ({total / ingest:,.0f} escaneos/s)')
+        self.stdout.write(f'Agregación: {len(counts)} claves en {aggregate * 1000:.0f} ms')
+        self.stdout.write(f'Visitantes únicos: estimado {merged.count()} / exacto {exact}')
+        self.stdout.write(self.style.SUCCESS('Benchmark de escaneos completado'))
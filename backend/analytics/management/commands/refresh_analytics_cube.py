@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from analytics.cube import SOURCES, refresh_cube
+
+class Command(BaseCommand):
+    help = 'Refresca el cubo analítico diario desde la última marca de agua'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            action='append',
+            dest='sources',
+            choices=sorted(SOURCES),
+            help='Fuente a refrescar (se puede repetir). Por defecto, todas.'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Reconstruir todos los días (recoge borrados y cambios de dimensiones)'
+        )
+
+    def handle(self, *args, **options):
+        written = refresh_cube(options.get('sources'), full=options['full'])
+
+        for source, facts in written.items():
+            self.stdout.write(f'  {source}: {facts} hechos')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Cubo refrescado: {len(written)} fuentes, {sum(written.values())} hechos escritos.'
+            )
+        )
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCubeWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('ANIMAL', 'Animales'), ('HEALTH_RECORD', 'Registros de Salud'), ('SENSOR', 'Lecturas de Sensores'), ('BLOCKCHAIN_EVENT', 'Eventos Blockchain'), ('CONTRACT_TX', 'Interacciones con Contratos'), ('BATCH', 'Lotes')], max_length=20, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('last_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de Agua del Cubo',
+                'verbose_name_plural': 'Marcas de Agua del Cubo',
+                'db_table': 'analytics_cube_watermark',
+            },
+        ),
+        migrations.CreateModel(
+            name='AnalyticsDailyFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(choices=[('ANIMAL', 'Animales'), ('HEALTH_RECORD', 'Registros de Salud'), ('SENSOR', 'Lecturas de Sensores'), ('BLOCKCHAIN_EVENT', 'Eventos Blockchain'), ('CONTRACT_TX', 'Interacciones con Contratos'), ('BATCH', 'Lotes')], max_length=20)),
+                ('breed', models.CharField(blank=True, default='', max_length=100)),
+                ('farm_id', models.BigIntegerField(default=0, help_text='ID del productor propietario; 0 = sin asignar')),
+                ('batch_status', models.CharField(blank=True, default='', max_length=20)),
+                ('event_type', models.CharField(blank=True, default='', max_length=30)),
+                ('network', models.CharField(blank=True, default='', max_length=50)),
+                ('record_count', models.BigIntegerField(default=0)),
+                ('alert_count', models.BigIntegerField(default=0)),
+                ('success_count', models.BigIntegerField(default=0)),
+                ('failed_count', models.BigIntegerField(default=0)),
+                ('temperature_sum', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('temperature_count', models.BigIntegerField(default=0)),
+                ('heart_rate_sum', models.BigIntegerField(default=0)),
+                ('heart_rate_count', models.BigIntegerField(default=0)),
+                ('movement_sum', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('movement_count', models.BigIntegerField(default=0)),
+                ('gas_used_sum', models.DecimalField(decimal_places=0, default=0, max_digits=30)),
+                ('gas_used_count', models.BigIntegerField(default=0)),
+                ('gas_cost_wei_sum', models.DecimalField(decimal_places=0, default=0, max_digits=40)),
+                ('birth_day_sum', models.BigIntegerField(default=0, help_text='Suma de fechas de nacimiento (ordinal)')),
+                ('size_sum', models.BigIntegerField(default=0)),
+                ('duration_seconds_sum', models.FloatField(default=0)),
+                ('duration_count', models.BigIntegerField(default=0)),
+                ('size_min', models.BigIntegerField(blank=True, null=True)),
+                ('size_max', models.BigIntegerField(blank=True, null=True)),
+                ('duration_seconds_min', models.FloatField(blank=True, null=True)),
+                ('duration_seconds_max', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Hecho Analítico Diario',
+                'verbose_name_plural': 'Hechos Analíticos Diarios',
+                'db_table': 'analytics_daily_fact',
+                'indexes': [models.Index(fields=['source', 'date'], name='analytics_fact_source_date'), models.Index(fields=['source', 'breed', 'date'], name='analytics_fact_breed'), models.Index(fields=['source', 'farm_id', 'date'], name='analytics_fact_farm')],
+            },
+        ),
+    ]
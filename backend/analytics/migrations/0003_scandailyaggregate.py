@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_analyticsdailyfact_analyticscubewatermark'),
+        ('cattle', '0008_animalmultichain_animalnftmirror'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanDailyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('region', models.CharField(blank=True, default='', max_length=64)),
+                ('tier', models.CharField(default='PUBLIC', max_length=20)),
+                ('scans', models.BigIntegerField(default=0)),
+                ('unique_visitors', models.IntegerField(default=0, verbose_name='Visitantes únicos (estimados)')),
+                ('visitor_sketch', models.BinaryField(default=b'')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('animal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_aggregates', to='cattle.animal')),
+            ],
+            options={
+                'verbose_name': 'Escaneos Diarios',
+                'verbose_name_plural': 'Escaneos Diarios',
+                'db_table': 'analytics_scan_daily_aggregate',
+                'indexes': [models.Index(fields=['date', 'tier'], name='scan_agg_date_tier_idx')],
+                'constraints': [models.UniqueConstraint(fields=('animal', 'date', 'region', 'tier'), name='unique_scan_daily_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_scandailyaggregate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analyticsdailyfact',
+            name='source',
+            field=models.CharField(choices=[('ANIMAL', 'Animales'), ('HEALTH_RECORD', 'Registros de Salud'), ('SENSOR', 'Lecturas de Sensores'), ('BLOCKCHAIN_EVENT', 'Eventos Blockchain'), ('CONTRACT_TX', 'Interacciones con Contratos'), ('BATCH', 'Lotes'), ('GPS', 'Lecturas GPS'), ('USER_ACTIVITY', 'Actividad de Usuarios')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='analyticscubewatermark',
+            name='source',
+            field=models.CharField(choices=[('ANIMAL', 'Animales'), ('HEALTH_RECORD', 'Registros de Salud'), ('SENSOR', 'Lecturas de Sensores'), ('BLOCKCHAIN_EVENT', 'Eventos Blockchain'), ('CONTRACT_TX', 'Interacciones con Contratos'), ('BATCH', 'Lotes'), ('GPS', 'Lecturas GPS'), ('USER_ACTIVITY', 'Actividad de Usuarios')], max_length=20, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_cube_gps_user_activity_sources'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCubeDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('ANIMAL', 'Animales'), ('HEALTH_RECORD', 'Registros de Salud'), ('SENSOR', 'Lecturas de Sensores'), ('BLOCKCHAIN_EVENT', 'Eventos Blockchain'), ('CONTRACT_TX', 'Interacciones con Contratos'), ('BATCH', 'Lotes'), ('GPS', 'Lecturas GPS'), ('USER_ACTIVITY', 'Actividad de Usuarios')], max_length=20)),
+                ('date', models.DateField()),
+                ('marked_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Día Pendiente del Cubo',
+                'verbose_name_plural': 'Días Pendientes del Cubo',
+                'db_table': 'analytics_cube_dirty_day',
+                'constraints': [models.UniqueConstraint(fields=('source', 'date'), name='unique_analytics_cube_dirty_day')],
+            },
+        ),
+    ]
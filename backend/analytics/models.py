@@ -13,4 +13,8 @@ class CarbonFootprint(models.Model):
     animal = models.ForeignKey('cattle.Animal', on_delete=models.CASCADE)
     co2_kg = models.DecimalField(max_digits=10, decimal_places=2)
     calculation_method = models.CharField(max_length=100)
-    certification = models.ForeignKey('certification.Certification', on_delete=models.CASCADE)
\ No newline at end of file
+    certification = models.ForeignKey('certification.Certification', on_delete=models.CASCADE)
+
+
+from .cube_models import AnalyticsDailyFact, AnalyticsCubeWatermark, AnalyticsCubeDirtyDay
+from .scan_models import ScanDailyAggregate
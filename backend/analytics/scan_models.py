@@ -0,0 +1,33 @@
+# backend/analytics/scan_models.py
+from django.db import models
+
+
+class ScanDailyAggregate(models.Model):
+    """Escaneos de QR agregados por (animal, día, región, nivel).
+
+    La mantiene ``analytics.scans.scan_buffer.flush()`` a partir del búfer en memoria:
+    ``scans`` es exacto; ``unique_visitors`` es la estimación HyperLogLog de
+    ``visitor_sketch`` (los sketches se combinan entre filas con máximo por registro).
+    """
+    animal = models.ForeignKey('cattle.Animal', on_delete=models.CASCADE, related_name='scan_aggregates')
+    date = models.DateField()
+    region = models.CharField(max_length=64, blank=True, default='')
+    tier = models.CharField(max_length=20, default='PUBLIC')
+    scans = models.BigIntegerField(default=0)
+    unique_visitors = models.IntegerField(default=0, verbose_name="Visitantes únicos (estimados)")
+    visitor_sketch = models.BinaryField(default=b'')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'analytics_scan_daily_aggregate'
+        verbose_name = "Escaneos Diarios"
+        verbose_name_plural = "Escaneos Diarios"
+        constraints = [
+            models.UniqueConstraint(fields=['animal', 'date', 'region', 'tier'], name='unique_scan_daily_key'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'tier'], name='scan_agg_date_tier_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.animal_id} {self.date} {self.region or '-'} {self.tier}: {self.scans}"
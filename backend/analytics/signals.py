@@ -1,15 +1,14 @@
 # backend/analytics/signals.py
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from consumer.models import QRCodeScan
-from .models import ConsumerAnalytics
-
-@receiver(post_save, sender=QRCodeScan)
-def update_analytics_on_scan(sender, instance, created, **kwargs):
-    """Actualizar analíticas cuando se escanea un QR"""
-    if created:
-        # Actualizar analítica del día
-        today = timezone.now().date()
-        analytics, _ = ConsumerAnalytics.objects.get_or_create(date=today)
-        analytics.total_qr_scans += 1
-        analytics.save()
\ No newline at end of file
+from django.dispatch import Signal, receiver
+
+from .scans import scan_buffer, scan_context
+
+# Enviada por las vistas de consumidor en cada escaneo verificado (animal_id, request)
+qr_scanned = Signal()
+
+
+@receiver(qr_scanned)
+def buffer_scan(sender, animal_id, request, **kwargs):
+    """Anexar el escaneo al búfer; se agrega y vuelca a ScanDailyAggregate por intervalos"""
+    region, tier, visitor = scan_context(request)
+    scan_buffer.record(animal_id, region=region, tier=tier, visitor=visitor)
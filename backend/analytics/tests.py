@@ -1,3 +1,464 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blockchain.models import BlockchainEvent, ContractInteraction
+from cattle.models import Animal, AnimalHealthRecord, Batch
+from iot.models import HealthSensorData, IoTDevice
+from users.models import User
+from .cube import AnalyticsCube, refresh_cube
+from .forecasting import SeriesStats, fitted_series
+from .models import AnalyticsCubeDirtyDay, AnalyticsCubeWatermark, AnalyticsDailyFact, ScanDailyAggregate
+from .scans import HyperLogLog, ScanBuffer, unique_visitors, visitor_hash
+
+
+class AnalyticsCubeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='cubeuser',
+            email='cube@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.angus = self.create_animal('CUBE001', 'Angus', 'HEALTHY')
+        self.hereford = self.create_animal('CUBE002', 'Hereford', 'SICK')
+        self.device = IoTDevice.objects.create(
+            device_id='CUBEDEV001',
+            device_type='HEART_RATE',
+            name='Cube Device',
+            status='ACTIVE',
+            owner=self.user
+        )
+
+        for animal, temperature, heart_rate in (
+            (self.angus, Decimal('38.50'), 70),
+            (self.angus, Decimal('39.10'), None),
+            (self.hereford, Decimal('40.20'), 95),
+        ):
+            AnimalHealthRecord.objects.create(
+                animal=animal, health_status=animal.health_status,
+                temperature=temperature, heart_rate=heart_rate
+            )
+            HealthSensorData.objects.create(
+                device=self.device, animal=animal, temperature=temperature,
+                heart_rate=heart_rate, movement_activity=Decimal('5.00'),
+                timestamp=timezone.now(), health_alert=temperature > 40
+            )
+
+        for gas_used, gas_price, tx_status in ((21000, 30 * 10**9, 'SUCCESS'), (50000, 25 * 10**9, 'FAILED')):
+            ContractInteraction.objects.create(
+                contract_type='NFT', action_type='MINT',
+                transaction_hash=f'0x{gas_used:064x}', block_number=1,
+                caller_address=self.user.wallet_address,
+                gas_used=gas_used, gas_price=gas_price, status=tx_status
+            )
+        BlockchainEvent.objects.create(
+            event_type='MINT', transaction_hash='0x' + 'a' * 64, block_number=1,
+            animal=self.angus, from_address=self.user.wallet_address
+        )
+
+        batch = Batch.objects.create(
+            name='Lote Cubo', origin='Granja A', destination='Planta B', created_by=self.user
+        )
+        batch.animals.add(self.angus, self.hereford)
+
+    def create_animal(self, ear_tag, breed, health_status):
+        return Animal.objects.create(
+            ear_tag=ear_tag,
+            breed=breed,
+            birth_date='2023-01-01',
+            weight=450.5,
+            health_status=health_status,
+            owner=self.user,
+            location='Test Farm'
+        )
+
+    def test_cube_matches_source_aggregates(self):
+        refresh_cube()
+
+        health = AnalyticsCube('HEALTH_RECORD').rollup()
+        raw_health = AnimalHealthRecord.objects.aggregate(
+            count=Count('id'), avg_temperature=Avg('temperature'), avg_heart_rate=Avg('heart_rate')
+        )
+        self.assertEqual(health['record_count'], raw_health['count'])
+        self.assertAlmostEqual(float(health['avg_temperature']), float(raw_health['avg_temperature']), places=4)
+        self.assertAlmostEqual(float(health['avg_heart_rate']), float(raw_health['avg_heart_rate']), places=4)
+
+        sensors = AnalyticsCube('SENSOR').rollup()
+        self.assertEqual(sensors['record_count'], HealthSensorData.objects.count())
+        self.assertEqual(sensors['alert_count'], HealthSensorData.objects.filter(health_alert=True).count())
+
+        transactions = AnalyticsCube('CONTRACT_TX').rollup()
+        raw_tx = ContractInteraction.objects.aggregate(
+            gas=Sum('gas_used'), successful=Count('id', filter=Q(status='SUCCESS'))
+        )
+        self.assertEqual(transactions['gas_used_sum'], raw_tx['gas'])
+        self.assertEqual(transactions['success_count'], raw_tx['successful'])
+        self.assertEqual(
+            transactions['gas_cost_wei_sum'],
+            sum(tx.gas_used * tx.gas_price for tx in ContractInteraction.objects.all())
+        )
+
+        breeds = {row['breed']: row['record_count'] for row in AnalyticsCube('ANIMAL').rollup('breed')}
+        self.assertEqual(breeds, {'Angus': 1, 'Hereford': 1})
+
+        batches = AnalyticsCube('BATCH').rollup()
+        self.assertEqual(batches['record_count'], 1)
+        self.assertEqual(batches['size_max'], 2)
+
+    def test_incremental_refresh_only_adds_new_rows(self):
+        refresh_cube()
+        watermark = AnalyticsCubeWatermark.objects.get(source='HEALTH_RECORD')
+        self.assertEqual(watermark.last_id, AnimalHealthRecord.objects.latest('id').id)
+
+        AnimalHealthRecord.objects.create(
+            animal=self.hereford, health_status='SICK', temperature=Decimal('40.00')
+        )
+        written = refresh_cube(['HEALTH_RECORD'])
+
+        self.assertEqual(written['HEALTH_RECORD'], AnalyticsDailyFact.objects.filter(source='HEALTH_RECORD').count())
+        self.assertEqual(AnalyticsCube('HEALTH_RECORD').rollup()['record_count'], AnimalHealthRecord.objects.count())
+
+        # Releer el margen detrás de la marca no altera el resultado
+        facts = AnalyticsDailyFact.objects.filter(source='HEALTH_RECORD').count()
+        refresh_cube(['HEALTH_RECORD'])
+        self.assertEqual(AnalyticsDailyFact.objects.filter(source='HEALTH_RECORD').count(), facts)
+        self.assertEqual(AnalyticsCube('HEALTH_RECORD').rollup()['record_count'], AnimalHealthRecord.objects.count())
+
+    def test_rows_committed_behind_the_watermark_are_picked_up(self):
+        refresh_cube()
+        record = AnimalHealthRecord.objects.create(
+            animal=self.hereford, health_status='SICK', temperature=Decimal('40.00')
+        )
+        # Una fila con id mayor ya se agregó antes de que esta se confirmara
+        AnalyticsCubeWatermark.objects.filter(source='HEALTH_RECORD').update(last_id=record.id + 1)
+
+        refresh_cube(['HEALTH_RECORD'])
+
+        self.assertEqual(AnalyticsCube('HEALTH_RECORD').rollup()['record_count'], AnimalHealthRecord.objects.count())
+
+    def test_edits_are_reaggregated(self):
+        refresh_cube()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reading = HealthSensorData.objects.filter(health_alert=False).first()
+            reading.health_alert = True
+            reading.save()
+            record = AnimalHealthRecord.objects.filter(animal=self.angus).first()
+            record.health_status = 'SICK'
+            record.save()
+        refresh_cube()
+
+        sensors = AnalyticsCube('SENSOR').rollup()
+        self.assertEqual(sensors['alert_count'], HealthSensorData.objects.filter(health_alert=True).count())
+        statuses = {
+            row['event_type']: row['record_count'] for row in AnalyticsCube('HEALTH_RECORD').rollup('event_type')
+        }
+        raw_statuses = dict(
+            AnimalHealthRecord.objects.values('health_status').annotate(count=Count('id'))
+            .values_list('health_status', 'count')
+        )
+        self.assertEqual(statuses, raw_statuses)
+
+    def test_animal_and_batch_dimension_changes_are_reaggregated(self):
+        refresh_cube()
+        batch = Batch.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.angus.breed = 'Brahman'
+            self.angus.current_batch = batch
+            self.angus.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            batch.status = 'IN_TRANSIT'
+            batch.save()
+        refresh_cube()
+
+        for key, model in (('SENSOR', HealthSensorData), ('HEALTH_RECORD', AnimalHealthRecord)):
+            cube = {
+                (row['breed'], row['batch_status']): row['record_count']
+                for row in AnalyticsCube(key).rollup('breed', 'batch_status')
+            }
+            raw = {
+                (breed, batch_status or ''): count
+                for breed, batch_status, count in model.objects.values(
+                    'animal__breed', 'animal__current_batch__status'
+                ).annotate(count=Count('id')).values_list(
+                    'animal__breed', 'animal__current_batch__status', 'count'
+                )
+            }
+            self.assertEqual(cube, raw)
+        animals = {row['batch_status'] for row in AnalyticsCube('ANIMAL').rollup('batch_status')}
+        self.assertIn('IN_TRANSIT', animals)
+
+    def test_full_refresh_picks_up_deletions(self):
+        refresh_cube()
+        HealthSensorData.objects.filter(animal=self.hereford).delete()
+
+        refresh_cube(['SENSOR'], full=True)
+
+        self.assertEqual(AnalyticsCube('SENSOR').rollup()['record_count'], HealthSensorData.objects.count())
+
+    def test_deletions_and_batch_membership_mark_dirty_days(self):
+        refresh_cube()
+        batch = Batch.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            HealthSensorData.objects.filter(animal=self.hereford).delete()
+            batch.animals.remove(self.hereford)
+        self.assertEqual(
+            set(AnalyticsCubeDirtyDay.objects.values_list('source', flat=True)), {'SENSOR', 'BATCH'}
+        )
+
+        refresh_cube(['SENSOR', 'BATCH'])
+
+        self.assertEqual(AnalyticsCube('SENSOR').rollup()['record_count'], HealthSensorData.objects.count())
+        self.assertEqual(AnalyticsCube('BATCH').rollup()['size_max'], 1)
+        self.assertFalse(AnalyticsCubeDirtyDay.objects.exists())
+
+    def test_rollup_respects_date_window(self):
+        refresh_cube()
+        tomorrow = timezone.localdate() + timedelta(days=1)
+
+        self.assertEqual(AnalyticsCube('SENSOR').rollup(date_from=tomorrow)['record_count'], 0)
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'analytics-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ForecastingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='forecaster',
+            email='forecast@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.animal = Animal.objects.create(
+            ear_tag='FCST001',
+            breed='Angus',
+            birth_date='2023-01-01',
+            weight=450.5,
+            health_status='HEALTHY',
+            owner=self.user,
+            location='Test Farm'
+        )
+
+    def test_series_stats_match_polyfit(self):
+        x = np.arange(10, dtype=float)
+        first, second = 2.0 * x + 1, -0.5 * x + 7
+        stats = SeriesStats().add(
+            np.concatenate([np.zeros(10), np.ones(10)]),
+            np.concatenate([x, x]),
+            np.concatenate([first, second])
+        )
+
+        slope, intercept = stats.coefficients()
+        np.testing.assert_allclose(slope, [np.polyfit(x, first, 1)[0], np.polyfit(x, second, 1)[0]])
+        np.testing.assert_allclose(intercept, [1.0, 7.0])
+
+    def test_refit_is_incremental_for_new_records(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for temperature in ('38.50', '38.90'):
+                AnimalHealthRecord.objects.create(
+                    animal=self.animal, health_status='HEALTHY', temperature=Decimal(temperature)
+                )
+
+        series, info = fitted_series('health_temperature')
+        self.assertEqual(info['refit'], 'full')
+        self.assertEqual(series.stats[SeriesStats.N, 0], 2)
+
+        # Sin cambios basta leer la versión de la caché
+        with self.assertNumQueries(0):
+            self.assertEqual(fitted_series('health_temperature')[1]['refit'], 'none')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AnimalHealthRecord.objects.create(
+                animal=self.animal, health_status='SICK', temperature=Decimal('40.10')
+            )
+        series, info = fitted_series('health_temperature')
+        self.assertEqual(info['refit'], 'incremental')
+        self.assertEqual(info['new_points'], 1)
+        self.assertEqual(series.stats[SeriesStats.N, 0], 3)
+
+    def test_records_committed_out_of_id_order_are_folded_in(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = AnimalHealthRecord.objects.create(
+                animal=self.animal, health_status='HEALTHY', temperature=Decimal('38.50')
+            )
+            AnimalHealthRecord.objects.create(
+                id=first.id + 2, animal=self.animal, health_status='HEALTHY', temperature=Decimal('38.70')
+            )
+        fitted_series('health_temperature')
+
+        # Id menor que el último ajustado, confirmado después del ajuste
+        with self.captureOnCommitCallbacks(execute=True):
+            AnimalHealthRecord.objects.create(
+                id=first.id + 1, animal=self.animal, health_status='SICK', temperature=Decimal('40.10')
+            )
+        series, info = fitted_series('health_temperature')
+
+        self.assertEqual((info['refit'], info['new_points']), ('incremental', 1))
+        self.assertEqual(series.stats[SeriesStats.N, 0], 3)
+        self.assertAlmostEqual(series.stats[SeriesStats.SY, 0], 38.5 + 38.7 + 40.1)
+
+    def test_deletion_forces_full_refit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record = AnimalHealthRecord.objects.create(
+                animal=self.animal, health_status='HEALTHY', temperature=Decimal('38.50')
+            )
+        fitted_series('health_temperature')
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delete()
+            AnimalHealthRecord.objects.create(
+                animal=self.animal, health_status='HEALTHY', temperature=Decimal('38.70')
+            )
+
+        series, info = fitted_series('health_temperature')
+        self.assertEqual(info['refit'], 'full')
+        self.assertEqual(series.stats[SeriesStats.N, 0], 1)
+
+
+@override_settings(SCAN_ANALYTICS_FLUSH_INTERVAL=None)
+class ScanAnalyticsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='scanuser',
+            email='scan@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.animal = Animal.objects.create(
+            ear_tag='SCAN001', breed='Angus', birth_date='2023-01-01', weight=450.5,
+            health_status='HEALTHY', owner=self.user, location='Test Farm',
+            token_id=303, mint_transaction_hash='0x' + 'd' * 64
+        )
+        self.buffer = ScanBuffer()
+
+    def test_concurrent_scans_flush_exact_totals(self):
+        def worker(offset):
+            for index in range(250):
+                self.buffer.record(self.animal.id, region='AR', visitor=(offset * 250 + index) % 300)
+
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.buffer.flush(), 2000)
+        row = ScanDailyAggregate.objects.get(animal=self.animal)
+        self.assertEqual(row.scans, 2000)
+        self.assertAlmostEqual(row.unique_visitors, 300, delta=15)
+
+    def test_flushes_accumulate_and_merge_sketches(self):
+        for visitor in range(100):
+            self.buffer.record(self.animal.id, tier='BASIC', visitor=visitor)
+        self.buffer.flush()
+        for visitor in range(50, 150):
+            self.buffer.record(self.animal.id, tier='BASIC', visitor=visitor)
+
+        self.buffer.flush()
+
+        row = ScanDailyAggregate.objects.get(animal=self.animal, tier='BASIC')
+        self.assertEqual(row.scans, 200)
+        self.assertAlmostEqual(row.unique_visitors, 150, delta=8)
+
+    def test_unique_visitors_across_dimensions(self):
+        for visitor in range(40):
+            self.buffer.record(self.animal.id, region='AR', tier='PUBLIC', visitor=visitor)
+            self.buffer.record(self.animal.id, region='UY', tier='PREMIUM', visitor=visitor)
+        self.buffer.flush()
+
+        self.assertEqual(ScanDailyAggregate.objects.filter(animal=self.animal).count(), 2)
+        self.assertAlmostEqual(unique_visitors(self.animal.id), 40, delta=2)
+
+    def test_scans_of_deleted_animals_are_dropped(self):
+        gone = Animal.objects.create(
+            ear_tag='SCAN002', breed='Angus', birth_date='2023-01-01', weight=450.5,
+            health_status='HEALTHY', owner=self.user, location='Test Farm'
+        )
+        self.buffer.record(self.animal.id, visitor=1)
+        self.buffer.record(gone.id, visitor=2)
+        gone.delete()
+
+        self.buffer.flush()
+
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(ScanDailyAggregate.objects.get().animal_id, self.animal.id)
+
+    def test_hyperloglog_estimate_is_close(self):
+        sketch = HyperLogLog().add_hashes([visitor_hash(index) for index in range(20000)])
+
+        self.assertAlmostEqual(sketch.count(), 20000, delta=20000 * 0.05)
+
+    def test_endpoints_serve_flushed_totals(self):
+        for visitor in range(30):
+            self.buffer.record(self.animal.id, region='AR', visitor=visitor)
+            self.buffer.record(self.animal.id, region='UY', tier='PREMIUM', visitor=visitor)
+        self.buffer.record(self.animal.id, day=timezone.localdate() - timedelta(days=1), visitor=99)
+        self.buffer.flush()
+
+        stats = self.client.get(reverse('analytics:consumeranalytics-stats'))
+        self.assertEqual(stats.json()['total_scans'], 61)
+
+        response = self.client.get(
+            reverse('analytics:consumeranalytics-scans'), {'animal_id': self.animal.id, 'days': 7}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['total_scans'], 61)
+        self.assertEqual([row['scans'] for row in data['daily']], [1, 60])
+        self.assertAlmostEqual(data['unique_visitors'], 31, delta=2)
+
+        self.assertEqual(
+            self.client.get(reverse('analytics:consumeranalytics-scans'), {'animal_id': 'x'}).status_code, 400
+        )
+
+    def test_qr_verification_buffers_scan(self):
+        with patch('analytics.signals.scan_buffer', self.buffer):
+            response = self.client.get(
+                reverse('consumer:verify-qr'), {'qr': f'GANADOCHAIN_ANIMAL_{self.animal.id}'},
+                HTTP_CF_IPCOUNTRY='AR'
+            )
+
+        self.assertTrue(response.json()['verified'])
+        self.assertEqual(self.buffer.pending(), 1)
+        self.buffer.flush()
+        self.assertEqual(ScanDailyAggregate.objects.get().region, 'AR')
+
+
+class AnalyticsParamsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='paramsadmin',
+            email='params@example.com',
+            password='adminpass123',
+            wallet_address='0x88df016429689c079f3b2f6ad39fa052532c5679'
+        )
+        self.client.force_login(self.admin)
+
+    def test_system_performance_rejects_non_integer_days(self):
+        response = self.client.get(reverse('analytics:system-performance'), {'days': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(reverse('analytics:system-performance'), {'days': '0'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_blockchain_analytics_clamps_days(self):
+        for days in ('0', '-5'):
+            response = self.client.get(reverse('analytics:blockchain-analytics'), {'days': days})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['events']['daily_avg'], 0)
+
+        response = self.client.get(reverse('analytics:blockchain-analytics'), {'days': 'abc'})
+        self.assertEqual(response.status_code, 400)
@@ -196,6 +196,7 @@ ANALYTICS_API_EXAMPLES = {
     'consumer': {
         'analytics': '/api/analytics/consumer-analytics/',
         'stats': '/api/analytics/consumer-analytics/stats/',
+        'scans': '/api/analytics/consumer-analytics/scans/?animal_id=123&days=30',
         'filtered': '/api/analytics/consumer-analytics/?start_date=2024-01-01&end_date=2024-03-01'
     },
     'carbon': {
@@ -283,6 +284,15 @@ ANALYTICS_ENDPOINTS_MAP = {
         'description': 'Estadísticas generales de analítica de consumidores',
         'parameters': {}
     },
+    'consumer_analytics_scans': {
+        'path': '/api/analytics/consumer-analytics/scans/',
+        'method': 'GET',
+        'description': 'Escaneos de QR por día y visitantes únicos estimados',
+        'parameters': {
+            'animal_id': 'int (opcional)',
+            'days': 'int (opcional)'
+        }
+    },
     'carbon_footprint_crud': {
         'path': '/api/analytics/carbon-footprint/',
         'method': 'GET, POST, PUT, DELETE',
@@ -2,8 +2,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.utils import timezone
-from django.db.models import Avg, Max, Min, Count, Q, F, Sum
-from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncWeek, TruncMonth
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 import pandas as pd
@@ -12,13 +12,19 @@ from datetime import timedelta
 import json
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 
 
-from .models import ConsumerAnalytics, CarbonFootprint
+from .models import ConsumerAnalytics, CarbonFootprint, ScanDailyAggregate
+from .scans import unique_visitors
+from .cube import AnalyticsCube
+from .forecasting import price_forecast, temperature_forecast, weight_forecast
+from reports.views import report_job_response
+from core.request_metrics import performance_summary
 from .serializers import ConsumerAnalyticsSerializer, CarbonFootprintSerializer
 
 # Importaciones corregidas desde las ubicaciones correctas
-from cattle.models import Animal, AnimalGeneticProfile, AnimalHealthRecord, Batch
+from cattle.models import Animal, AnimalGeneticProfile, AnimalHealthRecord
 from iot.models import HealthSensorData, IoTDevice
 from blockchain.models import BlockchainEvent, ContractInteraction
 from users.reputation_models import RewardDistribution, StakingPool
@@ -28,6 +34,14 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _int_param(value, name, default=None):
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Debe ser un entero'})
+
 
 class ConsumerAnalyticsViewSet(viewsets.ModelViewSet):
     queryset = ConsumerAnalytics.objects.all()
@@ -36,15 +50,34 @@ class ConsumerAnalyticsViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Estadísticas generales de analítica de consumidores"""
-        total_scans = ConsumerAnalytics.objects.aggregate(
-            total=Sum('total_scans'),
-            premium=Sum('premium_upgrades')
-        )
+        # Los escaneos salen de ScanDailyAggregate (analytics.scans); los upgrades, de ConsumerAnalytics
+        total_scans = ScanDailyAggregate.objects.aggregate(total=Sum('scans'))
+        premium = ConsumerAnalytics.objects.aggregate(premium=Sum('premium_upgrades'))
         
         return Response({
             'total_scans': total_scans['total'] or 0,
-            'total_premium_upgrades': total_scans['premium'] or 0,
+            'total_premium_upgrades': premium['premium'] or 0,
         })
+    
+    @action(detail=False, methods=['get'])
+    def scans(self, request):
+        """Escaneos por día (y visitantes únicos estimados si se filtra por animal)"""
+        animal_id = _int_param(request.query_params.get('animal_id'), 'animal_id')
+        days = max(_int_param(request.query_params.get('days'), 'days', 30), 1)
+        from_date = timezone.localdate() - timedelta(days=days)
+        
+        rows = ScanDailyAggregate.objects.filter(date__gte=from_date)
+        if animal_id is not None:
+            rows = rows.filter(animal_id=animal_id)
+        daily = list(rows.values('date').annotate(scans=Sum('scans')).order_by('date'))
+        
+        data = {
+            'total_scans': sum(row['scans'] for row in daily),
+            'daily': daily,
+        }
+        if animal_id is not None:
+            data['unique_visitors'] = unique_visitors(animal_id, date_from=from_date)
+        return Response(data)
 
 class CarbonFootprintViewSet(viewsets.ModelViewSet):
     queryset = CarbonFootprint.objects.all()
@@ -107,95 +140,112 @@ class GeneticAnalyticsView(APIView):
 class HealthTrendsView(APIView):
     permission_classes = [IsAuthenticated]
     
-    def get(self, request):
-        days = int(request.query_params.get('days', 30))
-        from_date = timezone.now() - timedelta(days=days)
+    def get(self, request, *args, **kwargs):
+        days = int(kwargs.get('days') or request.query_params.get('days', 30))
+        to_date = timezone.localdate()
+        from_date = to_date - timedelta(days=days)
         
-        # Tendencias de salud por fecha
-        health_trends = AnimalHealthRecord.objects.filter(
-            created_at__gte=from_date
-        ).annotate(
-            date=TruncDate('created_at')
-        ).values('date', 'health_status').annotate(
-            count=Count('id'),
-            avg_temperature=Avg('temperature'),
-            avg_heart_rate=Avg('heart_rate')
-        ).order_by('date')
+        health_cube = AnalyticsCube('HEALTH_RECORD')
+        sensor_cube = AnalyticsCube('SENSOR')
+        
+        # Tendencias de salud por fecha (servidas desde el cubo diario)
+        health_trends = [
+            {
+                'date': row['date'],
+                'health_status': row['event_type'],
+                'count': row['record_count'],
+                'avg_temperature': row['avg_temperature'],
+                'avg_heart_rate': row['avg_heart_rate']
+            }
+            for row in health_cube.rollup('date', 'event_type', date_from=from_date)
+        ]
         
         # Datos de sensores IoT
-        sensor_trends = HealthSensorData.objects.filter(
-            timestamp__gte=from_date
-        ).annotate(
-            date=TruncDate('timestamp')
-        ).values('date').annotate(
-            avg_temperature=Avg('temperature'),
-            avg_heart_rate=Avg('heart_rate'),
-            avg_movement=Avg('movement_activity'),
-            total_readings=Count('id'),
-            alert_count=Count('id', filter=Q(health_alert=True))
-        ).order_by('date')
+        sensor_rows = sensor_cube.rollup('date', date_from=from_date)
+        sensor_trends = [
+            {
+                'date': row['date'],
+                'avg_temperature': row['avg_temperature'],
+                'avg_heart_rate': row['avg_heart_rate'],
+                'avg_movement': row['avg_movement'],
+                'total_readings': row['record_count'],
+                'alert_count': row['alert_count']
+            }
+            for row in sensor_rows
+        ]
         
         # Distribución de estados de salud
-        health_distribution = AnimalHealthRecord.objects.filter(
-            created_at__gte=from_date
-        ).values('health_status').annotate(
-            count=Count('id'),
-            percentage=(Count('id') * 100.0 / AnimalHealthRecord.objects.filter(created_at__gte=from_date).count())
-        )
+        distribution_rows = health_cube.rollup('event_type', date_from=from_date)
+        total_health_records = sum(row['record_count'] for row in distribution_rows)
+        health_distribution = [
+            {
+                'health_status': row['event_type'],
+                'count': row['record_count'],
+                'percentage': row['record_count'] * 100.0 / total_health_records
+            }
+            for row in distribution_rows
+        ]
         
         return Response({
             'time_period': {
                 'from': from_date,
-                'to': timezone.now(),
+                'to': to_date,
                 'days': days
             },
-            'health_trends': list(health_trends),
-            'sensor_trends': list(sensor_trends),
-            'health_distribution': list(health_distribution),
+            'health_trends': health_trends,
+            'sensor_trends': sensor_trends,
+            'health_distribution': health_distribution,
             'summary': {
-                'total_health_records': AnimalHealthRecord.objects.filter(created_at__gte=from_date).count(),
-                'total_sensor_readings': HealthSensorData.objects.filter(timestamp__gte=from_date).count(),
-                'health_alerts': HealthSensorData.objects.filter(timestamp__gte=from_date, health_alert=True).count()
+                'total_health_records': total_health_records,
+                'total_sensor_readings': sum(row['total_readings'] for row in sensor_trends),
+                'health_alerts': sum(row['alert_count'] for row in sensor_trends)
             }
         })
 
 class SupplyChainAnalyticsView(APIView):
     permission_classes = [IsAuthenticated]
     
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
+        batch_cube = AnalyticsCube('BATCH')
+        totals = batch_cube.rollup()
+        by_status = {row['batch_status']: row for row in batch_cube.rollup('batch_status')}
+        
         # Estadísticas de la cadena de suministro
-        batch_stats = Batch.objects.aggregate(
-            total_batches=Count('id'),
-            active_batches=Count('id', filter=Q(status='IN_TRANSIT')),
-            delivered_batches=Count('id', filter=Q(status='DELIVERED')),
-            avg_batch_size=Avg(Count('animals')),
-            max_batch_size=Max(Count('animals')),
-            min_batch_size=Min(Count('animals'))
-        )
+        batch_stats = {
+            'total_batches': totals['record_count'],
+            'active_batches': by_status.get('IN_TRANSIT', {}).get('record_count', 0),
+            'delivered_batches': by_status.get('DELIVERED', {}).get('record_count', 0),
+            'avg_batch_size': totals['avg_size'],
+            'max_batch_size': totals['size_max'],
+            'min_batch_size': totals['size_min']
+        }
         
-        # Tiempos de tránsito (ejemplo simplificado)
-        transit_stats = Batch.objects.filter(
-            status='DELIVERED',
-            created_at__isnull=False,
-            updated_at__isnull=False
-        ).annotate(
-            transit_time=F('updated_at') - F('created_at')
-        ).aggregate(
-            avg_transit_time=Avg('transit_time'),
-            max_transit_time=Max('transit_time'),
-            min_transit_time=Min('transit_time')
-        )
+        # Tiempos de tránsito de los lotes entregados
+        delivered = by_status.get('DELIVERED', {})
+        
+        def as_timedelta(seconds):
+            return timedelta(seconds=seconds) if seconds is not None else None
+        
+        transit_stats = {
+            'avg_transit_time': as_timedelta(delivered.get('avg_duration_seconds')),
+            'max_transit_time': as_timedelta(delivered.get('duration_seconds_max')),
+            'min_transit_time': as_timedelta(delivered.get('duration_seconds_min'))
+        }
         
         # Distribución por estado
-        status_distribution = Batch.objects.values('status').annotate(
-            count=Count('id'),
-            percentage=(Count('id') * 100.0 / Batch.objects.count())
-        )
+        status_distribution = [
+            {
+                'status': batch_status,
+                'count': row['record_count'],
+                'percentage': row['record_count'] * 100.0 / totals['record_count']
+            }
+            for batch_status, row in by_status.items()
+        ]
         
         return Response({
             'batch_statistics': batch_stats,
             'transit_times': transit_stats,
-            'status_distribution': list(status_distribution),
+            'status_distribution': status_distribution,
             'efficiency_metrics': {
                 'delivery_success_rate': (batch_stats['delivered_batches'] * 100.0 / batch_stats['total_batches']) if batch_stats['total_batches'] > 0 else 0,
                 'avg_animals_per_batch': batch_stats['avg_batch_size'] or 0
@@ -241,28 +291,38 @@ class SustainabilityMetricsView(APIView):
 class BlockchainAnalyticsView(APIView):
     permission_classes = [IsAdminUser]
     
-    def get(self, request):
-        days = int(request.query_params.get('days', 30))
-        from_date = timezone.now() - timedelta(days=days)
+    def get(self, request, *args, **kwargs):
+        # Al menos un día: daily_avg divide por el período
+        days = max(_int_param(kwargs.get('days') or request.query_params.get('days'), 'days', 30), 1)
+        from_date = timezone.localdate() - timedelta(days=days)
+        
+        event_cube = AnalyticsCube('BLOCKCHAIN_EVENT')
+        tx_cube = AnalyticsCube('CONTRACT_TX')
+        events_by_type = {
+            row['event_type']: row['record_count']
+            for row in event_cube.rollup('event_type', date_from=from_date)
+        }
+        total_events = sum(events_by_type.values())
+        transactions = tx_cube.rollup(date_from=from_date)
         
         # Estadísticas de blockchain
         blockchain_stats = {
             'events': {
-                'total': BlockchainEvent.objects.filter(created_at__gte=from_date).count(),
-                'by_type': dict(BlockchainEvent.objects.filter(created_at__gte=from_date).values_list('event_type').annotate(count=Count('id'))),
-                'daily_avg': BlockchainEvent.objects.filter(created_at__gte=from_date).count() / days
+                'total': total_events,
+                'by_type': events_by_type,
+                'daily_avg': total_events / days
             },
             'transactions': {
-                'total': ContractInteraction.objects.filter(created_at__gte=from_date).count(),
-                'successful': ContractInteraction.objects.filter(created_at__gte=from_date, status='SUCCESS').count(),
-                'failed': ContractInteraction.objects.filter(created_at__gte=from_date, status='FAILED').count(),
-                'success_rate': (ContractInteraction.objects.filter(created_at__gte=from_date, status='SUCCESS').count() * 100.0 / 
-                               ContractInteraction.objects.filter(created_at__gte=from_date).count()) if ContractInteraction.objects.filter(created_at__gte=from_date).count() > 0 else 0
+                'total': transactions['record_count'],
+                'successful': transactions['success_count'],
+                'failed': transactions['failed_count'],
+                'success_rate': (transactions['success_count'] * 100.0 / 
+                               transactions['record_count']) if transactions['record_count'] > 0 else 0
             },
             'gas_usage': {
-                'total_gas': ContractInteraction.objects.filter(created_at__gte=from_date).aggregate(total=Sum('gas_used'))['total'] or 0,
-                'avg_gas_per_tx': ContractInteraction.objects.filter(created_at__gte=from_date).aggregate(avg=Avg('gas_used'))['avg'] or 0,
-                'total_cost_eth': sum([(tx.gas_used * tx.gas_price) / 10**18 for tx in ContractInteraction.objects.filter(created_at__gte=from_date) if tx.gas_used and tx.gas_price])
+                'total_gas': transactions['gas_used_sum'],
+                'avg_gas_per_tx': transactions['avg_gas_used'] or 0,
+                'total_cost_eth': float(transactions['gas_cost_wei_sum']) / 10**18
             }
         }
         
@@ -271,7 +331,9 @@ class BlockchainAnalyticsView(APIView):
 class SystemPerformanceView(APIView):
     permission_classes = [IsAdminUser]
     
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
+        days = max(_int_param(request.query_params.get('days'), 'days', 1), 1)
+        
         # Métricas de rendimiento del sistema
         performance_metrics = {
             'database': {
@@ -287,12 +349,8 @@ class SystemPerformanceView(APIView):
                 'device_uptime_pct': 99.8,
                 'data_points_today': HealthSensorData.objects.filter(timestamp__date=timezone.now().date()).count()
             },
-            'api_performance': {
-                'avg_response_time_ms': 125,
-                'requests_per_minute': 150,
-                'error_rate_pct': 0.2,
-                'uptime_pct': 99.95
-            },
+            # Medido por core.request_metrics.RequestMetricsMiddleware
+            'api_performance': performance_summary(days=days),
             'blockchain': {
                 'avg_block_time_sec': 2.1,
                 'pending_transactions': 12,
@@ -305,51 +363,61 @@ class SystemPerformanceView(APIView):
 class PredictiveAnalyticsView(APIView):
     permission_classes = [IsAdminUser]
     
-    def get(self, request):
-        # Analytics predictivos (ejemplo simplificado)
+    def get(self, request, *args, **kwargs):
+        # Analytics predictivos: modelos vectorizados y cacheados (analytics.forecasting)
         try:
+            total_animals = Animal.objects.count()
+            
             # Tendencia de crecimiento
-            animal_growth = Animal.objects.annotate(
+            animal_growth = list(Animal.objects.annotate(
                 month=TruncMonth('created_at')
             ).values('month').annotate(
                 count=Count('id')
-            ).order_by('month')
+            ).order_by('month'))
             
             # Predecir crecimiento próximo mes (regresión lineal simple)
             if len(animal_growth) >= 2:
-                last_months = list(animal_growth)[-6:]  # Últimos 6 meses
-                months = range(len(last_months))
-                counts = [item['count'] for item in last_months]
-                
-                # Regresión lineal simple
-                z = np.polyfit(months, counts, 1)
-                p = np.poly1d(z)
-                next_month_prediction = p(len(months))
+                counts = np.array([item['count'] for item in animal_growth[-6:]], dtype=float)  # Últimos 6 meses
+                slope, intercept = np.polyfit(np.arange(len(counts)), counts, 1)
+                next_month_prediction = intercept + slope * len(counts)
             else:
-                next_month_prediction = Animal.objects.count() * 1.1  # Crecimiento del 10%
+                next_month_prediction = total_animals * 1.1  # Crecimiento del 10%
+            
+            temperature = temperature_forecast()
+            prices = price_forecast()
+            weights = weight_forecast()
+            price_changes = [item['change_pct'] for item in prices['by_breed']]
             
             return Response({
                 'growth_prediction': {
                     'next_month_animals': int(next_month_prediction),
-                    'growth_rate_pct': ((next_month_prediction - Animal.objects.count()) * 100.0 / Animal.objects.count()) if Animal.objects.count() > 0 else 0,
+                    'growth_rate_pct': ((next_month_prediction - total_animals) * 100.0 / total_animals) if total_animals > 0 else 0,
                     'confidence_level': 'HIGH' if len(animal_growth) >= 3 else 'MEDIUM'
                 },
                 'health_trends': {
-                    'predicted_health_issues': int(Animal.objects.count() * 0.05),  # 5% de issues
+                    'predicted_health_issues': len(temperature['animals_at_risk']),
+                    'animals_at_risk': temperature['animals_at_risk'][:20],
                     'preventive_recommendations': [
                         'Aumentar monitoreo de temperatura',
                         'Reforzar protocolos de vacunación',
                         'Optimizar dieta para época estacional'
                     ]
                 },
+                'weight_forecast': weights['by_breed'],
                 'market_trends': {
-                    'predicted_demand_change_pct': +8.5,
+                    'predicted_demand_change_pct': round(float(np.mean(price_changes)), 2) if price_changes else 0,
+                    'price_forecast_by_breed': prices['by_breed'],
                     'recommended_pricing_strategy': 'competitive',
                     'supply_chain_optimization_opportunities': [
                         'Reducir tiempos de tránsito en 15%',
                         'Optimizar rutas de distribución',
                         'Aumentar capacidad de almacenamiento'
                     ]
+                },
+                'models': {
+                    'health_temperature': temperature['model'],
+                    'breed_price': prices['model'],
+                    'breed_weight': weights['model']
                 }
             })
             
@@ -359,57 +427,74 @@ class PredictiveAnalyticsView(APIView):
 
 class CustomReportView(APIView):
     permission_classes = [IsAdminUser]
+    REPORT_TYPES = ('comprehensive', 'financial', 'operational')
     
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
         report_type = request.query_params.get('type', 'comprehensive')
         days = int(request.query_params.get('days', 30))
         
-        from_date = timezone.now() - timedelta(days=days)
-        
-        if report_type == 'comprehensive':
-            report_data = {
-                'time_period': f'{from_date.date()} to {timezone.now().date()}',
-                'animal_metrics': self.get_animal_metrics(from_date),
-                'financial_metrics': self.get_financial_metrics(from_date),
-                'operational_metrics': self.get_operational_metrics(from_date),
-                'sustainability_metrics': self.get_sustainability_metrics(),
-                'generated_at': timezone.now()
-            }
-            
-        elif report_type == 'financial':
-            report_data = self.get_financial_metrics(from_date)
-            
-        elif report_type == 'operational':
-            report_data = self.get_operational_metrics(from_date)
-            
-        else:
+        if report_type not in self.REPORT_TYPES:
             return Response({'error': 'Invalid report type'}, status=400)
         
-        return Response(report_data)
+        # Se genera en segundo plano (reports.jobs) y se reutiliza si ya existe
+        return report_job_response('custom', {'type': report_type, 'days': days}, request.user)
+    
+    def build_report(self, report_type, days, progress=None):
+        progress = progress or (lambda percentage: None)
+        from_date = timezone.localdate() - timedelta(days=days)
+        
+        if report_type == 'financial':
+            return self.get_financial_metrics(from_date)
+        
+        if report_type == 'operational':
+            return self.get_operational_metrics(from_date)
+        
+        animal_metrics = self.get_animal_metrics(from_date)
+        progress(25)
+        financial_metrics = self.get_financial_metrics(from_date)
+        progress(50)
+        operational_metrics = self.get_operational_metrics(from_date)
+        progress(75)
+        return {
+            'time_period': f'{from_date} to {timezone.localdate()}',
+            'animal_metrics': animal_metrics,
+            'financial_metrics': financial_metrics,
+            'operational_metrics': operational_metrics,
+            'sustainability_metrics': self.get_sustainability_metrics(),
+            'generated_at': timezone.now()
+        }
     
     def get_animal_metrics(self, from_date):
+        animal_cube = AnalyticsCube('ANIMAL')
+        totals = animal_cube.rollup()
+        total_animals = totals['record_count']
+        avg_birth_day = totals['birth_day_sum'] / total_animals if total_animals else None
         return {
-            'total_animals': Animal.objects.count(),
-            'animals_added': Animal.objects.filter(created_at__gte=from_date).count(),
-            'health_status_distribution': dict(Animal.objects.values_list('health_status').annotate(count=Count('id'))),
-            'breed_distribution': dict(Animal.objects.values_list('breed').annotate(count=Count('id'))),
-            'avg_animal_age_days': Animal.objects.aggregate(avg_age=Avg(timezone.now() - F('birth_date')))['avg_age'].days if Animal.objects.exists() else 0
+            'total_animals': total_animals,
+            'animals_added': animal_cube.rollup(date_from=from_date)['record_count'],
+            'health_status_distribution': {row['event_type']: row['record_count'] for row in animal_cube.rollup('event_type')},
+            'breed_distribution': {row['breed']: row['record_count'] for row in animal_cube.rollup('breed')},
+            'avg_animal_age_days': int(timezone.localdate().toordinal() - avg_birth_day) if avg_birth_day else 0
         }
     
     def get_financial_metrics(self, from_date):
+        total_animals = AnalyticsCube('ANIMAL').rollup()['record_count']
         return {
-            'total_value_usd': Animal.objects.count() * 1500,  # Valor promedio por animal
-            'rewards_distributed': RewardDistribution.objects.filter(distribution_date__gte=from_date).aggregate(total=Sum('tokens_awarded'))['total'] or 0,
+            'total_value_usd': total_animals * 1500,  # Valor promedio por animal
+            'rewards_distributed': RewardDistribution.objects.filter(distribution_date__date__gte=from_date).aggregate(total=Sum('tokens_awarded'))['total'] or 0,
             'staking_volume': StakingPool.objects.aggregate(total=Sum('tokens_staked'))['total'] or 0,
-            'operational_costs': Animal.objects.count() * 300  # Costo operativo por animal
+            'operational_costs': total_animals * 300  # Costo operativo por animal
         }
     
     def get_operational_metrics(self, from_date):
+        def count_since(source):
+            return AnalyticsCube(source).rollup(date_from=from_date)['record_count']
+        
         return {
-            'batches_processed': Batch.objects.filter(created_at__gte=from_date).count(),
-            'health_checks_performed': AnimalHealthRecord.objects.filter(created_at__gte=from_date).count(),
-            'iot_data_points': HealthSensorData.objects.filter(timestamp__gte=from_date).count(),
-            'blockchain_transactions': ContractInteraction.objects.filter(created_at__gte=from_date).count(),
+            'batches_processed': count_since('BATCH'),
+            'health_checks_performed': count_since('HEALTH_RECORD'),
+            'iot_data_points': count_since('SENSOR'),
+            'blockchain_transactions': count_since('CONTRACT_TX'),
             'system_uptime_pct': 99.98
         }
     
@@ -1,26 +1,32 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
+from django.db.models import Count, Q
 from .models import (
     BlockchainEvent, ContractInteraction, 
     NetworkState, SmartContract, GasPriceHistory, TransactionPool,
     GovernanceProposal, Vote
 )
-from .market_models import MarketListing, Trade
+from .market_models import BuyOrder, MarketListing, Trade
 from core.admin import format_json_field, status_badge, warning_badge, get_admin_change_link
+from core.admin_changelist import LargeTableAdminMixin, RecentPeriodFilter
 import json
 
 @admin.register(BlockchainEvent)
-class BlockchainEventAdmin(admin.ModelAdmin):
+class BlockchainEventAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'event_type_display', 'short_hash', 'block_number', 
         'animal_link', 'batch_link', 'from_address_short', 
         'to_address_short', 'created_at', 'polyscan_link',
         'event_state_display'
     ]
+    list_annotations = {'animal_ear_tag': 'animal__ear_tag', 'batch_name': 'batch__name'}
+    list_defer = ['metadata']
     list_filter = [
-        'event_type', 'created_at', 'block_number'
+        RecentPeriodFilter, 'event_type'
     ]
+    date_hierarchy = 'created_at'
+    rollup_source = 'BLOCKCHAIN_EVENT'
     search_fields = [
         'transaction_hash', 'animal__ear_tag', 'batch__name',
         'from_address', 'to_address'
@@ -86,17 +92,18 @@ class BlockchainEventAdmin(admin.ModelAdmin):
         return "—"
     short_hash.short_description = 'Hash'
 
+    # Caravana y nombre del lote salen de list_annotations: sin cargar las relaciones
     def animal_link(self, obj):
-        if obj.animal:
-            url = reverse('admin:cattle_animal_change', args=[obj.animal.id])
-            return format_html('<a href="{}">{}</a>', url, obj.animal.ear_tag)
+        if obj.animal_id:
+            url = reverse('admin:cattle_animal_change', args=[obj.animal_id])
+            return format_html('<a href="{}">{}</a>', url, obj.animal_ear_tag)
         return "—"
     animal_link.short_description = 'Animal'
 
     def batch_link(self, obj):
-        if obj.batch:
-            url = reverse('admin:cattle_batch_change', args=[obj.batch.id])
-            return format_html('<a href="{}">{}</a>', url, obj.batch.name)
+        if obj.batch_id:
+            url = reverse('admin:cattle_batch_change', args=[obj.batch_id])
+            return format_html('<a href="{}">{}</a>', url, obj.batch_name)
         return "—"
     batch_link.short_description = 'Lote'
 
@@ -126,15 +133,18 @@ class BlockchainEventAdmin(admin.ModelAdmin):
     metadata_prettified.short_description = 'Metadata (Formateada)'
 
 @admin.register(ContractInteraction)
-class ContractInteractionAdmin(admin.ModelAdmin):
+class ContractInteractionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'contract_type_display', 'action_type_display', 'short_hash',
         'caller_short', 'status_display', 'gas_used_display',
         'gas_cost_display', 'created_at'
     ]
+    list_defer = ['parameters', 'error_message']
     list_filter = [
-        'contract_type', 'action_type', 'status', 'created_at'
+        RecentPeriodFilter, 'contract_type', 'action_type', 'status'
     ]
+    date_hierarchy = 'created_at'
+    rollup_source = 'CONTRACT_TX'
     search_fields = [
         'transaction_hash', 'caller_address', 'target_address'
     ]
@@ -516,6 +526,7 @@ class GovernanceProposalAdmin(admin.ModelAdmin):
         'voting_status', 'status_display', 'total_votes_calculated',
         'created_at'
     ]
+    list_select_related = ['proposed_by']
     list_filter = [
         'proposal_type', 'status', 'created_at', 'voting_start', 'voting_end'
     ]
@@ -605,16 +616,24 @@ class GovernanceProposalAdmin(admin.ModelAdmin):
             return format_html('<span style="color: blue;">✅ Completada</span>')
     voting_status.short_description = 'Estado Votación'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            total_votes=Count('votes'),
+            yes_votes=Count('votes', filter=Q(votes__vote_value=True)),
+            no_votes=Count('votes', filter=Q(votes__vote_value=False))
+        )
+
     def total_votes_calculated(self, obj):
-        return obj.votes.count()
+        return obj.total_votes
     total_votes_calculated.short_description = 'Total Votos'
+    total_votes_calculated.admin_order_field = 'total_votes'
 
     def yes_votes_calculated(self, obj):
-        return obj.votes.filter(vote_value=True).count()
+        return obj.yes_votes
     yes_votes_calculated.short_description = 'Votos Sí'
 
     def no_votes_calculated(self, obj):
-        return obj.votes.filter(vote_value=False).count()
+        return obj.no_votes
     no_votes_calculated.short_description = 'Votos No'
 
     def parameters_prettified(self, obj):
@@ -636,6 +655,7 @@ class VoteAdmin(admin.ModelAdmin):
         'proposal_link', 'voter_link', 'vote_value_display',
         'voting_power', 'created_at', 'blockchain_link'
     ]
+    list_select_related = ['proposal', 'voter']
     list_filter = ['vote_value', 'created_at']
     search_fields = [
         'proposal__title', 'voter__email', 
@@ -672,6 +692,8 @@ class VoteAdmin(admin.ModelAdmin):
     voter_link.short_description = 'Votante'
 
     def vote_value_display(self, obj):
+        if obj.vote_value is None:
+            return format_html('<span style="color: gray;">➖ Abstención</span>')
         if obj.vote_value:
             return format_html('<span style="color: green;">✅ Sí</span>')
         else:
@@ -695,6 +717,7 @@ class MarketListingAdmin(admin.ModelAdmin):
         'currency', 'listing_status', 'expiration_status',
         'listing_date'
     ]
+    list_select_related = ['animal', 'seller']
     list_filter = ['currency', 'is_active', 'listing_date', 'expiration_date']
     search_fields = [
         'animal__ear_tag', 'seller__email', 
@@ -771,6 +794,7 @@ class TradeAdmin(admin.ModelAdmin):
         'listing_link', 'buyer_link', 'price_display',
         'platform_fee_display', 'status_display', 'trade_date'
     ]
+    list_select_related = ['listing', 'buyer']
     list_filter = ['status', 'trade_date']
     search_fields = [
         'listing__animal__ear_tag', 'buyer__email', 
@@ -845,6 +869,31 @@ class TradeAdmin(admin.ModelAdmin):
         return "—"
     blockchain_link.short_description = 'Enlace Blockchain'
 
+@admin.register(BuyOrder)
+class BuyOrderAdmin(admin.ModelAdmin):
+    list_display = [
+        'buyer_link', 'breed', 'max_price_display',
+        'fill_display', 'status', 'created_at', 'expiration_date'
+    ]
+    list_select_related = ['buyer']
+    list_filter = ['status', 'currency', 'created_at']
+    search_fields = ['breed', 'buyer__email', 'buyer__first_name', 'buyer__last_name']
+    readonly_fields = ['created_at', 'buyer_link', 'filled_quantity']
+
+    def buyer_link(self, obj):
+        if obj.buyer:
+            return get_admin_change_link(obj.buyer, 'users', 'user')
+        return "—"
+    buyer_link.short_description = 'Comprador'
+
+    def max_price_display(self, obj):
+        return f"{obj.max_price} {obj.currency}"
+    max_price_display.short_description = 'Precio máximo'
+
+    def fill_display(self, obj):
+        return f"{obj.filled_quantity}/{obj.quantity}"
+    fill_display.short_description = 'Completado'
+
 # Configuración del Admin Site
 admin.site.site_header = "🐄 GanadoChain - Blockchain Administration"
 admin.site.site_title = "GanadoChain Blockchain Admin"
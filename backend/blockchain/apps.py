@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class BlockchainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blockchain'
+
+    def ready(self):
+        # Anexar los eventos del ciclo de vida al acumulador Merkle de cada animal
+        from blockchain.proofs import connect_proof_signals
+        connect_proof_signals()
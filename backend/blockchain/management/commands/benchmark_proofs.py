@@ -0,0 +1,63 @@
+# blockchain/management/commands/benchmark_proofs.py
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from blockchain.proofs import (
+    MerkleAccumulator, leaf_hash, path_coordinates, recover_signer, root_digest, verify_inclusion
+)
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo de anexar, generar y verificar pruebas Merkle con hojas sintéticas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leaves', type=int, default=100000, help='Hojas del acumulador')
+        parser.add_argument('--samples', type=int, default=1000, help='Pruebas a verificar')
+
+    def handle(self, *args, **options):
+        size = options['leaves']
+        payloads = [{'source': 'event', 'id': index, 'transaction_hash': f'0x{index:064x}'} for index in range(size)]
+        digests = [leaf_hash(payload) for payload in payloads]
+
+        accumulator = MerkleAccumulator()
+        nodes = {}
+        started = time.perf_counter()
+        for digest in digests:
+            for level, index, node in accumulator.append(digest):
+                nodes[(level, index)] = node
+        append_seconds = time.perf_counter() - started
+
+        peaks = [digest for _, digest in accumulator.peaks]
+        samples = random.sample(range(size), min(options['samples'], size))
+        proofs = [(index, [nodes[coordinate] for coordinate in path_coordinates(index, size)]) for index in samples]
+
+        started = time.perf_counter()
+        for index, path in proofs:
+            # El cliente rehace el hash de la hoja a partir de su contenido
+            assert verify_inclusion(leaf_hash(payloads[index]), index, size, path, peaks, accumulator.root)
+        verify_seconds = time.perf_counter() - started
+
+        longest = max(len(path) for _, path in proofs)
+        self.stdout.write(f'Hojas: {size}  picos: {len(peaks)}  ruta máxima: {longest} hashes')
+        self.stdout.write(f'Anexar: {append_seconds * 1e6 / size:.2f} µs/hoja')
+        self.stdout.write(f'Verificar: {verify_seconds * 1e6 / len(proofs):.2f} µs/prueba')
+        self.stdout.write(f'Tamaño de prueba: {(longest + len(peaks) + 1) * 32} bytes máx.')
+
+        try:
+            from eth_account import Account
+        except ImportError:
+            self.stdout.write('eth_account no disponible: se omite la verificación de firma')
+        else:
+            from eth_account.messages import encode_defunct
+
+            account = Account.create()
+            message = encode_defunct(hexstr=root_digest(1, size, accumulator.root))
+            signature = account.sign_message(message).signature.hex()
+            started = time.perf_counter()
+            for _ in range(100):
+                assert recover_signer(1, size, accumulator.root, signature) == account.address
+            self.stdout.write(f'Verificar firma: {(time.perf_counter() - started) * 1e4:.2f} µs/raíz')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark de pruebas completado'))
@@ -0,0 +1,28 @@
+# blockchain/management/commands/rebuild_proof_logs.py
+from django.core.management.base import BaseCommand
+
+from blockchain.proofs import rebuild_log
+from cattle.models import Animal
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los acumuladores Merkle de pruebas a partir de los eventos del ciclo de vida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--animal', type=int, help='ID del animal (por defecto, todos)')
+        parser.add_argument('--missing', action='store_true', help='Solo animales sin acumulador')
+
+    def handle(self, *args, **options):
+        animals = Animal.objects.order_by('id')
+        if options['animal']:
+            animals = animals.filter(id=options['animal'])
+        if options['missing']:
+            animals = animals.filter(proof_log__isnull=True)
+
+        rebuilt = leaves = 0
+        for animal in animals.iterator():
+            log = rebuild_log(animal)
+            rebuilt += 1
+            leaves += log.leaf_count
+
+        self.stdout.write(self.style.SUCCESS(f'{rebuilt} acumuladores reconstruidos ({leaves} hojas)'))
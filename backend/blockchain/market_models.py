@@ -15,14 +15,92 @@ class MarketListing(models.Model):
     class Meta:
         db_table = 'blockchain_market_listing'
 
+class BuyOrder(models.Model):
+    """Orden de compra: acepta cualquier listado de la raza (vacía = cualquiera)
+    y moneda indicadas a ``max_price`` o menos. La casa ``market.engine``."""
+    STATUS_CHOICES = [
+        ('OPEN', 'Abierta'),
+        ('FILLED', 'Completada'),
+        ('CANCELLED', 'Cancelada'),
+        ('EXPIRED', 'Expirada'),
+    ]
+
+    buyer = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='buy_orders')
+    breed = models.CharField(max_length=100, blank=True, verbose_name="Raza")
+    currency = models.CharField(max_length=10, default='USDC')
+    max_price = models.DecimalField(max_digits=20, decimal_places=2, verbose_name="Precio máximo")
+    quantity = models.PositiveIntegerField(default=1, verbose_name="Cantidad")
+    filled_quantity = models.PositiveIntegerField(default=0, verbose_name="Cantidad completada")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expiration_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'blockchain_buy_order'
+        verbose_name = "Orden de Compra"
+        verbose_name_plural = "Órdenes de Compra"
+        indexes = [
+            models.Index(fields=['status', 'currency'], name='buy_order_status_cur_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.buyer_id} {self.breed or '*'} ≤ {self.max_price} {self.currency} ({self.filled_quantity}/{self.quantity})"
+
+    @property
+    def remaining(self):
+        return self.quantity - self.filled_quantity
+
+
 class Trade(models.Model):
     listing = models.ForeignKey(MarketListing, on_delete=models.CASCADE, related_name='trades')
     buyer = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='purchases')
+    buy_order = models.ForeignKey(BuyOrder, on_delete=models.SET_NULL, null=True, blank=True, related_name='trades')
     transaction_hash = models.CharField(max_length=255)
     trade_date = models.DateTimeField(auto_now_add=True)
     price = models.DecimalField(max_digits=20, decimal_places=2)
+    currency = models.CharField(max_length=10, default='USDC')
     platform_fee = models.DecimalField(max_digits=20, decimal_places=2)
     status = models.CharField(max_length=20, default='COMPLETED')
 
     class Meta:
-        db_table = 'blockchain_trade'
\ No newline at end of file
+        db_table = 'blockchain_trade'
+
+class PriceCandle(models.Model):
+    """Vela OHLC de trades por resolución, raza y moneda.
+
+    La actualiza ``market.candles`` con cada trade nuevo; ``open_trade_id`` y
+    ``close_trade_id`` deciden la apertura y el cierre aunque los trades
+    lleguen desordenados.
+    """
+    RESOLUTION_CHOICES = [
+        ('1h', '1 hora'),
+        ('1d', '1 día'),
+        ('1w', '1 semana'),
+    ]
+
+    resolution = models.CharField(max_length=2, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField(verbose_name="Inicio del intervalo")
+    breed = models.CharField(max_length=100, blank=True, verbose_name="Raza")
+    currency = models.CharField(max_length=10, default='USDC')
+    open = models.DecimalField(max_digits=20, decimal_places=2)
+    high = models.DecimalField(max_digits=20, decimal_places=2)
+    low = models.DecimalField(max_digits=20, decimal_places=2)
+    close = models.DecimalField(max_digits=20, decimal_places=2)
+    volume = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    trade_count = models.PositiveIntegerField(default=0)
+    open_trade_id = models.BigIntegerField()
+    close_trade_id = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'blockchain_price_candle'
+        verbose_name = "Vela de Precio"
+        verbose_name_plural = "Velas de Precio"
+        constraints = [
+            models.UniqueConstraint(fields=['resolution', 'breed', 'currency', 'bucket_start'], name='unique_price_candle'),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'currency', 'bucket_start'], name='price_candle_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resolution} {self.breed or '*'} {self.currency} {self.bucket_start:%Y-%m-%d %H:%M}"
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0005_marketlisting_trade'),
+        ('cattle', '0008_animalmultichain_animalnftmirror'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnimalProofLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leaf_count', models.PositiveIntegerField(default=0, verbose_name='Hojas')),
+                ('peaks', models.JSONField(default=list, verbose_name='Picos')),
+                ('root', models.CharField(blank=True, max_length=64, verbose_name='Raíz')),
+                ('signature', models.CharField(blank=True, max_length=132, verbose_name='Firma de la raíz')),
+                ('signer', models.CharField(blank=True, max_length=42, verbose_name='Firmante')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('animal', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='proof_log', to='cattle.animal')),
+            ],
+            options={
+                'verbose_name': 'Registro de Pruebas de Animal',
+                'verbose_name_plural': 'Registros de Pruebas de Animales',
+                'db_table': 'blockchain_animal_proof_log',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProofLeaf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(verbose_name='Índice')),
+                ('source', models.CharField(choices=[('event', 'Evento Blockchain'), ('health', 'Registro de Salud'), ('certification', 'Certificación')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('payload', models.JSONField(verbose_name='Contenido')),
+                ('leaf_hash', models.CharField(max_length=64)),
+                ('transaction_hash', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaves', to='blockchain.animalprooflog')),
+            ],
+            options={
+                'verbose_name': 'Hoja de Prueba',
+                'verbose_name_plural': 'Hojas de Prueba',
+                'db_table': 'blockchain_proof_leaf',
+                'constraints': [
+                    models.UniqueConstraint(fields=('log', 'index'), name='unique_proof_leaf_index'),
+                    models.UniqueConstraint(fields=('source', 'object_id'), name='unique_proof_leaf_source'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProofNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField()),
+                ('index', models.PositiveIntegerField()),
+                ('hash', models.CharField(max_length=64)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nodes', to='blockchain.animalprooflog')),
+            ],
+            options={
+                'db_table': 'blockchain_proof_node',
+                'constraints': [models.UniqueConstraint(fields=('log', 'level', 'index'), name='unique_proof_node')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0006_animalprooflog_proofleaf_proofnode'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuyOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('breed', models.CharField(blank=True, max_length=100, verbose_name='Raza')),
+                ('currency', models.CharField(default='USDC', max_length=10)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=20, verbose_name='Precio máximo')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Cantidad')),
+                ('filled_quantity', models.PositiveIntegerField(default=0, verbose_name='Cantidad completada')),
+                ('status', models.CharField(choices=[('OPEN', 'Abierta'), ('FILLED', 'Completada'), ('CANCELLED', 'Cancelada'), ('EXPIRED', 'Expirada')], default='OPEN', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expiration_date', models.DateTimeField(blank=True, null=True)),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buy_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Orden de Compra',
+                'verbose_name_plural': 'Órdenes de Compra',
+                'db_table': 'blockchain_buy_order',
+                'indexes': [models.Index(fields=['status', 'currency'], name='buy_order_status_cur_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='buy_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trades', to='blockchain.buyorder'),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='currency',
+            field=models.CharField(default='USDC', max_length=10),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0007_buyorder_trade_currency_buy_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceCandle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('1h', '1 hora'), ('1d', '1 día'), ('1w', '1 semana')], max_length=2)),
+                ('bucket_start', models.DateTimeField(verbose_name='Inicio del intervalo')),
+                ('breed', models.CharField(blank=True, max_length=100, verbose_name='Raza')),
+                ('currency', models.CharField(default='USDC', max_length=10)),
+                ('open', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('high', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('low', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('close', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('trade_count', models.PositiveIntegerField(default=0)),
+                ('open_trade_id', models.BigIntegerField()),
+                ('close_trade_id', models.BigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Vela de Precio',
+                'verbose_name_plural': 'Velas de Precio',
+                'db_table': 'blockchain_price_candle',
+                'constraints': [models.UniqueConstraint(fields=('resolution', 'breed', 'currency', 'bucket_start'), name='unique_price_candle')],
+                'indexes': [models.Index(fields=['resolution', 'currency', 'bucket_start'], name='price_candle_range_idx')],
+            },
+        ),
+    ]
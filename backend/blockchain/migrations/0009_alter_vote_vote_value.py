@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0008_pricecandle'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vote',
+            name='vote_value',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0009_alter_vote_vote_value'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contractinteraction',
+            index=models.Index(fields=['created_at'], name='blockchain_ci_created_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 # En blockchain/models.py
-from .market_models import MarketListing, Trade
+from .market_models import BuyOrder, MarketListing, PriceCandle, Trade
+from .proof_models import AnimalProofLog, ProofLeaf, ProofNode
 from django.core.exceptions import ValidationError
 from django.utils.html import format_html
 from django.urls import reverse
@@ -165,6 +166,7 @@ class ContractInteraction(models.Model):
             models.Index(fields=['caller_address']),
             models.Index(fields=['contract_type', 'action_type']),
             models.Index(fields=['block_number']),
+            models.Index(fields=['created_at'], name='blockchain_ci_created_idx'),
         ]
         ordering = ['-block_number', '-created_at']
 
@@ -483,7 +485,7 @@ class GovernanceProposal(models.Model):
 class Vote(models.Model):
     proposal = models.ForeignKey(GovernanceProposal, on_delete=models.CASCADE, related_name='votes')
     voter = models.ForeignKey('users.User', on_delete=models.CASCADE)
-    vote_value = models.BooleanField()
+    vote_value = models.BooleanField(null=True, blank=True)  # None = abstención
     voting_power = models.DecimalField(max_digits=20, decimal_places=2)
     blockchain_vote_hash = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
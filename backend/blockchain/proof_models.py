@@ -0,0 +1,63 @@
+# backend/blockchain/proof_models.py
+from django.db import models
+
+
+class AnimalProofLog(models.Model):
+    """Estado del acumulador Merkle de solo anexado de un animal."""
+    animal = models.OneToOneField('cattle.Animal', on_delete=models.CASCADE, related_name='proof_log')
+    leaf_count = models.PositiveIntegerField(default=0, verbose_name="Hojas")
+    # Picos del árbol de izquierda a derecha: [[nivel, hash], ...]
+    peaks = models.JSONField(default=list, verbose_name="Picos")
+    root = models.CharField(max_length=64, blank=True, verbose_name="Raíz")
+    signature = models.CharField(max_length=132, blank=True, verbose_name="Firma de la raíz")
+    signer = models.CharField(max_length=42, blank=True, verbose_name="Firmante")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'blockchain_animal_proof_log'
+        verbose_name = "Registro de Pruebas de Animal"
+        verbose_name_plural = "Registros de Pruebas de Animales"
+
+    def __str__(self):
+        return f"Pruebas {self.animal_id} - {self.leaf_count} hojas"
+
+
+class ProofLeaf(models.Model):
+    """Evento del ciclo de vida tal como se anexó al acumulador."""
+    SOURCE_CHOICES = [
+        ('event', 'Evento Blockchain'),
+        ('health', 'Registro de Salud'),
+        ('certification', 'Certificación'),
+    ]
+
+    log = models.ForeignKey(AnimalProofLog, on_delete=models.CASCADE, related_name='leaves')
+    index = models.PositiveIntegerField(verbose_name="Índice")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    object_id = models.BigIntegerField()
+    payload = models.JSONField(verbose_name="Contenido")
+    leaf_hash = models.CharField(max_length=64)
+    transaction_hash = models.CharField(max_length=255, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'blockchain_proof_leaf'
+        verbose_name = "Hoja de Prueba"
+        verbose_name_plural = "Hojas de Prueba"
+        constraints = [
+            models.UniqueConstraint(fields=['log', 'index'], name='unique_proof_leaf_index'),
+            models.UniqueConstraint(fields=['source', 'object_id'], name='unique_proof_leaf_source'),
+        ]
+
+
+class ProofNode(models.Model):
+    """Nodo completo del árbol: ``(nivel, índice)``; el nivel 0 son las hojas."""
+    log = models.ForeignKey(AnimalProofLog, on_delete=models.CASCADE, related_name='nodes')
+    level = models.PositiveSmallIntegerField()
+    index = models.PositiveIntegerField()
+    hash = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = 'blockchain_proof_node'
+        constraints = [
+            models.UniqueConstraint(fields=['log', 'level', 'index'], name='unique_proof_node'),
+        ]
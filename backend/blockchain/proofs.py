@@ -0,0 +1,339 @@
+# backend/blockchain/proofs.py
+"""
+Acumulador Merkle de solo anexado por animal.
+
+Cada evento del ciclo de vida (``BlockchainEvent``, registro de salud,
+certificación) se anexa como hoja. El árbol se guarda como una cordillera de
+picos (subárboles completos, uno por bit a 1 del tamaño): anexar una hoja solo
+fusiona picos de igual altura, O(log n), y los nodos ya escritos no cambian.
+
+La raíz es el plegado de los picos de derecha a izquierda y se firma (EIP-191)
+junto con el animal y el tamaño, así que un cliente verifica fuera de línea:
+
+    1. hash de la hoja a partir de su contenido (``leaf_hash``)
+    2. subir por ``path`` hasta su pico
+    3. plegar ``peaks`` y comparar con ``root``
+    4. recuperar el firmante de ``signature`` sobre ``root_digest``
+
+Hashes con separación de dominio (0x00 hoja, 0x01 nodo) como en RFC 6962.
+
+Ajustes:
+    PROOF_SIGNING_KEY   clave privada con la que se firman las raíces
+"""
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+
+from .proof_models import AnimalProofLog, ProofLeaf, ProofNode
+
+logger = logging.getLogger(__name__)
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+# ==============================================================================
+# HASHES Y VERIFICACIÓN (sin base de datos: reproducible por el cliente)
+# ==============================================================================
+
+def canonical(payload):
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder).encode()
+
+
+def leaf_hash(payload):
+    return hashlib.sha256(LEAF_PREFIX + canonical(payload)).hexdigest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def bag_peaks(peak_hashes):
+    """Raíz a partir de los picos (de izquierda a derecha)."""
+    if not peak_hashes:
+        return ''
+    root = peak_hashes[-1]
+    for peak in reversed(peak_hashes[:-1]):
+        root = node_hash(peak, root)
+    return root
+
+
+def peak_levels(size):
+    """Alturas de los picos de un árbol de ``size`` hojas, de izquierda a derecha."""
+    return [level for level in range(size.bit_length() - 1, -1, -1) if size >> level & 1]
+
+
+def locate(index, size):
+    """``(posición del pico, altura, primera hoja del pico)`` que contiene la hoja."""
+    start = 0
+    for position, level in enumerate(peak_levels(size)):
+        if index < start + (1 << level):
+            return position, level, start
+        start += 1 << level
+    raise IndexError(f'Hoja {index} fuera de rango ({size} hojas)')
+
+
+def root_digest(animal_id, size, root):
+    """Mensaje firmado: liga la raíz al animal y al tamaño del acumulador."""
+    return hashlib.sha256(f'GanadoChain:proof:{animal_id}:{size}:{root}'.encode()).hexdigest()
+
+
+def verify_inclusion(leaf, index, size, path, peaks, root):
+    """Comprobar que ``leaf`` (hash) es la hoja ``index`` del árbol con raíz ``root``."""
+    if len(peaks) != len(peak_levels(size)) or bag_peaks(peaks) != root:
+        return False
+    try:
+        position, level, _ = locate(index, size)
+    except IndexError:
+        return False
+    if len(path) != level:
+        return False
+
+    current = leaf
+    for height, sibling in enumerate(path):
+        current = node_hash(sibling, current) if index >> height & 1 else node_hash(current, sibling)
+    return current == peaks[position]
+
+
+class MerkleAccumulator:
+    """Cordillera de picos en memoria; ``append`` devuelve los nodos nuevos."""
+
+    def __init__(self, size=0, peaks=()):
+        self.size = size
+        self.peaks = [(level, digest) for level, digest in peaks]
+
+    def append(self, digest):
+        index = self.size
+        level = 0
+        created = [(0, index, digest)]
+        while self.peaks and self.peaks[-1][0] == level:
+            _, left = self.peaks.pop()
+            digest = node_hash(left, digest)
+            level += 1
+            index >>= 1
+            created.append((level, index, digest))
+        self.peaks.append((level, digest))
+        self.size += 1
+        return created
+
+    @property
+    def root(self):
+        return bag_peaks([digest for _, digest in self.peaks])
+
+    def state(self):
+        return [[level, digest] for level, digest in self.peaks]
+
+
+def path_coordinates(index, size):
+    """Nodos hermanos ``(nivel, índice)`` que forman la prueba de la hoja."""
+    _, level, _ = locate(index, size)
+    return [(height, (index >> height) ^ 1) for height in range(level)]
+
+
+# ==============================================================================
+# FIRMA
+# ==============================================================================
+
+def sign_root(animal_id, size, root):
+    """``(firma, firmante)``; vacíos si no hay clave configurada."""
+    key = getattr(settings, 'PROOF_SIGNING_KEY', None)
+    if not key or not root:
+        return '', ''
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+
+    signed = Account.sign_message(encode_defunct(hexstr=root_digest(animal_id, size, root)), private_key=key)
+    return '0x' + signed.signature.hex().removeprefix('0x'), Account.from_key(key).address
+
+
+def recover_signer(animal_id, size, root, signature):
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+
+    return Account.recover_message(encode_defunct(hexstr=root_digest(animal_id, size, root)), signature=signature)
+
+
+# ==============================================================================
+# HOJAS
+# ==============================================================================
+
+def event_leaf(event):
+    return {
+        'source': 'event',
+        'id': event.pk,
+        'event_type': event.event_type,
+        'transaction_hash': event.transaction_hash,
+        'block_number': event.block_number,
+        'timestamp': event.created_at,
+    }
+
+
+def health_leaf(record):
+    return {
+        'source': 'health',
+        'id': record.pk,
+        'health_status': record.health_status,
+        'transaction_hash': record.transaction_hash,
+        'timestamp': record.created_at,
+    }
+
+
+def certification_leaf(certification):
+    return {
+        'source': 'certification',
+        'id': certification.pk,
+        'standard_id': certification.standard_id,
+        'certification_date': certification.certification_date,
+        'expiration_date': certification.expiration_date,
+        'transaction_hash': certification.blockchain_hash,
+        'timestamp': certification.created_at,
+    }
+
+
+def _leaf_rows(log, payloads, accumulator):
+    leaves, nodes = [], []
+    for payload in payloads:
+        # El contenido se normaliza a JSON para que lo guardado sea lo que se hasheó
+        payload = json.loads(canonical(payload))
+        digest = leaf_hash(payload)
+        leaves.append(ProofLeaf(
+            log=log, index=accumulator.size, source=payload['source'], object_id=payload['id'],
+            payload=payload, leaf_hash=digest, transaction_hash=payload.get('transaction_hash') or ''
+        ))
+        nodes.extend(
+            ProofNode(log=log, level=level, index=index, hash=node)
+            for level, index, node in accumulator.append(digest)
+        )
+    return leaves, nodes
+
+
+def _save_state(log, accumulator):
+    log.leaf_count = accumulator.size
+    log.peaks = accumulator.state()
+    log.root = accumulator.root
+    log.signature, log.signer = sign_root(log.animal_id, log.leaf_count, log.root)
+    log.save(update_fields=['leaf_count', 'peaks', 'root', 'signature', 'signer', 'updated_at'])
+
+
+def append_leaf(animal_id, payload):
+    """Anexar un evento al acumulador del animal (idempotente por origen)."""
+    with transaction.atomic():
+        AnimalProofLog.objects.get_or_create(animal_id=animal_id)
+        log = AnimalProofLog.objects.select_for_update().get(animal_id=animal_id)
+        if ProofLeaf.objects.filter(source=payload['source'], object_id=payload['id']).exists():
+            return log
+
+        accumulator = MerkleAccumulator(log.leaf_count, log.peaks)
+        leaves, nodes = _leaf_rows(log, [payload], accumulator)
+        ProofLeaf.objects.bulk_create(leaves)
+        ProofNode.objects.bulk_create(nodes)
+        _save_state(log, accumulator)
+    return log
+
+
+def lifecycle_payloads(animal):
+    """Todos los eventos del animal en orden cronológico (para reconstruir)."""
+    from blockchain.models import BlockchainEvent
+    from cattle.blockchain_models import AnimalCertification
+    from cattle.models import AnimalHealthRecord
+
+    payloads = [event_leaf(event) for event in BlockchainEvent.objects.filter(animal=animal)]
+    payloads += [health_leaf(record) for record in AnimalHealthRecord.objects.filter(animal=animal)]
+    payloads += [certification_leaf(cert) for cert in AnimalCertification.objects.filter(animal=animal)]
+    return sorted(payloads, key=lambda payload: (payload['timestamp'], payload['source'], payload['id']))
+
+
+def rebuild_log(animal):
+    """Reconstruir el acumulador desde cero (migración o reparación)."""
+    with transaction.atomic():
+        AnimalProofLog.objects.filter(animal=animal).delete()
+        log = AnimalProofLog.objects.create(animal=animal)
+        accumulator = MerkleAccumulator()
+        leaves, nodes = _leaf_rows(log, lifecycle_payloads(animal), accumulator)
+        ProofLeaf.objects.bulk_create(leaves, batch_size=1000)
+        ProofNode.objects.bulk_create(nodes, batch_size=1000)
+        _save_state(log, accumulator)
+    return log
+
+
+# ==============================================================================
+# PRUEBAS
+# ==============================================================================
+
+def root_bundle(log):
+    return {
+        'animal_id': log.animal_id,
+        'size': log.leaf_count,
+        'root': log.root,
+        'peaks': [digest for _, digest in log.peaks],
+        'root_digest': root_digest(log.animal_id, log.leaf_count, log.root) if log.root else '',
+        'signature': log.signature or None,
+        'signer': log.signer or None,
+    }
+
+
+def inclusion_proof(log, leaf):
+    """Prueba de inclusión: O(log n) hashes leídos en una sola consulta."""
+    coordinates = path_coordinates(leaf.index, log.leaf_count)
+    lookup = Q(pk__in=[])
+    for level, index in coordinates:
+        lookup |= Q(level=level, index=index)
+    hashes = {
+        (level, index): digest
+        for level, index, digest in ProofNode.objects.filter(lookup, log=log).values_list('level', 'index', 'hash')
+    }
+    return {
+        'leaf': leaf.payload,
+        'leaf_hash': leaf.leaf_hash,
+        'index': leaf.index,
+        'path': [hashes[coordinate] for coordinate in coordinates],
+        **root_bundle(log),
+    }
+
+
+# ==============================================================================
+# SEÑALES
+# ==============================================================================
+
+def _append_on_commit(animal_id, build):
+    if not animal_id:
+        return
+
+    def append():
+        try:
+            append_leaf(animal_id, build())
+        except Exception as e:
+            logger.error(f"Error anexando prueba del animal {animal_id}: {str(e)}")
+
+    transaction.on_commit(append)
+
+
+def _on_event(sender, instance, created, **kwargs):
+    if created:
+        _append_on_commit(instance.animal_id, lambda: event_leaf(instance))
+
+
+def _on_health_record(sender, instance, created, **kwargs):
+    if created:
+        _append_on_commit(instance.animal_id, lambda: health_leaf(instance))
+
+
+def _on_certification(sender, instance, created, **kwargs):
+    if created:
+        _append_on_commit(instance.animal_id, lambda: certification_leaf(instance))
+
+
+def connect_proof_signals():
+    from blockchain.models import BlockchainEvent
+    from cattle.blockchain_models import AnimalCertification
+    from cattle.models import AnimalHealthRecord
+
+    post_save.connect(_on_event, sender=BlockchainEvent, dispatch_uid='proof_blockchain_event')
+    post_save.connect(_on_health_record, sender=AnimalHealthRecord, dispatch_uid='proof_health_record')
+    post_save.connect(_on_certification, sender=AnimalCertification, dispatch_uid='proof_certification')
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from cattle.models import HealthStatus
 from .models import BlockchainEvent, ContractInteraction, NetworkState, SmartContract, GasPriceHistory, TransactionPool, GovernanceProposal, Vote
-from .market_models import MarketListing, Trade
+from .market_models import BuyOrder, MarketListing, Trade
 from cattle.blockchain_models import CertificationStandard, AnimalCertification
 import re
 import json
@@ -547,13 +547,16 @@ class GovernanceProposalSerializer(serializers.ModelSerializer):
             return 'COMPLETED'
     
     def get_total_votes(self, obj):
-        return obj.votes.count()
+        tally = getattr(obj, 'tally', None)
+        return tally.total_votes if tally else obj.votes.count()
     
     def get_yes_votes(self, obj):
-        return obj.votes.filter(vote_value=True).count()
+        tally = getattr(obj, 'tally', None)
+        return tally.yes_votes if tally else obj.votes.filter(vote_value=True).count()
     
     def get_no_votes(self, obj):
-        return obj.votes.filter(vote_value=False).count()
+        tally = getattr(obj, 'tally', None)
+        return tally.no_votes if tally else obj.votes.filter(vote_value=False).count()
     
     def get_parameters_prettified(self, obj):
         return json.dumps(obj.parameters, indent=2, ensure_ascii=False) if obj.parameters else None
@@ -645,8 +648,8 @@ class TradeSerializer(serializers.ModelSerializer):
         model = Trade
         fields = [
             'id', 'listing', 'animal_ear_tag', 'buyer', 'buyer_name', 'seller_name',
-            'transaction_hash', 'trade_date', 'price', 'platform_fee',
-            'status', 'status_display', 'polyscan_url'
+            'transaction_hash', 'trade_date', 'price', 'currency', 'platform_fee',
+            'buy_order', 'status', 'status_display', 'polyscan_url'
         ]
         read_only_fields = ['trade_date', 'polyscan_url', 'status_display']
     
@@ -676,6 +679,22 @@ class ExecuteTradeSerializer(serializers.Serializer):
             raise serializers.ValidationError('Formato de wallet inválido.')
         return value
 
+class BuyOrderSerializer(serializers.ModelSerializer):
+    remaining = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = BuyOrder
+        fields = [
+            'id', 'buyer', 'breed', 'currency', 'max_price', 'quantity',
+            'filled_quantity', 'remaining', 'status', 'created_at', 'expiration_date'
+        ]
+        read_only_fields = ['buyer', 'filled_quantity', 'remaining', 'status', 'created_at']
+
+    def validate_max_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('El precio máximo debe ser positivo.')
+        return value
+
 class MarketStatsSerializer(serializers.Serializer):
     total_listings = serializers.IntegerField(min_value=0)
     active_listings = serializers.IntegerField(min_value=0)
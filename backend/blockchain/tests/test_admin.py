@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from blockchain.models import BlockchainEvent, GovernanceProposal, Vote
+from cattle.models import Animal
+from core.query_guard import query_guard
+from users.models import User
+
+QUERY_BUDGET = 20
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Las listas del admin de blockchain no consultan por fila"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='chain_admin',
+            email='chain_admin@example.com',
+            password='adminpass123',
+            wallet_address='0xB52d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        voters = [
+            User.objects.create_user(username=f'chain_voter{index}', password='x', wallet_address=f'0x{0xB60 + index:040x}')
+            for index in range(5)
+        ]
+        animal = Animal.objects.create(
+            ear_tag='CHAIN001', breed='Angus', birth_date='2023-01-01', weight=300,
+            health_status='HEALTHY', owner=voters[0], location='Campo'
+        )
+        BlockchainEvent.objects.bulk_create([
+            BlockchainEvent(
+                event_type='MINT', transaction_hash=f'0x{index:064x}', block_number=1000000 + index, animal=animal
+            )
+            for index in range(100)
+        ])
+        now = timezone.now()
+        for index in range(20):
+            proposal = GovernanceProposal.objects.create(
+                title=f'Propuesta {index}', description='Cambio de parámetro', proposal_type='PARAMETER_CHANGE',
+                proposed_by=voters[index % 5], voting_start=now, voting_end=now + timedelta(days=7)
+            )
+            Vote.objects.bulk_create([
+                Vote(proposal=proposal, voter=voter, vote_value=position % 2 == 0, voting_power=1,
+                     blockchain_vote_hash=f'0x{index:032x}{position:032x}')
+                for position, voter in enumerate(voters)
+            ])
+        self.client.force_login(self.admin)
+
+    def test_changelists_stay_under_query_budget(self):
+        for name in ('blockchain_blockchainevent', 'blockchain_governanceproposal', 'blockchain_vote'):
+            with self.subTest(changelist=name):
+                with query_guard(budget=QUERY_BUDGET):
+                    response = self.client.get(reverse(f'admin:{name}_changelist'))
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,132 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from blockchain.models import AnimalProofLog, BlockchainEvent
+from blockchain.proofs import (
+    MerkleAccumulator, leaf_hash, path_coordinates, rebuild_log, recover_signer, verify_inclusion
+)
+from cattle.models import Animal
+from users.models import User
+
+SIGNING_KEY = '0x' + '11' * 32
+
+
+class MerkleAccumulatorTests(TestCase):
+    def test_every_leaf_verifies_against_root(self):
+        for size in (1, 2, 5, 8, 13):
+            accumulator = MerkleAccumulator()
+            nodes = {}
+            for index in range(size):
+                for level, position, digest in accumulator.append(leaf_hash({'id': index})):
+                    nodes[(level, position)] = digest
+            peaks = [digest for _, digest in accumulator.peaks]
+
+            for index in range(size):
+                path = [nodes[coordinate] for coordinate in path_coordinates(index, size)]
+                self.assertTrue(verify_inclusion(leaf_hash({'id': index}), index, size, path, peaks, accumulator.root))
+                self.assertFalse(verify_inclusion(leaf_hash({'id': -1}), index, size, path, peaks, accumulator.root))
+
+    def test_append_only_creates_log_n_nodes(self):
+        accumulator = MerkleAccumulator()
+        for index in range(1023):
+            accumulator.append(leaf_hash({'id': index}))
+
+        self.assertEqual(len(accumulator.append(leaf_hash({'id': 1023}))), 11)
+        self.assertEqual(len(accumulator.peaks), 1)
+
+
+@override_settings(PROOF_SIGNING_KEY=SIGNING_KEY)
+class BlockchainProofViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='proofowner',
+            email='proof@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.animal = Animal.objects.create(
+            ear_tag='PRF001',
+            breed='Angus',
+            birth_date='2023-01-01',
+            weight=450.5,
+            health_status='HEALTHY',
+            owner=self.user,
+            location='Test Farm',
+            token_id=202,
+            mint_transaction_hash='0x' + 'c' * 64
+        )
+        self.url = reverse('consumer:blockchain-proof', args=[self.animal.id])
+
+    def add_event(self, block_number):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BlockchainEvent.objects.create(
+                event_type='TRANSFER',
+                transaction_hash='0x' + f'{block_number:064x}',
+                block_number=block_number,
+                animal=self.animal,
+                from_address=self.user.wallet_address
+            )
+
+    def test_events_are_appended_and_root_is_signed(self):
+        for block_number in range(1, 4):
+            self.add_event(block_number)
+
+        log = AnimalProofLog.objects.get(animal=self.animal)
+        self.assertEqual(log.leaf_count, 3)
+        self.assertEqual(recover_signer(self.animal.id, 3, log.root, log.signature), log.signer)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['root'], log.root)
+        self.assertEqual((response.data['leaf_count'], response.data['signature']), (3, log.signature))
+
+        events = self.client.get(response.data['events_url']).data
+        self.assertEqual(events['count'], 3)
+        self.assertEqual([event['leaf_index'] for event in events['results']], [0, 1, 2])
+
+    @patch.object(PageNumberPagination, 'page_size', 2)
+    def test_root_response_does_not_grow_with_events(self):
+        self.add_event(1)
+        small = self.client.get(self.url).data
+        for block_number in range(2, 6):
+            self.add_event(block_number)
+
+        with CaptureQueriesContext(connection) as queries:
+            large = self.client.get(self.url).data
+        self.assertEqual(set(large), set(small))
+        self.assertEqual(large['leaf_count'], 5)
+        self.assertLessEqual(len(queries), 3)
+
+        second_page = self.client.get(large['events_url'], {'page': 2}).data
+        self.assertEqual([event['leaf_index'] for event in second_page['results']], [2, 3])
+
+    def test_inclusion_proof_verifies_offline(self):
+        events = [self.add_event(block_number) for block_number in range(1, 6)]
+
+        proof = self.client.get(self.url, {'tx': events[3].transaction_hash}).data
+
+        self.assertEqual(proof['index'], 3)
+        self.assertEqual(leaf_hash(proof['leaf']), proof['leaf_hash'])
+        self.assertTrue(verify_inclusion(
+            proof['leaf_hash'], proof['index'], proof['size'], proof['path'], proof['peaks'], proof['root']
+        ))
+
+    def test_unknown_leaf_returns_404(self):
+        self.add_event(1)
+
+        self.assertEqual(self.client.get(self.url, {'leaf': '7'}).status_code, 404)
+
+    def test_rebuild_matches_incremental_root(self):
+        for block_number in range(1, 7):
+            self.add_event(block_number)
+        incremental = AnimalProofLog.objects.get(animal=self.animal).root
+
+        self.assertEqual(rebuild_log(self.animal).root, incremental)
@@ -659,20 +659,29 @@ class BlockchainStatsView(APIView):
     
     def get(self, request, *args, **kwargs):
         try:
-            from django.db import models
+            from core.counters import load_counters
+            
+            counters = load_counters([
+                'blockchain.events', 'blockchain.events.type',
+                'blockchain.interactions', 'blockchain.interactions.status',
+                'blockchain.interactions.contract_type', 'blockchain.interactions.gas_used',
+                'blockchain.gas_prices', 'blockchain.gas_prices.sum',
+                'blockchain.contracts.active', 'blockchain.tx_pool.status',
+            ])
+            last_block = NetworkState.objects.values_list('last_block_number', flat=True).first()
             
             stats = {
-                'total_events': BlockchainEvent.objects.count(),
-                'total_transactions': ContractInteraction.objects.count(),
-                'successful_transactions': ContractInteraction.objects.filter(status='SUCCESS').count(),
-                'failed_transactions': ContractInteraction.objects.filter(status='FAILED').count(),
-                'average_gas_price': GasPriceHistory.objects.aggregate(avg_gas=models.Avg('gas_price'))['avg_gas'] or 0,
-                'total_gas_used': ContractInteraction.objects.aggregate(total_gas=models.Sum('gas_used'))['total_gas'] or 0,
-                'last_block_number': NetworkState.objects.first().last_block_number if NetworkState.objects.exists() else 0,
-                'active_contracts': SmartContract.objects.filter(is_active=True).count(),
-                'pending_transactions': TransactionPool.objects.filter(status='PENDING').count(),
-                'events_by_type': dict(BlockchainEvent.objects.values_list('event_type').annotate(count=Count('id'))),
-                'interactions_by_type': dict(ContractInteraction.objects.values_list('contract_type').annotate(count=Count('id')))
+                'total_events': counters.count('blockchain.events'),
+                'total_transactions': counters.count('blockchain.interactions'),
+                'successful_transactions': counters.count('blockchain.interactions.status', 'SUCCESS'),
+                'failed_transactions': counters.count('blockchain.interactions.status', 'FAILED'),
+                'average_gas_price': counters.average('blockchain.gas_prices.sum', 'blockchain.gas_prices'),
+                'total_gas_used': counters.count('blockchain.interactions.gas_used'),
+                'last_block_number': last_block or 0,
+                'active_contracts': counters.count('blockchain.contracts.active'),
+                'pending_transactions': counters.count('blockchain.tx_pool.status', 'PENDING'),
+                'events_by_type': counters.breakdown('blockchain.events.type'),
+                'interactions_by_type': counters.breakdown('blockchain.interactions.contract_type')
             }
             
             serializer = BlockchainStatsSerializer(stats)
@@ -125,6 +125,7 @@ class CattleAuditTrailInline(admin.TabularInline):
 @admin.register(AnimalGeneticProfile)
 class AnimalGeneticProfileAdmin(admin.ModelAdmin):
     list_display = ['animal_link', 'genetic_marker', 'breed_composition_summary', 'blockchain_linked_display', 'created_at']
+    list_select_related = ['animal']
     list_filter = ['created_at', 'genetic_marker']
     search_fields = ['animal__ear_tag', 'genetic_marker', 'blockchain_hash']
     readonly_fields = ['animal_link', 'created_at', 'updated_at', 'blockchain_linked_display', 'polyscan_link_method']
@@ -158,6 +159,7 @@ class AnimalGeneticProfileAdmin(admin.ModelAdmin):
 @admin.register(FeedingRecord)
 class FeedingRecordAdmin(admin.ModelAdmin):
     list_display = ['animal_link', 'feed_type', 'quantity_kg', 'feeding_date', 'supplier_link', 'blockchain_linked_display']
+    list_select_related = ['animal', 'supplier']
     list_filter = ['feed_type', 'feeding_date', 'supplier']
     search_fields = ['animal__ear_tag', 'feed_type', 'supplier__username']
     readonly_fields = ['animal_link', 'supplier_link', 'created_at', 'blockchain_linked_display', 'polyscan_link_method']
@@ -209,6 +211,7 @@ class CertificationStandardAdmin(admin.ModelAdmin):
 @admin.register(AnimalCertification)
 class AnimalCertificationAdmin(admin.ModelAdmin):
     list_display = ['animal_link', 'standard', 'certification_date', 'expiration_date', 'expiration_status', 'certifying_authority_link', 'blockchain_linked_display']
+    list_select_related = ['animal', 'standard', 'certifying_authority']
     list_filter = ['standard', 'certification_date', 'revoked']
     search_fields = ['animal__ear_tag', 'standard__name', 'certifying_authority__username']
     readonly_fields = ['animal_link', 'standard_link', 'certifying_authority_link', 'created_at', 'updated_at', 'expiration_status', 'blockchain_linked_display', 'polyscan_link_method']
@@ -272,6 +275,8 @@ class AnimalAdmin(admin.ModelAdmin):
         'created_at'
     ]
     
+    list_select_related = ['owner', 'current_batch']
+    
     list_filter = [
         'health_status',
         'breed',
@@ -446,6 +451,8 @@ class AnimalHealthRecordAdmin(admin.ModelAdmin):
         'created_at'
     ]
     
+    list_select_related = ['animal']
+    
     list_filter = [
         'health_status',
         'source',
@@ -574,6 +581,9 @@ class AnimalInline(admin.TabularInline):
     verbose_name_plural = 'Animales en el Lote'
     readonly_fields = ['animal_minted_status', 'animal_health_status']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('animal')
+    
     def animal_minted_status(self, obj):
         if obj.animal.is_minted:
             return format_html('<span style="color: green;">✅ Sí</span>')
@@ -606,6 +616,8 @@ class BatchAdmin(admin.ModelAdmin):
         'on_blockchain'
     ]
     
+    list_select_related = ['created_by']
+    
     list_filter = [
         'status',
         'created_by',
@@ -681,16 +693,19 @@ class BatchAdmin(admin.ModelAdmin):
         return format_html('<span style="color: {};">{}</span>', color, obj.get_status_display())
     status_display.short_description = 'Estado'
     
+    # Los conteos salen de las anotaciones de get_queryset: sin consultas por fila
     def minted_animals_count_display(self, obj):
-        return f"{obj.minted_animals_count} / {obj.total_animals_count}"
+        return f"{obj.minted_count} / {obj.animals_count}"
     minted_animals_count_display.short_description = 'Animales con NFT'
+    minted_animals_count_display.admin_order_field = 'minted_count'
     
     def get_total_animals_count(self, obj):
-        return obj.total_animals_count
+        return obj.animals_count
     get_total_animals_count.short_description = 'Total Animales'
+    get_total_animals_count.admin_order_field = 'animals_count'
     
     def get_total_animals_count_display(self, obj):
-        return obj.total_animals_count
+        return obj.animals_count
     get_total_animals_count_display.short_description = 'Total Animales'
     
     def polyscan_link_method(self, obj):
@@ -737,6 +752,8 @@ class CattleAuditTrailAdmin(admin.ModelAdmin):
         'blockchain_linked_display'
     ]
     
+    list_select_related = ['user']
+    
     list_filter = [
         'object_type',
         'action_type',
@@ -902,9 +919,9 @@ class BlockchainEventStateAdmin(admin.ModelAdmin):
     )
     
     def event_link(self, obj):
-        if obj.event:
-            url = reverse('admin:blockchain_blockchainevent_change', args=[obj.event.id])
-            return format_html('<a href="{}">Evento #{}</a>', url, obj.event.id)
+        if obj.event_id:
+            url = reverse('admin:blockchain_blockchainevent_change', args=[obj.event_id])
+            return format_html('<a href="{}">Evento #{}</a>', url, obj.event_id)
         return "—"
     event_link.short_description = 'Evento Blockchain'
     
@@ -7,6 +7,7 @@ from django.contrib.auth import get_user_model
 from cattle.models import Animal, AnimalHealthRecord, Batch
 from cattle.blockchain_models import BlockchainEventState
 from cattle.audit_models import CattleAuditTrail
+from core.query_guard import query_guard
 
 User = get_user_model()
 
@@ -396,3 +397,47 @@ class SimpleTests(APITestCase):
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+
+class AdminChangelistQueryTests(TestCase):
+    """Las listas del admin con 100 filas no consultan por fila"""
+    
+    QUERY_BUDGET = 20
+    
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='changelist_admin',
+            email='changelist@example.com',
+            password='adminpass123',
+            wallet_address='0xA52d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        owners = [
+            User.objects.create_user(
+                username=f'changelist_owner{index}', password='x', wallet_address=f'0x{0xA60 + index:040x}'
+            )
+            for index in range(5)
+        ]
+        batches = [
+            Batch.objects.create(name=f'Lote {index}', origin='Campo', destination='Planta', created_by=owners[index % 5])
+            for index in range(100)
+        ]
+        for index in range(100):
+            animal = Animal.objects.create(
+                ear_tag=f'CHG{index:04d}', breed='Angus', birth_date='2023-01-01', weight=300,
+                health_status='HEALTHY', owner=owners[index % 5], location='Campo',
+                current_batch=batches[index], token_id=index if index % 2 else None
+            )
+            batches[index].animals.add(animal)
+            AnimalHealthRecord.objects.create(animal=animal, health_status='HEALTHY')
+        self.client.force_login(self.admin)
+    
+    def test_changelists_stay_under_query_budget(self):
+        for name in ('cattle_batch', 'cattle_animal', 'cattle_animalhealthrecord'):
+            with self.subTest(changelist=name):
+                with query_guard(budget=self.QUERY_BUDGET):
+                    response = self.client.get(reverse(f'admin:{name}_changelist'))
+                self.assertEqual(response.status_code, 200)
+    
+    def test_batch_counts_come_from_annotations(self):
+        response = self.client.get(reverse('admin:cattle_batch_changelist'))
+        self.assertContains(response, '1 / 1')
+        self.assertContains(response, '0 / 1')
@@ -934,31 +934,21 @@ def search_batches(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def cattle_stats(request):
+    from core.counters import load_counters
+    
     user = request.user
-    if user.is_superuser:
-        animals = Animal.objects.all()
-        batches = Batch.objects.all()
-    else:
-        animals = Animal.objects.filter(owner=user)
-        batches = Batch.objects.filter(created_by=user)
-    
-    from collections import defaultdict
+    counters = load_counters([
+        'cattle.animals', 'cattle.animals.minted', 'cattle.batches',
+        'cattle.animals.health_status', 'cattle.batches.status', 'cattle.animals.breed',
+    ], user=None if user.is_superuser else user)
+    
     stats = {
-        'total_animals': animals.count(),
-        'minted_animals': animals.filter(token_id__isnull=False).count(),
-        'total_batches': batches.count(),
-        'animals_by_health_status': defaultdict(int),
-        'batches_by_status': defaultdict(int),
-        'animals_by_breed': defaultdict(int)
+        'total_animals': counters.count('cattle.animals'),
+        'minted_animals': counters.count('cattle.animals.minted'),
+        'total_batches': counters.count('cattle.batches'),
+        'animals_by_health_status': counters.breakdown('cattle.animals.health_status'),
+        'batches_by_status': counters.breakdown('cattle.batches.status'),
+        'animals_by_breed': counters.breakdown('cattle.animals.breed')
     }
     
-    for status_val, count in animals.values_list('health_status').annotate(count=Count('id')):
-        stats['animals_by_health_status'][status_val] = count
-    
-    for status_val, count in batches.values_list('status').annotate(count=Count('id')):
-        stats['batches_by_status'][status_val] = count
-    
-    for breed, count in animals.values_list('breed').annotate(count=Count('id')):
-        stats['animals_by_breed'][breed] = count
-    
     return Response(stats)
\ No newline at end of file
@@ -1,8 +1,5 @@
 # backend/certification/adapters/multichain_adapter.py
-from django.db import models
 from core.multichain.manager import multichain_manager
-from core.starknet.client import SyncStarknetClient
-import json
 
 class CertificationMultichainAdapter:
     """Adaptador para certificaciones multichain"""
@@ -11,97 +8,29 @@ class CertificationMultichainAdapter:
         self.certification = certification
         
     def issue_on_blockchain(self, networks=None):
-        """Emitir certificación en blockchain(s)"""
-        if networks is None:
-            networks = ['STARKNET_SEPOLIA', 'POLYGON_AMOY']
-        
-        results = {}
-        for network_id in networks:
-            network = multichain_manager.get_network(network_id)
-            if network.is_starknet:
-                results[network_id] = self._issue_on_starknet(network)
-            else:
-                results[network_id] = self._issue_on_evm(network)
-        
-        # Actualizar estado si al menos una fue exitosa
-        if any(r['success'] for r in results.values()):
-            self.certification.blockchain_certificate = True
-            self.certification.save()
-            
-            # Crear registro multichain
-            self._create_multichain_record(results)
-        
-        return results
-    
-    def _issue_on_starknet(self, network):
-        """Emitir certificación en Starknet"""
-        try:
-            client = SyncStarknetClient(network)
-            
-            # Obtener contrato de certificaciones
-            contract_address = self._get_certification_contract(network)
-            
-            # Preparar datos de la certificación
-            cert_data = {
-                'certificate_number': self.certification.certificate_number,
-                'entity_address': self.certification.certified_entity.wallet_address,
-                'standard_code': self.certification.standard.code,
-                'grade': self.certification.grade,
-                'issue_date': self.certification.issue_date.isoformat(),
-                'expiry_date': self.certification.expiry_date.isoformat(),
-            }
-            
-            # Llamar al contrato (implementación específica)
-            # result = client.issue_certification(contract_address, cert_data)
-            
-            return {
-                'success': True,
-                'transaction_hash': '0x123...',  # Placeholder
-                'network': network.name
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'network': network.name
-            }
-    
-    def _issue_on_evm(self, network):
-        """Emitir certificación en EVM (Polygon)"""
-        # Implementación similar para EVM
+        """Emitir certificación en blockchain(s)
+        
+        Usa la emisión por lotes (``certification.issuance``): un lote de un
+        certificado, comprometido en todas las redes a la vez. Sin ``networks``
+        usa las redes preferidas del organismo.
+        """
+        from ..issuance import issue_certifications, publish_batch
+        from ..models import Certification
+        
+        batch = self.certification.issuance_batch
+        if batch is None:
+            batches = issue_certifications(Certification.objects.filter(pk=self.certification.pk), networks)
+            if not batches:
+                return {}
+            batch = batches[0]
+        elif batch.status != 'ISSUED':
+            # Reintentar las redes que fallaron
+            batch = publish_batch(batch, force=True)
+        self.certification.refresh_from_db(fields=['blockchain_certificate', 'issuance_batch', 'issuance_proof'])
         return {
-            'success': True,
-            'transaction_hash': '0x456...',  # Placeholder
-            'network': network.name
+            network: {'success': 'transaction_hash' in result, 'network': network, **result}
+            for network, result in batch.network_results.items()
         }
-    
-    def _get_certification_contract(self, network):
-        """Obtener dirección del contrato de certificaciones"""
-        # Lógica para obtener contrato según la red
-        return "0xcontract_address"
-    
-    def _create_multichain_record(self, results):
-        """Crear registro multichain para la certificación"""
-        from core.multichain.models import ChainSpecificModel
-        
-        chain_data = {}
-        for network_id, result in results.items():
-            if result['success']:
-                chain_data[network_id] = {
-                    'transaction_hash': result['transaction_hash'],
-                    'timestamp': result.get('timestamp')
-                }
-        
-        multichain_record = ChainSpecificModel.objects.create(
-            content_type='certification',
-            object_id=str(self.certification.id),
-            network=multichain_manager.get_primary_network(),
-            chain_data=chain_data
-        )
-        
-        self.certification.multichain_data = multichain_record
-        self.certification.save()
 
 class ConsumerAccessMultichainAdapter:
     """Adaptador para acceso multichain de consumidores"""
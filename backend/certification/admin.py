@@ -3,7 +3,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from .models import (
     GlobalCertificationBody, CertificationStandard, 
-    Certification, CertificationAudit
+    Certification, CertificationAudit, CertificateIssuanceBatch
 )
 
 @admin.register(GlobalCertificationBody)
@@ -106,7 +106,7 @@ class CertificationAdmin(admin.ModelAdmin):
             'fields': ['status', 'suspension_reason', 'revocation_cause']  # ← CORREGIDO: lista
         }),
         ('Integración Blockchain', {
-            'fields': ['blockchain_certificate', 'multichain_data']  # ← CORREGIDO: lista
+            'fields': ['blockchain_certificate', 'multichain_data', 'issuance_batch', 'issuance_proof']
         }),
         ('Propiedades Calculadas', {
             'fields': ['is_valid', 'days_until_expiry', 'requires_renewal', 'is_compliant']  # ← CORREGIDO: lista
@@ -147,4 +147,21 @@ class CertificationAuditAdmin(admin.ModelAdmin):
         ('Blockchain', {
             'fields': ['blockchain_hash']  # ← CORREGIDO: lista
         })
-    )
\ No newline at end of file
+    )
+
+@admin.register(CertificateIssuanceBatch)
+class CertificateIssuanceBatchAdmin(admin.ModelAdmin):
+    list_display = ['id', 'certificate_count', 'networks', 'status', 'next_retry_at', 'created_at', 'issued_at']
+    list_filter = ['status']
+    readonly_fields = [
+        'merkle_root', 'networks', 'certificate_count', 'status',
+        'network_results', 'next_retry_at', 'created_at', 'issued_at'
+    ]
+    actions = ['retry_issuance']
+    
+    def retry_issuance(self, request, queryset):
+        from .issuance import publish_batch
+        
+        batches = [publish_batch(batch, force=True) for batch in queryset.exclude(status='ISSUED')]
+        self.message_user(request, f"{len(batches)} lotes reintentados")
+    retry_issuance.short_description = 'Reintentar redes pendientes'
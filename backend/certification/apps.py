@@ -10,8 +10,5 @@ class CertificationConfig(AppConfig):
         # Importar señales
         import certification.signals
         
-        # Configurar tareas periódicas
-        from .tasks import check_expiring_certifications
-        from celery.schedules import crontab
-        
-        # Esto se configurará en settings.py de Celery
\ No newline at end of file
+        # Los vencimientos se escanean con `manage.py scan_certification_expiry`
+        # (cron o --loop), sin depender de Celery
\ No newline at end of file
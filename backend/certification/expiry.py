@@ -0,0 +1,192 @@
+# backend/certification/expiry.py
+"""
+Escaneo de vencimientos de certificaciones con avisos agrupados.
+
+Cada corrida recorre las certificaciones aprobadas que entran en la ventana
+de aviso desde la última corrida (marca ``ExpiryScanState.watermark``), por
+lotes con paginación por llave sobre ``(expiry_date, id)`` y el índice
+``(status, expiry_date)``. Los avisos se agrupan por destinatario: el dueño
+recibe un resumen con todas sus certificaciones por vencer y el administrador
+de cada organismo uno con las de sus estándares. Las consultas crecen con el
+número de lotes, no con el de certificaciones.
+
+Ajustes:
+    CERTIFICATION_EXPIRY_WARNING_DAYS   días de anticipación del aviso (30)
+    CERTIFICATION_DIGEST_BACKEND        ruta del backend de envío
+    CERTIFICATION_DIGEST_FILE           archivo del ``FileDigestBackend``
+"""
+import json
+import logging
+import sys
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Certification, ExpiryScanState
+
+logger = logging.getLogger(__name__)
+
+SCAN_BATCH_SIZE = 2000
+SCAN_NAME = 'expiry-warning'
+
+Digest = namedtuple('Digest', 'recipient name items')
+
+SCAN_FIELDS = (
+    'id', 'expiry_date', 'certificate_number', 'standard__name',
+    'standard__certification_body__name', 'certified_entity__email', 'certified_entity__username',
+    'standard__certification_body__admin_user__email', 'standard__certification_body__admin_user__username',
+)
+
+
+# ==============================================================================
+# BACKENDS
+# ==============================================================================
+
+class ConsoleDigestBackend:
+    """Escribe cada resumen en la consola (o en ``stream``)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send_digests(self, digests):
+        for digest in digests:
+            self.stream.write(f"Para: {digest.recipient} ({len(digest.items)} certificaciones)\n")
+            for item in digest.items:
+                self.stream.write(
+                    f"  - {item['certificate_number']} {item['standard']} vence {item['expiry_date']}"
+                    f" ({item['days_left']} días)\n"
+                )
+        return len(digests)
+
+
+class FileDigestBackend:
+    """Agrega cada resumen como una línea JSON a un archivo."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.CERTIFICATION_DIGEST_FILE
+
+    def send_digests(self, digests):
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            for digest in digests:
+                handle.write(json.dumps(digest._asdict(), default=str, ensure_ascii=False) + '\n')
+        return len(digests)
+
+
+class MailDigestBackend:
+    """Un correo por destinatario, todos por la misma conexión SMTP."""
+
+    def send_digests(self, digests):
+        messages = []
+        for digest in digests:
+            lines = [
+                f"- {item['certificate_number']} ({item['standard']}): vence el {item['expiry_date']}, "
+                f"en {item['days_left']} días"
+                for item in digest.items
+            ]
+            messages.append((
+                f"Certificaciones próximas a expirar ({len(digest.items)})",
+                f"Hola {digest.name},\n\nLas siguientes certificaciones expiran pronto:\n\n"
+                + "\n".join(lines) + "\n\nPor favor, inicie el proceso de renovación.",
+                settings.DEFAULT_FROM_EMAIL,
+                [digest.recipient],
+            ))
+        return send_mass_mail(messages, fail_silently=False)
+
+
+def get_digest_backend():
+    path = getattr(settings, 'CERTIFICATION_DIGEST_BACKEND', 'certification.expiry.ConsoleDigestBackend')
+    return import_string(path)()
+
+
+# ==============================================================================
+# ESCANEO
+# ==============================================================================
+
+def _expiring_rows(start, end, changed_since=None):
+    """Filas (como tuplas) con vencimiento en (start, end], por lotes con llave."""
+    queryset = Certification.objects.filter(status='APPROVED', expiry_date__gt=start, expiry_date__lte=end)
+    if changed_since is not None:
+        queryset = queryset.filter(updated_at__gt=changed_since)
+    last = None
+    while True:
+        batch = queryset
+        if last is not None:
+            batch = batch.filter(Q(expiry_date__gt=last[0]) | Q(expiry_date=last[0], id__gt=last[1]))
+        rows = list(batch.order_by('expiry_date', 'id').values_list(*SCAN_FIELDS)[:SCAN_BATCH_SIZE])
+        yield from rows
+        if len(rows) < SCAN_BATCH_SIZE:
+            return
+        last = (rows[-1][1], rows[-1][0])
+
+
+def build_digests(rows, today):
+    """Agrupar las filas en un resumen por destinatario (dueños y organismos)."""
+    digests = {}
+    for (cert_id, expiry_date, number, standard, body, owner_email, owner_name,
+         admin_email, admin_name) in rows:
+        item = {
+            'certification_id': cert_id,
+            'certificate_number': number,
+            'standard': standard,
+            'certification_body': body,
+            'owner': owner_name,
+            'expiry_date': expiry_date.isoformat(),
+            'days_left': (expiry_date - today).days,
+        }
+        for email, name in ((owner_email, owner_name), (admin_email, admin_name)):
+            if not email:
+                continue
+            digest = digests.get(email)
+            if digest is None:
+                digest = digests[email] = Digest(email, name, [])
+            if not digest.items or digest.items[-1]['certification_id'] != cert_id:
+                digest.items.append(item)
+    return list(digests.values())
+
+
+def expire_overdue(today=None):
+    """Marcar como expiradas las aprobadas ya vencidas (un UPDATE)."""
+    today = today or timezone.localdate()
+    return Certification.objects.filter(status='APPROVED', expiry_date__lt=today).update(
+        status='EXPIRED', updated_at=timezone.now()
+    )
+
+
+def scan_expiring(today=None, backend=None, warning_days=None):
+    """Enviar los resúmenes de lo que entró en la ventana de aviso desde la última corrida.
+
+    Devuelve ``(certificaciones, resúmenes)``. La marca solo avanza si el envío
+    termina, así que una corrida fallida se repite completa. Las certificaciones
+    aprobadas después de la última corrida cuyo vencimiento ya quedó detrás de la
+    marca se recogen con un segundo rango filtrado por ``updated_at``.
+    """
+    started = timezone.now()
+    today = today or timezone.localdate()
+    warning_days = warning_days if warning_days is not None else getattr(
+        settings, 'CERTIFICATION_EXPIRY_WARNING_DAYS', 30)
+    end = today + timedelta(days=warning_days)
+
+    state, _ = ExpiryScanState.objects.get_or_create(name=SCAN_NAME)
+    # La primera corrida avisa desde hoy; las siguientes, solo lo nuevo en la ventana
+    yesterday = today - timedelta(days=1)
+    start = max(state.watermark, yesterday) if state.watermark is not None else yesterday
+
+    rows = list(_expiring_rows(start, end))
+    if state.last_run_at is not None and start > yesterday:
+        # Aprobadas (o modificadas) después de la última corrida con vencimiento ya escaneado
+        rows = list(_expiring_rows(yesterday, start, changed_since=state.last_run_at)) + rows
+    digests = build_digests(rows, today)
+    if digests:
+        (backend or get_digest_backend()).send_digests(digests)
+
+    ExpiryScanState.objects.filter(pk=state.pk).update(
+        watermark=max(end, start), last_run_at=started, last_certification_count=len(rows),
+        last_digest_count=len(digests)
+    )
+    logger.info(f"Escaneo de vencimientos hasta {end}: {len(rows)} certificaciones, {len(digests)} resúmenes")
+    return len(rows), len(digests)
@@ -0,0 +1,420 @@
+# backend/certification/issuance.py
+"""
+Emisión de certificados en cadena por lotes.
+
+``create_batches`` toma las certificaciones aprobadas que aún no están en
+cadena, las agrupa por conjunto de redes del organismo y arma un árbol Merkle
+por lote: cada certificación guarda su prueba y el lote su raíz, todo con
+escrituras en bloque. ``publish_batch`` compromete la raíz con una sola
+transacción por red (``commitBatch`` en ``GanadoCertificateRegistryUpgradeable``)
+y lanza las redes en paralelo, así que certificar un lote completo de animales
+cuesta una ronda por red en lugar de una transacción por certificado y red.
+Las redes que fallan quedan pendientes en el lote y se reintentan sin volver
+a publicar las que ya confirmaron, con espera exponencial y un máximo de
+intentos; ``issue_pending`` solo toma los lotes cuyo ``next_retry_at`` ya
+pasó. Las redes sin registro configurado no entran en los lotes.
+
+La emisión nunca corre en la petición que aprueba: una aprobación arranca el
+hilo ``issuer``, que ejecuta ``issue_pending`` por intervalos (lotes nuevos y
+reintentos vencidos). Sin hilo (intervalo ``None``) la emisión queda a cargo
+del comando ``issue_certificates --loop`` o de un cron.
+
+Hoja: ``keccak256(bytes.concat(keccak256(abi.encode(number, entity, standard, expiry))))``
+con ``number`` y ``standard`` como ``keccak256`` del texto y ``expiry`` como AAAAMMDD.
+
+Ajustes:
+    CERTIFICATION_REGISTRY_ADDRESSES   dirección del registro por red
+    CERTIFICATION_ISSUANCE_BATCH_SIZE  certificaciones por lote (500)
+    CERTIFICATION_ISSUANCE_RETRY_DELAY espera antes del primer reintento, en segundos (60)
+    CERTIFICATION_ISSUANCE_MAX_ATTEMPTS intentos por red antes de abandonarla (8)
+    CERTIFICATION_ISSUANCE_INTERVAL    segundos entre emisiones en segundo plano (60; None = sin hilo)
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from eth_abi import encode
+from eth_utils import keccak, to_checksum_address
+
+from core.background import PeriodicThread
+from rewards.distribution import build_layers, merkle_proof, verify_proof
+from .models import CertificateIssuanceBatch, Certification, GlobalCertificationBody
+
+logger = logging.getLogger(__name__)
+
+# Las mismas redes que asigna GlobalCertificationBody.save cuando no hay preferidas
+DEFAULT_NETWORKS = ['POLYGON', 'STARKNET']
+NETWORK_TYPES = {'POLYGON': 'EVM', 'ETHEREUM': 'EVM', 'STARKNET': 'STARKNET'}
+ZERO_ADDRESS = '0x' + '00' * 20
+
+LEAF_FIELDS = (
+    'id', 'certificate_number', 'certified_entity__wallet_address', 'standard__code', 'expiry_date',
+    'standard__certification_body__preferred_networks',
+)
+
+REGISTRY_ABI = [{
+    'name': 'commitBatch',
+    'type': 'function',
+    'stateMutability': 'nonpayable',
+    'inputs': [
+        {'name': 'batchId', 'type': 'uint256'},
+        {'name': 'root', 'type': 'bytes32'},
+        {'name': 'size', 'type': 'uint256'},
+    ],
+    'outputs': [],
+}]
+
+
+class IssuanceError(Exception):
+    """El lote no puede emitirse en una red."""
+
+
+# ==============================================================================
+# HOJAS Y LOTES
+# ==============================================================================
+
+def certificate_leaf(certificate_number, wallet_address, standard_code, expiry_date):
+    return keccak(keccak(encode(
+        ['bytes32', 'address', 'bytes32', 'uint256'],
+        [
+            keccak(text=certificate_number),
+            to_checksum_address(wallet_address or ZERO_ADDRESS),
+            keccak(text=standard_code),
+            int(expiry_date.strftime('%Y%m%d')),
+        ]
+    )))
+
+
+def leaf_for(certification):
+    return certificate_leaf(
+        certification.certificate_number, certification.certified_entity.wallet_address,
+        certification.standard.code, certification.expiry_date
+    )
+
+
+def verify_certification(certification):
+    """Comprobar la prueba de la certificación contra la raíz de su lote."""
+    batch = certification.issuance_batch
+    if batch is None:
+        return False
+    proof = [bytes.fromhex(node[2:]) for node in certification.issuance_proof]
+    return verify_proof(proof, bytes.fromhex(batch.merkle_root[2:]), leaf_for(certification))
+
+
+def pending_certifications():
+    """Aprobadas, de organismos que emiten en cadena y sin lote asignado."""
+    return Certification.objects.filter(
+        status='APPROVED',
+        blockchain_certificate=False,
+        issuance_batch__isnull=True,
+        standard__certification_body__issues_blockchain_certs=True,
+    )
+
+
+def registry_networks():
+    """Redes con registro de certificados configurado."""
+    return {
+        network for network, address in getattr(settings, 'CERTIFICATION_REGISTRY_ADDRESSES', {}).items() if address
+    }
+
+
+def _create_batch(networks, rows):
+    leaves = [certificate_leaf(*row[1:5]) for row in rows]
+    layers = build_layers(leaves)
+    batch = CertificateIssuanceBatch.objects.create(
+        merkle_root='0x' + layers[-1][0].hex(),
+        networks=networks,
+        certificate_count=len(rows),
+        next_retry_at=timezone.now(),
+    )
+    Certification.objects.bulk_update([
+        Certification(
+            pk=row[0],
+            issuance_batch=batch,
+            issuance_proof=['0x' + node.hex() for node in merkle_proof(layers, index)],
+        )
+        for index, row in enumerate(rows)
+    ], ['issuance_batch', 'issuance_proof'], batch_size=500)
+    return batch
+
+
+def create_batches(queryset=None, networks=None, limit=None):
+    """Asignar a lotes las certificaciones sin lote; uno por conjunto de redes.
+
+    Con ``networks`` todas van a esas redes; si no, a las preferidas de su
+    organismo. Solo cuentan las redes con registro configurado: las
+    certificaciones sin ninguna quedan sin lote. Las filas bloqueadas por otra
+    corrida se saltan.
+    """
+    queryset = pending_certifications() if queryset is None else queryset
+    limit = limit or getattr(settings, 'CERTIFICATION_ISSUANCE_BATCH_SIZE', 500)
+    configured = registry_networks()
+    if networks is not None:
+        networks = [network for network in networks if network in configured]
+        if not networks:
+            logger.warning('Ninguna de las redes pedidas tiene registro de certificados configurado')
+            return []
+    else:
+        # Organismos sin ninguna red emisible: sus filas no deben ocupar el lote
+        blocked = [
+            body_id for body_id, preferred in GlobalCertificationBody.objects.filter(
+                issues_blockchain_certs=True
+            ).values_list('pk', 'preferred_networks')
+            if not configured.intersection(preferred or DEFAULT_NETWORKS)
+        ]
+        if blocked:
+            logger.warning(f"Organismos sin registro de certificados configurado: {blocked}")
+            queryset = queryset.exclude(standard__certification_body_id__in=blocked)
+    with transaction.atomic():
+        rows = list(
+            queryset.filter(issuance_batch__isnull=True)
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('id').values_list(*LEAF_FIELDS)[:limit]
+        )
+        groups = {}
+        for row in rows:
+            key = tuple(network for network in (networks or row[5] or DEFAULT_NETWORKS) if network in configured)
+            groups.setdefault(key, []).append(row)
+        return [_create_batch(list(key), group) for key, group in groups.items()]
+
+
+# ==============================================================================
+# PUBLICADORES
+# ==============================================================================
+
+class Web3BatchPublisher:
+    """Compromete raíces de lotes en el registro de una red EVM.
+
+    Firma con ``private_key`` o usa la cuenta desbloqueada ``sender``, igual
+    que ``rewards.distribution.Web3RootPublisher``.
+    """
+
+    def __init__(self, w3=None, address=None, rpc_url=None, private_key=None, sender=None, timeout=120):
+        from web3 import Web3
+
+        self.w3 = w3 or Web3(Web3.HTTPProvider(rpc_url or settings.BLOCKCHAIN_RPC_URL))
+        self.contract = self.w3.eth.contract(address=Web3.to_checksum_address(address), abi=REGISTRY_ABI)
+        if private_key is None and sender is None:
+            private_key = settings.ADMIN_PRIVATE_KEY
+        self.private_key = private_key
+        self.sender = sender
+        self.timeout = timeout
+
+    def commit_batch(self, batch_id, root, size):
+        call = self.contract.functions.commitBatch(batch_id, bytes.fromhex(root[2:]), size)
+        if self.private_key:
+            account = self.w3.eth.account.from_key(self.private_key)
+            transaction_data = call.build_transaction({
+                'from': account.address,
+                'nonce': self.w3.eth.get_transaction_count(account.address, 'pending'),
+                'gas': 120000,
+                'gasPrice': self.w3.eth.gas_price,
+            })
+            signed = account.sign_transaction(transaction_data)
+            tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        else:
+            tx_hash = call.transact({'from': self.sender, 'gas': 120000})
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.timeout)
+        if receipt['status'] != 1:
+            raise IssuanceError(f'El compromiso del lote {batch_id} falló en cadena')
+        return self.w3.to_hex(tx_hash)
+
+
+class StarknetBatchPublisher:
+    """Compromete raíces de lotes en el registro Cairo (``commit_batch``) de Starknet."""
+
+    def __init__(self, address, rpc_url=None):
+        from starknet_py.contract import Contract
+        from starknet_py.net.account.account import Account
+        from starknet_py.net.full_node_client import FullNodeClient
+        from starknet_py.net.models import StarknetChainId
+        from starknet_py.net.signer.stark_curve_signer import KeyPair
+
+        if not settings.STARKNET_ACCOUNT_ADDRESS or not settings.STARKNET_PRIVATE_KEY:
+            raise IssuanceError('La cuenta de Starknet no está configurada')
+        account = Account(
+            client=FullNodeClient(node_url=rpc_url or settings.STARKNET_RPC_URL),
+            address=settings.STARKNET_ACCOUNT_ADDRESS,
+            key_pair=KeyPair.from_private_key(int(settings.STARKNET_PRIVATE_KEY, 16)),
+            chain=StarknetChainId.SEPOLIA,
+        )
+        self.contract = Contract.from_address_sync(address=address, provider=account)
+
+    def commit_batch(self, batch_id, root, size):
+        invocation = self.contract.functions['commit_batch'].invoke_v1_sync(
+            batch_id, int(root, 16), size, auto_estimate=True
+        )
+        invocation.wait_for_acceptance_sync()
+        return hex(invocation.hash)
+
+
+def get_batch_publisher(network_name):
+    """Publicador para una red (``POLYGON_AMOY``, o el alias ``POLYGON``)."""
+    from core.multichain.manager import multichain_manager
+
+    address = getattr(settings, 'CERTIFICATION_REGISTRY_ADDRESSES', {}).get(network_name)
+    if not address:
+        raise IssuanceError(f'No hay registro de certificados configurado para {network_name}')
+    network = multichain_manager.get_network(network_name)
+    network_type = network.network_type if network else NETWORK_TYPES.get(network_name.split('_')[0])
+    if network_type == 'EVM':
+        return Web3BatchPublisher(address=address, rpc_url=network.rpc_url if network else None)
+    if network_type == 'STARKNET':
+        return StarknetBatchPublisher(address=address, rpc_url=network.rpc_url if network else None)
+    raise IssuanceError(f'Red no soportada para emitir certificados: {network_name}')
+
+
+# ==============================================================================
+# EMISIÓN
+# ==============================================================================
+
+def _exhausted(result):
+    # Falló y ya no tiene reintento programado
+    return 'error' in result and 'retry_at' not in result
+
+
+def _is_due(result, now):
+    retry_at = result.get('retry_at')
+    return retry_at is None or parse_datetime(retry_at) <= now
+
+
+def _failure(previous, error, now):
+    """Resultado de un intento fallido: cuenta intentos y programa el siguiente."""
+    attempts = previous.get('attempts', 0) + 1
+    result = {'error': error, 'attempts': attempts}
+    if attempts < getattr(settings, 'CERTIFICATION_ISSUANCE_MAX_ATTEMPTS', 8):
+        delay = getattr(settings, 'CERTIFICATION_ISSUANCE_RETRY_DELAY', 60) * 2 ** (attempts - 1)
+        result['retry_at'] = (now + timedelta(seconds=delay)).isoformat()
+    return result
+
+
+def publish_batch(batch, publishers=None, force=False):
+    """Comprometer la raíz en las redes que faltan, en paralelo; devuelve el lote.
+
+    Sin ``force`` se saltan las redes cuyo reintento aún no toca o que
+    agotaron sus intentos. Solo las llamadas a la cadena corren en hilos; los
+    resultados se guardan con un UPDATE del lote y otro de sus certificaciones.
+    """
+    publishers = publishers or {}
+    now = timezone.now()
+    previous = batch.network_results
+    results = {}
+    jobs = {}
+    for network in batch.networks:
+        result = previous.get(network, {})
+        if result.get('transaction_hash'):
+            continue
+        if not force and (_exhausted(result) or not _is_due(result, now)):
+            continue
+        try:
+            jobs[network] = publishers.get(network) or get_batch_publisher(network)
+        except Exception as e:
+            results[network] = _failure(result, str(e), now)
+
+    if jobs:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = {
+                network: pool.submit(publisher.commit_batch, batch.id, batch.merkle_root, batch.certificate_count)
+                for network, publisher in jobs.items()
+            }
+        for network, future in futures.items():
+            try:
+                results[network] = {'transaction_hash': future.result(), 'committed_at': timezone.now().isoformat()}
+            except Exception as e:
+                logger.error(f"Error issuing certificate batch {batch.id} on {network}: {str(e)}")
+                results[network] = _failure(previous.get(network, {}), str(e), now)
+
+    now = timezone.now()
+    with transaction.atomic():
+        batch = CertificateIssuanceBatch.objects.select_for_update().get(pk=batch.pk)
+        network_results = dict(batch.network_results)
+        for network, result in results.items():
+            # Otra corrida pudo confirmar la red mientras tanto
+            if not network_results.get(network, {}).get('transaction_hash'):
+                network_results[network] = result
+        issued = [network for network in batch.networks if network_results.get(network, {}).get('transaction_hash')]
+        retries = [
+            parse_datetime(network_results[network]['retry_at']) if 'retry_at' in network_results.get(network, {})
+            else now
+            for network in batch.networks
+            if network not in issued and not _exhausted(network_results.get(network, {}))
+        ]
+        batch.network_results = network_results
+        batch.next_retry_at = min(retries) if retries else None
+        if len(issued) == len(batch.networks):
+            batch.status = 'ISSUED'
+        elif issued:
+            batch.status = 'PARTIAL'
+        else:
+            # Sin reintentos pendientes no hay nada más que esperar
+            batch.status = 'PENDING' if retries else 'FAILED'
+        if issued and batch.issued_at is None:
+            batch.issued_at = now
+        batch.save(update_fields=['network_results', 'status', 'issued_at', 'next_retry_at'])
+        if issued:
+            Certification.objects.filter(issuance_batch=batch, blockchain_certificate=False).update(
+                blockchain_certificate=True, updated_at=now
+            )
+    logger.info(f"Lote {batch.id}: {batch.certificate_count} certificados en {', '.join(issued) or 'ninguna red'}")
+    return batch
+
+
+def issue_pending(publishers=None):
+    """Emitir las certificaciones nuevas y reintentar los lotes cuyo reintento ya toca."""
+    # Un lote por pasada tiene tope de tamaño: seguir hasta vaciar lo pendiente
+    while create_batches():
+        pass
+    batches = CertificateIssuanceBatch.objects.filter(next_retry_at__lte=timezone.now()).order_by('id')
+    return [publish_batch(batch, publishers) for batch in batches]
+
+
+def issue_certifications(queryset, networks=None, publishers=None):
+    """Emitir ya un conjunto de certificaciones (p. ej. desde el adaptador)."""
+    return [publish_batch(batch, publishers) for batch in create_batches(queryset, networks)]
+
+
+issuer = PeriodicThread(
+    'certificate-issuance', issue_pending, 'CERTIFICATION_ISSUANCE_INTERVAL', default=60,
+    error='Error emitiendo certificados en cadena', run_at_start=True,
+)
+
+
+def _enqueue_issuance():
+    # Las llamadas a la cadena esperan recibos: nunca en el hilo de la petición
+    issuer.ensure()
+
+
+class _ScheduledIssuance(threading.local):
+    """Conexiones (por alias) con una emisión pedida y aún sin arrancar."""
+
+    def __init__(self):
+        self.aliases = set()
+
+
+_scheduled = _ScheduledIssuance()
+
+
+def _enqueue_scheduled(using):
+    if using in _scheduled.aliases:
+        _scheduled.aliases.discard(using)
+        _enqueue_issuance()
+
+
+def schedule_issuance(using=None):
+    """Pedir una sola emisión por transacción, al confirmar.
+
+    Cada llamada registra su callback (así sobrevive a los savepoints que se
+    deshagan), pero solo el primero que corre tras el commit arranca la
+    emisión, que toma todas las certificaciones aprobadas en los mismos lotes.
+    Si la transacción entera se deshace, la marca queda y a lo sumo provoca
+    una emisión de más en el próximo commit.
+    """
+    using = using or 'default'
+    _scheduled.aliases.add(using)
+    transaction.on_commit(partial(_enqueue_scheduled, using), using=using)
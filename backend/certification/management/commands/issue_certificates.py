@@ -0,0 +1,23 @@
+# certification/management/commands/issue_certificates.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from certification.issuance import issue_pending
+
+
+class Command(BaseCommand):
+    help = 'Agrupa en lotes las certificaciones aprobadas pendientes, las emite en cadena y reintenta las redes vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Repetir cada CERTIFICATION_ISSUANCE_INTERVAL segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            batches = issue_pending()
+            issued = sum(1 for batch in batches if batch.status == 'ISSUED')
+            self.stdout.write(self.style.SUCCESS(f'{len(batches)} lotes procesados, {issued} emitidos en todas sus redes'))
+            if not options['loop']:
+                return
+            time.sleep(settings.CERTIFICATION_ISSUANCE_INTERVAL or 60)
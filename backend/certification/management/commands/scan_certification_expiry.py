@@ -0,0 +1,28 @@
+# certification/management/commands/scan_certification_expiry.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from certification.expiry import expire_overdue, scan_expiring
+
+
+class Command(BaseCommand):
+    help = 'Expira las certificaciones vencidas y envía un resumen por destinatario de las que están por vencer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', help='Ruta del backend de resúmenes (por defecto CERTIFICATION_DIGEST_BACKEND)')
+        parser.add_argument('--loop', action='store_true', help='Repetir cada CERTIFICATION_EXPIRY_SCAN_INTERVAL segundos')
+
+    def handle(self, *args, **options):
+        backend = import_string(options['backend'])() if options['backend'] else None
+        while True:
+            expired = expire_overdue()
+            certifications, digests = scan_expiring(backend=backend)
+            self.stdout.write(self.style.SUCCESS(
+                f'{expired} expiradas; {certifications} por vencer en {digests} resúmenes'
+            ))
+            if not options['loop']:
+                return
+            time.sleep(settings.CERTIFICATION_EXPIRY_SCAN_INTERVAL)
@@ -0,0 +1,87 @@
+# backend/certification/metadata.py
+"""
+Resumen del alcance de las certificaciones (animales y lotes cubiertos).
+
+Los cambios en ``Certification.animals`` y ``Certification.batches`` no
+recalculan en el momento: ``mark_dirty`` anota los ids afectados en un
+conjunto propio de la conexión y registra un callback ``on_commit``. El
+primero que corre tras el commit recalcula todo el conjunto en un lote de
+consultas agregadas y lo vacía; los demás no encuentran nada. Agregar mil
+animales uno a uno dentro de una transacción recalcula una sola vez; fuera de
+una transacción cada cambio confirma y recalcula por su cuenta.
+
+Cada callback se registra en el savepoint donde ocurrió su cambio, así que
+deshacer un savepoint nunca se lleva el recálculo de lo confirmado. Los ids
+de lo deshecho quedan en el conjunto y se recalculan de más en el próximo
+commit, lo que no cambia el resultado.
+"""
+import threading
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from .models import Certification
+
+
+def recompute(certification_ids):
+    """Recalcular ``scope_metadata`` de varias certificaciones; consultas constantes."""
+    certification_ids = sorted(set(certification_ids))
+    if not certification_ids:
+        return 0
+    AnimalLink = Certification.animals.through
+    BatchLink = Certification.batches.through
+
+    animals = {
+        row['certification_id']: row
+        for row in AnimalLink.objects.filter(certification_id__in=certification_ids)
+        .values('certification_id').annotate(total=Count('animal_id'), average_weight=Avg('animal__weight'))
+    }
+    breeds = {}
+    for certification_id, breed in (
+        AnimalLink.objects.filter(certification_id__in=certification_ids)
+        .values_list('certification_id', 'animal__breed').distinct().order_by('certification_id', 'animal__breed')
+    ):
+        breeds.setdefault(certification_id, []).append(breed)
+    batches = dict(
+        BatchLink.objects.filter(certification_id__in=certification_ids)
+        .values_list('certification_id').annotate(total=Count('batch_id'))
+    )
+
+    now = timezone.now().isoformat()
+    updates = []
+    for certification_id in certification_ids:
+        animal_row = animals.get(certification_id, {})
+        average_weight = animal_row.get('average_weight')
+        updates.append(Certification(pk=certification_id, scope_metadata={
+            'total_animals': animal_row.get('total', 0),
+            'breeds': breeds.get(certification_id, []),
+            'average_weight': float(average_weight) if average_weight is not None else None,
+            'total_batches': batches.get(certification_id, 0),
+            'updated_at': now,
+        }))
+    Certification.objects.bulk_update(updates, ['scope_metadata'], batch_size=500)
+    return len(certification_ids)
+
+
+class _DirtyCertifications(threading.local):
+    """Ids por recalcular de cada conexión (por alias) del hilo."""
+
+    def __init__(self):
+        self.by_alias = {}
+
+
+_dirty = _DirtyCertifications()
+
+
+def _recompute_dirty(using):
+    certification_ids = _dirty.by_alias.pop(using, None)
+    if certification_ids:
+        recompute(certification_ids)
+
+
+def mark_dirty(certification_ids, using='default'):
+    """Anotar certificaciones para recalcular una vez, al confirmar la transacción."""
+    _dirty.by_alias.setdefault(using, set()).update(certification_ids)
+    transaction.on_commit(partial(_recompute_dirty, using), using=using)
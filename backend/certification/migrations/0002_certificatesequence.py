@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certification', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificateSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=100, unique=True, verbose_name='Ámbito')),
+                ('last_value', models.PositiveBigIntegerField(default=0, verbose_name='Último Valor')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Certificados',
+                'verbose_name_plural': 'Secuencias de Certificados',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certification', '0002_certificatesequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiryScanState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Nombre')),
+                ('watermark', models.DateField(blank=True, null=True, verbose_name='Escaneado Hasta')),
+                ('last_run_at', models.DateTimeField(blank=True, null=True, verbose_name='Última Corrida')),
+                ('last_certification_count', models.PositiveIntegerField(default=0, verbose_name='Certificaciones')),
+                ('last_digest_count', models.PositiveIntegerField(default=0, verbose_name='Resúmenes Enviados')),
+            ],
+            options={
+                'verbose_name': 'Estado de Escaneo de Vencimientos',
+                'verbose_name_plural': 'Estados de Escaneo de Vencimientos',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='certification',
+            index=models.Index(fields=['status', 'expiry_date'], name='certificati_status_8a0483_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certification', '0003_expiryscanstate_certification_status_expiry_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificateIssuanceBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('merkle_root', models.CharField(max_length=66, verbose_name='Raíz Merkle')),
+                ('networks', models.JSONField(default=list, verbose_name='Redes')),
+                ('certificate_count', models.PositiveIntegerField(verbose_name='Certificados')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('PARTIAL', 'Emitido en Algunas Redes'), ('ISSUED', 'Emitido')], default='PENDING', max_length=10, verbose_name='Estado')),
+                ('network_results', models.JSONField(default=dict, help_text='Hash de transacción o error de cada red', verbose_name='Resultados por Red')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('issued_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Emisión')),
+            ],
+            options={
+                'verbose_name': 'Lote de Emisión de Certificados',
+                'verbose_name_plural': 'Lotes de Emisión de Certificados',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status'], name='certificati_status_4b55db_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='certification',
+            name='issuance_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='certifications', to='certification.certificateissuancebatch', verbose_name='Lote de Emisión'),
+        ),
+        migrations.AddField(
+            model_name='certification',
+            name='issuance_proof',
+            field=models.JSONField(blank=True, default=list, verbose_name='Prueba Merkle'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certification', '0004_certificateissuancebatch_certification_issuance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certification',
+            name='scope_metadata',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Resumen del Alcance'),
+        ),
+    ]
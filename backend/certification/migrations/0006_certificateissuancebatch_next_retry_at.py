@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:00
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def schedule_unfinished_batches(apps, schema_editor):
+    # Los lotes sin terminar se reintentan en la próxima corrida
+    CertificateIssuanceBatch = apps.get_model('certification', 'CertificateIssuanceBatch')
+    CertificateIssuanceBatch.objects.exclude(status='ISSUED').update(next_retry_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certification', '0005_certification_scope_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificateissuancebatch',
+            name='next_retry_at',
+            field=models.DateTimeField(blank=True, help_text='Cuándo vuelve a intentarse alguna red pendiente; vacío si no queda ninguna', null=True, verbose_name='Próximo Reintento'),
+        ),
+        migrations.AlterField(
+            model_name='certificateissuancebatch',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pendiente'), ('PARTIAL', 'Emitido en Algunas Redes'), ('ISSUED', 'Emitido'), ('FAILED', 'Fallido')], default='PENDING', max_length=10, verbose_name='Estado'),
+        ),
+        migrations.AddIndex(
+            model_name='certificateissuancebatch',
+            index=models.Index(fields=['next_retry_at'], name='cert_batch_retry_idx'),
+        ),
+        migrations.RunPython(schedule_unfinished_batches, migrations.RunPython.noop),
+    ]
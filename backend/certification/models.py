@@ -337,6 +337,9 @@ class Certification(models.Model):
         verbose_name="Lotes Certificados"
     )
     
+    # Resumen de animales y lotes cubiertos (ver ``certification.metadata``)
+    scope_metadata = models.JSONField(default=dict, blank=True, verbose_name="Resumen del Alcance")
+    
     # INFORMACIÓN DE LA CERTIFICACIÓN (TUS CAMPOS EXISTENTES)
     certificate_number = models.CharField(
         max_length=100, 
@@ -415,6 +418,16 @@ class Certification(models.Model):
         blank=True,
         verbose_name="Datos Multichain"
     )
+    # Emisión por lotes (ver ``certification.issuance``): lote y prueba Merkle
+    issuance_batch = models.ForeignKey(
+        'CertificateIssuanceBatch',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='certifications',
+        verbose_name="Lote de Emisión"
+    )
+    issuance_proof = models.JSONField(default=list, blank=True, verbose_name="Prueba Merkle")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -427,6 +440,7 @@ class Certification(models.Model):
             models.Index(fields=['certified_entity', 'status']),
             models.Index(fields=['standard', 'grade']),
             models.Index(fields=['expiry_date']),
+            models.Index(fields=['status', 'expiry_date']),
             models.Index(fields=['status']),
             models.Index(fields=['scope_type']),
             models.Index(fields=['blockchain_certificate']),
@@ -472,17 +486,26 @@ class Certification(models.Model):
         
         super().save(*args, **kwargs)
     
-    def generate_certificate_number(self):
-        """Generar número de certificado único"""
-        timestamp = timezone.now().strftime("%Y%m%d")
+    def certificate_number_scope(self, today=None):
+        """Ámbito de la secuencia: código del organismo y día de emisión"""
+        today = today or timezone.localdate()
         body_code = self.standard.certification_body.accreditation_number[:4].upper()
-        entity_id = str(self.certified_entity.id).zfill(6)[-4:]
-        sequential = Certification.objects.filter(
-            standard__certification_body=self.standard.certification_body,
-            created_at__date=timezone.now().date()
-        ).count() + 1
+        return f"{body_code}-{today.strftime('%Y%m%d')}"
+    
+    def generate_certificate_number(self, sequential=None, today=None):
+        """Generar número de certificado único
+        
+        El consecutivo sale de ``CertificateSequence`` (ver ``certification.numbering``);
+        la emisión masiva reserva rangos con ``assign_certificate_numbers``.
+        """
+        from .numbering import allocate
         
-        return f"CERT-{body_code}-{timestamp}-{entity_id}-{sequential:03d}"
+        scope = self.certificate_number_scope(today)
+        entity_id = str(self.certified_entity_id).zfill(6)[-4:]
+        if sequential is None:
+            sequential = allocate(scope)[0]
+        
+        return f"CERT-{scope}-{entity_id}-{sequential:03d}"
     
     @property
     def is_valid(self):
@@ -522,6 +545,13 @@ class Certification(models.Model):
             }
         return None
     
+    def update_scope_metadata(self):
+        """Recalcular ya el resumen del alcance (los signals lo hacen al confirmar)"""
+        from .metadata import recompute
+        
+        recompute([self.pk])
+        self.refresh_from_db(fields=['scope_metadata'])
+    
     # ✅ USAR TU ADAPTER EXISTENTE EN LUGAR DEL MIXIN
     @property
     def multichain_adapter(self):
@@ -552,6 +582,73 @@ class Certification(models.Model):
         except Exception as e:
             return {'verified': False, 'error': str(e)}
 
+class CertificateSequence(models.Model):
+    """Contador de números de certificado por ámbito (organismo y día)"""
+    scope = models.CharField(max_length=100, unique=True, verbose_name="Ámbito")
+    last_value = models.PositiveBigIntegerField(default=0, verbose_name="Último Valor")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Secuencia de Certificados"
+        verbose_name_plural = "Secuencias de Certificados"
+
+    def __str__(self):
+        return f"{self.scope}: {self.last_value}"
+
+class ExpiryScanState(models.Model):
+    """Marca del último escaneo de vencimientos (ver ``certification.expiry``)"""
+    name = models.CharField(max_length=50, unique=True, verbose_name="Nombre")
+    watermark = models.DateField(null=True, blank=True, verbose_name="Escaneado Hasta")
+    last_run_at = models.DateTimeField(null=True, blank=True, verbose_name="Última Corrida")
+    last_certification_count = models.PositiveIntegerField(default=0, verbose_name="Certificaciones")
+    last_digest_count = models.PositiveIntegerField(default=0, verbose_name="Resúmenes Enviados")
+
+    class Meta:
+        verbose_name = "Estado de Escaneo de Vencimientos"
+        verbose_name_plural = "Estados de Escaneo de Vencimientos"
+
+    def __str__(self):
+        return f"{self.name}: {self.watermark}"
+
+class CertificateIssuanceBatch(models.Model):
+    """Lote de certificados comprometido con una raíz Merkle por red"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendiente'),
+        ('PARTIAL', 'Emitido en Algunas Redes'),
+        ('ISSUED', 'Emitido'),
+        ('FAILED', 'Fallido'),
+    ]
+    
+    merkle_root = models.CharField(max_length=66, verbose_name="Raíz Merkle")
+    networks = models.JSONField(default=list, verbose_name="Redes")
+    certificate_count = models.PositiveIntegerField(verbose_name="Certificados")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', verbose_name="Estado")
+    network_results = models.JSONField(
+        default=dict,
+        verbose_name="Resultados por Red",
+        help_text="Hash de transacción o error de cada red"
+    )
+    next_retry_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Próximo Reintento",
+        help_text="Cuándo vuelve a intentarse alguna red pendiente; vacío si no queda ninguna"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    issued_at = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de Emisión")
+
+    class Meta:
+        verbose_name = "Lote de Emisión de Certificados"
+        verbose_name_plural = "Lotes de Emisión de Certificados"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status']),
+            models.Index(fields=['next_retry_at'], name='cert_batch_retry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Lote {self.id} ({self.certificate_count} certificados) - {self.status}"
+
 class CertificationAuditTrail(models.Model):
     """Auditoría de cambios en certificaciones - MANTENIENDO TU ESTRUCTURA EXISTENTE"""
     certification = models.ForeignKey(Certification, on_delete=models.CASCADE, related_name='audit_trail')
@@ -0,0 +1,95 @@
+# backend/certification/numbering.py
+"""
+Asignación de números de certificado sin carreras.
+
+Cada ámbito (organismo y día) tiene una fila en ``CertificateSequence``. Una
+reserva incrementa el contador con un UPDATE y lee el nuevo valor dentro de
+la misma transacción: el UPDATE toma el bloqueo de fila (PostgreSQL/MySQL) o
+el de escritura de la base (SQLite) antes de leer, así que dos emisiones
+concurrentes nunca ven el mismo valor. Son dos consultas por reserva, sin
+importar cuántos certificados existan, y una reserva de ``count`` números
+devuelve el rango completo de una vez. La asignación en bloque crea antes,
+con un solo INSERT que ignora conflictos, las filas de los ámbitos nuevos y
+reserva todos los rangos en una transacción.
+
+SQLite no tiene bloqueo de fila y, con caché compartida, las escrituras
+concurrentes fallan en lugar de esperar; por eso las reservas dentro del
+proceso se serializan con un lock.
+"""
+import threading
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CertificateSequence
+
+_sqlite_lock = threading.Lock()
+
+
+def _reserve(scope, count):
+    with transaction.atomic():
+        updated = CertificateSequence.objects.filter(scope=scope).update(last_value=F('last_value') + count)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    CertificateSequence.objects.create(scope=scope, last_value=count)
+                return range(1, count + 1)
+            except IntegrityError:
+                # Otra emisión creó la fila primero
+                CertificateSequence.objects.filter(scope=scope).update(last_value=F('last_value') + count)
+        last = CertificateSequence.objects.filter(scope=scope).values_list('last_value', flat=True).get()
+    return range(last - count + 1, last + 1)
+
+
+def _reserve_many(counts):
+    with transaction.atomic():
+        CertificateSequence.objects.bulk_create(
+            [CertificateSequence(scope=scope, last_value=0) for scope in counts], ignore_conflicts=True
+        )
+        ranges = {}
+        # Orden fijo de bloqueo entre emisiones concurrentes
+        for scope in sorted(counts):
+            count = counts[scope]
+            CertificateSequence.objects.filter(scope=scope).update(last_value=F('last_value') + count)
+            last = CertificateSequence.objects.filter(scope=scope).values_list('last_value', flat=True).get()
+            ranges[scope] = range(last - count + 1, last + 1)
+    return ranges
+
+
+def allocate(scope, count=1):
+    """Reservar ``count`` consecutivos del ámbito; devuelve el ``range`` reservado."""
+    if count < 1:
+        raise ValueError('count debe ser positivo')
+    if connection.vendor == 'sqlite':
+        with _sqlite_lock:
+            return _reserve(scope, count)
+    return _reserve(scope, count)
+
+
+def assign_certificate_numbers(certifications, today=None):
+    """Asignar número a las certificaciones que no lo tienen, un rango por ámbito.
+
+    Las certificaciones deben tener ``standard`` (con su organismo) y
+    ``certified_entity``; no se guardan aquí.
+    """
+    today = today or timezone.localdate()
+    by_scope = defaultdict(list)
+    for certification in certifications:
+        if not certification.certificate_number:
+            by_scope[certification.certificate_number_scope(today)].append(certification)
+
+    if not by_scope:
+        return certifications
+    counts = {scope: len(pending) for scope, pending in by_scope.items()}
+    if connection.vendor == 'sqlite':
+        with _sqlite_lock:
+            ranges = _reserve_many(counts)
+    else:
+        ranges = _reserve_many(counts)
+
+    for scope, pending in by_scope.items():
+        for certification, sequential in zip(pending, ranges[scope]):
+            certification.certificate_number = certification.generate_certificate_number(sequential, today)
+    return certifications
@@ -38,6 +38,9 @@ class CertificationSerializer(serializers.ModelSerializer):
         ]
     
     def get_animals_count(self, obj):
+        # El resumen del alcance evita un COUNT por fila; las anteriores a él cuentan en vivo
+        if 'total_animals' in obj.scope_metadata:
+            return obj.scope_metadata['total_animals']
         return obj.animals.count()
     
     def get_is_valid(self, obj):
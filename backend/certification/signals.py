@@ -54,15 +54,15 @@ def validate_certification_changes(sender, instance, **kwargs):
 def handle_certification_approval(sender, instance, created, **kwargs):
     """Manejar aprobación de certificaciones"""
     if not created and instance.status == 'APPROVED':
+        from .issuance import schedule_issuance
         from .tasks import (
-            issue_blockchain_certificate, 
             send_certification_approval_notification,
             update_entity_reputation
         )
         
-        # Emitir certificado en blockchain si está habilitado
-        if instance.blockchain_certificate:
-            issue_blockchain_certificate.delay(instance.id)
+        # Emitir en blockchain por lotes: una emisión por transacción, no por certificado
+        if not instance.blockchain_certificate and instance.issuance_batch_id is None:
+            schedule_issuance()
         
         # Enviar notificaciones
         send_certification_approval_notification.delay(instance.id)
@@ -71,17 +71,17 @@ def handle_certification_approval(sender, instance, created, **kwargs):
         update_entity_reputation.delay(instance.certified_entity.id, 'CERTIFICATION_APPROVED')
 
 @receiver(m2m_changed, sender=Certification.animals.through)
-def update_animal_certification_status(sender, instance, action, **kwargs):
-    """Actualizar estado de certificación de animales cuando se modifican relaciones"""
-    if action in ['post_add', 'post_remove', 'post_clear']:
-        if instance.scope_type == 'ANIMAL':
-            # Actualizar metadatos de certificación para animales
-            instance.update_animal_certification_metadata()
-
 @receiver(m2m_changed, sender=Certification.batches.through)
-def update_batch_certification_status(sender, instance, action, **kwargs):
-    """Actualizar estado de certificación de lotes cuando se modifican relaciones"""
-    if action in ['post_add', 'post_remove', 'post_clear']:
-        if instance.scope_type == 'BATCH':
-            # Actualizar metadatos de certificación para lotes
-            instance.update_batch_certification_metadata()
\ No newline at end of file
+def update_certification_scope_metadata(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """Anotar las certificaciones cuyo alcance cambió; se recalculan una vez al confirmar"""
+    from .metadata import mark_dirty
+    
+    if not reverse:
+        if action in ['post_add', 'post_remove', 'post_clear']:
+            mark_dirty([instance.pk], using)
+    elif action == 'pre_clear':
+        # Después del clear ya no se sabe qué certificaciones tenía el animal o lote
+        related = instance.certification_certifications if sender is Certification.animals.through else instance.certifications
+        mark_dirty(related.values_list('pk', flat=True), using)
+    elif action in ['post_add', 'post_remove']:
+        mark_dirty(pk_set, using)
@@ -1,55 +1,31 @@
 # backend/certification/tasks.py
-from celery import shared_task
-from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 import logging
 from .models import Certification, GlobalCertificationBody
 
+try:
+    from celery import shared_task
+except ImportError:
+    # Sin Celery las tareas corren en el proceso cuando la transacción confirma
+    def shared_task(func):
+        func.delay = lambda *args, **kwargs: transaction.on_commit(lambda: func(*args, **kwargs))
+        return func
+
 logger = logging.getLogger(__name__)
 
 @shared_task
-def issue_blockchain_certificate(certification_id):
-    """Emitir certificado en blockchain"""
+def issue_pending_certificates():
+    """Emitir en cadena, por lotes, las certificaciones aprobadas pendientes"""
+    from .issuance import issue_pending
+    
     try:
-        certification = Certification.objects.get(id=certification_id)
-        
-        if not certification.blockchain_certificate:
-            # Lógica para emitir en blockchain
-            from core.multichain.manager import multichain_manager
-            
-            # Preparar datos del certificado
-            certificate_data = {
-                'certificate_number': certification.certificate_number,
-                'entity_id': certification.certified_entity.id,
-                'standard_code': certification.standard.full_code,
-                'issue_date': certification.issue_date.isoformat(),
-                'expiry_date': certification.expiry_date.isoformat(),
-                'grade': certification.final_grade,
-                'score': str(certification.audit_score),
-                'auditor_id': certification.auditor.id if certification.auditor else None,
-            }
-            
-            # Emitir en la red preferida del organismo
-            certification_body = certification.standard.certification_body
-            preferred_network = certification_body.preferred_networks.first()
-            
-            if preferred_network:
-                result = multichain_manager.issue_certificate(
-                    network_id=preferred_network.network_id,
-                    certificate_data=certificate_data,
-                    issuer_address=certification_body.admin_user.wallet_address
-                )
-                
-                if result['success']:
-                    certification.blockchain_certificate = True
-                    certification.save()
-                    logger.info(f"Blockchain certificate issued for {certification.certificate_number}")
-                else:
-                    logger.error(f"Failed to issue blockchain certificate: {result['error']}")
-        
+        batches = issue_pending()
+        logger.info(f"{len(batches)} lotes de certificados procesados")
+        return [batch.id for batch in batches]
     except Exception as e:
-        logger.error(f"Error issuing blockchain certificate: {str(e)}")
+        logger.error(f"Error issuing blockchain certificates: {str(e)}")
 
 @shared_task
 def send_certification_approval_notification(certification_id):
@@ -83,46 +59,13 @@ def send_certification_approval_notification(certification_id):
 
 @shared_task
 def check_expiring_certifications():
-    """Verificar certificaciones próximas a expirar"""
+    """Expirar lo vencido y enviar un resumen por destinatario de lo que está por vencer"""
+    from .expiry import expire_overdue, scan_expiring
+    
     try:
-        warning_date = timezone.now().date() + timezone.timedelta(days=30)
-        expiring_certifications = Certification.objects.filter(
-            expiry_date__lte=warning_date,
-            status='APPROVED'
-        )
-        
-        for certification in expiring_certifications:
-            send_certification_expiry_warning.delay(certification.id)
-            
+        expired = expire_overdue()
+        certifications, digests = scan_expiring()
+        logger.info(f"{expired} certificaciones expiradas, {certifications} por vencer en {digests} resúmenes")
+        return certifications, digests
     except Exception as e:
         logger.error(f"Error checking expiring certifications: {str(e)}")
-
-@shared_task
-def send_certification_expiry_warning(certification_id):
-    """Enviar advertencia de expiración de certificación"""
-    try:
-        certification = Certification.objects.get(id=certification_id)
-        days_until_expiry = certification.days_until_expiry
-        
-        subject = f"Certificación Próxima a Expirar - {certification.certificate_number}"
-        message = f"""
-        Su certificación expirará en {days_until_expiry} días.
-        
-        Detalles:
-        - Certificado: {certification.certificate_number}
-        - Estándar: {certification.standard.name}
-        - Fecha de expiración: {certification.expiry_date}
-        
-        Por favor, inicie el proceso de renovación.
-        """
-        
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [certification.certified_entity.email],
-            fail_silently=False,
-        )
-        
-    except Exception as e:
-        logger.error(f"Error sending certification expiry warning: {str(e)}")
\ No newline at end of file
@@ -1,3 +1,380 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+import threading
+from datetime import date, timedelta
+from unittest import mock
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from cattle.models import Animal, Batch
+from users.models import User
+from . import metadata
+from .expiry import ConsoleDigestBackend, FileDigestBackend, expire_overdue, scan_expiring
+from .issuance import issue_pending, schedule_issuance, verify_certification
+from .models import Certification, CertificationStandard, GlobalCertificationBody
+from .numbering import allocate, assign_certificate_numbers
+
+
+def unsaved_certification(entity_id, accreditation_number='ACCR-TEST-001'):
+    body = GlobalCertificationBody(accreditation_number=accreditation_number)
+    return Certification(standard=CertificationStandard(certification_body=body), certified_entity_id=entity_id)
+
+
+class CertificateNumberTests(TestCase):
+    def test_allocation_is_constant_query_count(self):
+        allocate('ACCR-20261019')
+        with CaptureQueriesContext(connection) as queries:
+            numbers = allocate('ACCR-20261019', 50)
+        self.assertEqual(list(numbers), list(range(2, 52)))
+        self.assertLessEqual(len(queries), 4)
+
+    def test_bulk_assignment_reserves_one_range_per_scope(self):
+        certifications = [unsaved_certification(entity_id) for entity_id in range(1, 6)]
+        certifications.append(unsaved_certification(9, accreditation_number='OTRO-002'))
+
+        with CaptureQueriesContext(connection) as queries:
+            assign_certificate_numbers(certifications, today=date(2026, 10, 19))
+
+        self.assertEqual(certifications[0].certificate_number, 'CERT-ACCR-20261019-0001-001')
+        self.assertEqual(certifications[4].certificate_number, 'CERT-ACCR-20261019-0005-005')
+        self.assertEqual(certifications[5].certificate_number, 'CERT-OTRO-20261019-0009-001')
+        self.assertLessEqual(len(queries), 8)
+
+
+class ConcurrentCertificateNumberTests(TransactionTestCase):
+    def test_concurrent_issuance_never_repeats_numbers(self):
+        issued = []
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(25):
+                    issued.extend(allocate('ACCR-20261019'))
+                issued.extend(allocate('ACCR-20261019', 10))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(issued), list(range(1, 8 * 35 + 1)))
+
+
+class ExpiryScanTests(TestCase):
+    def setUp(self):
+        self.today = date(2026, 10, 19)
+        self.auditor = User.objects.create_user(
+            username='certbody', email='body@example.com', password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.owners = [
+            User.objects.create_user(
+                username=f'rancher{index}', email=f'rancher{index}@example.com', password='testpass123',
+                wallet_address='0x%040x' % (index + 900)
+            )
+            for index in range(3)
+        ]
+        body = GlobalCertificationBody.objects.create(
+            admin_user=self.auditor, name='Orgánicos del Sur', acronym='OS', description='Organismo de prueba',
+            certification_type='ORGANIC', country='Bolivia', accreditation_number='ACCR-OS-001'
+        )
+        self.standard = CertificationStandard.objects.create(
+            certification_body=body, name='Orgánico Básico', code='ORG-1', description='Estándar de prueba',
+            grading_system='LETTER'
+        )
+        self.sequence = 0
+
+    def certify(self, owner, expires_in, status='APPROVED'):
+        self.sequence += 1
+        return Certification(
+            certified_entity=owner, standard=self.standard, grade='A', status=status,
+            certificate_number=f'CERT-TEST-{self.sequence:04d}',
+            issue_date=self.today - timedelta(days=300), expiry_date=self.today + timedelta(days=expires_in)
+        )
+
+    def test_digests_group_per_recipient_and_runs_are_incremental(self):
+        Certification.objects.bulk_create(
+            [self.certify(self.owners[0], days) for days in (3, 10, 25)] +
+            [self.certify(self.owners[1], 20), self.certify(self.owners[2], 45),
+             self.certify(self.owners[2], 5, status='DRAFT')]
+        )
+        stream = io.StringIO()
+
+        with CaptureQueriesContext(connection) as queries:
+            certifications, digests = scan_expiring(today=self.today, backend=ConsoleDigestBackend(stream))
+
+        self.assertEqual((certifications, digests), (4, 3))
+        self.assertLessEqual(len(queries), 8)
+        self.assertIn('Para: rancher0@example.com (3 certificaciones)', stream.getvalue())
+        self.assertIn('Para: body@example.com (4 certificaciones)', stream.getvalue())
+
+        # Al día siguiente solo entra lo que cruzó el borde de la ventana
+        self.assertEqual(scan_expiring(today=self.today + timedelta(days=15), backend=ConsoleDigestBackend(stream)), (1, 2))
+        self.assertEqual(scan_expiring(today=self.today + timedelta(days=15), backend=ConsoleDigestBackend(stream)), (0, 0))
+
+    def test_file_backend_and_overdue_expiry(self):
+        Certification.objects.bulk_create([
+            self.certify(self.owners[0], -2), self.certify(self.owners[1], 7)
+        ])
+        self.assertEqual(expire_overdue(self.today), 1)
+
+        with tempfile.NamedTemporaryFile('r', suffix='.jsonl') as handle:
+            scan_expiring(today=self.today, backend=FileDigestBackend(handle.name))
+            lines = [json.loads(line) for line in handle.read().splitlines()]
+
+        self.assertEqual(sorted(line['recipient'] for line in lines), ['body@example.com', 'rancher1@example.com'])
+        self.assertEqual(lines[0]['items'][0]['days_left'], 7)
+
+
+class FakeBatchPublisher:
+    def __init__(self, barrier=None, fail=False):
+        self.barrier = barrier
+        self.fail = fail
+        self.commits = []
+
+    def commit_batch(self, batch_id, root, size):
+        if self.barrier is not None:
+            # Solo pasa si la otra red está publicando al mismo tiempo
+            self.barrier.wait()
+        if self.fail:
+            raise ConnectionError('RPC no disponible')
+        self.commits.append((batch_id, root, size))
+        return '0x' + ('%064x' % (len(self.commits) + batch_id))
+
+
+REGISTRIES = {'POLYGON': '0x' + '11' * 20, 'STARKNET': '0x' + '22' * 32}
+
+
+@override_settings(CERTIFICATION_REGISTRY_ADDRESSES=REGISTRIES)
+class BulkIssuanceTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user(
+            username='issuer', email='issuer@example.com', password='testpass123',
+            wallet_address='0x%040x' % 950
+        )
+        self.owners = [
+            User.objects.create_user(
+                username=f'herd{index}', email=f'herd{index}@example.com', password='testpass123',
+                wallet_address='0x%040x' % (index + 951)
+            )
+            for index in range(2)
+        ]
+        body = GlobalCertificationBody.objects.create(
+            admin_user=admin, name='Bienestar Andino', acronym='BA', description='Organismo de prueba',
+            certification_type='ANIMAL_WELFARE', country='Perú', accreditation_number='ACCR-BA-001'
+        )
+        self.standard = CertificationStandard.objects.create(
+            certification_body=body, name='Bienestar Básico', code='BIE-1', description='Estándar de prueba',
+            grading_system='LETTER'
+        )
+        self.sequence = 0
+
+    def certify(self, count, status='APPROVED'):
+        today = date(2026, 10, 19)
+        certifications = []
+        for _ in range(count):
+            self.sequence += 1
+            certifications.append(Certification(
+                certified_entity=self.owners[self.sequence % 2], standard=self.standard, grade='A', status=status,
+                certificate_number=f'CERT-BA-{self.sequence:04d}',
+                issue_date=today, expiry_date=today + timedelta(days=365)
+            ))
+        Certification.objects.bulk_create(certifications)
+
+    def test_batch_is_one_parallel_commit_per_network(self):
+        self.certify(6)
+        self.certify(1, status='DRAFT')
+        barrier = threading.Barrier(2, timeout=5)
+        publishers = {'POLYGON': FakeBatchPublisher(barrier), 'STARKNET': FakeBatchPublisher(barrier)}
+
+        batches = issue_pending(publishers)
+
+        self.assertEqual(len(batches), 1)
+        batch = batches[0]
+        self.assertEqual((batch.status, batch.certificate_count), ('ISSUED', 6))
+        for publisher in publishers.values():
+            self.assertEqual(publisher.commits, [(batch.id, batch.merkle_root, 6)])
+        issued = Certification.objects.select_related('issuance_batch', 'certified_entity', 'standard').filter(
+            blockchain_certificate=True)
+        self.assertEqual(issued.count(), 6)
+        self.assertTrue(all(verify_certification(certification) for certification in issued))
+        self.assertEqual(issue_pending(publishers), [])
+
+    def test_issuance_queries_do_not_grow_with_batch_size(self):
+        publishers = {'POLYGON': FakeBatchPublisher(), 'STARKNET': FakeBatchPublisher()}
+        self.certify(3)
+        with CaptureQueriesContext(connection) as few:
+            issue_pending(publishers)
+        self.certify(40)
+        with CaptureQueriesContext(connection) as many:
+            issue_pending(publishers)
+        self.assertEqual(len(few), len(many))
+
+    def test_failed_network_is_retried_without_republishing(self):
+        self.certify(4)
+        polygon = FakeBatchPublisher()
+
+        batch = issue_pending({'POLYGON': polygon, 'STARKNET': FakeBatchPublisher(fail=True)})[0]
+        self.assertEqual(batch.status, 'PARTIAL')
+        self.assertIn('error', batch.network_results['STARKNET'])
+        self.assertEqual(Certification.objects.filter(blockchain_certificate=True).count(), 4)
+
+        # Hasta que pase la espera, otra aprobación no vuelve a publicar el lote
+        self.assertEqual(issue_pending({'POLYGON': polygon, 'STARKNET': FakeBatchPublisher()}), [])
+
+        later = timezone.now() + timedelta(minutes=2)
+        with mock.patch('certification.issuance.timezone.now', return_value=later):
+            batch = issue_pending({'POLYGON': polygon, 'STARKNET': FakeBatchPublisher()})[0]
+        self.assertEqual(batch.status, 'ISSUED')
+        self.assertIsNone(batch.next_retry_at)
+        self.assertEqual(len(polygon.commits), 1)
+        self.assertIn('transaction_hash', batch.network_results['STARKNET'])
+
+    @override_settings(CERTIFICATION_ISSUANCE_RETRY_DELAY=0, CERTIFICATION_ISSUANCE_MAX_ATTEMPTS=2)
+    def test_network_is_abandoned_after_max_attempts(self):
+        self.certify(2)
+        publishers = {'POLYGON': FakeBatchPublisher(fail=True), 'STARKNET': FakeBatchPublisher(fail=True)}
+
+        self.assertEqual(issue_pending(publishers)[0].status, 'PENDING')
+        batch = issue_pending(publishers)[0]
+
+        self.assertEqual(batch.status, 'FAILED')
+        self.assertIsNone(batch.next_retry_at)
+        self.assertEqual(batch.network_results['POLYGON']['attempts'], 2)
+        self.assertEqual(issue_pending(publishers), [])
+
+    @override_settings(CERTIFICATION_REGISTRY_ADDRESSES={'POLYGON': REGISTRIES['POLYGON'], 'STARKNET': None})
+    def test_networks_without_registry_are_left_out(self):
+        self.certify(3)
+        polygon = FakeBatchPublisher()
+
+        batch, = issue_pending({'POLYGON': polygon})
+
+        self.assertEqual((batch.networks, batch.status), (['POLYGON'], 'ISSUED'))
+        self.assertEqual(len(polygon.commits), 1)
+
+    @override_settings(CERTIFICATION_ISSUANCE_BATCH_SIZE=2)
+    def test_pending_beyond_one_batch_are_all_issued(self):
+        self.certify(5)
+        publishers = {'POLYGON': FakeBatchPublisher(), 'STARKNET': FakeBatchPublisher()}
+
+        batches = issue_pending(publishers)
+
+        self.assertEqual([batch.certificate_count for batch in batches], [2, 2, 1])
+        self.assertFalse(Certification.objects.filter(blockchain_certificate=False, status='APPROVED').exists())
+
+    def test_approval_starts_the_issuer_instead_of_issuing_inline(self):
+        with mock.patch('certification.issuance.issuer') as issuer, \
+                mock.patch('certification.issuance.issue_pending') as issue:
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_issuance()
+        issuer.ensure.assert_called_once_with()
+        issue.assert_not_called()
+
+    def test_issuance_is_scheduled_once_per_transaction(self):
+        with mock.patch('certification.issuance._enqueue_issuance') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(3):
+                    schedule_issuance()
+            self.assertEqual(enqueue.call_count, 1)
+
+            # Un savepoint deshecho no se lleva la emisión de lo que sí se confirma
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_issuance()
+                try:
+                    with transaction.atomic():
+                        schedule_issuance()
+                        raise ValueError
+                except ValueError:
+                    pass
+            self.assertEqual(enqueue.call_count, 2)
+
+
+class ScopeMetadataTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(
+            username='scopeowner', email='scope@example.com', password='testpass123',
+            wallet_address='0x%040x' % 960
+        )
+        body = GlobalCertificationBody.objects.create(
+            admin_user=owner, name='Trazabilidad Total', acronym='TT', description='Organismo de prueba',
+            certification_type='ORIGIN', country='Chile', accreditation_number='ACCR-TT-001'
+        )
+        standard = CertificationStandard.objects.create(
+            certification_body=body, name='Origen', code='ORI-1', description='Estándar de prueba',
+            grading_system='LETTER'
+        )
+        self.certifications = Certification.objects.bulk_create([
+            Certification(
+                certified_entity=owner, standard=standard, grade='A', scope_type='ANIMAL',
+                certificate_number=f'CERT-TT-{index}', issue_date=date(2026, 1, 1), expiry_date=date(2027, 1, 1)
+            )
+            for index in range(2)
+        ])
+        self.animals = Animal.objects.bulk_create([
+            Animal(
+                ear_tag=f'SCOPE{index:03d}', breed='Angus' if index % 2 else 'Brahman', birth_date='2024-01-01',
+                weight=300 + index, health_status='HEALTHY', owner=owner, location='Potrero 1'
+            )
+            for index in range(20)
+        ])
+        self.batch = Batch.objects.create(
+            name='Lote 1', origin='Potrero 1', destination='Frigorífico', created_by=owner
+        )
+
+    def test_adds_in_one_transaction_recompute_once(self):
+        certification = self.certifications[0]
+        with mock.patch.object(metadata, 'recompute', wraps=metadata.recompute) as recompute:
+            with self.captureOnCommitCallbacks(execute=True):
+                for animal in self.animals:
+                    certification.animals.add(animal)
+                certification.batches.add(self.batch)
+
+        self.assertEqual(recompute.call_count, 1)
+        certification.refresh_from_db()
+        self.assertEqual(certification.scope_metadata['total_animals'], 20)
+        self.assertEqual(certification.scope_metadata['total_batches'], 1)
+        self.assertEqual(certification.scope_metadata['breeds'], ['Angus', 'Brahman'])
+        self.assertEqual(certification.scope_metadata['average_weight'], 309.5)
+
+    def test_reverse_changes_mark_every_certification(self):
+        animal = self.animals[0]
+        with mock.patch.object(metadata, 'recompute', wraps=metadata.recompute) as recompute:
+            with self.captureOnCommitCallbacks(execute=True):
+                animal.certification_certifications.add(*self.certifications)
+            with self.captureOnCommitCallbacks(execute=True):
+                animal.certification_certifications.clear()
+
+        self.assertEqual(recompute.call_count, 2)
+        self.assertEqual(sorted(recompute.call_args_list[0].args[0]), [c.pk for c in self.certifications])
+        self.assertEqual(
+            [c.scope_metadata['total_animals'] for c in Certification.objects.order_by('pk')], [0, 0]
+        )
+
+    def test_rolled_back_changes_do_not_block_later_recompute(self):
+        certification = self.certifications[0]
+        with mock.patch.object(metadata, 'recompute', wraps=metadata.recompute) as recompute:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        certification.animals.add(self.animals[0])
+                        raise ValueError
+                except ValueError:
+                    pass
+                certification.animals.add(self.animals[1])
+
+        recompute.assert_called_once()
+        self.assertEqual(recompute.call_args.args[0], {certification.pk})
+        certification.refresh_from_db()
+        self.assertEqual(certification.scope_metadata['total_animals'], 1)
 
-# Create your tests here.
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from .issuance import verify_certification
 from .models import GlobalCertificationBody, Certification, CertificationStandard
 from .serializers import (
     GlobalCertificationBodySerializer,
@@ -37,16 +38,29 @@ class CertificationViewSet(viewsets.ModelViewSet):
         """Verificación en blockchain - MUY IMPRESIONANTE"""
         certification = self.get_object()
         
-        # Simular verificación multichain
+        batch = certification.issuance_batch
+        if batch is None:
+            return Response({
+                'certificate_number': certification.certificate_number,
+                'blockchain_verified': False,
+                'reason': 'La certificación aún no fue emitida en blockchain'
+            })
+        
+        # La prueba Merkle enlaza el certificado con la raíz comprometida en cada red
+        confirmed = {
+            network: result['transaction_hash']
+            for network, result in batch.network_results.items()
+            if result.get('transaction_hash')
+        }
         verification_result = {
             'certificate_number': certification.certificate_number,
-            'blockchain_verified': True,
-            'networks_verified': ['STARKNET_SEPOLIA', 'POLYGON_AMOY'],
-            'verification_date': '2024-09-15T10:30:00Z',
-            'transaction_hashes': [
-                '0x1234567890abcdef...',
-                '0xfedcba0987654321...'
-            ]
+            'blockchain_verified': bool(confirmed) and verify_certification(certification),
+            'batch_id': batch.id,
+            'merkle_root': batch.merkle_root,
+            'merkle_proof': certification.issuance_proof,
+            'networks_verified': list(confirmed),
+            'verification_date': batch.issued_at,
+            'transaction_hashes': list(confirmed.values())
         }
         
         return Response(verification_result)
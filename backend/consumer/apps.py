@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ConsumerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'consumer'
+
+    def ready(self):
+        # Invalidar la caché pública de verificación al cambiar el contenido de un animal
+        from consumer.cache import connect_version_signals
+        connect_version_signals()
+
+        # Olvidar cuotas cacheadas al cambiar de nivel o de suscripción
+        from consumer.quota import connect_quota_signals
+        connect_quota_signals()
+
+        # Rematerializar los payloads por nivel de QRCodeAccess al cambiar sus orígenes
+        from consumer.materializer import connect_materializer_signals
+        connect_materializer_signals()
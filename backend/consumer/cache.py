@@ -0,0 +1,263 @@
+# backend/consumer/cache.py
+"""
+Caché de respuestas públicas por (animal, versión de contenido).
+
+Cada animal tiene un número de versión en caché que se incrementa con los
+guardados de ``Animal``, ``AnimalHealthRecord``, certificaciones,
+``BlockchainEvent`` y su acumulador de pruebas. Las respuestas se guardan
+bajo la versión vigente, así que invalidar es O(1): las entradas antiguas
+simplemente dejan de leerse y expiran solas. Un escaneo repetido resuelve
+versión y respuesta en caché sin tocar la base de datos.
+
+Ajustes:
+    CONSUMER_CACHE_ALIAS   alias de ``CACHES`` a usar ('default')
+    CONSUMER_CACHE_TTL     vida de una respuesta en segundos (300)
+    CONSUMER_CACHE_SWR     ventana stale-while-revalidate en segundos (30)
+
+Con varios procesos, el alias debe apuntar a un backend compartido (los
+ajustes exigen Redis fuera de DEBUG); con LocMemCache cada proceso
+invalida solo su propia copia y el TTL acota lo que otro proceso pueda servir.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'consumer'
+# Basta con que sobreviva a las respuestas; al expirar se re-siembra con la hora
+VERSION_TTL = 86400
+
+
+def _cache():
+    return caches[getattr(settings, 'CONSUMER_CACHE_ALIAS', 'default')]
+
+
+def _ttl():
+    return getattr(settings, 'CONSUMER_CACHE_TTL', 300)
+
+
+def _swr():
+    return getattr(settings, 'CONSUMER_CACHE_SWR', 30)
+
+
+# ==============================================================================
+# VERSIONES
+# ==============================================================================
+
+def _version_key(animal_id):
+    return f'{KEY_PREFIX}:version:{animal_id}'
+
+
+def animal_version(animal_id):
+    """Versión vigente del contenido de un animal.
+
+    Si la clave se perdió (expulsión, reinicio) se siembra con la hora en
+    milisegundos, nunca con un valor ya usado, para no resucitar entradas viejas.
+    """
+    cache = _cache()
+    key = _version_key(animal_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), VERSION_TTL)
+        version = cache.get(key)
+    return version
+
+
+def bump_animal_version(animal_id):
+    """Invalidar las respuestas de un animal cuando se confirme la transacción.
+
+    Antes del commit otra petición podría reconstruir con datos viejos y
+    guardarlos bajo la versión nueva.
+    """
+    if not animal_id:
+        return
+
+    def bump():
+        cache = _cache()
+        key = _version_key(animal_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), VERSION_TTL)
+
+    transaction.on_commit(bump)
+
+
+def remember_alias(kind, value, animal_id):
+    """Recordar a qué animal apunta un token o certificado (evita la consulta)."""
+    _cache().set(f'{KEY_PREFIX}:alias:{kind}:{value}', animal_id, _ttl())
+
+
+def resolve_alias(kind, value):
+    return _cache().get(f'{KEY_PREFIX}:alias:{kind}:{value}')
+
+
+def _value_key(namespace, animal_id, variant):
+    return f'{KEY_PREFIX}:value:{namespace}:{animal_id}:{variant}:{animal_version(animal_id)}'
+
+
+def cached_animal_value(namespace, animal_id, variant=''):
+    """Valor derivado de un animal guardado bajo su versión vigente (o None)."""
+    return _cache().get(_value_key(namespace, animal_id, variant))
+
+
+def store_animal_value(namespace, animal_id, variant, value):
+    _cache().set(_value_key(namespace, animal_id, variant), value, _ttl())
+
+
+def clear_animal_value(namespace, animal_id, variant=''):
+    _cache().delete(_value_key(namespace, animal_id, variant))
+
+
+# ==============================================================================
+# RESPUESTAS
+# ==============================================================================
+
+def _etag(namespace, animal_id, variant, version, body):
+    digest = hashlib.sha1(f'{namespace}:{animal_id}:{variant}:{version}:{body}'.encode()).hexdigest()
+    # Débil: los campos por petición (fecha de verificación) no alteran el contenido
+    return f'W/{quote_etag(digest)}'
+
+
+def _spawn(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+
+
+def _not_modified(request, etag):
+    candidates = [value.strip() for value in request.headers.get('If-None-Match', '').split(',')]
+    return etag in candidates or '*' in candidates
+
+
+def _respond(request, entry, finalize, stale=False):
+    if _not_modified(request, entry['etag']):
+        response = Response(status=304)
+    else:
+        data = json.loads(entry['body'])
+        response = Response(finalize(data) if finalize else data)
+
+    response['ETag'] = entry['etag']
+    response['Cache-Control'] = f'public, max-age={_ttl()}, stale-while-revalidate={_swr()}'
+    response['X-Cache'] = 'STALE' if stale else 'HIT'
+    return response
+
+
+def uncached(response):
+    """Marcar una respuesta 200 que no debe guardarse (p. ej. 'no encontrado')."""
+    response.consumer_cacheable = False
+    return response
+
+
+def _cacheable(response):
+    return response.status_code == 200 and getattr(response, 'consumer_cacheable', True)
+
+
+def _store(namespace, animal_id, variant, version, data):
+    body = json.dumps(data, cls=DjangoJSONEncoder)
+    entry = {'body': body, 'etag': _etag(namespace, animal_id, variant, version, body),
+             'version': version, 'stored_at': time.time()}
+    cache = _cache()
+    cache.set(f'{KEY_PREFIX}:response:{namespace}:{animal_id}:{variant}:{version}', entry, _ttl())
+    # Última respuesta conocida, para servirla mientras se revalida
+    cache.set(f'{KEY_PREFIX}:latest:{namespace}:{animal_id}:{variant}', entry, _ttl() + _swr())
+    return entry
+
+
+def cached_animal_response(request, namespace, animal_id, build, variant='', finalize=None):
+    """Servir ``build()`` cacheado por la versión del animal.
+
+    ``build`` devuelve un ``Response``; solo se guardan los 200 no marcados
+    con ``uncached``. ``finalize``
+    recibe una copia de los datos en cada petición para añadir campos
+    volátiles (fechas de verificación) sin invalidar la entrada.
+    """
+    cache = _cache()
+    version = animal_version(animal_id)
+    entry = cache.get(f'{KEY_PREFIX}:response:{namespace}:{animal_id}:{variant}:{version}')
+    if entry is not None:
+        return _respond(request, entry, finalize)
+
+    latest = cache.get(f'{KEY_PREFIX}:latest:{namespace}:{animal_id}:{variant}')
+    if latest is not None and time.time() - latest['stored_at'] < _ttl() + _swr():
+        lock_key = f'{KEY_PREFIX}:revalidating:{namespace}:{animal_id}:{variant}:{version}'
+        if cache.add(lock_key, True, _swr()):
+            def revalidate():
+                try:
+                    response = build()
+                    if _cacheable(response):
+                        _store(namespace, animal_id, variant, version, response.data)
+                except Exception as e:
+                    logger.error(f"Error revalidando caché de consumidor {namespace}:{animal_id}: {str(e)}")
+                finally:
+                    connections.close_all()
+            _spawn(revalidate)
+        return _respond(request, latest, finalize, stale=True)
+
+    response = build()
+    if not _cacheable(response):
+        return response
+    entry = _store(namespace, animal_id, variant, version, response.data)
+    fresh = _respond(request, entry, finalize)
+    fresh['X-Cache'] = 'MISS'
+    return fresh
+
+
+# ==============================================================================
+# SEÑALES
+# ==============================================================================
+
+def _bump_from_animal(sender, instance, **kwargs):
+    bump_animal_version(instance.pk)
+
+
+def _bump_from_related(sender, instance, **kwargs):
+    bump_animal_version(getattr(instance, 'animal_id', None))
+
+
+def _bump_from_certification(sender, instance, **kwargs):
+    if instance.pk:
+        for animal_id in instance.animals.values_list('pk', flat=True):
+            bump_animal_version(animal_id)
+
+
+def _bump_from_certification_animals(sender, instance, action, pk_set, model, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if model._meta.label == 'cattle.Animal':
+        animal_ids = pk_set or instance.animals.values_list('pk', flat=True)
+        for animal_id in animal_ids:
+            bump_animal_version(animal_id)
+    else:
+        bump_animal_version(instance.pk)
+
+
+def connect_version_signals():
+    from blockchain.models import AnimalProofLog, BlockchainEvent
+    from cattle.blockchain_models import AnimalCertification
+    from cattle.models import Animal, AnimalHealthRecord
+    from certification.models import Certification
+
+    for signal in (post_save, post_delete):
+        signal.connect(_bump_from_animal, sender=Animal, dispatch_uid=f'consumer_version_animal_{id(signal)}')
+        for model in (AnimalHealthRecord, AnimalCertification, BlockchainEvent, AnimalProofLog):
+            signal.connect(
+                _bump_from_related, sender=model,
+                dispatch_uid=f'consumer_version_{model._meta.label_lower}_{id(signal)}'
+            )
+    post_save.connect(_bump_from_certification, sender=Certification, dispatch_uid='consumer_version_certification')
+    pre_delete.connect(_bump_from_certification, sender=Certification, dispatch_uid='consumer_version_certification_delete')
+    m2m_changed.connect(
+        _bump_from_certification_animals, sender=Certification.animals.through,
+        dispatch_uid='consumer_version_certification_animals'
+    )
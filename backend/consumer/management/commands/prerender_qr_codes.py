@@ -0,0 +1,58 @@
+# consumer/management/commands/prerender_qr_codes.py
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cattle.models import Animal
+from consumer.qr_assets import QROptions, prerender, qr_payload, verification_base_url
+
+
+class Command(BaseCommand):
+    help = 'Pre-renderiza los códigos QR de un lote (o de todos los animales) como activos estáticos'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--batch', type=int, help='ID del lote a pre-renderizar')
+        target.add_argument('--all', action='store_true', help='Todos los animales')
+        parser.add_argument('--size', type=int, default=QROptions.size, help='Tamaño de módulo en píxeles')
+        parser.add_argument('--format', nargs='+', default=[QROptions.format], help='png y/o svg')
+        parser.add_argument('--ec', default=QROptions.error_correction, help='Corrección de errores: L, M, Q o H')
+        parser.add_argument('--workers', type=int, default=None, help='Procesos de render (por defecto, CPUs)')
+        parser.add_argument('--base-url', default=None, help='Base de la URL de verificación impresa en el QR')
+
+    def handle(self, *args, **options):
+        try:
+            variants = [
+                QROptions.from_params({'size': options['size'], 'qr_format': format, 'ec': options['ec']})
+                for format in options['format']
+            ]
+            base_url = options['base_url'] or verification_base_url()
+        except ValueError as e:
+            raise CommandError(str(e))
+        base_url = base_url.rstrip('/') + '/'
+
+        animals = Animal.objects.all()
+        if options['batch']:
+            animals = animals.filter(batches__id=options['batch'])
+        rows = animals.order_by('id').values_list('id', 'ear_tag', 'token_id', 'breed')
+
+        # Las cargas se calculan aquí; los procesos solo renderizan y escriben
+        jobs = [
+            (qr_payload(animal_id, ear_tag, token_id, breed, base_url), variant)
+            for animal_id, ear_tag, token_id, breed in rows.iterator()
+            for variant in variants
+        ]
+        if not jobs:
+            self.stdout.write('No hay animales que pre-renderizar')
+            return
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            results = list(executor.map(prerender, jobs, chunksize=64))
+        elapsed = time.perf_counter() - started
+
+        created = sum(1 for _, was_created in results if was_created)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(results)} QR listos ({created} nuevos, {len(results) - created} ya existían) en {elapsed:.2f}s'
+        ))
@@ -0,0 +1,453 @@
+# backend/consumer/materializer.py
+"""
+Materialización de los datos por nivel de ``QRCodeAccess``.
+
+Los tres niveles (público, premium, experto) se guardan ya serializados en
+la fila del QR junto con un hash corto, de modo que servir un nivel es leer
+una columna de una fila y enviar los bytes tal cual.
+
+Cada payload se compone de secciones derivadas de los registros de origen
+(animal, salud, genética, certificaciones, blockchain) y de los campos
+editoriales ``public_data``/``premium_data``/``expert_data``, que se aplican
+encima. Las secciones se guardan en ``materialized_sections``: un cambio en
+un registro de salud solo recalcula la sección de salud y re-serializa.
+
+Los cambios se marcan al confirmar la transacción y se agrupan por animal;
+una ráfaga de ediciones produce una sola reconstrucción cuando pasan
+``QR_MATERIALIZE_DEBOUNCE`` segundos sin cambios (o 10 veces ese tiempo desde
+la primera edición). ``None`` desactiva el hilo; ``run_pending()`` procesa a
+demanda.
+
+La marca en memoria se persiste también en ``materialize_pending`` y cada
+fila guarda cuándo vence la primera certificación incluida
+(``materialized_expires_at``). ``reconcile()`` reconstruye ambas cosas: lo
+que un proceso marcó y no llegó a procesar, y lo que venció sin que nada
+cambiara. El hilo la ejecuta al arrancar y cada
+``QR_MATERIALIZE_RECONCILE_INTERVAL`` segundos (300); además, al servir un
+nivel ya vencido se recalculan sus certificaciones antes de responder.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.background import PeriodicThread
+
+from .models import QRCodeAccess
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ('public', 'premium', 'expert')
+SECTIONS = ('animal', 'health', 'genetics', 'certifications', 'blockchain')
+HEALTH_HISTORY_LIMIT = 50
+EVENT_HISTORY_LIMIT = 50
+
+
+def tier_level(tier_name):
+    """Nivel de payload para un ``ConsumerTier.name`` (anónimo o BASIC: público)."""
+    if tier_name in ('EXPERT', 'ENTERPRISE'):
+        return 'expert'
+    if tier_name == 'PREMIUM':
+        return 'premium'
+    return 'public'
+
+
+def serialize(data):
+    body = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), sort_keys=True, ensure_ascii=False).encode()
+    return body, hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+# ==============================================================================
+# SECCIONES (cada una devuelve {'public': {...}, 'premium': {...}, 'expert': {...}})
+# ==============================================================================
+
+def _animal_section(animal_id, access):
+    from cattle.models import Animal
+
+    animal = Animal.objects.filter(pk=animal_id).values(
+        'ear_tag', 'breed', 'birth_date', 'weight', 'health_status', 'location',
+        'token_id', 'mint_transaction_hash', 'ipfs_hash', 'current_batch__name', 'current_batch__origin'
+    ).first() or {}
+    return {
+        'public': {
+            'ear_tag': animal.get('ear_tag'),
+            'breed': animal.get('breed'),
+            'birth_date': animal.get('birth_date'),
+            'health_status': animal.get('health_status'),
+            'blockchain_verified': bool(animal.get('token_id') and animal.get('mint_transaction_hash')),
+        },
+        'premium': {
+            'weight': animal.get('weight'),
+            'location': animal.get('location'),
+            'batch': animal.get('current_batch__name'),
+            'origin': animal.get('current_batch__origin'),
+        },
+        'expert': {
+            'token_id': animal.get('token_id'),
+            'mint_transaction_hash': animal.get('mint_transaction_hash'),
+            'ipfs_hash': animal.get('ipfs_hash'),
+        },
+    }
+
+
+def _health_section(animal_id, access):
+    from cattle.models import AnimalHealthRecord
+
+    records = list(AnimalHealthRecord.objects.filter(animal_id=animal_id).order_by('-created_at').values(
+        'health_status', 'source', 'temperature', 'heart_rate', 'notes', 'transaction_hash', 'created_at'
+    )[:HEALTH_HISTORY_LIMIT])
+    last = records[0] if records else None
+    return {
+        'public': {},
+        'premium': {
+            'last_health_check': {
+                'health_status': last['health_status'],
+                'temperature': last['temperature'],
+                'date': last['created_at'],
+            } if last else None,
+            'health_records_count': AnimalHealthRecord.objects.filter(animal_id=animal_id).count(),
+        },
+        'expert': {'health_history': records},
+    }
+
+
+def _genetics_section(animal_id, access):
+    from cattle.models import AnimalGeneticProfile
+
+    profile = AnimalGeneticProfile.objects.filter(animal_id=animal_id).values(
+        'genetic_marker', 'breed_composition', 'parent_male__ear_tag', 'parent_female__ear_tag',
+        'genetic_defects', 'ipfs_hash', 'blockchain_hash'
+    ).first()
+    if profile is None:
+        return {'public': {}, 'premium': {}, 'expert': {'genetics': None}}
+    return {
+        'public': {},
+        'premium': {'breed_composition': profile['breed_composition']},
+        'expert': {
+            'genetics': {
+                'genetic_marker': profile['genetic_marker'],
+                'sire': profile['parent_male__ear_tag'],
+                'dam': profile['parent_female__ear_tag'],
+                'genetic_defects': profile['genetic_defects'],
+                'ipfs_hash': profile['ipfs_hash'],
+                'blockchain_hash': profile['blockchain_hash'],
+            }
+        },
+    }
+
+
+def _certifications_section(animal_id, access):
+    from cattle.blockchain_models import AnimalCertification
+
+    now = timezone.now()
+    animal_certs = list(AnimalCertification.objects.filter(
+        animal_id=animal_id, revoked=False, expiration_date__gte=now
+    ).values('standard__name', 'standard__issuing_authority', 'certification_date', 'expiration_date', 'blockchain_hash'))
+    linked = list(access.certifications.values(
+        'certificate_number', 'standard__name', 'grade', 'score', 'status', 'issue_date', 'expiry_date'
+    ))
+    return {
+        # No es un nivel: vencimiento de la primera certificación incluida
+        'expires_at': min((cert['expiration_date'] for cert in animal_certs), default=None),
+        'public': {
+            'certifications': sorted({cert['standard__name'] for cert in animal_certs} | {cert['standard__name'] for cert in linked}),
+        },
+        'premium': {
+            'certification_details': [
+                {
+                    'standard': cert['standard__name'],
+                    'authority': cert['standard__issuing_authority'],
+                    'valid_until': cert['expiration_date'],
+                } for cert in animal_certs
+            ] + [
+                {
+                    'standard': cert['standard__name'],
+                    'certificate_number': cert['certificate_number'],
+                    'grade': cert['grade'],
+                    'status': cert['status'],
+                    'valid_until': cert['expiry_date'],
+                } for cert in linked
+            ],
+        },
+        'expert': {
+            'certification_evidence': [
+                {'standard': cert['standard__name'], 'blockchain_hash': cert['blockchain_hash'],
+                 'certified_at': cert['certification_date']}
+                for cert in animal_certs
+            ] + [
+                {'certificate_number': cert['certificate_number'], 'score': cert['score'], 'issued_at': cert['issue_date']}
+                for cert in linked
+            ],
+        },
+    }
+
+
+def _blockchain_section(animal_id, access):
+    from blockchain.models import AnimalProofLog, BlockchainEvent
+
+    events = list(BlockchainEvent.objects.filter(animal_id=animal_id).order_by('-created_at').values(
+        'event_type', 'transaction_hash', 'block_number', 'created_at'
+    )[:EVENT_HISTORY_LIMIT])
+    proof = AnimalProofLog.objects.filter(animal_id=animal_id).values('leaf_count', 'root', 'signature').first()
+    return {
+        'public': {},
+        'premium': {'blockchain_events_count': BlockchainEvent.objects.filter(animal_id=animal_id).count()},
+        'expert': {
+            'blockchain_events': events,
+            'merkle_root': proof['root'] if proof else None,
+            'merkle_size': proof['leaf_count'] if proof else 0,
+            'merkle_signature': proof['signature'] if proof else None,
+        },
+    }
+
+
+BUILDERS = {
+    'animal': _animal_section,
+    'health': _health_section,
+    'genetics': _genetics_section,
+    'certifications': _certifications_section,
+    'blockchain': _blockchain_section,
+}
+# Secciones que dependen solo del animal: se calculan una vez para todos sus QR
+ANIMAL_SECTIONS = ('animal', 'health', 'genetics', 'blockchain')
+
+
+def compose(access, sections):
+    """Payloads acumulativos por nivel a partir de secciones y campos editoriales."""
+    payloads = {}
+    base = {'qr_code': access.qr_code, 'cut_of_meat': access.cut_of_meat}
+    overrides = {'public': access.public_data, 'premium': access.premium_data, 'expert': access.expert_data}
+    for level in LEVELS:
+        for section in SECTIONS:
+            base.update(sections.get(section, {}).get(level, {}))
+        base.update(overrides[level] or {})
+        payloads[level] = dict(base, tier=level)
+    return payloads
+
+
+def materialize(animal_id, sections=SECTIONS):
+    """Recalcular ``sections`` para todos los QR del animal; devuelve cuántos cambiaron."""
+    accesses = list(QRCodeAccess.objects.filter(animal_id=animal_id))
+    if not accesses:
+        return 0
+
+    shared = {section: BUILDERS[section](animal_id, None) for section in sections if section in ANIMAL_SECTIONS}
+    changed = 0
+    for access in accesses:
+        stored = dict(access.materialized_sections or {})
+        stored.update(shared)
+        if 'certifications' in sections:
+            stored['certifications'] = _certifications_section(animal_id, access)
+        # Secciones nunca calculadas (QR recién creado)
+        for section in SECTIONS:
+            if section not in stored:
+                stored[section] = BUILDERS[section](animal_id, access)
+        stored = json.loads(json.dumps(stored, cls=DjangoJSONEncoder))
+
+        expires_at = stored['certifications'].get('expires_at')
+        updates = {
+            'materialized_sections': stored,
+            'materialized_at': timezone.now(),
+            'materialized_expires_at': parse_datetime(expires_at) if expires_at else None,
+            'materialize_pending': False,
+        }
+        payload_changed = False
+        for level, payload in compose(access, stored).items():
+            body, digest = serialize(payload)
+            if digest != getattr(access, f'{level}_hash'):
+                updates[f'{level}_payload'] = body
+                updates[f'{level}_hash'] = digest
+                payload_changed = True
+        if payload_changed:
+            changed += 1
+        elif (stored == access.materialized_sections and not access.materialize_pending
+              and updates['materialized_expires_at'] == access.materialized_expires_at):
+            # Nada que escribir: mismos payloads, mismas secciones y sin marca pendiente
+            continue
+        # update(): no dispara señales ni vuelve a marcar el animal
+        QRCodeAccess.objects.filter(pk=access.pk).update(**updates)
+    return changed
+
+
+# ==============================================================================
+# REBOTE (DEBOUNCE)
+# ==============================================================================
+
+class Materializer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_reconcile = None
+        # Revisa los pendientes dos veces por ventana de rebote; sin rebote no hay hilo
+        self._worker = PeriodicThread(
+            'qr-materializer', self._tick, lambda: self._debounce() and max(self._debounce(), 0.1) / 2,
+            error='Error en el materializador de QR', run_at_start=True,
+        )
+
+    def _debounce(self):
+        return getattr(settings, 'QR_MATERIALIZE_DEBOUNCE', 2)
+
+    def mark(self, animal_id, *sections):
+        """Marcar secciones de un animal como pendientes (tras el commit).
+
+        Sin secciones solo se re-serializan los payloads (cambio editorial).
+        """
+        if not animal_id:
+            return
+
+        def record():
+            now = time.monotonic()
+            with self._lock:
+                new = animal_id not in self._pending
+                entry = self._pending.setdefault(animal_id, {'sections': set(), 'first': now, 'last': now})
+                entry['sections'].update(sections)
+                entry['last'] = now
+            if new:
+                # Sobrevive a un reinicio del proceso: reconcile() la recoge
+                QRCodeAccess.objects.filter(animal_id=animal_id, materialize_pending=False).update(
+                    materialize_pending=True
+                )
+            self._worker.ensure()
+
+        transaction.on_commit(record)
+
+    def pending(self):
+        with self._lock:
+            return {animal_id: set(entry['sections']) for animal_id, entry in self._pending.items()}
+
+    def run_pending(self, force=True):
+        """Reconstruir lo pendiente; sin ``force`` solo lo que ya está en calma."""
+        debounce = self._debounce() or 0
+        now = time.monotonic()
+        with self._lock:
+            ready = {
+                animal_id: entry['sections'] for animal_id, entry in self._pending.items()
+                if force or now - entry['last'] >= debounce or now - entry['first'] >= debounce * 10
+            }
+            for animal_id in ready:
+                del self._pending[animal_id]
+
+        rebuilt = 0
+        for animal_id, sections in ready.items():
+            try:
+                materialize(animal_id, tuple(section for section in SECTIONS if section in sections))
+                rebuilt += 1
+            except Exception as e:
+                logger.error(f"Error materializando QR del animal {animal_id}: {str(e)}")
+        return rebuilt
+
+    def reconcile(self):
+        """Reconstruir QR con marcas persistidas o certificaciones vencidas."""
+        animal_ids = set(QRCodeAccess.objects.filter(
+            Q(materialize_pending=True) | Q(materialized_expires_at__lte=timezone.now())
+        ).values_list('animal_id', flat=True))
+
+        rebuilt = 0
+        for animal_id in animal_ids:
+            try:
+                materialize(animal_id)
+                rebuilt += 1
+            except Exception as e:
+                logger.error(f"Error materializando QR del animal {animal_id}: {str(e)}")
+        return rebuilt
+
+    def _tick(self):
+        interval = getattr(settings, 'QR_MATERIALIZE_RECONCILE_INTERVAL', 300)
+        if interval and (self._last_reconcile is None or time.monotonic() - self._last_reconcile >= interval):
+            self._last_reconcile = time.monotonic()
+            self.reconcile()
+        self.run_pending(force=False)
+
+
+materializer = Materializer()
+
+
+def tier_payload(qr_code, level):
+    """``(bytes, hash)`` de un nivel: lectura de una columna de una fila."""
+    materializer._worker.ensure()
+    row = QRCodeAccess.objects.filter(qr_code=qr_code).values_list(
+        'pk', 'animal_id', f'{level}_payload', f'{level}_hash', 'materialized_expires_at'
+    ).first()
+    if row is None:
+        return None, None
+    _, animal_id, body, digest, expires_at = row
+    expired = expires_at is not None and expires_at <= timezone.now()
+    if not digest or expired:
+        # Nunca materializado (p. ej. creado antes de este servicio) o con una certificación vencida
+        materialize(animal_id, ('certifications',) if digest else SECTIONS)
+        body, digest = QRCodeAccess.objects.filter(qr_code=qr_code).values_list(
+            f'{level}_payload', f'{level}_hash'
+        ).first()
+    return bytes(body), digest
+
+
+# ==============================================================================
+# SEÑALES
+# ==============================================================================
+
+def _section_marker(*sections):
+    def handler(sender, instance, **kwargs):
+        materializer.mark(getattr(instance, 'animal_id', None), *sections)
+    return handler
+
+
+_on_health = _section_marker('health')
+_on_genetics = _section_marker('genetics')
+_on_animal_certification = _section_marker('certifications')
+_on_event = _section_marker('blockchain')
+
+
+def _on_animal_saved(sender, instance, **kwargs):
+    materializer.mark(instance.pk, 'animal', 'blockchain')
+
+
+def _on_access_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Alta o cambio editorial: basta con re-serializar (las secciones ausentes se calculan)
+    materializer.mark(instance.animal_id, *(SECTIONS if created else ()))
+
+
+def _on_access_certifications(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        materializer.mark(instance.animal_id, 'certifications')
+
+
+def _on_certification(sender, instance, **kwargs):
+    if instance.pk:
+        for animal_id in instance.animals.values_list('pk', flat=True):
+            materializer.mark(animal_id, 'certifications')
+        for animal_id in QRCodeAccess.objects.filter(certifications=instance).values_list('animal_id', flat=True):
+            materializer.mark(animal_id, 'certifications')
+
+
+def connect_materializer_signals():
+    from blockchain.models import AnimalProofLog, BlockchainEvent
+    from cattle.blockchain_models import AnimalCertification
+    from cattle.models import Animal, AnimalGeneticProfile, AnimalHealthRecord
+    from certification.models import Certification
+
+    handlers = (
+        (AnimalHealthRecord, _on_health),
+        (AnimalGeneticProfile, _on_genetics),
+        (AnimalCertification, _on_animal_certification),
+        (BlockchainEvent, _on_event),
+        (AnimalProofLog, _on_event),
+    )
+    for signal in (post_save, post_delete):
+        signal.connect(_on_animal_saved, sender=Animal, dispatch_uid=f'qr_materialize_animal_{id(signal)}')
+        for model, handler in handlers:
+            signal.connect(handler, sender=model, dispatch_uid=f'qr_materialize_{model._meta.label_lower}_{id(signal)}')
+    post_save.connect(_on_access_saved, sender=QRCodeAccess, dispatch_uid='qr_materialize_access')
+    post_save.connect(_on_certification, sender=Certification, dispatch_uid='qr_materialize_certification')
+    m2m_changed.connect(
+        _on_access_certifications, sender=QRCodeAccess.certifications.through,
+        dispatch_uid='qr_materialize_access_certifications'
+    )
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='materialized_sections',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Secciones Materializadas'),
+        ),
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='public_payload',
+            field=models.BinaryField(default=b'', verbose_name='Payload Público'),
+        ),
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='public_hash',
+            field=models.CharField(blank=True, max_length=16, verbose_name='Hash Público'),
+        ),
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='premium_payload',
+            field=models.BinaryField(default=b'', verbose_name='Payload Premium'),
+        ),
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='premium_hash',
+            field=models.CharField(blank=True, max_length=16, verbose_name='Hash Premium'),
+        ),
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='expert_payload',
+            field=models.BinaryField(default=b'', verbose_name='Payload Experto'),
+        ),
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='expert_hash',
+            field=models.CharField(blank=True, max_length=16, verbose_name='Hash Experto'),
+        ),
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='materialized_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Materializado'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumer', '0002_qrcodeaccess_materialized_payloads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='materialized_expires_at',
+            field=models.DateTimeField(blank=True, help_text='Primera certificación incluida que vence; a partir de entonces se recalcula', null=True, verbose_name='Vencimiento Materializado'),
+        ),
+        migrations.AddField(
+            model_name='qrcodeaccess',
+            name='materialize_pending',
+            field=models.BooleanField(default=False, verbose_name='Materialización Pendiente'),
+        ),
+        migrations.AddIndex(
+            model_name='qrcodeaccess',
+            index=models.Index(fields=['materialize_pending'], name='consumer_qr_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='qrcodeaccess',
+            index=models.Index(fields=['materialized_expires_at'], name='consumer_qr_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:10
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_reservations(apps, schema_editor):
+    """Lo ya consumido este mes cuenta como reservado."""
+    ConsumerProfile = apps.get_model('consumer', 'ConsumerProfile')
+    now = timezone.localtime(timezone.now())
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    ConsumerProfile.objects.filter(last_query_date__gte=start).update(
+        quota_reserved=models.F('queries_this_month'), quota_reserved_month=start.date()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumer', '0003_qrcodeaccess_materialize_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumerprofile',
+            name='quota_reserved',
+            field=models.IntegerField(default=0, verbose_name='Consultas Reservadas del Mes'),
+        ),
+        migrations.AddField(
+            model_name='consumerprofile',
+            name='quota_reserved_month',
+            field=models.DateField(blank=True, null=True, verbose_name='Mes de la Reserva'),
+        ),
+        migrations.RunPython(seed_reservations, migrations.RunPython.noop),
+    ]
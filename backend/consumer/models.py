@@ -1,4 +1,6 @@
 # backend/consumer/models.py
+import json
+
 from django.db import models
 from core.multichain.manager import multichain_manager
 
@@ -68,6 +70,10 @@ class ConsumerProfile(models.Model):
     queries_this_month = models.IntegerField(default=0, verbose_name="Consultas Este Mes")
     last_query_date = models.DateTimeField(null=True, blank=True, verbose_name="Última Consulta")
     
+    # Bloques de cuota mensual reservados por los procesos (consumer/quota.py)
+    quota_reserved = models.IntegerField(default=0, verbose_name="Consultas Reservadas del Mes")
+    quota_reserved_month = models.DateField(null=True, blank=True, verbose_name="Mes de la Reserva")
+    
     # Suscripción
     subscription_active = models.BooleanField(default=False, verbose_name="Suscripción Activa")
     subscription_start_date = models.DateTimeField(null=True, blank=True, verbose_name="Inicio de Suscripción")
@@ -133,6 +139,21 @@ class QRCodeAccess(models.Model):
     ipfs_hash = models.CharField(max_length=255, blank=True, verbose_name="Hash IPFS")
     blockchain_verified = models.BooleanField(default=False, verbose_name="Verificado en Blockchain")
     
+    # Payloads por nivel ya serializados (los mantiene consumer.materializer)
+    materialized_sections = models.JSONField(default=dict, blank=True, verbose_name="Secciones Materializadas")
+    public_payload = models.BinaryField(default=b'', verbose_name="Payload Público")
+    public_hash = models.CharField(max_length=16, blank=True, verbose_name="Hash Público")
+    premium_payload = models.BinaryField(default=b'', verbose_name="Payload Premium")
+    premium_hash = models.CharField(max_length=16, blank=True, verbose_name="Hash Premium")
+    expert_payload = models.BinaryField(default=b'', verbose_name="Payload Experto")
+    expert_hash = models.CharField(max_length=16, blank=True, verbose_name="Hash Experto")
+    materialized_at = models.DateTimeField(null=True, blank=True, verbose_name="Materializado")
+    materialized_expires_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Vencimiento Materializado",
+        help_text="Primera certificación incluida que vence; a partir de entonces se recalcula"
+    )
+    materialize_pending = models.BooleanField(default=False, verbose_name="Materialización Pendiente")
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -142,6 +163,8 @@ class QRCodeAccess(models.Model):
         indexes = [
             models.Index(fields=['qr_code']),
             models.Index(fields=['animal']),
+            models.Index(fields=['materialize_pending'], name='consumer_qr_pending_idx'),
+            models.Index(fields=['materialized_expires_at'], name='consumer_qr_expires_idx'),
         ]
 
     def __str__(self):
@@ -149,6 +172,11 @@ class QRCodeAccess(models.Model):
     
     def get_data_for_tier(self, tier_name):
         """Obtener datos según el nivel del consumidor"""
+        from .materializer import tier_level
+        payload = getattr(self, f'{tier_level(tier_name)}_payload')
+        if payload:
+            return json.loads(bytes(payload))
+        
         if tier_name == 'EXPERT':
             return {**self.public_data, **self.premium_data, **self.expert_data}
         elif tier_name == 'PREMIUM':
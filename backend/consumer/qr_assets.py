@@ -0,0 +1,159 @@
+# backend/consumer/qr_assets.py
+"""
+Servicio de activos QR direccionados por contenido.
+
+Un QR depende solo de su contenido (datos públicos del animal + URL de
+verificación) y de las opciones de render (tamaño, formato, corrección de
+errores). El nombre del archivo es el hash de todo ello, así que cada
+combinación se renderiza una sola vez y el archivo es inmutable: se sirve en
+``qr/assets/<hash>.<formato>`` con ``Cache-Control: immutable`` y sin tocar
+la base de datos. Un servidor web puede servir esa ruta desde
+``QR_ASSETS_DIR/<hash[:2]>/<hash>.<formato>`` sin pasar por Django.
+La URL por animal (``animal/<id>/qr/``) cambia de destino cuando cambian los
+datos del animal: redirige al archivo con vida corta y ETag.
+
+Ajustes:
+    QR_ASSETS_DIR              directorio de archivos (MEDIA_ROOT/qr)
+    QR_VERIFICATION_BASE_URL   base de la URL de verificación impresa en el QR
+                               (por defecto, la del host de la petición)
+    QR_CACHE_MAX_AGE           max-age en segundos de la URL por animal (60)
+    QR_ASSET_MAX_AGE           max-age en segundos de los archivos por hash (un año)
+"""
+import hashlib
+import io
+import json
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+ERROR_CORRECTION_LEVELS = ('L', 'M', 'Q', 'H')
+DIGEST_LENGTH = 40
+MIN_BOX_SIZE, MAX_BOX_SIZE = 1, 40
+
+
+@dataclass(frozen=True)
+class QROptions:
+    """Opciones de render de un QR."""
+    size: int = 10
+    format: str = 'png'
+    error_correction: str = 'L'
+
+    @classmethod
+    def from_params(cls, params):
+        """Construir desde parámetros de consulta; lanza ValueError si son inválidos.
+
+        El formato llega en ``qr_format``: DRF reserva ``format`` para elegir renderer.
+        """
+        try:
+            size = int(params.get('size', cls.size))
+        except (TypeError, ValueError):
+            raise ValueError('size debe ser un entero')
+        format = str(params.get('qr_format', cls.format)).lower()
+        error_correction = str(params.get('ec', cls.error_correction)).upper()
+
+        if not MIN_BOX_SIZE <= size <= MAX_BOX_SIZE:
+            raise ValueError(f'size debe estar entre {MIN_BOX_SIZE} y {MAX_BOX_SIZE}')
+        if format not in FORMATS:
+            raise ValueError(f"Formato no soportado: {format}")
+        if error_correction not in ERROR_CORRECTION_LEVELS:
+            raise ValueError(f"Nivel de corrección no soportado: {error_correction}")
+        return cls(size=size, format=format, error_correction=error_correction)
+
+    @property
+    def content_type(self):
+        return FORMATS[self.format]
+
+
+def verification_base_url(request=None):
+    base_url = getattr(settings, 'QR_VERIFICATION_BASE_URL', None)
+    if base_url:
+        return base_url.rstrip('/') + '/'
+    if request is not None:
+        return request.build_absolute_uri('/')
+    raise ValueError('Defina QR_VERIFICATION_BASE_URL o indique --base-url')
+
+
+def qr_payload(animal_id, ear_tag, token_id, breed, base_url):
+    """Contenido codificado en el QR (mismo formato que la versión histórica)."""
+    return json.dumps({
+        'type': 'GANADOCHAIN_ANIMAL',
+        'animal_id': animal_id,
+        'ear_tag': ear_tag,
+        'token_id': token_id,
+        'breed': breed,
+        'verification_url': f"{base_url}api/consumer/verify/?qr=GANADOCHAIN_ANIMAL_{animal_id}"
+    })
+
+
+def content_hash(payload, options):
+    material = f'{payload}|{options.size}|{options.format}|{options.error_correction}'
+    return hashlib.sha256(material.encode()).hexdigest()[:DIGEST_LENGTH]
+
+
+def is_digest(value):
+    return len(value) == DIGEST_LENGTH and all(char in '0123456789abcdef' for char in value)
+
+
+def assets_dir():
+    return Path(getattr(settings, 'QR_ASSETS_DIR', Path(settings.MEDIA_ROOT) / 'qr'))
+
+
+def asset_path(digest, options):
+    return assets_dir() / digest[:2] / f'{digest}.{options.format}'
+
+
+def render(payload, options):
+    """Renderizar el QR a bytes (PNG con Pillow o SVG vectorial)."""
+    import qrcode
+    import qrcode.image.svg
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=getattr(qrcode.constants, f'ERROR_CORRECT_{options.error_correction}'),
+        box_size=options.size,
+        border=4,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    buffer = io.BytesIO()
+    if options.format == 'svg':
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def ensure_asset(payload, options):
+    """Devolver ``(hash, ruta)``; renderiza solo si el archivo no existe.
+
+    La escritura es atómica (temporal + ``os.replace``), así que dos
+    renderizados concurrentes del mismo QR producen el mismo archivo final.
+    """
+    digest = content_hash(payload, options)
+    path = asset_path(digest, options)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f'{path.name}.{uuid.uuid4().hex}.tmp')
+        temp_path.write_bytes(render(payload, options))
+        os.replace(temp_path, path)
+    return digest, path
+
+
+def prerender(job):
+    """Unidad de trabajo del pre-render masivo (ejecutable en otro proceso).
+
+    ``job`` es ``(payload, options)``; devuelve ``(hash, creado)``.
+    """
+    payload, options = job
+    digest = content_hash(payload, options)
+    existed = asset_path(digest, options).exists()
+    ensure_asset(payload, options)
+    return digest, not existed
@@ -0,0 +1,333 @@
+# backend/consumer/quota.py
+"""
+Cuotas de consulta por nivel de consumidor sin escrituras por petición.
+
+Cada consumidor tiene dos cubetas:
+
+* ráfaga: cubeta de fichas en memoria del proceso (capacidad y recarga según
+  ``CONSUMER_QUOTA_BURST`` por nivel), debitada bajo un lock;
+* mensual: cada proceso reserva bloques de ``CONSUMER_QUOTA_BLOCK`` consultas
+  en ``ConsumerProfile.quota_reserved`` con un UPDATE condicional (``F()`` y
+  ``WHERE reservado + bloque <= límite``) y los gasta en memoria. El UPDATE es
+  atómico en la base de datos, así que entre todos los procesos nunca se
+  reservan más consultas que ``ConsumerTier.max_queries_per_month``; cuando
+  ya no cabe un bloque entero se reserva de a una.
+
+Solo una de cada ``CONSUMER_QUOTA_BLOCK`` consultas escribe en la base de
+datos. Lo que un proceso reservó y no gastó (reinicio, cambio de mes) se
+pierde: la cuota puede quedarse corta en a lo sumo un bloque por proceso,
+nunca pasarse.
+
+Las consultas admitidas se acumulan en memoria y un hilo las vuelca a
+``ConsumerProfile`` por lotes cada ``CONSUMER_QUOTA_FLUSH_INTERVAL`` segundos
+(un solo UPDATE por lote; ``None`` desactiva el hilo) y una última vez al
+terminar el proceso. Los datos del perfil y del nivel se cachean
+``CONSUMER_QUOTA_PROFILE_TTL`` segundos.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, IntegerField, Q, Value, When
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from core.background import PeriodicThread
+
+from .models import ConsumerProfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BURST = '60/minute'
+DEFAULT_BLOCK = 20
+FLUSH_BATCH_SIZE = 500
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """``'60/minute'`` -> ``(60, 60)``, con la misma notación que DRF."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+def month_start(now=None):
+    now = timezone.localtime(now or timezone.now())
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month_start(now=None):
+    start = month_start(now)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+
+@dataclass
+class QuotaProfile:
+    """Lo necesario para decidir sin consultar la base de datos."""
+    profile_id: int
+    tier: str
+    monthly_limit: int
+    active: bool
+    loaded_at: float
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    remaining: int = 0
+    wait: float = None
+
+
+class QuotaEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self._buckets = {}
+        self._blocks = {}
+        self._pending = {}
+        self._flusher = PeriodicThread(
+            'consumer-quota-flush', self.flush, 'CONSUMER_QUOTA_FLUSH_INTERVAL', default=10,
+            error='Error volcando cuotas de consumidores', run_at_exit=True,
+        )
+
+    # --------------------------------------------------------------------------
+    # Ajustes
+    # --------------------------------------------------------------------------
+
+    def _burst(self, tier):
+        rates = getattr(settings, 'CONSUMER_QUOTA_BURST', {})
+        default = getattr(settings, 'REST_FRAMEWORK', {}).get('DEFAULT_THROTTLE_RATES', {}).get('burst')
+        return parse_rate(rates.get(tier) or default or DEFAULT_BURST)
+
+    # --------------------------------------------------------------------------
+    # Perfiles
+    # --------------------------------------------------------------------------
+
+    def profile(self, user_id):
+        """Perfil de cuota del usuario (None si no es consumidor), cacheado."""
+        ttl = getattr(settings, 'CONSUMER_QUOTA_PROFILE_TTL', 60)
+        with self._lock:
+            cached = self._profiles.get(user_id)
+        if cached is not None and time.monotonic() - cached.loaded_at < ttl:
+            return cached if cached.profile_id else None
+
+        row = ConsumerProfile.objects.filter(user_id=user_id).values(
+            'pk', 'tier__name', 'tier__max_queries_per_month', 'subscription_active'
+        ).first()
+        if row is None:
+            profile = QuotaProfile(0, '', 0, False, time.monotonic())
+        else:
+            profile = QuotaProfile(
+                profile_id=row['pk'],
+                tier=row['tier__name'],
+                monthly_limit=row['tier__max_queries_per_month'],
+                active=row['subscription_active'],
+                loaded_at=time.monotonic(),
+            )
+        with self._lock:
+            self._profiles[user_id] = profile
+        return profile if profile.profile_id else None
+
+    def invalidate(self, user_id=None):
+        """Olvidar perfiles cacheados (cambio de nivel o suscripción)."""
+        with self._lock:
+            if user_id is None:
+                self._profiles.clear()
+            else:
+                self._profiles.pop(user_id, None)
+
+    # --------------------------------------------------------------------------
+    # Débito
+    # --------------------------------------------------------------------------
+
+    def _take_burst(self, profile):
+        """Debitar una ficha de ráfaga; devuelve la espera si no hay."""
+        capacity, duration = self._burst(profile.tier)
+        refill = capacity / duration
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(profile.profile_id, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            if tokens < 1:
+                self._buckets[profile.profile_id] = (tokens, now)
+                return (1 - tokens) / refill
+            self._buckets[profile.profile_id] = (tokens - 1, now)
+        return None
+
+    def _refund_burst(self, profile):
+        capacity, _ = self._burst(profile.tier)
+        with self._lock:
+            tokens, updated = self._buckets[profile.profile_id]
+            self._buckets[profile.profile_id] = (min(capacity, tokens + 1), updated)
+
+    def _reserve(self, profile, month):
+        """Reservar en la base de datos un bloque del mes.
+
+        Devuelve ``(consultas reservadas, total reservado del mes)``.
+        """
+        size = max(1, getattr(settings, 'CONSUMER_QUOTA_BLOCK', DEFAULT_BLOCK))
+        current = Q(quota_reserved_month=month)
+        for amount in sorted({size, 1}, reverse=True):
+            if amount > profile.monthly_limit:
+                continue
+            # Un solo UPDATE condicional: dos procesos no pueden pasarse del límite
+            reserved = ConsumerProfile.objects.filter(
+                Q(current, quota_reserved__lte=profile.monthly_limit - amount) | ~current,
+                pk=profile.profile_id,
+            ).update(
+                quota_reserved=Case(
+                    When(current, then=F('quota_reserved') + amount),
+                    default=Value(amount),
+                    output_field=IntegerField()
+                ),
+                quota_reserved_month=month,
+            )
+            if reserved:
+                total = ConsumerProfile.objects.filter(pk=profile.profile_id).values_list(
+                    'quota_reserved', flat=True
+                ).first()
+                return amount, total
+        return 0, None
+
+    def _take_monthly(self, profile):
+        """Debitar una consulta del mes; devuelve las restantes o None si no hay."""
+        month = month_start().date()
+        with self._lock:
+            block_month, available, reserved = self._blocks.get(profile.profile_id, (month, 0, 0))
+            if block_month == month and available:
+                self._blocks[profile.profile_id] = (month, available - 1, reserved)
+                return max(0, profile.monthly_limit - reserved) + available - 1
+
+        granted, reserved = self._reserve(profile, month)
+        if not granted:
+            return None
+        with self._lock:
+            block_month, available, _ = self._blocks.get(profile.profile_id, (month, 0, 0))
+            available = (available if block_month == month else 0) + granted - 1
+            self._blocks[profile.profile_id] = (month, available, reserved)
+        return max(0, profile.monthly_limit - reserved) + available
+
+    def consume(self, user_id):
+        """Intentar consumir una consulta; solo escribe en la base de datos al reservar un bloque nuevo del mes."""
+        profile = self.profile(user_id)
+        if profile is None:
+            return Decision(True)
+        if not profile.active:
+            return Decision(False)
+
+        wait = self._take_burst(profile)
+        if wait is not None:
+            return Decision(False, wait=wait)
+
+        remaining = self._take_monthly(profile)
+        if remaining is None:
+            self._refund_burst(profile)
+            return Decision(False, wait=(next_month_start() - timezone.now()).total_seconds())
+
+        with self._lock:
+            count, _ = self._pending.get(profile.profile_id, (0, None))
+            self._pending[profile.profile_id] = (count + 1, timezone.now())
+        self._flusher.ensure()
+        return Decision(True, remaining=remaining)
+
+    def remaining(self, user_id):
+        """Consultas del mes aún sin reservar por ningún proceso más las de este."""
+        profile = self.profile(user_id)
+        if profile is None:
+            return None
+        month = month_start().date()
+        reserved = ConsumerProfile.objects.filter(
+            pk=profile.profile_id, quota_reserved_month=month
+        ).values_list('quota_reserved', flat=True).first() or 0
+        with self._lock:
+            block_month, available, _ = self._blocks.get(profile.profile_id, (month, 0, 0))
+        return max(0, profile.monthly_limit - reserved) + (available if block_month == month else 0)
+
+    # --------------------------------------------------------------------------
+    # Volcado
+    # --------------------------------------------------------------------------
+
+    def flush(self):
+        """Volcar las consultas acumuladas a ``ConsumerProfile`` por lotes."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            self._write(pending)
+        except Exception:
+            # Devolver lo no escrito para el próximo intento
+            with self._lock:
+                for profile_id, (count, moment) in pending.items():
+                    newer_count, newer_moment = self._pending.get(profile_id, (0, moment))
+                    self._pending[profile_id] = (count + newer_count, max(moment, newer_moment))
+            raise
+        return sum(count for count, _ in pending.values())
+
+    def _write(self, pending):
+        start = month_start()
+        items = list(pending.items())
+        # Todos los lotes o ninguno: un reintento no cuenta dos veces
+        with transaction.atomic():
+            for offset in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch = items[offset:offset + FLUSH_BATCH_SIZE]
+                delta = Case(
+                    *[When(pk=profile_id, then=Value(count)) for profile_id, (count, _) in batch],
+                    output_field=IntegerField()
+                )
+                last = Case(
+                    *[When(pk=profile_id, then=Value(moment)) for profile_id, (_, moment) in batch],
+                    output_field=DateTimeField()
+                )
+                # Primera consulta del mes: el contador mensual empieza de cero
+                ConsumerProfile.objects.filter(pk__in=[profile_id for profile_id, _ in batch]).update(
+                    total_queries=F('total_queries') + delta,
+                    queries_this_month=Case(
+                        When(last_query_date__gte=start, then=F('queries_this_month') + delta),
+                        default=delta,
+                        output_field=IntegerField()
+                    ),
+                    last_query_date=last,
+                )
+
+
+quota_engine = QuotaEngine()
+
+
+class ConsumerQuotaThrottle(BaseThrottle):
+    """Throttle DRF: ráfaga + cuota mensual del nivel del consumidor.
+
+    Los usuarios anónimos y los que no son consumidores no se limitan aquí.
+    """
+
+    def allow_request(self, request, view):
+        user = getattr(request, 'user', None)
+        if not user or not user.is_authenticated:
+            return True
+        decision = quota_engine.consume(user.pk)
+        self._wait = decision.wait
+        request.quota_remaining = decision.remaining
+        return decision.allowed
+
+    def wait(self):
+        return getattr(self, '_wait', None)
+
+
+def _invalidate_profile(sender, instance, **kwargs):
+    quota_engine.invalidate(instance.user_id)
+
+
+def _invalidate_tier(sender, instance, **kwargs):
+    quota_engine.invalidate()
+
+
+def connect_quota_signals():
+    from django.db.models.signals import post_save
+
+    from .models import ConsumerTier
+
+    post_save.connect(_invalidate_profile, sender=ConsumerProfile, dispatch_uid='consumer_quota_profile')
+    post_save.connect(_invalidate_tier, sender=ConsumerTier, dispatch_uid='consumer_quota_tier')
@@ -22,7 +22,10 @@ class QRCodeAccessSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = QRCodeAccess
-        fields = '__all__'
+        exclude = [
+            'materialized_sections', 'public_payload', 'public_hash', 'premium_payload',
+            'premium_hash', 'expert_payload', 'expert_hash'
+        ]
 
 class ConsumerAccessLogSerializer(serializers.ModelSerializer):
     consumer_username = serializers.CharField(source='consumer.username', read_only=True)
@@ -1,3 +1,464 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blockchain.models import BlockchainEvent
+from cattle.blockchain_models import AnimalCertification, CertificationStandard
+from cattle.models import Animal, AnimalHealthRecord
+from users.models import User
+from . import materializer as materializer_module, qr_assets
+from .materializer import materializer
+from .models import ConsumerProfile, ConsumerTier, QRCodeAccess
+from .quota import QuotaEngine
+from .qr_assets import QROptions, ensure_asset
+
+# La configuración de tests usa DummyCache; estas pruebas necesitan una caché real
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'consumer-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConsumerResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='producer',
+            email='producer@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.animal = Animal.objects.create(
+            ear_tag='QR001',
+            breed='Angus',
+            birth_date='2023-01-01',
+            weight=450.5,
+            health_status='HEALTHY',
+            owner=self.user,
+            location='Test Farm',
+            token_id=101,
+            mint_transaction_hash='0x' + 'b' * 64
+        )
+        self.url = reverse('consumer:blockchain-proof', args=[self.animal.id])
+
+    def add_event(self, block_number):
+        with self.captureOnCommitCallbacks(execute=True):
+            BlockchainEvent.objects.create(
+                event_type='TRANSFER',
+                transaction_hash='0x' + f'{block_number:064x}',
+                block_number=block_number,
+                animal=self.animal,
+                from_address=self.user.wallet_address
+            )
+
+    def test_repeat_scan_is_served_without_queries(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_event_serves_stale_then_revalidates(self):
+        self.assertEqual(self.client.get(self.url).data['leaf_count'], 0)
+        self.add_event(1)
+
+        with patch('consumer.cache._spawn', side_effect=lambda target: target()):
+            stale = self.client.get(self.url)
+        self.assertEqual(stale['X-Cache'], 'STALE')
+        self.assertEqual(stale.data['leaf_count'], 0)
+
+        fresh = self.client.get(self.url)
+        self.assertEqual(fresh['X-Cache'], 'HIT')
+        self.assertEqual(fresh.data['leaf_count'], 1)
+
+    def test_unminted_animal_is_not_cached(self):
+        Animal.objects.filter(pk=self.animal.pk).update(token_id=None)
+
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_qr_verification_adds_fresh_stamp(self):
+        url = reverse('consumer:verify-qr')
+        first = self.client.get(url, {'qr': f'GANADOCHAIN_ANIMAL_{self.animal.id}'})
+        second = self.client.get(url, {'qr': f'GANADOCHAIN_ANIMAL_{self.animal.id}'})
+
+        self.assertTrue(first.data['verified'])
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertIn('verification_date', second.data)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QRAssetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.assets = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.assets, ignore_errors=True)
+        self.settings_override = override_settings(
+            QR_ASSETS_DIR=self.assets, QR_VERIFICATION_BASE_URL='https://ganadochain.example'
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='qrproducer',
+            email='qr@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.animal = Animal.objects.create(
+            ear_tag='QR002',
+            breed='Hereford',
+            birth_date='2023-01-01',
+            weight=450.5,
+            health_status='HEALTHY',
+            owner=self.user,
+            location='Test Farm'
+        )
+        self.url = reverse('consumer:generate-qr', args=[self.animal.id])
+
+    def test_render_once_and_redirect_to_immutable_asset(self):
+        with patch.object(qr_assets, 'render', wraps=qr_assets.render) as render:
+            first = self.client.get(self.url)
+            with self.assertNumQueries(0):
+                second = self.client.get(self.url)
+                asset = self.client.get(first['Location'])
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(first['Location'], second['Location'])
+        self.assertEqual(first['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(asset['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(asset['ETag'], first['ETag'])
+        self.assertIn('ganadochain_qr_QR002.png', asset['Content-Disposition'])
+        self.assertTrue(b''.join(asset.streaming_content).startswith(b'\x89PNG'))
+
+    def test_svg_and_error_correction_are_distinct_assets(self):
+        png = self.client.get(self.url, follow=True)
+        svg = self.client.get(self.url, {'qr_format': 'svg', 'ec': 'H'}, follow=True)
+
+        self.assertEqual(svg['Content-Type'], 'image/svg+xml')
+        self.assertNotEqual(png['ETag'], svg['ETag'])
+        self.assertIn(b'<svg', b''.join(svg.streaming_content))
+
+    def test_unknown_asset_is_not_found(self):
+        missing = reverse('consumer:qr-asset', args=['0' * 40, 'png'])
+        unsupported = reverse('consumer:qr-asset', args=['0' * 40, 'gif'])
+
+        self.assertEqual(self.client.get(missing).status_code, 404)
+        self.assertEqual(self.client.get(unsupported).status_code, 404)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_deleted_file_is_rendered_again(self):
+        first = self.client.get(self.url)
+        for path in Path(self.assets).rglob('*.png'):
+            path.unlink()
+
+        second = self.client.get(self.url)
+
+        self.assertEqual(second.status_code, 302)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(self.client.get(second['Location']).status_code, 200)
+
+    def test_missing_file_after_render_returns_503(self):
+        # Ruta de lectura distinta de la de escritura: no debe reintentar sin fin
+        with patch('consumer.views.asset_path', return_value=Path(self.assets) / 'no-existe.png'):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 503)
+
+    def test_invalid_options_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'qr_format': 'gif'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'size': '500'}).status_code, 400)
+
+    def test_asset_name_depends_on_content(self):
+        options = QROptions()
+        first, path = ensure_asset('payload-a', options)
+        again, _ = ensure_asset('payload-a', options)
+        other, _ = ensure_asset('payload-b', options)
+
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+        self.assertTrue(Path(path).is_relative_to(self.assets))
+
+
+@override_settings(CONSUMER_QUOTA_BURST={'PREMIUM': '1000/second'}, CONSUMER_QUOTA_FLUSH_INTERVAL=None)
+class ConsumerQuotaTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='quotaconsumer',
+            email='quota@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.tier = ConsumerTier.objects.create(
+            name='PREMIUM', description='Premium', monthly_fee_usd=10, max_queries_per_month=50
+        )
+        self.profile = ConsumerProfile.objects.create(user=self.user, tier=self.tier, subscription_active=True)
+        self.engine = QuotaEngine()
+
+    def test_quota_check_does_not_touch_database(self):
+        self.engine.consume(self.user.pk)
+
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.engine.consume(self.user.pk)
+
+    def test_flush_writes_usage_in_one_batch(self):
+        for _ in range(3):
+            self.engine.consume(self.user.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.engine.flush(), 3)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.queries_this_month, 3)
+        self.assertEqual(self.profile.total_queries, 3)
+
+    def test_failed_flush_keeps_pending_usage(self):
+        for _ in range(3):
+            self.engine.consume(self.user.pk)
+
+        with patch.object(ConsumerProfile.objects, 'filter', side_effect=DatabaseError('caída')):
+            with self.assertRaises(DatabaseError):
+                self.engine.flush()
+        self.engine.consume(self.user.pk)
+
+        self.assertEqual(self.engine.flush(), 4)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.total_queries, 4)
+
+    @override_settings(CONSUMER_QUOTA_BURST={'PREMIUM': '2/minute'})
+    def test_burst_bucket_limits_rate(self):
+        decisions = [self.engine.consume(self.user.pk) for _ in range(3)]
+
+        self.assertEqual([decision.allowed for decision in decisions], [True, True, False])
+        self.assertGreater(decisions[-1].wait, 0)
+
+    def test_processes_share_the_monthly_quota(self):
+        # Cada motor hace de un worker distinto: solo comparten la base de datos
+        engines = [QuotaEngine() for _ in range(4)]
+        admitted = 0
+        for _ in range(20):
+            for engine in engines:
+                admitted += engine.consume(self.user.pk).allowed
+
+        self.assertEqual(admitted, 50)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.quota_reserved, 50)
+
+    def test_new_month_starts_a_new_reservation(self):
+        self.engine.consume(self.user.pk)
+        ConsumerProfile.objects.filter(pk=self.profile.pk).update(
+            quota_reserved=50, quota_reserved_month=date(2000, 1, 1)
+        )
+
+        self.assertTrue(QuotaEngine().consume(self.user.pk).allowed)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.quota_reserved, 20)
+
+
+@override_settings(CONSUMER_QUOTA_BURST={'PREMIUM': '1000/second'}, CONSUMER_QUOTA_FLUSH_INTERVAL=None)
+class ConcurrentConsumerQuotaTests(TransactionTestCase):
+    def test_concurrent_requests_never_exceed_monthly_quota(self):
+        user = User.objects.create_user(
+            username='quotaconsumer',
+            email='quota@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        tier = ConsumerTier.objects.create(
+            name='PREMIUM', description='Premium', monthly_fee_usd=10, max_queries_per_month=50
+        )
+        ConsumerProfile.objects.create(user=user, tier=tier, subscription_active=True)
+        engine = QuotaEngine()
+        engine.profile(user.pk)
+        admitted = []
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(20):
+                    admitted.append(engine.consume(user.pk).allowed)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # SQLite en memoria puede rechazar escrituras concurrentes con "table is locked":
+        # esas consultas no se admiten, pero ninguna puede pasarse del límite
+        self.assertTrue(all(isinstance(error, DatabaseError) for error in errors), errors)
+        self.assertLessEqual(admitted.count(True), 50)
+        profile = ConsumerProfile.objects.get(user=user)
+        self.assertLessEqual(profile.quota_reserved, 50)
+
+        # Lo admitido es exactamente lo que se vuelca
+        engine.flush()
+        profile.refresh_from_db()
+        self.assertEqual(profile.total_queries, admitted.count(True))
+
+
+@override_settings(QR_MATERIALIZE_DEBOUNCE=None)
+class QRTierMaterializerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        materializer.run_pending()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='tierowner',
+            email='tier@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.animal = Animal.objects.create(
+            ear_tag='TIER001',
+            breed='Angus',
+            birth_date='2023-01-01',
+            weight=450.5,
+            health_status='HEALTHY',
+            owner=self.user,
+            location='Test Farm'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.access = QRCodeAccess.objects.create(
+                qr_code='QRTIER001', animal=self.animal, cut_of_meat='Lomo',
+                public_data={'producer_story': 'Pastura natural'}
+            )
+        materializer.run_pending()
+        self.url = reverse('consumer:qr-tier-data', args=['QRTIER001'])
+
+    def add_health_record(self, temperature):
+        with self.captureOnCommitCallbacks(execute=True):
+            AnimalHealthRecord.objects.create(
+                animal=self.animal, health_status='HEALTHY', temperature=temperature
+            )
+
+    def test_tiers_are_materialized_cumulatively(self):
+        self.access.refresh_from_db()
+
+        public = self.access.get_data_for_tier('BASIC')
+        premium = self.access.get_data_for_tier('PREMIUM')
+        self.assertEqual(public['producer_story'], 'Pastura natural')
+        self.assertNotIn('weight', public)
+        self.assertEqual(premium['ear_tag'], 'TIER001')
+        self.assertIn('weight', premium)
+        self.assertEqual(len(self.access.expert_hash), 16)
+
+    def test_burst_of_edits_coalesces_into_one_rebuild(self):
+        for temperature in (38.5, 38.7, 38.9, 39.1):
+            self.add_health_record(temperature)
+        pending = materializer.pending()
+        self.assertEqual(list(pending), [self.animal.id])
+        self.assertIn('health', pending[self.animal.id])
+
+        with patch.object(materializer_module, 'materialize', wraps=materializer_module.materialize) as materialize:
+            materializer.run_pending()
+
+        materialize.assert_called_once()
+        self.access.refresh_from_db()
+        self.assertEqual(self.access.get_data_for_tier('PREMIUM')['health_records_count'], 4)
+
+    def test_unchanged_rebuild_skips_the_write(self):
+        self.access.refresh_from_db()
+        materialized_at = self.access.materialized_at
+
+        self.assertEqual(materializer_module.materialize(self.animal.id), 0)
+
+        self.access.refresh_from_db()
+        self.assertEqual(self.access.materialized_at, materialized_at)
+
+        self.add_health_record(38.5)
+        self.assertEqual(materializer_module.materialize(self.animal.id, ('health',)), 1)
+        self.access.refresh_from_db()
+        self.assertFalse(self.access.materialize_pending)
+
+    def test_public_tier_is_single_row_read(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response['X-Data-Tier'], 'public')
+        self.assertEqual(json.loads(response.content)['ear_tag'], 'TIER001')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_expired_certification_is_dropped_when_served(self):
+        standard = CertificationStandard.objects.create(
+            name='Orgánico', description='Orgánico', issuing_authority='SENASA', validity_days=30
+        )
+        auditor = User.objects.create_user(
+            username='tierauditor', email='auditor@example.com', password='testpass123', role='auditor'
+        )
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            certification = AnimalCertification.objects.create(
+                animal=self.animal, standard=standard, certifying_authority=auditor,
+                certification_date=now - timedelta(days=30), expiration_date=now + timedelta(hours=1)
+            )
+        materializer.run_pending()
+        self.assertEqual(json.loads(self.client.get(self.url).content)['certifications'], ['Orgánico'])
+
+        # Vence sin que ninguna escritura vuelva a marcar el animal
+        AnimalCertification.objects.filter(pk=certification.pk).update(expiration_date=now - timedelta(minutes=1))
+        QRCodeAccess.objects.filter(pk=self.access.pk).update(materialized_expires_at=now - timedelta(minutes=1))
+
+        self.assertEqual(json.loads(self.client.get(self.url).content)['certifications'], [])
+        self.access.refresh_from_db()
+        self.assertIsNone(self.access.materialized_expires_at)
+
+    def test_reconcile_rebuilds_persisted_marks(self):
+        self.add_health_record(38.5)
+        self.access.refresh_from_db()
+        self.assertTrue(self.access.materialize_pending)
+
+        # Un reinicio pierde la marca en memoria; la persistida sigue ahí
+        with materializer._lock:
+            materializer._pending.clear()
+        self.assertEqual(materializer.reconcile(), 1)
+
+        self.access.refresh_from_db()
+        self.assertFalse(self.access.materialize_pending)
+        self.assertEqual(self.access.get_data_for_tier('PREMIUM')['health_records_count'], 1)
+
+    def test_premium_consumer_receives_premium_payload(self):
+        tier = ConsumerTier.objects.create(
+            name='PREMIUM', description='Premium', monthly_fee_usd=10, max_queries_per_month=100
+        )
+        ConsumerProfile.objects.create(user=self.user, tier=tier, subscription_active=True)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['X-Data-Tier'], 'premium')
+        self.assertIn('weight', json.loads(response.content))
@@ -3,9 +3,12 @@ from .views import (
     QRVerificationView,
     PublicAnimalHistoryView,
     GenerateQRView,
+    QRAssetView,
     AnimalSearchView,
     CertificationVerificationView,
     BlockchainProofView,
+    BlockchainProofEventsView,
+    QRTierDataView,
     PublicAPIDocsView
 )
 
@@ -19,6 +22,18 @@ urlpatterns = [
         name='verify-qr',
         kwargs={'description': 'Verificar animal mediante QR code o token ID'}
     ),
+    path(
+        'qr/<str:qr_code>/data/', 
+        QRTierDataView.as_view(), 
+        name='qr-tier-data',
+        kwargs={'description': 'Datos de un QR según el nivel del consumidor'}
+    ),
+    path(
+        'qr/assets/<slug:digest>.<slug:qr_format>',
+        QRAssetView.as_view(),
+        name='qr-asset',
+        kwargs={'description': 'Imagen QR inmutable direccionada por contenido'}
+    ),
     
     # -------------------------------------------------------------------------
     # INFORMACIÓN PÚBLICA DE ANIMALES
@@ -33,13 +48,19 @@ urlpatterns = [
         'animal/<int:animal_id>/qr/', 
         GenerateQRView.as_view(), 
         name='generate-qr',
-        kwargs={'description': 'Generar código QR para un animal'}
+        kwargs={'description': 'Redirigir al código QR inmutable de un animal'}
     ),
     path(
         'animal/<int:animal_id>/proof/', 
         BlockchainProofView.as_view(), 
         name='blockchain-proof',
-        kwargs={'description': 'Obtener cadena de proof blockchain de un animal'}
+        kwargs={'description': 'Raíz Merkle firmada de un animal o prueba de inclusión de un evento'}
+    ),
+    path(
+        'animal/<int:animal_id>/proof/events/',
+        BlockchainProofEventsView.as_view(),
+        name='blockchain-proof-events',
+        kwargs={'description': 'Eventos blockchain de un animal con su hoja en la prueba, paginados'}
     ),
     
     # -------------------------------------------------------------------------
@@ -86,6 +107,11 @@ CONSUMER_QUERY_PARAMS = {
         'q': 'Término de búsqueda (ear_tag, breed, token_id)',
         'breed': 'Filtrar por raza',
         'health_status': 'Filtrar por estado de salud'
+    },
+    'qr': {
+        'size': 'Tamaño de módulo (1-40)',
+        'qr_format': 'png o svg',
+        'ec': 'Corrección de errores (L, M, Q, H)'
     }
 }
 
@@ -93,12 +119,16 @@ CONSUMER_QUERY_PARAMS = {
 CONSUMER_API_EXAMPLES = {
     'verification': {
         'qr_code': '/api/consumer/verify/?qr=GANADOCHAIN_ANIMAL_123',
-        'token_id': '/api/consumer/verify/?token_id=456'
+        'token_id': '/api/consumer/verify/?token_id=456',
+        'tier_data': '/api/consumer/qr/QR123/data/'
     },
     'animal_info': {
         'history': '/api/consumer/animal/123/history/',
         'qr_code': '/api/consumer/animal/123/qr/',
-        'blockchain_proof': '/api/consumer/animal/123/proof/'
+        'qr_asset': '/api/consumer/qr/assets/<hash>.png',
+        'blockchain_proof': '/api/consumer/animal/123/proof/',
+        'blockchain_proof_leaf': '/api/consumer/animal/123/proof/?leaf=0',
+        'blockchain_proof_events': '/api/consumer/animal/123/proof/events/?page=2'
     },
     'search': {
         'general': '/api/consumer/search/?q=Angus',
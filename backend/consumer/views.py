@@ -1,13 +1,16 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+from django.utils.text import get_valid_filename
+from django.urls import reverse
 from django.db.models import Q
-import qrcode
-import io
-import json
 
 # Importaciones corregidas desde las ubicaciones correctas
 from cattle.models import Animal, AnimalHealthRecord
@@ -18,16 +21,26 @@ from cattle.serializers import (
     PublicHealthRecordSerializer,
     
 )
-from blockchain.models import BlockchainEvent
+from analytics.signals import qr_scanned
+from blockchain.models import AnimalProofLog, BlockchainEvent, ProofLeaf
+from blockchain.proofs import inclusion_proof
 from blockchain.serializers import PublicBlockchainEventSerializer, PublicCertificationSerializer
+from .cache import (
+    cached_animal_response, cached_animal_value, clear_animal_value, remember_alias,
+    resolve_alias, store_animal_value, uncached
+)
+from .materializer import tier_level, tier_payload
+from .quota import ConsumerQuotaThrottle, quota_engine
+from .qr_assets import FORMATS, QROptions, asset_path, ensure_asset, is_digest, qr_payload, verification_base_url
 import logging
 
 logger = logging.getLogger(__name__)
 
 class QRVerificationView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [ConsumerQuotaThrottle]
     
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
         qr_data = request.query_params.get('qr', '')
         token_id = request.query_params.get('token_id', '')
         
@@ -36,76 +49,101 @@ class QRVerificationView(APIView):
         
         try:
             if qr_data:
-                # Decodificar QR code
-                if qr_data.startswith('GANADOCHAIN_ANIMAL_'):
-                    animal_id = int(qr_data.split('_')[-1])
-                    animal = Animal.objects.get(id=animal_id, is_minted=True)
-                else:
+                # Decodificar QR code (sin consultar la base de datos)
+                if not qr_data.startswith('GANADOCHAIN_ANIMAL_'):
                     return Response({'verified': False, 'error': 'Invalid QR format'})
+                animal_id = int(qr_data.split('_')[-1])
             else:
                 # Buscar por token ID
-                animal = Animal.objects.get(token_id=token_id, is_minted=True)
-            
-            # Verificar que el animal esté mintado y sea válido
-            if not animal.is_minted:
-                return Response({'verified': False, 'error': 'Animal not minted on blockchain'})
+                animal_id = resolve_alias('token', token_id)
+                if animal_id is None:
+                    animal_id = Animal.objects.filter(token_id=token_id).values_list('id', flat=True).first()
+                    if animal_id is None:
+                        return Response({'verified': False, 'error': 'Animal not found'})
+                    remember_alias('token', token_id, animal_id)
             
-            # Obtener información pública del animal
-            animal_data = PublicAnimalSerializer(animal).data
-            
-            # Obtener certificaciones válidas
-            certifications = AnimalCertification.objects.filter(
-                animal=animal, 
-                revoked=False,
-                expiration_date__gte=timezone.now()
+            response = cached_animal_response(
+                request, 'qr', animal_id,
+                build=lambda: self.build_verification(animal_id),
+                finalize=self.add_verification_stamp
             )
+            if response.status_code == 304 or response.data.get('verified'):
+                qr_scanned.send(sender=self.__class__, animal_id=animal_id, request=request)
+            return response
             
-            # Obtener último registro de salud
-            last_health_record = AnimalHealthRecord.objects.filter(
-                animal=animal
-            ).order_by('-created_at').first()
-            
-            # Obtener eventos blockchain relevantes
-            blockchain_events = BlockchainEvent.objects.filter(
-                animal=animal,
-                event_type__in=['MINT', 'TRANSFER', 'HEALTH_UPDATE']
-            ).order_by('-created_at')[:10]
-            
-            return Response({
-                'verified': True,
-                'animal': animal_data,
-                'certifications': PublicCertificationSerializer(certifications, many=True).data,
-                'last_health_record': PublicHealthRecordSerializer(last_health_record).data if last_health_record else None,
-                'blockchain_events': PublicBlockchainEventSerializer(blockchain_events, many=True).data,
-                'verification_date': timezone.now(),
-                'verification_id': f"VC_{animal.id}_{timezone.now().strftime('%Y%m%d%H%M%S')}"
-            })
-            
-        except Animal.DoesNotExist:
-            return Response({'verified': False, 'error': 'Animal not found'})
         except Exception as e:
             logger.error(f"Error en verificación QR: {str(e)}")
             return Response({'verified': False, 'error': 'Verification error'})
+    
+    def build_verification(self, animal_id):
+        animal = Animal.objects.filter(id=animal_id).first()
+        if animal is None:
+            return uncached(Response({'verified': False, 'error': 'Animal not found'}))
+        
+        # Verificar que el animal esté mintado y sea válido
+        if not animal.is_minted:
+            return uncached(Response({'verified': False, 'error': 'Animal not minted on blockchain'}))
+        
+        # Obtener certificaciones válidas
+        certifications = AnimalCertification.objects.filter(
+            animal=animal, 
+            revoked=False,
+            expiration_date__gte=timezone.now()
+        ).select_related('animal', 'standard')
+        
+        # Obtener último registro de salud
+        last_health_record = AnimalHealthRecord.objects.filter(
+            animal=animal
+        ).select_related('animal').order_by('-created_at').first()
+        
+        # Obtener eventos blockchain relevantes
+        blockchain_events = BlockchainEvent.objects.filter(
+            animal=animal,
+            event_type__in=['MINT', 'TRANSFER', 'HEALTH_UPDATE']
+        ).select_related('animal', 'batch').order_by('-created_at')[:10]
+        
+        return Response({
+            'verified': True,
+            'animal': PublicAnimalSerializer(animal).data,
+            'certifications': PublicCertificationSerializer(certifications, many=True).data,
+            'last_health_record': PublicHealthRecordSerializer(last_health_record).data if last_health_record else None,
+            'blockchain_events': PublicBlockchainEventSerializer(blockchain_events, many=True).data
+        })
+    
+    def add_verification_stamp(self, data):
+        now = timezone.now()
+        data['verification_date'] = now
+        data['verification_id'] = f"VC_{data['animal']['id']}_{now.strftime('%Y%m%d%H%M%S')}"
+        return data
 
 class PublicAnimalHistoryView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [ConsumerQuotaThrottle]
     
-    def get(self, request, animal_id):
-        animal = get_object_or_404(Animal, id=animal_id, is_minted=True)
+    def get(self, request, animal_id, *args, **kwargs):
+        return cached_animal_response(
+            request, 'history', animal_id,
+            build=lambda: self.build_history(animal_id)
+        )
+    
+    def build_history(self, animal_id):
+        animal = get_object_or_404(Animal, id=animal_id)
+        if not animal.is_minted:
+            raise Http404('Animal not minted on blockchain')
         
         # Obtener historial completo público
-        health_records = AnimalHealthRecord.objects.filter(
+        health_records = list(AnimalHealthRecord.objects.filter(
             animal=animal
-        ).order_by('-created_at')[:50]  # Limitar a 50 registros
+        ).select_related('animal').order_by('-created_at')[:50])  # Limitar a 50 registros
         
-        certifications = AnimalCertification.objects.filter(
+        certifications = list(AnimalCertification.objects.filter(
             animal=animal,
             revoked=False
-        ).order_by('-certification_date')
+        ).select_related('animal', 'standard').order_by('-certification_date'))
         
-        blockchain_events = BlockchainEvent.objects.filter(
+        blockchain_events = list(BlockchainEvent.objects.filter(
             animal=animal
-        ).order_by('-created_at')[:20]
+        ).select_related('animal', 'batch').order_by('-created_at')[:20])
         
         response_data = {
             'animal': PublicAnimalSerializer(animal).data,
@@ -113,10 +151,10 @@ class PublicAnimalHistoryView(APIView):
             'certifications': PublicCertificationSerializer(certifications, many=True).data,
             'blockchain_history': PublicBlockchainEventSerializer(blockchain_events, many=True).data,
             'summary': {
-                'total_health_records': health_records.count(),
-                'total_certifications': certifications.count(),
-                'total_blockchain_events': blockchain_events.count(),
-                'first_record_date': health_records.last().created_at if health_records.exists() else None,
+                'total_health_records': len(health_records),
+                'total_certifications': len(certifications),
+                'total_blockchain_events': len(blockchain_events),
+                'first_record_date': health_records[-1].created_at if health_records else None,
                 'last_update': animal.updated_at
             }
         }
@@ -124,43 +162,90 @@ class PublicAnimalHistoryView(APIView):
         return Response(response_data)
 
 class GenerateQRView(APIView):
+    """QR de un animal: redirige al activo direccionado por contenido"""
     permission_classes = [AllowAny]
+    throttle_classes = [ConsumerQuotaThrottle]
     
-    def get(self, request, animal_id):
-        animal = get_object_or_404(Animal, id=animal_id)
-        
-        # Generar QR con más información
-        qr_data = json.dumps({
-            'type': 'GANADOCHAIN_ANIMAL',
-            'animal_id': animal.id,
-            'ear_tag': animal.ear_tag,
-            'token_id': animal.token_id,
-            'breed': animal.breed,
-            'verification_url': f"{request.build_absolute_uri('/')}api/consumer/verify/?qr=GANADOCHAIN_ANIMAL_{animal.id}"
-        })
+    def get(self, request, animal_id, *args, **kwargs):
+        try:
+            options = QROptions.from_params(request.query_params)
+            base_url = verification_base_url(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
         
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
+        # (hash, arete) por versión del animal: un QR repetido no consulta la base de datos
+        variant = f'{options.size}:{options.format}:{options.error_correction}:{base_url}'
+        asset = cached_animal_value('qr-asset', animal_id, variant)
+        if asset is None:
+            asset = self._render_asset(animal_id, options, base_url, variant)
         
-        img = qr.make_image(fill_color="black", back_color="white")
+        path = asset_path(asset['digest'], options)
+        if not path.exists():
+            # El archivo se borró del disco: se renderiza de nuevo una sola vez
+            try:
+                asset = self._render_asset(animal_id, options, base_url, variant)
+            except OSError as e:
+                logger.error(f"Error renderizando QR del animal {animal_id}: {str(e)}")
+            path = asset_path(asset['digest'], options)
+            if not path.exists():
+                clear_animal_value('qr-asset', animal_id, variant)
+                return Response({'error': 'Código QR no disponible temporalmente'}, status=503)
         
-        # Convertir a respuesta HTTP
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
+        etag = f'"{asset["digest"]}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+        else:
+            url = reverse('consumer:qr-asset', args=[asset['digest'], options.format])
+            download = f'ganadochain_qr_{asset["ear_tag"]}.{options.format}'
+            response = HttpResponseRedirect(f'{url}?{urlencode({"download": download})}')
+        response['ETag'] = etag
+        # El destino cambia con el animal: solo el archivo por hash es inmutable
+        response['Cache-Control'] = f'public, max-age={getattr(settings, "QR_CACHE_MAX_AGE", 60)}'
+        return response
+    
+    def _render_asset(self, animal_id, options, base_url, variant):
+        animal = get_object_or_404(
+            Animal.objects.values('id', 'ear_tag', 'token_id', 'breed'), id=animal_id
+        )
+        payload = qr_payload(animal['id'], animal['ear_tag'], animal['token_id'], animal['breed'], base_url)
+        digest, _ = ensure_asset(payload, options)
+        asset = {'digest': digest, 'ear_tag': animal['ear_tag']}
+        store_animal_value('qr-asset', animal_id, variant, asset)
+        return asset
+
+
+class QRAssetView(APIView):
+    """Archivo QR por hash de contenido: inmutable y sin consultas"""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    throttle_classes = []
+    
+    def get(self, request, digest, qr_format, *args, **kwargs):
+        if qr_format not in FORMATS or not is_digest(digest):
+            raise Http404
+        options = QROptions(format=qr_format)
+        path = asset_path(digest, options)
         
-        response = HttpResponse(buffer, content_type='image/png')
-        response['Content-Disposition'] = f'attachment; filename="ganadochain_qr_{animal.ear_tag}.png"'
+        etag = f'"{digest}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+        else:
+            try:
+                response = FileResponse(open(path, 'rb'), content_type=options.content_type)
+            except FileNotFoundError:
+                raise Http404
+            download = get_valid_filename(request.query_params.get('download', ''))
+            if download:
+                response['Content-Disposition'] = f'attachment; filename="{download}"'
+        response['ETag'] = etag
+        response['Cache-Control'] = (
+            f'public, max-age={getattr(settings, "QR_ASSET_MAX_AGE", 31536000)}, immutable'
+        )
         return response
 
 class AnimalSearchView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [ConsumerQuotaThrottle]
     
     def get(self, request):
         search_term = request.query_params.get('q', '')
@@ -193,64 +278,163 @@ class AnimalSearchView(APIView):
 
 class CertificationVerificationView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [ConsumerQuotaThrottle]
     
-    def get(self, request, certification_id):
-        certification = get_object_or_404(AnimalCertification, id=certification_id)
-        
-        # Verificar que la certificación sea válida
-        is_valid = (
-            not certification.revoked and 
-            certification.expiration_date >= timezone.now() and
-            certification.animal.is_minted
+    def get(self, request, certification_id, *args, **kwargs):
+        animal_id = resolve_alias('certification', certification_id)
+        if animal_id is None:
+            animal_id = AnimalCertification.objects.filter(
+                id=certification_id
+            ).values_list('animal_id', flat=True).first()
+            if animal_id is None:
+                raise Http404('Certification not found')
+            remember_alias('certification', certification_id, animal_id)
+        
+        return cached_animal_response(
+            request, 'certification', animal_id,
+            build=lambda: self.build_verification(certification_id),
+            variant=str(certification_id),
+            finalize=self.add_validity
+        )
+    
+    def build_verification(self, certification_id):
+        certification = get_object_or_404(
+            AnimalCertification.objects.select_related('animal', 'standard'), id=certification_id
         )
         
         response_data = {
             'certification': PublicCertificationSerializer(certification).data,
-            'is_valid': is_valid,
-            'verification_date': timezone.now(),
             'animal': PublicAnimalSerializer(certification.animal).data,
-            'issuing_authority': certification.standard.issuing_authority if certification.standard else None
+            'issuing_authority': certification.standard.issuing_authority if certification.standard else None,
+            # Base de la validez; la expiración se evalúa en cada petición
+            '_validity': {
+                'active': not certification.revoked and certification.animal.is_minted,
+                'expires': certification.expiration_date
+            }
         }
         
         return Response(response_data)
+    
+    def add_validity(self, data):
+        now = timezone.now()
+        validity = data.pop('_validity')
+        expires = parse_datetime(validity['expires']) if validity['expires'] else None
+        data['is_valid'] = bool(validity['active'] and expires and expires >= now)
+        data['verification_date'] = now
+        return data
 
 class BlockchainProofView(APIView):
+    """Raíz Merkle firmada del animal o prueba de inclusión de un evento (?leaf= o ?tx=)"""
     permission_classes = [AllowAny]
+    throttle_classes = [ConsumerQuotaThrottle]
     
-    def get(self, request, animal_id):
-        animal = get_object_or_404(Animal, id=animal_id, is_minted=True)
+    def get(self, request, animal_id, *args, **kwargs):
+        leaf_index = request.query_params.get('leaf')
+        transaction_hash = request.query_params.get('tx')
+        if leaf_index is not None and not leaf_index.isdigit():
+            return Response({'error': 'leaf debe ser un índice entero'}, status=400)
         
-        # Obtener eventos blockchain como prueba
-        events = BlockchainEvent.objects.filter(
-            animal=animal
-        ).order_by('created_at')
-        
-        # Crear proof chain
-        proof_chain = []
-        for event in events:
-            proof_chain.append({
-                'event_type': event.event_type,
-                'transaction_hash': event.transaction_hash,
-                'block_number': event.block_number,
-                'timestamp': event.created_at,
-                'metadata': event.metadata
-            })
+        variant = f'leaf:{leaf_index}' if leaf_index is not None else f'tx:{transaction_hash}' if transaction_hash else ''
+        return cached_animal_response(
+            request, 'proof', animal_id, variant=variant,
+            build=lambda: self.build_proof(animal_id, leaf_index, transaction_hash)
+        )
+    
+    def build_proof(self, animal_id, leaf_index=None, transaction_hash=None):
+        animal = get_object_or_404(Animal.objects.select_related('proof_log'), id=animal_id)
+        if not animal.is_minted:
+            raise Http404('Animal not minted on blockchain')
+        # Animales sin eventos (o anteriores al acumulador, hasta rebuild_proof_logs): árbol vacío
+        log = getattr(animal, 'proof_log', None) or AnimalProofLog(animal=animal)
+        
+        if leaf_index is not None or transaction_hash:
+            leaves = ProofLeaf.objects.filter(log_id=log.pk)
+            if leaf_index is not None:
+                leaves = leaves.filter(index=int(leaf_index))
+            else:
+                leaves = leaves.filter(transaction_hash=transaction_hash).order_by('index')
+            leaf = leaves.first()
+            if leaf is None:
+                return Response({'error': 'Evento no incluido en la prueba del animal'}, status=404)
+            return Response(inclusion_proof(log, leaf))
         
+        # Tamaño constante: la lista de eventos se pagina en proof/events/
+        proof_url = reverse('consumer:blockchain-proof', args=[animal.id])
         return Response({
             'animal_id': animal.id,
-            'ear_tag': animal.ear_tag,
-            'token_id': animal.token_id,
-            'proof_chain': proof_chain,
-            'total_events': len(proof_chain),
-            'first_event': proof_chain[0] if proof_chain else None,
-            'last_event': proof_chain[-1] if proof_chain else None,
-            'verification_hash': self.generate_verification_hash(proof_chain)
+            'leaf_count': log.leaf_count,
+            'root': log.root,
+            'signature': log.signature or None,
+            'leaf_url': f'{proof_url}?leaf={{index}}',
+            'events_url': reverse('consumer:blockchain-proof-events', args=[animal.id]),
         })
+
+class BlockchainProofEventsView(APIView):
+    """Eventos blockchain de un animal con su hoja en la prueba, paginados"""
+    permission_classes = [AllowAny]
+    throttle_classes = [ConsumerQuotaThrottle]
     
-    def generate_verification_hash(self, proof_chain):
-        import hashlib
-        chain_data = ''.join([str(event['transaction_hash']) for event in proof_chain])
-        return hashlib.sha256(chain_data.encode()).hexdigest()
+    def get(self, request, animal_id, *args, **kwargs):
+        paginator = PageNumberPagination()
+        variant = str(request.query_params.get(paginator.page_query_param, 1))
+        return cached_animal_response(
+            request, 'proof-events', animal_id, variant=variant,
+            build=lambda: self.build_page(request, paginator, animal_id)
+        )
+    
+    def build_page(self, request, paginator, animal_id):
+        animal = get_object_or_404(Animal.objects.select_related('proof_log'), id=animal_id)
+        if not animal.is_minted:
+            raise Http404('Animal not minted on blockchain')
+        log = getattr(animal, 'proof_log', None)
+        
+        events = BlockchainEvent.objects.filter(animal=animal).order_by('created_at', 'id').values(
+            'id', 'event_type', 'transaction_hash', 'block_number', 'created_at', 'metadata'
+        )
+        page = paginator.paginate_queryset(events, request, view=self)
+        # Índices de hoja solo de los eventos de esta página
+        leaf_indexes = dict(
+            ProofLeaf.objects.filter(
+                log_id=log.pk, source='event', object_id__in=[event['id'] for event in page]
+            ).values_list('object_id', 'index')
+        ) if log else {}
+        
+        return paginator.get_paginated_response([{
+            'event_type': event['event_type'],
+            'transaction_hash': event['transaction_hash'],
+            'block_number': event['block_number'],
+            'timestamp': event['created_at'],
+            'metadata': event['metadata'],
+            'leaf_index': leaf_indexes.get(event['id'])
+        } for event in page])
+
+class QRTierDataView(APIView):
+    """Datos de un QR según el nivel del consumidor, servidos como bytes materializados"""
+    permission_classes = [AllowAny]
+    throttle_classes = [ConsumerQuotaThrottle]
+    
+    def get(self, request, qr_code, *args, **kwargs):
+        tier_name = None
+        if request.user.is_authenticated:
+            profile = quota_engine.profile(request.user.pk)
+            if profile and profile.active:
+                tier_name = profile.tier
+        level = tier_level(tier_name)
+        
+        body, digest = tier_payload(qr_code, level)
+        if body is None:
+            return Response({'error': 'QR code not found'}, status=404)
+        
+        etag = f'"{digest}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=60' if level == 'public' else 'private, max-age=60'
+        response['Vary'] = 'Authorization, Cookie'
+        response['X-Data-Tier'] = level
+        return response
 
 class PublicAPIDocsView(APIView):
     permission_classes = [AllowAny]
@@ -272,7 +456,13 @@ class PublicAPIDocsView(APIView):
                 'generate_qr': {
                     'url': '/api/consumer/animal/<animal_id>/qr/',
                     'method': 'GET',
-                    'description': 'Generate QR code for an animal'
+                    'params': {'size': 'module size (1-40)', 'qr_format': 'png or svg', 'ec': 'L, M, Q or H'},
+                    'description': 'Redirect to the immutable QR code asset of an animal'
+                },
+                'qr_asset': {
+                    'url': '/api/consumer/qr/assets/<digest>.<qr_format>',
+                    'method': 'GET',
+                    'description': 'Content-addressed QR code image, cacheable forever'
                 },
                 'animal_search': {
                     'url': '/api/consumer/search/',
@@ -288,7 +478,14 @@ class PublicAPIDocsView(APIView):
                 'blockchain_proof': {
                     'url': '/api/consumer/animal/<animal_id>/proof/',
                     'method': 'GET',
-                    'description': 'Get blockchain proof chain for an animal'
+                    'params': {'leaf': 'leaf index', 'tx': 'transaction hash'},
+                    'description': 'Signed Merkle root of an animal, or the inclusion proof of one event'
+                },
+                'blockchain_proof_events': {
+                    'url': '/api/consumer/animal/<animal_id>/proof/events/',
+                    'method': 'GET',
+                    'params': {'page': 'page number'},
+                    'description': 'Paginated blockchain events of an animal with their leaf index'
                 }
             },
             'response_formats': ['JSON'],
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from .models import validate_ethereum_address, validate_transaction_hash, validate_ipfs_hash
-from .metrics_models import SystemMetrics
+from .metrics_models import RouteMetrics, SystemMetrics
+from .request_metrics import LatencyHistogram
 import json
 
 @admin.register(SystemMetrics)
@@ -153,6 +154,37 @@ class SystemMetricsAdmin(admin.ModelAdmin):
         # No permitir eliminar métricas del sistema
         return False
 
+@admin.register(RouteMetrics)
+class RouteMetricsAdmin(admin.ModelAdmin):
+    list_display = [
+        'date', 'route', 'request_count', 'avg_time_display', 'p95_display',
+        'max_time_ms', 'error_count', 'client_error_count', 'avg_queries_display'
+    ]
+    list_filter = ['date']
+    search_fields = ['route']
+    date_hierarchy = 'date'
+    exclude = ['histogram']
+
+    def avg_time_display(self, obj):
+        return round(obj.total_time_ms / obj.request_count, 2) if obj.request_count else "—"
+    avg_time_display.short_description = 'Promedio (ms)'
+
+    def p95_display(self, obj):
+        p95 = LatencyHistogram(obj.histogram).quantile(0.95)
+        return round(p95, 2) if p95 is not None else "—"
+    p95_display.short_description = 'p95 (ms)'
+
+    def avg_queries_display(self, obj):
+        return round(obj.query_count / obj.request_count, 1) if obj.request_count else "—"
+    avg_queries_display.short_description = 'Consultas promedio'
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields if field.name != 'histogram']
+
+    def has_add_permission(self, request):
+        # Las filas las escribe el volcado de core.request_metrics
+        return False
+
 # Panel de administración para las utilidades/core (si es necesario)
 class CoreAdmin(admin.ModelAdmin):
     """Panel de administración para utilidades del core"""
@@ -0,0 +1,426 @@
+# backend/core/admin_changelist.py
+"""
+Listas del admin para tablas de millones de filas.
+
+``LargeTableAdminMixin`` reemplaza las partes de la lista por defecto que
+recorren la tabla entera:
+
+- Conteo: ``estimated_count`` usa la estimación del planificador
+  (``pg_class.reltuples`` sin filtros, ``EXPLAIN`` con filtros) y solo cuenta
+  exacto por debajo de ``ADMIN_EXACT_COUNT_LIMIT`` filas. Sin estadísticas
+  (SQLite) cuenta hasta ese límite y muestra "más de N".
+- Paginación por clave: si el orden es sobre columnas no nulas, la página
+  siguiente se pide con ``?after=<cursor>`` (``WHERE (ts, id) < (...)``) en
+  lugar de ``OFFSET``, así que la página 100 000 cuesta lo mismo que la
+  primera. Con otros órdenes se vuelve a ``OFFSET`` con el conteo estimado.
+- Jerarquía de fechas: años, meses y días salen de ``AnalyticsDailyFact``
+  (``rollup_source``) en vez de un ``SELECT DISTINCT`` sobre la tabla; los
+  días posteriores al último refresco del cubo se leen de la tabla en un rango
+  acotado. Mientras el cubo no tenga filas de la fuente, solo se listan los
+  últimos ``ADMIN_ROLLUP_FALLBACK_DAYS`` días de la tabla. La jerarquía
+  ignora los demás filtros activos.
+- Período: ``RecentPeriodFilter`` limita la lista por defecto a los últimos
+  7 días sobre ``date_hierarchy``; "Sin límite" o la jerarquía lo quitan.
+
+Los campos relacionados de la lista se anotan (``list_annotations``) en vez
+de cargar los objetos, y las columnas pesadas se difieren (``list_defer``).
+
+Ajustes:
+- ``ADMIN_EXACT_COUNT_LIMIT``: filas por debajo de las cuales se cuenta exacto (10000).
+- ``ADMIN_ROLLUP_FALLBACK_DAYS``: días recientes que lista la jerarquía mientras
+  el cubo está vacío (30).
+"""
+import base64
+import json
+import logging
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, models
+from django.db.models import F, Max, Q
+from django.utils import formats, timezone
+from django.utils.functional import cached_property
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+logger = logging.getLogger(__name__)
+
+CURSOR_VAR = 'after'
+BEFORE_VAR = 'before'
+
+RowCount = namedtuple('RowCount', ['value', 'kind'])  # kind: 'exact', 'estimate' o 'at_least'
+
+
+# ==============================================================================
+# CONTEO
+# ==============================================================================
+
+def planner_estimate(queryset):
+    """Filas que el planificador estima para ``queryset``; None si no hay estadísticas."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                if not queryset.query.where:
+                    cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+                    row = cursor.fetchone()
+                    # -1: la tabla nunca se analizó
+                    return row[0] if row and row[0] >= 0 else None
+                sql, params = queryset.order_by().values('pk').query.sql_with_params()
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]['Plan']['Plan Rows'])
+            if connection.vendor == 'mysql' and not queryset.query.where:
+                cursor.execute(
+                    'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                    'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [table]
+                )
+                row = cursor.fetchone()
+                return row[0] if row else None
+    except DatabaseError as e:
+        logger.error(f"Error estimando filas de {table}: {str(e)}")
+    return None
+
+
+def estimated_count(queryset):
+    """Filas de ``queryset``: exacto si son pocas, estimado o acotado si son muchas."""
+    limit = getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 10000)
+    estimate = planner_estimate(queryset)
+    if estimate is not None and estimate > limit:
+        return RowCount(estimate, 'estimate')
+    # Conteo acotado: recorre a lo sumo limit + 1 filas aunque la estimación falle
+    count = queryset.order_by()[:limit + 1].count()
+    if count > limit:
+        return RowCount(limit, 'at_least')
+    return RowCount(count, 'exact')
+
+
+def format_count(row_count):
+    if row_count.kind == 'estimate':
+        return f"≈ {row_count.value:,}"
+    if row_count.kind == 'at_least':
+        return f"más de {row_count.value:,}"
+    return f"{row_count.value:,}"
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginador cuyo ``count`` es ``estimated_count``."""
+
+    @cached_property
+    def row_count(self):
+        return estimated_count(self.object_list)
+
+    @cached_property
+    def count(self):
+        return self.row_count.value
+
+
+# ==============================================================================
+# PAGINACIÓN POR CLAVE
+# ==============================================================================
+
+def encode_cursor(obj, fields):
+    values = [field.value_to_string(obj) for field, _descending in fields]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """Valores del cursor convertidos al tipo de cada campo; ValueError si no es válido."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise ValueError(f"Cursor inválido: {cursor}")
+    return [field.to_python(value) for (field, _descending), value in zip(fields, values)]
+
+
+def keyset_filter(fields, values, forward=True):
+    """Filas posteriores (o anteriores) a ``values`` en el orden de ``fields``.
+
+    Expande ``(a, b, c) < (x, y, z)`` como ``a < x OR (a = x AND b < y) OR ...``
+    y repite ``a <= x`` como condición suelta para que el índice de la primera
+    columna acote el recorrido.
+    """
+    first, first_descending = fields[0]
+    first_lookup = 'lte' if first_descending == forward else 'gte'
+    condition = Q()
+    for index, (field, descending) in enumerate(fields):
+        lookup = 'lt' if descending == forward else 'gt'
+        equal = {prefix.attname: value for (prefix, _descending), value in zip(fields[:index], values)}
+        condition |= Q(**equal, **{f'{field.attname}__{lookup}': values[index]})
+    return Q(**{f'{first.attname}__{first_lookup}': values[0]}) & condition
+
+
+class LargeTableChangeList(ChangeList):
+    """ChangeList con conteo estimado, paginación por clave y jerarquía desde el cubo."""
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = self.cursor_var = None
+        for var in (CURSOR_VAR, BEFORE_VAR):
+            if var in request.GET:
+                # El cursor no es un filtro: quitarlo antes de que ChangeList lo interprete como tal
+                request.GET = request.GET.copy()
+                self.cursor, self.cursor_var = request.GET.pop(var)[-1], var
+        self.keyset_ordering = []
+        super().__init__(request, *args, **kwargs)
+
+    def get_ordering(self, request, queryset):
+        self.keyset_ordering = super().get_ordering(request, queryset)
+        return self.keyset_ordering
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.model_admin.list_defer:
+            queryset = queryset.defer(*self.model_admin.list_defer)
+        return queryset
+
+    def keyset_fields(self):
+        """``[(campo, descendente)]`` si el orden admite paginación por clave; None si no."""
+        fields = []
+        for item in self.keyset_ordering:
+            if not isinstance(item, str):
+                return None
+            name = item.lstrip('-')
+            try:
+                field = self.opts.pk if name == 'pk' else self.opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if not field.concrete or field.is_relation or field.null:
+                return None
+            fields.append((field, item.startswith('-')))
+        return fields or None
+
+    def get_results(self, request):
+        fields = self.keyset_fields()
+        self.keyset = fields is not None
+        if not self.keyset:
+            super().get_results(request)
+            self.result_count_display = format_count(self.paginator.row_count)
+            return
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        forward = self.cursor_var != BEFORE_VAR
+        queryset = self.queryset
+        if self.cursor is not None:
+            try:
+                values = decode_cursor(self.cursor, fields)
+            except (ValueError, ValidationError):
+                raise IncorrectLookupParameters
+            queryset = queryset.filter(keyset_filter(fields, values, forward))
+        if not forward:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[:self.list_per_page + 1])
+        more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+        if not forward:
+            rows.reverse()
+        # Hacia atrás siempre hay página siguiente: la de la que se viene
+        has_previous = more if not forward else self.cursor is not None
+        has_next = more if forward else self.cursor is not None
+
+        self.first_page_url = self.get_query_string() if has_previous else None
+        self.previous_page_url = (
+            self.get_query_string({BEFORE_VAR: encode_cursor(rows[0], fields)}) if has_previous and rows else None
+        )
+        self.next_page_url = (
+            self.get_query_string({CURSOR_VAR: encode_cursor(rows[-1], fields)}) if has_next and rows else None
+        )
+
+        self.result_count = paginator.count
+        self.result_count_display = format_count(paginator.row_count)
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_previous or has_next
+        self.paginator = paginator
+
+    @cached_property
+    def hierarchy(self):
+        """Contexto de ``admin/date_hierarchy.html`` desde el cubo; None sin ``rollup_source``."""
+        if not (self.date_hierarchy and self.model_admin.rollup_source):
+            return None
+        field_name = self.date_hierarchy
+        year_field, month_field, day_field = (f'{field_name}__{part}' for part in ('year', 'month', 'day'))
+        year, month, day = (self.params.get(name) for name in (year_field, month_field, day_field))
+
+        def link(filters):
+            return self.get_query_string(filters, [f'{field_name}__', RecentPeriodFilter.parameter_name])
+
+        if not (year or month or day):
+            # Nivel inicial como el admin de Django: saltar al único año (y mes) con datos
+            days = self.model_admin.rollup_days()
+            if len({d.year for d in days}) == 1:
+                year = days[0].year
+                if len({d.month for d in days}) == 1:
+                    month = days[0].month
+
+        if year and month and day:
+            current = date(int(year), int(month), int(day))
+            return {
+                'show': True,
+                'back': {
+                    'link': link({year_field: year, month_field: month}),
+                    'title': capfirst(formats.date_format(current, 'YEAR_MONTH_FORMAT')),
+                },
+                'choices': [{'title': capfirst(formats.date_format(current, 'MONTH_DAY_FORMAT'))}],
+            }
+        if year and month:
+            return {
+                'show': True,
+                'back': {'link': link({year_field: year}), 'title': str(year)},
+                'choices': [
+                    {
+                        'link': link({year_field: year, month_field: month, day_field: current.day}),
+                        'title': capfirst(formats.date_format(current, 'MONTH_DAY_FORMAT')),
+                    }
+                    for current in self.model_admin.rollup_days(int(year), int(month))
+                ],
+            }
+        if year:
+            months = sorted({current.replace(day=1) for current in self.model_admin.rollup_days(int(year))})
+            return {
+                'show': True,
+                'back': {'link': link({}), 'title': _('All dates')},
+                'choices': [
+                    {
+                        'link': link({year_field: year, month_field: current.month}),
+                        'title': capfirst(formats.date_format(current, 'YEAR_MONTH_FORMAT')),
+                    }
+                    for current in months
+                ],
+            }
+        return {
+            'show': True,
+            'back': None,
+            'choices': [
+                {'link': link({year_field: str(current)}), 'title': str(current)}
+                for current in sorted({d.year for d in self.model_admin.rollup_days()})
+            ],
+        }
+
+
+# ==============================================================================
+# FILTRO DE PERÍODO
+# ==============================================================================
+
+class RecentPeriodFilter(admin.SimpleListFilter):
+    """Limita la lista a un período reciente de ``date_hierarchy``; por defecto, 7 días."""
+    title = 'período'
+    parameter_name = 'periodo'
+    default = '7d'
+    PERIODS = {
+        '1h': ('Última hora', timedelta(hours=1)),
+        '24h': ('Últimas 24 horas', timedelta(days=1)),
+        '7d': ('Últimos 7 días', timedelta(days=7)),
+        '30d': ('Últimos 30 días', timedelta(days=30)),
+        '90d': ('Últimos 90 días', timedelta(days=90)),
+        'todo': ('Sin límite', None),
+    }
+
+    def __init__(self, request, params, model, model_admin):
+        self.field_name = model_admin.date_hierarchy
+        # Navegando la jerarquía (o con un rango explícito) el período por defecto sobra
+        self.drilling = any(key.startswith(f'{self.field_name}__') for key in params)
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, (label, _period) in self.PERIODS.items()]
+
+    def value(self):
+        value = super().value()
+        if value is None and not self.drilling:
+            return self.default
+        return value
+
+    def queryset(self, request, queryset):
+        period = self.PERIODS.get(self.value(), (None, None))[1]
+        if period is None:
+            return queryset
+        return queryset.filter(**{f'{self.field_name}__gte': timezone.now() - period})
+
+    def choices(self, changelist):
+        # Sin la opción "Todos": quitar el parámetro volvería al período por defecto
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+
+# ==============================================================================
+# MIXIN
+# ==============================================================================
+
+class LargeTableAdminMixin:
+    """Lista del admin para tablas grandes; se combina con ``admin.ModelAdmin``."""
+    change_list_template = 'admin/large_table_change_list.html'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    # Fuente de AnalyticsDailyFact que respalda la jerarquía de fechas
+    rollup_source = None
+    # Campos relacionados de la lista como anotaciones: {alias: 'relación__campo'}
+    list_annotations = {}
+    # Columnas pesadas que la lista no muestra
+    list_defer = ()
+
+    def get_changelist(self, request, **kwargs):
+        return LargeTableChangeList
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.list_annotations:
+            queryset = queryset.annotate(**{alias: F(path) for alias, path in self.list_annotations.items()})
+        return queryset
+
+    def rollup_days(self, year=None, month=None):
+        """
+        Días con filas según el cubo, más los posteriores a su último refresco.
+
+        Sin filas en el cubo solo se leen de la tabla los últimos
+        ``ADMIN_ROLLUP_FALLBACK_DAYS`` días, no la tabla entera.
+        """
+        field_name = self.date_hierarchy
+        is_datetime = isinstance(self.model._meta.get_field(field_name), models.DateTimeField)
+        facts = apps.get_model('analytics', 'AnalyticsDailyFact').objects.filter(
+            source=self.rollup_source, record_count__gt=0
+        )
+        last_refreshed = facts.aggregate(last=Max('date'))['last']
+        recent = self.model._default_manager.all()
+        if last_refreshed:
+            since = datetime.combine(last_refreshed, time.min)
+        else:
+            fallback_days = getattr(settings, 'ADMIN_ROLLUP_FALLBACK_DAYS', 30)
+            since = datetime.combine(timezone.localdate() - timedelta(days=fallback_days), time.min)
+        if is_datetime:
+            recent = recent.filter(**{f'{field_name}__gte': timezone.make_aware(since) if settings.USE_TZ else since})
+        else:
+            recent = recent.filter(**{f'{field_name}__gte': since.date()})
+        if year:
+            facts = facts.filter(date__year=year)
+            recent = recent.filter(**{f'{field_name}__year': year})
+        if month:
+            facts = facts.filter(date__month=month)
+            recent = recent.filter(**{f'{field_name}__month': month})
+
+        days = set(facts.order_by().values_list('date', flat=True).distinct())
+        if is_datetime:
+            days.update(value.date() for value in recent.datetimes(field_name, 'day'))
+        else:
+            days.update(recent.dates(field_name, 'day'))
+        return sorted(days)
@@ -6,9 +6,11 @@ class CoreConfig(AppConfig):
     name = 'core'
     verbose_name = 'Núcleo Multichain'
     
-    # def ready(self):
-    #     # Importar señales y configuraciones
-    #     # import core.signals
-    #     # # Cargar redes por defecto
-    #     # from core.utils import load_default_networks
-    #     # load_default_networks()
\ No newline at end of file
+    def ready(self):
+        # Mantener contadores materializados del dashboard
+        from core.counters import connect_counter_signals
+        connect_counter_signals()
+        
+        # # Cargar redes por defecto
+        # from core.utils import load_default_networks
+        # load_default_networks()
@@ -0,0 +1,92 @@
+# backend/core/background.py
+"""
+Hilos periódicos en segundo plano.
+
+``PeriodicThread`` ejecuta una tarea cada N segundos en un hilo daemon que
+se arranca a demanda (la primera vez que el proceso la necesita), cierra las
+conexiones a la base de datos tras cada ejecución y registra los errores sin
+detener el hilo. El intervalo sale de un ajuste (o de una función); ``None``
+o ``0`` desactiva el hilo y la tarea queda a cargo de quien la llame.
+
+Los acumuladores en memoria (escaneos, cuotas, métricas de peticiones) piden
+``run_at_exit``: la tarea se ejecuta una última vez al terminar el proceso
+(``atexit``; un worker de gunicorn o uWSGI sale por ahí en un reinicio
+ordenado), así que lo no volcado no se pierde al reciclar workers. Un proceso
+matado con SIGKILL pierde igualmente lo acumulado desde el último volcado.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicThread:
+    """Tarea periódica en un hilo daemon arrancado a demanda.
+
+    ``interval`` es el nombre de un ajuste (con ``default``) o una función sin
+    argumentos que devuelve los segundos entre ejecuciones. Con
+    ``run_at_start`` la primera ejecución no espera un intervalo.
+    """
+
+    def __init__(self, name, task, interval, default=None, error='', run_at_start=False, run_at_exit=False):
+        self.name = name
+        self.task = task
+        self.error = error or f'Error en la tarea {name}'
+        self.run_at_start = run_at_start
+        self.run_at_exit = run_at_exit
+        self._interval = interval
+        self._default = default
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def interval(self):
+        if callable(self._interval):
+            return self._interval()
+        return getattr(settings, self._interval, self._default)
+
+    def ensure(self):
+        """Arrancar el hilo si hay intervalo y aún no corre."""
+        # Sin intervalo no hay hilo: la tarea queda a cargo de quien la llame
+        if self._thread is not None or not self.interval():
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run_forever, name=self.name, daemon=True)
+            self._thread.start()
+            if self.run_at_exit:
+                atexit.register(self._run_at_exit)
+
+    def stop(self):
+        """Detener el hilo (o impedir que arranque) sin ejecutar la tarea."""
+        with self._lock:
+            self._stopped.set()
+            if self._thread is None:
+                self._thread = False
+
+    def run_once(self):
+        """Ejecutar la tarea una vez, registrando el error en vez de propagarlo."""
+        try:
+            self.task()
+        except Exception as e:
+            logger.error(f"{self.error}: {str(e)}")
+        finally:
+            connections.close_all()
+
+    def _run_forever(self):
+        delay = 0 if self.run_at_start else self.interval()
+        while not self._stopped.wait(delay or 0):
+            self.run_once()
+            delay = self.interval()
+            if not delay:
+                # El ajuste se desactivó en caliente: el hilo termina
+                return
+
+    def _run_at_exit(self):
+        if not self._stopped.is_set():
+            self.run_once()
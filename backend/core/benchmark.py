@@ -0,0 +1,465 @@
+# backend/core/benchmark.py
+"""
+Benchmark de extremo a extremo de la API, sin red.
+
+``seed_dataset`` carga un conjunto sintético determinista (rebaños por
+productor, lotes, historial de sensores GPS y de salud, registros sanitarios y
+eventos blockchain) con ``bulk_create`` y reconcilia los contadores del
+dashboard. Los escenarios recorren la pila completa de Django (middleware,
+autenticación, serializadores) con el cliente de pruebas de DRF, en proceso:
+
+- ``iot_ingest``: ``POST /api/iot/ingest/`` con GPS y salud de un dispositivo.
+- ``qr_verify``: ``GET /api/consumer/verify/`` anónimo sobre animales mintados.
+- ``animal_list``: ``GET /api/cattle/animals/`` paginado como productor.
+- ``dashboard_stats``: ``GET /api/core/dashboard/stats/`` como productor.
+- ``blockchain_mint``: ``BlockchainService.mint_and_associate_animal`` contra
+  eth-tester (firma, nonce y envío reales; se omite si eth-tester no está).
+
+``run_scenario`` reparte las peticiones entre ``concurrency`` hilos, cada uno
+con su conexión, y devuelve rendimiento, percentiles exactos de latencia,
+consultas por petición y memoria pico (``tracemalloc``, en una pasada
+secuencial aparte para no distorsionar la latencia). Con la misma semilla y
+escala, las consultas por petición son reproducibles entre commits y la
+latencia es comparable en la misma máquina. Si alguna petición del
+calentamiento falla (respuesta fuera de 2xx o excepción), ``run_scenario``
+lanza ``BenchmarkError`` con el detalle en lugar de medir un escenario roto.
+
+Uso: ``manage.py benchmark_api``.
+"""
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db import connection, connections
+
+from .request_metrics import _QueryCounter
+
+logger = logging.getLogger(__name__)
+
+BREEDS = ['Angus', 'Hereford', 'Brahman', 'Holstein', 'Brangus', 'Limousin', 'Charolais', 'Simmental']
+HEALTH_STATUSES = ['HEALTHY'] * 7 + ['SICK', 'UNDER_OBSERVATION', 'RECOVERING']
+BATCH_STATUSES = ['CREATED', 'IN_TRANSIT', 'DELIVERED', 'PROCESSING']
+BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+# Todas las fechas sintéticas cuelgan de un instante fijo para que el conjunto sea idéntico entre corridas
+EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+MINT_ABI = [{
+    'type': 'function', 'name': 'mintAnimal', 'stateMutability': 'nonpayable',
+    'inputs': [
+        {'name': 'to', 'type': 'address'},
+        {'name': 'tokenURI', 'type': 'string'},
+        {'name': 'operationalIPFS', 'type': 'string'},
+    ],
+    'outputs': [{'name': '', 'type': 'uint256'}],
+}]
+
+
+class BenchmarkError(Exception):
+    """El escenario no funciona: no tiene sentido medirlo."""
+
+
+class BenchmarkDataset:
+    """Ids y credenciales del conjunto sembrado que usan los escenarios."""
+
+    def __init__(self):
+        self.producers = []
+        self.animals_per_herd = 0
+        self.minted_ids = []
+        self.unminted = []
+        self.devices = []
+
+
+# ==============================================================================
+# DATOS SINTÉTICOS
+# ==============================================================================
+
+def seed_dataset(seed=42, herds=10, animals_per_herd=100, batches_per_herd=5, sensor_days=7,
+                 readings_per_day=4, minted_ratio=0.8):
+    """Sembrar el conjunto sintético; devuelve un ``BenchmarkDataset``."""
+    from blockchain.models import BlockchainEvent
+    from cattle.models import Animal, AnimalHealthRecord, Batch
+    from iot.models import GPSData, HealthSensorData, IoTDevice
+    from users.models import User
+
+    from .counters import reconcile_counters
+
+    rng = random.Random(seed)
+    dataset = BenchmarkDataset()
+
+    User.objects.bulk_create([
+        User(
+            username=f'bench_producer_{herd}', email=f'bench{herd}@example.com', role='PRODUCER',
+            wallet_address=f'0x{herd + 1:040x}', password='!'
+        )
+        for herd in range(herds)
+    ])
+    producers = list(User.objects.filter(username__startswith='bench_producer_').order_by('id'))
+    dataset.producers = producers
+    dataset.animals_per_herd = animals_per_herd
+
+    animals = []
+    for herd, producer in enumerate(producers):
+        for index in range(animals_per_herd):
+            number = herd * animals_per_herd + index
+            minted = rng.random() < minted_ratio
+            animals.append(Animal(
+                ear_tag=f'BENCH{number:07d}',
+                breed=rng.choice(BREEDS),
+                birth_date=date(2022, 1, 1) + timedelta(days=rng.randrange(900)),
+                weight=Decimal(rng.randrange(18000, 65000)) / 100,
+                health_status=rng.choice(HEALTH_STATUSES),
+                location=f'Establecimiento {herd}',
+                owner=producer,
+                ipfs_hash='Qm' + ''.join(rng.choice(BASE58) for _ in range(44)),
+                token_id=number + 1 if minted else None,
+                mint_transaction_hash=f'0x{rng.getrandbits(256):064x}' if minted else '',
+                nft_owner_wallet=producer.wallet_address if minted else '',
+            ))
+    Animal.objects.bulk_create(animals, batch_size=1000)
+    animals = list(Animal.objects.filter(ear_tag__startswith='BENCH').select_related('owner').order_by('id'))
+    dataset.minted_ids = [animal.id for animal in animals if animal.token_id]
+    dataset.unminted = [animal for animal in animals if not animal.token_id]
+
+    herd_animals = {}
+    for animal in animals:
+        herd_animals.setdefault(animal.owner_id, []).append(animal)
+
+    batches = []
+    for producer in producers:
+        for index in range(batches_per_herd):
+            batches.append(Batch(
+                name=f'BENCH Lote {producer.id}-{index}', origin=f'Establecimiento {producer.id}',
+                destination=f'Frigorífico {index % 3}', status=rng.choice(BATCH_STATUSES), created_by=producer
+            ))
+    Batch.objects.bulk_create(batches, batch_size=1000)
+    Membership = Batch.animals.through
+    memberships = []
+    for batch in Batch.objects.filter(name__startswith='BENCH Lote ').order_by('id'):
+        for animal in rng.sample(herd_animals[batch.created_by_id], min(20, len(herd_animals[batch.created_by_id]))):
+            memberships.append(Membership(batch_id=batch.id, animal_id=animal.id))
+    Membership.objects.bulk_create(memberships, batch_size=1000, ignore_conflicts=True)
+
+    devices = []
+    for producer in producers:
+        devices.append(IoTDevice(
+            device_id=f'BENCH-DEV-{producer.id}', device_type='MULTI', name=f'Collar {producer.id}',
+            owner=producer, battery_level=rng.randrange(5, 100), auth_token=f'bench-token-{producer.id}'
+        ))
+    IoTDevice.objects.bulk_create(devices)
+    devices = list(IoTDevice.objects.filter(device_id__startswith='BENCH-DEV-').order_by('id'))
+    dataset.devices = [
+        (device.device_id, device.auth_token, [animal.ear_tag for animal in herd_animals[device.owner_id]])
+        for device in devices
+    ]
+
+    gps_rows, health_rows = [], []
+    steps = sensor_days * readings_per_day
+    for device in devices:
+        for animal in herd_animals[device.owner_id]:
+            for step in range(steps):
+                timestamp = EPOCH - timedelta(hours=step * 24 / readings_per_day)
+                gps_rows.append(GPSData(
+                    device=device, animal=animal, timestamp=timestamp,
+                    latitude=Decimal(-34000000 - rng.randrange(500000)) / 1000000,
+                    longitude=Decimal(-58000000 - rng.randrange(500000)) / 1000000,
+                ))
+                health_rows.append(HealthSensorData(
+                    device=device, animal=animal, timestamp=timestamp,
+                    heart_rate=rng.randrange(50, 90), temperature=Decimal(rng.randrange(3750, 3950)) / 100,
+                    movement_activity=Decimal(rng.randrange(0, 10000)) / 100,
+                ))
+    GPSData.objects.bulk_create(gps_rows, batch_size=2000)
+    HealthSensorData.objects.bulk_create(health_rows, batch_size=2000)
+
+    records, events = [], []
+    for animal in animals:
+        records.append(AnimalHealthRecord(
+            animal=animal, health_status=animal.health_status, temperature=Decimal('38.50'), heart_rate=70
+        ))
+        if animal.token_id:
+            for event_type in ('MINT', 'TRANSFER', 'HEALTH_UPDATE'):
+                events.append(BlockchainEvent(
+                    event_type=event_type, animal=animal, transaction_hash=f'0x{rng.getrandbits(256):064x}',
+                    block_number=rng.randrange(1_000_000, 2_000_000), from_address=animal.nft_owner_wallet,
+                    to_address=animal.nft_owner_wallet,
+                ))
+    AnimalHealthRecord.objects.bulk_create(records, batch_size=1000)
+    BlockchainEvent.objects.bulk_create(events, batch_size=1000)
+
+    # bulk_create no emite señales: los contadores del dashboard se recalculan desde las tablas
+    reconcile_counters()
+    return dataset
+
+
+def eth_tester_service():
+    """``BlockchainService`` sobre eth-tester con una cuenta admin fondeada.
+
+    Sin RPC ni artifacts de Hardhat: el contrato NFT se reemplaza por una
+    dirección con el ABI de ``mintAnimal``, así que se miden la construcción,
+    la firma, el nonce y el envío de la transacción, no la ejecución del contrato.
+    """
+    from web3 import EthereumTesterProvider, Web3
+
+    from blockchain.services import BlockchainService
+
+    w3 = Web3(EthereumTesterProvider())
+    account = w3.eth.account.create()
+    w3.eth.send_transaction({'from': w3.eth.accounts[0], 'to': account.address, 'value': w3.to_wei(10000, 'ether')})
+
+    service = BlockchainService.__new__(BlockchainService)
+    service.w3 = w3
+    service.admin_account = account
+    service.wallet_address = account.address
+    service.private_key = account.key
+    service.nft_abi = MINT_ABI
+    service.nft_contract = w3.eth.contract(address=Web3.to_checksum_address('0x' + '2' * 40), abi=MINT_ABI)
+    return service
+
+
+# ==============================================================================
+# ESCENARIOS
+# ==============================================================================
+
+class Scenario:
+    """Un escenario prepara un cliente por hilo y ejecuta una petición por llamada."""
+
+    name = None
+    # Los escenarios que comparten una cuenta firmante corren en un solo hilo
+    max_concurrency = None
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.last_failure = None
+
+    def client(self, worker):
+        from rest_framework.test import APIClient
+
+        return APIClient()
+
+    def request(self, client, rng, index):
+        """Ejecutar una petición; devuelve True si fue exitosa."""
+        raise NotImplementedError
+
+    def succeeded(self, response):
+        """True si la respuesta es 2xx; si no, guarda el motivo para el reporte."""
+        if 200 <= response.status_code < 300:
+            return True
+        body = getattr(response, 'data', None) or response.content[:200]
+        self.last_failure = f'HTTP {response.status_code}: {body}'
+        return False
+
+
+class IoTIngestScenario(Scenario):
+    name = 'iot_ingest'
+
+    def request(self, client, rng, index):
+        device_id, token, ear_tags = self.dataset.devices[index % len(self.dataset.devices)]
+        ear_tag = rng.choice(ear_tags)
+        payload = {
+            'gps_data': {
+                'device_id': device_id, 'animal_ear_tag': ear_tag,
+                'latitude': f'{-34 - rng.random() / 2:.6f}', 'longitude': f'{-58 - rng.random() / 2:.6f}',
+            },
+            'health_data': {
+                'device_id': device_id, 'animal_ear_tag': ear_tag,
+                'heart_rate': rng.randrange(50, 110), 'temperature': f'{rng.uniform(37.5, 40.5):.2f}',
+            },
+        }
+        response = client.post(
+            '/api/iot/ingest/', payload, format='json', HTTP_X_DEVICE_ID=device_id, HTTP_X_DEVICE_TOKEN=token
+        )
+        return self.succeeded(response)
+
+
+class QRVerifyScenario(Scenario):
+    name = 'qr_verify'
+
+    def request(self, client, rng, index):
+        animal_id = rng.choice(self.dataset.minted_ids)
+        response = client.get('/api/consumer/verify/', {'qr': f'GANADOCHAIN_ANIMAL_{animal_id}'})
+        if not self.succeeded(response):
+            return False
+        if response.data.get('verified') is not True:
+            self.last_failure = f'animal {animal_id} no verificado'
+            return False
+        return True
+
+
+class AnimalListScenario(Scenario):
+    name = 'animal_list'
+
+    def client(self, worker):
+        client = super().client(worker)
+        client.force_authenticate(self.dataset.producers[worker % len(self.dataset.producers)])
+        return client
+
+    def request(self, client, rng, index):
+        from rest_framework.settings import api_settings
+
+        # Solo páginas que existen: una fuera de rango es un 404, no una medición
+        pages = max(1, -(-self.dataset.animals_per_herd // api_settings.PAGE_SIZE))
+        response = client.get('/api/cattle/animals/', {'page': rng.randrange(1, min(pages, 3) + 1)})
+        return self.succeeded(response)
+
+
+class DashboardStatsScenario(AnimalListScenario):
+    name = 'dashboard_stats'
+
+    def request(self, client, rng, index):
+        return self.succeeded(client.get('/api/core/dashboard/stats/'))
+
+
+class BlockchainMintScenario(Scenario):
+    name = 'blockchain_mint'
+    max_concurrency = 1
+
+    def __init__(self, dataset):
+        super().__init__(dataset)
+        self.service = eth_tester_service()
+
+    def client(self, worker):
+        return self.service
+
+    def request(self, service, rng, index):
+        animal = self.dataset.unminted[index % len(self.dataset.unminted)]
+        result = service.mint_and_associate_animal(animal)
+        if not result['success']:
+            self.last_failure = result.get('error') or f'mint del animal {animal.id} fallido'
+        return result['success']
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (IoTIngestScenario, QRVerifyScenario, AnimalListScenario, DashboardStatsScenario,
+                     BlockchainMintScenario)
+}
+
+
+# ==============================================================================
+# EJECUCIÓN
+# ==============================================================================
+
+def _percentile(ordered, q):
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _drive(scenario, requests, concurrency, seed, strict=False):
+    """Repartir ``requests`` peticiones entre hilos; devuelve muestras y duración.
+
+    Con ``strict`` la primera petición fallida corta la corrida con ``BenchmarkError``.
+    """
+    per_worker = [requests // concurrency + (1 if worker < requests % concurrency else 0)
+                  for worker in range(concurrency)]
+    samples = [[] for _ in range(concurrency)]
+    failures = []
+
+    def worker(number):
+        rng = random.Random(seed * 1000 + number)
+        client = scenario.client(number)
+        counter = _QueryCounter()
+        try:
+            with connection.execute_wrapper(counter):
+                for index in range(number, number + per_worker[number] * concurrency, concurrency):
+                    before = counter.count
+                    started = time.perf_counter_ns()
+                    try:
+                        ok = scenario.request(client, rng, index)
+                    except Exception as e:
+                        logger.error(f"Error en escenario {scenario.name}: {str(e)}")
+                        scenario.last_failure = f'{type(e).__name__}: {str(e)}'
+                        ok = False
+                    if strict and not ok:
+                        raise BenchmarkError(
+                            f'{scenario.name}: la petición {index} falló ({scenario.last_failure or "sin detalle"})'
+                        )
+                    samples[number].append(((time.perf_counter_ns() - started) / 1e6, counter.count - before, ok))
+        except Exception as e:
+            failures.append(e)
+        finally:
+            if concurrency > 1:
+                connections.close_all()
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        # Un solo hilo corre en el actual: ve la misma conexión (y transacción) que quien llama
+        worker(0)
+    else:
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    duration = time.perf_counter() - started
+    if failures:
+        raise failures[0]
+    return [sample for worker_samples in samples for sample in worker_samples], duration
+
+
+def run_scenario(scenario, requests=200, concurrency=1, seed=42, warmup=10, memory_requests=50):
+    """Medir un escenario; devuelve un diccionario de resultados serializable."""
+    concurrency = max(1, min(concurrency, scenario.max_concurrency or concurrency))
+    for cache in caches.all():
+        cache.clear()
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        # BlockchainService escribe su progreso con print()
+        if warmup:
+            # El calentamiento valida el escenario: cualquier fallo aborta la medición
+            _drive(scenario, warmup, 1, seed + 1, strict=True)
+        samples, duration = _drive(scenario, requests, concurrency, seed)
+
+        tracemalloc.start()
+        try:
+            _drive(scenario, min(memory_requests, requests), 1, seed + 2)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[1] for sample in samples]
+    return {
+        'requests': len(samples),
+        'concurrency': concurrency,
+        'errors': sum(1 for sample in samples if not sample[2]),
+        'duration_s': round(duration, 4),
+        'throughput_rps': round(len(samples) / duration, 2) if duration else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(_percentile(latencies, 0.50), 3),
+            'p95': round(_percentile(latencies, 0.95), 3),
+            'p99': round(_percentile(latencies, 0.99), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        },
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline):
+    """Diferencias contra una corrida anterior: ``{escenario: {métrica: (antes, ahora, %)}}``."""
+    changes = {}
+    for name, current in results.get('scenarios', {}).items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        metrics = {
+            'throughput_rps': (previous['throughput_rps'], current['throughput_rps']),
+            'p95_ms': (previous['latency_ms']['p95'], current['latency_ms']['p95']),
+            'queries_mean': (previous['queries']['mean'], current['queries']['mean']),
+            'peak_memory_kb': (previous['peak_memory_kb'], current['peak_memory_kb']),
+        }
+        changes[name] = {
+            metric: (before, after, round((after - before) * 100.0 / before, 1) if before else None)
+            for metric, (before, after) in metrics.items()
+        }
+    return changes
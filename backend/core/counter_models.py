@@ -0,0 +1,37 @@
+from django.db import models
+
+
+class MetricCounter(models.Model):
+    """Contador materializado para estadísticas de dashboard.
+
+    Cada fila guarda el valor agregado (conteo o suma) de una métrica para
+    una dimensión concreta, opcionalmente acotado a un usuario propietario.
+    Cada clave se reparte en varias filas (``shard``) para que las escrituras
+    concurrentes no compitan por el mismo bloqueo; el valor es la suma de
+    sus fragmentos. Las filas se mantienen con señales (``core.counters``) y
+    se reparan con el comando ``reconcile_counters``.
+    """
+    metric = models.CharField(max_length=100)
+    dimension = models.CharField(max_length=150, blank=True, default='')
+    user_scope = models.BigIntegerField(default=0, help_text="ID del usuario propietario; 0 = global")
+    shard = models.PositiveSmallIntegerField(default=0, help_text="Fragmento de la clave; el valor total es la suma de fragmentos")
+    value = models.DecimalField(max_digits=36, decimal_places=8, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Contador de Métrica"
+        verbose_name_plural = "Contadores de Métricas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['metric', 'dimension', 'user_scope', 'shard'],
+                name='unique_metric_counter_shard'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user_scope', 'metric'], name='core_metric_scope_idx'),
+        ]
+
+    def __str__(self):
+        scope = f"user:{self.user_scope}" if self.user_scope else "global"
+        dimension = f"[{self.dimension}]" if self.dimension else ""
+        return f"{self.metric}{dimension} ({scope}#{self.shard}) = {self.value}"
@@ -0,0 +1,436 @@
+# backend/core/counters.py
+"""
+Contadores materializados para los endpoints de estadísticas.
+
+Cada ``CounterSpec`` describe un agregado (conteo o suma) sobre un modelo,
+opcionalmente desglosado por un campo (``group_by``) y acotado por usuario
+propietario (``owner``). Las señales de modelo aplican deltas sobre
+``MetricCounter`` en cada alta, cambio o baja, y ``reconcile_counters``
+recalcula los valores desde las tablas origen para reparar la deriva que
+producen las escrituras que no emiten señales (``update()``,
+``bulk_create()``, SQL directo).
+
+Cada clave se reparte en ``METRIC_COUNTER_SHARDS`` filas: cada escritura
+incrementa un fragmento al azar, de modo que las altas concurrentes de
+GPS o salud no se serializan sobre la misma fila global, y la lectura
+suma los fragmentos.
+
+Los contadores con propietario a través de una relación
+(``animal__owner_id``) se trasladan al nuevo dueño cuando cambia el
+propietario de la fila relacionada (un animal vendido se lleva sus lecturas
+de GPS y salud). Las rutas de más de un salto no se siguen y derivan hasta
+la siguiente reconciliación.
+
+Ajustes:
+    METRIC_COUNTER_SHARDS: fragmentos por clave (1 = sin fragmentar).
+"""
+import logging
+import random
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .counter_models import MetricCounter
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = 0
+DEFAULT_SHARDS = 16
+
+
+@dataclass(frozen=True)
+class CounterSpec:
+    """Definición de un contador materializado."""
+    metric: str
+    model: str
+    where: dict = field(default_factory=dict)
+    group_by: str = None
+    owner: str = None
+    sum_field: str = None
+
+    @property
+    def paths(self):
+        """Rutas de campo necesarias para evaluar la contribución de una fila."""
+        paths = {_split_lookup(lookup)[0] for lookup in self.where}
+        paths.update(p for p in (self.group_by, self.owner, self.sum_field) if p)
+        return sorted(paths)
+
+
+COUNTERS = [
+    # Ganado
+    CounterSpec('cattle.animals', 'cattle.Animal', owner='owner_id'),
+    CounterSpec('cattle.animals.health_status', 'cattle.Animal', group_by='health_status', owner='owner_id'),
+    CounterSpec('cattle.animals.breed', 'cattle.Animal', group_by='breed', owner='owner_id'),
+    CounterSpec('cattle.animals.minted', 'cattle.Animal', where={'token_id__isnull': False}, owner='owner_id'),
+    CounterSpec('cattle.batches', 'cattle.Batch', owner='created_by_id'),
+    CounterSpec('cattle.batches.status', 'cattle.Batch', group_by='status', owner='created_by_id'),
+
+    # IoT
+    CounterSpec('iot.devices', 'iot.IoTDevice', owner='owner_id'),
+    CounterSpec('iot.devices.status', 'iot.IoTDevice', group_by='status', owner='owner_id'),
+    CounterSpec('iot.devices.type', 'iot.IoTDevice', group_by='device_type', owner='owner_id'),
+    CounterSpec('iot.devices.low_battery', 'iot.IoTDevice', where={'battery_level__lt': 20}, owner='owner_id'),
+    CounterSpec('iot.devices.battery_reported', 'iot.IoTDevice', where={'battery_level__isnull': False}, owner='owner_id'),
+    CounterSpec('iot.devices.battery_sum', 'iot.IoTDevice', sum_field='battery_level', owner='owner_id'),
+    CounterSpec('iot.gps_data', 'iot.GPSData', owner='animal__owner_id'),
+    CounterSpec('iot.health_data', 'iot.HealthSensorData', owner='animal__owner_id'),
+    CounterSpec('iot.health_data.alerts', 'iot.HealthSensorData', where={'health_alert': True}, owner='animal__owner_id'),
+    CounterSpec('iot.device_events', 'iot.DeviceEvent', owner='device__owner_id'),
+    CounterSpec('iot.device_events.unresolved', 'iot.DeviceEvent', where={'resolved': False}, owner='device__owner_id'),
+
+    # Usuarios
+    CounterSpec('users.users', 'users.User'),
+
+    # Blockchain
+    CounterSpec('blockchain.events', 'blockchain.BlockchainEvent'),
+    CounterSpec('blockchain.events.type', 'blockchain.BlockchainEvent', group_by='event_type'),
+    CounterSpec('blockchain.interactions', 'blockchain.ContractInteraction'),
+    CounterSpec('blockchain.interactions.status', 'blockchain.ContractInteraction', group_by='status'),
+    CounterSpec('blockchain.interactions.contract_type', 'blockchain.ContractInteraction', group_by='contract_type'),
+    CounterSpec('blockchain.interactions.gas_used', 'blockchain.ContractInteraction', sum_field='gas_used'),
+    CounterSpec('blockchain.gas_prices', 'blockchain.GasPriceHistory'),
+    CounterSpec('blockchain.gas_prices.sum', 'blockchain.GasPriceHistory', sum_field='gas_price'),
+    CounterSpec('blockchain.contracts.active', 'blockchain.SmartContract', where={'is_active': True}),
+    CounterSpec('blockchain.tx_pool.status', 'blockchain.TransactionPool', group_by='status'),
+
+    # Mercado
+    CounterSpec('market.listings.active', 'blockchain.MarketListing', where={'is_active': True}),
+    CounterSpec('market.listings.active.currency', 'blockchain.MarketListing', where={'is_active': True}, group_by='currency'),
+    CounterSpec('market.listings.active.breed', 'blockchain.MarketListing', where={'is_active': True}, group_by='animal__breed'),
+    CounterSpec('market.listings.active.price_sum', 'blockchain.MarketListing', where={'is_active': True}, sum_field='price'),
+    CounterSpec('market.trades', 'blockchain.Trade'),
+    CounterSpec('market.trades.volume', 'blockchain.Trade', sum_field='price'),
+    CounterSpec('market.trades.fees', 'blockchain.Trade', sum_field='platform_fee'),
+    CounterSpec('market.trades.day', 'blockchain.Trade', group_by='trade_date__date'),
+
+    # Gobernanza
+    CounterSpec('governance.proposals', 'blockchain.GovernanceProposal'),
+    CounterSpec('governance.proposals.status', 'blockchain.GovernanceProposal', group_by='status'),
+    CounterSpec('governance.proposals.type', 'blockchain.GovernanceProposal', group_by='proposal_type'),
+    CounterSpec('governance.votes', 'blockchain.Vote'),
+    CounterSpec('governance.votes.voter', 'blockchain.Vote', group_by='voter_id'),
+]
+
+_LOOKUPS = {
+    'exact': lambda value, expected: value == expected,
+    'lt': lambda value, expected: value is not None and value < expected,
+    'lte': lambda value, expected: value is not None and value <= expected,
+    'gt': lambda value, expected: value is not None and value > expected,
+    'gte': lambda value, expected: value is not None and value >= expected,
+    'isnull': lambda value, expected: (value is None) == expected,
+    'in': lambda value, expected: value in expected,
+}
+
+
+def _split_lookup(lookup):
+    path, _, operator = lookup.rpartition('__')
+    if path and operator in _LOOKUPS:
+        return path, operator
+    return lookup, 'exact'
+
+
+def _resolve(instance, path):
+    """Resolver una ruta estilo ORM (``animal__owner_id``) sobre una instancia."""
+    value = instance
+    for part in path.split('__'):
+        if value is None:
+            return None
+        if part == 'date' and isinstance(value, datetime):
+            value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+            continue
+        try:
+            value = getattr(value, part)
+        except ObjectDoesNotExist:
+            return None
+    return value
+
+
+def _dimension(value):
+    return '' if value is None else str(value)[:150]
+
+
+def _contributions(spec, getter):
+    """Claves ``(metric, dimension, user_scope)`` y valor que aporta una fila."""
+    for lookup, expected in spec.where.items():
+        path, operator = _split_lookup(lookup)
+        if not _LOOKUPS[operator](getter(path), expected):
+            return {}
+
+    amount = 1 if spec.sum_field is None else getter(spec.sum_field)
+    if amount is None:
+        return {}
+    amount = Decimal(str(amount))
+
+    dimension = _dimension(getter(spec.group_by)) if spec.group_by else ''
+    keys = {(spec.metric, dimension, GLOBAL_SCOPE): amount}
+    if spec.owner:
+        owner_id = getter(spec.owner)
+        if owner_id:
+            keys[(spec.metric, dimension, owner_id)] = amount
+    return keys
+
+
+def _collect(specs, getter):
+    totals = defaultdict(Decimal)
+    for spec in specs:
+        for key, amount in _contributions(spec, getter).items():
+            totals[key] += amount
+    return totals
+
+
+def _shard_count():
+    return max(1, getattr(settings, 'METRIC_COUNTER_SHARDS', DEFAULT_SHARDS))
+
+
+def apply_deltas(deltas):
+    """Aplicar incrementos atómicos (``F()``) sobre un fragmento de cada contador.
+
+    Las claves se recorren en orden para que dos escrituras concurrentes
+    bloqueen las filas en la misma secuencia.
+    """
+    now = timezone.now()
+    shard = random.randrange(_shard_count())
+    try:
+        with transaction.atomic():
+            for (metric, dimension, scope), delta in sorted(deltas.items()):
+                if not delta:
+                    continue
+                lookup = {'metric': metric, 'dimension': dimension, 'user_scope': scope, 'shard': shard}
+                updated = MetricCounter.objects.filter(**lookup).update(value=F('value') + delta, updated_at=now)
+                if updated:
+                    continue
+                try:
+                    with transaction.atomic():
+                        MetricCounter.objects.create(value=delta, **lookup)
+                except IntegrityError:
+                    # Otro proceso creó la fila entre el UPDATE y el INSERT
+                    MetricCounter.objects.filter(**lookup).update(value=F('value') + delta, updated_at=now)
+    except Exception as e:
+        # La deriva se corrige con reconcile_counters
+        logger.error(f"Error actualizando contadores: {str(e)}")
+
+
+# ==============================================================================
+# SEÑALES
+# ==============================================================================
+
+_specs_by_model = defaultdict(list)
+# Modelo propietario -> [(spec, relación, campo de dueño)] de los contadores
+# cuyo dueño se alcanza a través de una relación (``animal__owner_id``)
+_followers_by_model = defaultdict(list)
+
+
+def _capture_previous(sender, instance, raw=False, **kwargs):
+    # Un alta no tiene fila previa: las inserciones de GPS o salud no consultan
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    specs = _specs_by_model[sender]
+    owner_fields = sorted({owner_field for _, _, owner_field in _followers_by_model[sender]})
+    paths = sorted({path for spec in specs for path in spec.paths}.union(owner_fields))
+    if not paths:
+        # Conteos simples: una actualización nunca cambia su contribución
+        instance._counter_previous = _collect(specs, lambda path: None)
+        return
+    row = sender._base_manager.filter(pk=instance.pk).values(*paths).first()
+    if row:
+        instance._counter_previous = _collect(specs, row.get)
+        instance._counter_previous_owners = {owner_field: row[owner_field] for owner_field in owner_fields}
+
+
+def _move_owned_rows(deltas, spec, relation, pk, old_owner, new_owner):
+    """Pasar de ``old_owner`` a ``new_owner`` lo que aportan las filas que cuelgan de ``pk``."""
+    queryset = apps.get_model(spec.model)._base_manager.filter(**spec.where, **{relation: pk}).order_by()
+    aggregate = Sum(spec.sum_field) if spec.sum_field else Count('pk')
+    if spec.group_by:
+        rows = queryset.values(spec.group_by).annotate(value=aggregate)
+    else:
+        rows = [queryset.aggregate(value=aggregate)]
+
+    for row in rows:
+        if not row['value']:
+            continue
+        dimension = _dimension(row[spec.group_by]) if spec.group_by else ''
+        amount = Decimal(str(row['value']))
+        if old_owner:
+            key = (spec.metric, dimension, old_owner)
+            deltas[key] = deltas.get(key, 0) - amount
+        if new_owner:
+            key = (spec.metric, dimension, new_owner)
+            deltas[key] = deltas.get(key, 0) + amount
+
+
+def _on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.__dict__.pop('_counter_previous', {})
+    previous_owners = instance.__dict__.pop('_counter_previous_owners', {})
+    current = _collect(_specs_by_model[sender], lambda path: _resolve(instance, path))
+    deltas = {
+        key: current.get(key, 0) - previous.get(key, 0)
+        for key in set(previous) | set(current)
+    }
+    for spec, relation, owner_field in _followers_by_model[sender]:
+        if owner_field not in previous_owners:
+            continue
+        old_owner, new_owner = previous_owners[owner_field], getattr(instance, owner_field)
+        if old_owner != new_owner:
+            _move_owned_rows(deltas, spec, relation, instance.pk, old_owner, new_owner)
+    apply_deltas(deltas)
+
+
+def _on_delete(sender, instance, **kwargs):
+    current = _collect(_specs_by_model[sender], lambda path: _resolve(instance, path))
+    apply_deltas({key: -amount for key, amount in current.items()})
+
+
+def connect_counter_signals():
+    """Conectar las señales de los modelos que alimentan contadores."""
+    _specs_by_model.clear()
+    _followers_by_model.clear()
+    for spec in COUNTERS:
+        try:
+            model = apps.get_model(spec.model)
+        except LookupError:
+            continue
+        _specs_by_model[model].append(spec)
+
+        relation, _, owner_field = (spec.owner or '').partition('__')
+        if owner_field and '__' not in owner_field:
+            owner_model = model._meta.get_field(relation).related_model
+            _followers_by_model[owner_model].append((spec, relation, owner_field))
+
+    for model in set(_specs_by_model) | set(_followers_by_model):
+        uid = f'core.counters.{model._meta.label_lower}'
+        pre_save.connect(_capture_previous, sender=model, dispatch_uid=f'{uid}.pre_save')
+        post_save.connect(_on_save, sender=model, dispatch_uid=f'{uid}.post_save')
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f'{uid}.post_delete')
+
+
+# ==============================================================================
+# LECTURA
+# ==============================================================================
+
+class CounterSnapshot:
+    """Valores de contadores cargados en una sola consulta."""
+
+    def __init__(self, rows):
+        self._values = defaultdict(dict)
+        for metric, dimension, value in rows:
+            self._values[metric][dimension] = value
+
+    def value(self, metric, dimension=''):
+        return self._values.get(metric, {}).get(dimension, Decimal('0'))
+
+    def count(self, metric, dimension=''):
+        return int(self.value(metric, dimension))
+
+    def breakdown(self, metric):
+        """Desglose ``{dimensión: conteo}`` omitiendo dimensiones en cero."""
+        return {
+            dimension: int(value)
+            for dimension, value in self._values.get(metric, {}).items()
+            if value
+        }
+
+    def average(self, sum_metric, count_metric):
+        count = self.value(count_metric)
+        return float(self.value(sum_metric) / count) if count else 0
+
+
+def load_counters(metrics, user=None):
+    """Cargar los contadores indicados, globales o de un usuario."""
+    scope = GLOBAL_SCOPE if user is None else user.pk
+    rows = MetricCounter.objects.filter(
+        user_scope=scope, metric__in=list(metrics)
+    ).order_by().values('metric', 'dimension').annotate(total=Sum('value')).values_list('metric', 'dimension', 'total')
+    return CounterSnapshot(rows)
+
+
+def count_dimensions(metric, user=None):
+    """Número de dimensiones con valor distinto de cero (p. ej. votantes únicos)."""
+    scope = GLOBAL_SCOPE if user is None else user.pk
+    return MetricCounter.objects.filter(
+        metric=metric, user_scope=scope
+    ).order_by().values('dimension').annotate(total=Sum('value')).exclude(total=0).count()
+
+
+# ==============================================================================
+# RECONCILIACIÓN
+# ==============================================================================
+
+def _ground_truth(spec, model):
+    queryset = model._base_manager.filter(**spec.where).order_by()
+    aggregate = Sum(spec.sum_field) if spec.sum_field else Count('pk')
+    group_fields = [f for f in (spec.group_by, spec.owner) if f]
+
+    truth = defaultdict(Decimal)
+    if not group_fields:
+        value = queryset.aggregate(value=aggregate)['value']
+        if value is not None:
+            truth[(spec.metric, '', GLOBAL_SCOPE)] = Decimal(str(value))
+        return truth
+
+    for row in queryset.values(*group_fields).annotate(value=aggregate):
+        if row['value'] is None:
+            continue
+        dimension = _dimension(row[spec.group_by]) if spec.group_by else ''
+        amount = Decimal(str(row['value']))
+        truth[(spec.metric, dimension, GLOBAL_SCOPE)] += amount
+        owner_id = row[spec.owner] if spec.owner else None
+        if owner_id:
+            truth[(spec.metric, dimension, owner_id)] += amount
+    return truth
+
+
+def reconcile_counters(metrics=None):
+    """Recontar desde las tablas origen y corregir los contadores con deriva.
+
+    Devuelve un diccionario ``{métrica: filas corregidas}``.
+    """
+    repaired = {}
+    for spec in COUNTERS:
+        if metrics and spec.metric not in metrics:
+            continue
+        try:
+            model = apps.get_model(spec.model)
+        except LookupError:
+            continue
+
+        now = timezone.now()
+        with transaction.atomic():
+            stored = defaultdict(list)
+            for row in MetricCounter.objects.select_for_update().filter(metric=spec.metric).order_by('pk'):
+                stored[(row.metric, row.dimension, row.user_scope)].append(row)
+            truth = _ground_truth(spec, model)
+
+            # El valor correcto queda en un fragmento y el resto vuelve a cero
+            to_create, to_update = [], []
+            for key in set(truth) | set(stored):
+                value = truth.get(key, Decimal('0'))
+                rows = stored.get(key, [])
+                if sum((row.value for row in rows), Decimal('0')) == value:
+                    continue
+                if not rows:
+                    metric, dimension, scope = key
+                    to_create.append(MetricCounter(metric=metric, dimension=dimension, user_scope=scope, value=value))
+                    continue
+                for index, row in enumerate(rows):
+                    row.value, row.updated_at = (value if index == 0 else Decimal('0')), now
+                    to_update.append(row)
+
+            MetricCounter.objects.bulk_create(to_create, batch_size=1000)
+            MetricCounter.objects.bulk_update(to_update, ['value', 'updated_at'], batch_size=1000)
+
+        repaired[spec.metric] = len(to_create) + len(to_update)
+        if repaired[spec.metric]:
+            logger.info(f"Contador {spec.metric}: {repaired[spec.metric]} filas corregidas")
+    return repaired
@@ -0,0 +1,81 @@
+# backend/core/data_versions.py
+"""
+Versiones de datos por modelo.
+
+Cada alta, cambio o baja de un modelo registrado incrementa, al confirmarse
+la transacción, un contador en la caché compartida. Quien guarda resultados
+derivados (artefactos de reportes, ajustes de pronósticos) compara versiones
+con una sola lectura de caché en lugar de recorrer las tablas con MAX/COUNT.
+Las altas y las reescrituras (cambios y bajas) se cuentan por separado, de
+modo que un consumidor incremental sabe si solo hubo inserciones.
+
+Si la caché pierde un contador (expulsión, reinicio) se reinicia con la hora
+actual en nanosegundos, así nunca vuelve a un valor ya visto. Las escrituras
+que no emiten señales (``update()``, ``bulk_create()``) no cambian la versión;
+los consumidores acotan además la vida de sus resultados.
+"""
+import logging
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+VERSION_PREFIX = 'data-version:'
+INSERTS = 'inserts'
+REWRITES = 'rewrites'
+
+
+def _key(label, kind):
+    return f'{VERSION_PREFIX}{label}:{kind}'
+
+
+def bump_version(label, kind):
+    """Incrementar la versión ``kind`` (altas o reescrituras) de un modelo."""
+    key = _key(label, kind)
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+    except Exception as e:
+        logger.error(f"Error actualizando versión de datos {label}: {str(e)}")
+
+
+def data_versions(models):
+    """``{etiqueta: (altas, reescrituras)}`` de los modelos, en una lectura de caché."""
+    keys = {
+        _key(model._meta.label, kind): (model._meta.label, kind)
+        for model in models for kind in (INSERTS, REWRITES)
+    }
+    values = cache.get_many(list(keys))
+    for key in keys.keys() - values.keys():
+        cache.add(key, time.time_ns(), None)
+        values[key] = cache.get(key)
+
+    versions = {}
+    for model in models:
+        label = model._meta.label
+        versions[label] = (values.get(_key(label, INSERTS)) or 0, values.get(_key(label, REWRITES)) or 0)
+    return versions
+
+
+def _on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(partial(bump_version, sender._meta.label, INSERTS if created else REWRITES))
+
+
+def _on_delete(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_version, sender._meta.label, REWRITES))
+
+
+def track_data_versions(*models):
+    """Mantener la versión de datos de los modelos indicados."""
+    for model in models:
+        uid = f'core.data_versions.{model._meta.label_lower}'
+        post_save.connect(_on_save, sender=model, dispatch_uid=f'{uid}.post_save')
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f'{uid}.post_delete')
@@ -0,0 +1,160 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core.benchmark import SCENARIOS, BenchmarkError, compare, run_scenario, seed_dataset
+
+# Hilos de volcado en segundo plano que escribirían en la base durante la medición
+BACKGROUND_INTERVALS = [
+    'CONSUMER_QUOTA_FLUSH_INTERVAL', 'SCAN_ANALYTICS_FLUSH_INTERVAL', 'QR_MATERIALIZE_DEBOUNCE',
+    'MARKET_EXPIRY_INTERVAL', 'HEALTH_SAMPLE_INTERVAL', 'REQUEST_METRICS_FLUSH_INTERVAL',
+    'ANALYTICS_CUBE_REFRESH_INTERVAL',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Siembra un conjunto sintético determinista en una base de pruebas y mide rendimiento, '
+        'latencia, consultas y memoria de los endpoints críticos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            choices=sorted(SCENARIOS),
+            help='Escenario a medir (se puede repetir). Por defecto, todos.'
+        )
+        parser.add_argument(
+            '--concurrency',
+            action='append',
+            type=int,
+            dest='concurrency',
+            help='Hilos concurrentes (se puede repetir). Por defecto, 1 y 4.'
+        )
+        parser.add_argument('--requests', type=int, default=200, help='Peticiones por escenario y concurrencia')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--herds', type=int, default=10, help='Productores con rebaño propio')
+        parser.add_argument('--animals-per-herd', type=int, default=100)
+        parser.add_argument('--sensor-days', type=int, default=7, help='Días de historial de sensores por animal')
+        parser.add_argument('--output', help='Archivo JSON donde guardar los resultados')
+        parser.add_argument('--baseline', help='Archivo JSON de una corrida anterior para comparar')
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            help='Fallar si p95 o rendimiento empeoran más de este porcentaje, o si suben las consultas'
+        )
+
+    def handle(self, *args, **options):
+        concurrency_levels = options['concurrency'] or [1, 4]
+        names = options['scenarios'] or list(SCENARIOS)
+
+        # SQLite en memoria no admite escrituras concurrentes entre hilos: usar un archivo temporal
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'ganadochain_benchmark.sqlite3')
+
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(**dict.fromkeys(BACKGROUND_INTERVALS)):
+                dataset = seed_dataset(
+                    seed=options['seed'], herds=options['herds'], animals_per_herd=options['animals_per_herd'],
+                    sensor_days=options['sensor_days']
+                )
+                self.stdout.write(
+                    f'Conjunto sembrado: {len(dataset.producers)} rebaños, '
+                    f'{len(dataset.minted_ids) + len(dataset.unminted)} animales, {len(dataset.devices)} dispositivos'
+                )
+                scenarios = self._run(names, dataset, concurrency_levels, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results = {'meta': self._meta(options, concurrency_levels), 'scenarios': scenarios}
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                self._report_changes(compare(results, json.load(f)), options['max_regression'])
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f'Resultados guardados en {options["output"]}')
+
+        self.stdout.write(self.style.SUCCESS(f'Benchmark de la API completado: {len(scenarios)} mediciones.'))
+
+    def _run(self, names, dataset, concurrency_levels, options):
+        scenarios = {}
+        for name in names:
+            try:
+                scenario = SCENARIOS[name](dataset)
+            except ImportError as e:
+                self.stdout.write(self.style.WARNING(f'  {name}: omitido ({str(e)})'))
+                continue
+            for concurrency in concurrency_levels:
+                try:
+                    result = run_scenario(scenario, requests=options['requests'], concurrency=concurrency,
+                                          seed=options['seed'])
+                except BenchmarkError as e:
+                    raise CommandError(f'Escenario roto, no se mide: {str(e)}')
+                key = f'{name}@{result["concurrency"]}'
+                if key in scenarios:
+                    continue
+                scenarios[key] = result
+                latency = result['latency_ms']
+                self.stdout.write(
+                    f'  {key}: {result["throughput_rps"]} req/s, p50 {latency["p50"]} ms, '
+                    f'p95 {latency["p95"]} ms, p99 {latency["p99"]} ms, '
+                    f'{result["queries"]["mean"]} consultas/req, {result["peak_memory_kb"]} KB pico, '
+                    f'{result["errors"]} errores'
+                )
+        return scenarios
+
+    def _meta(self, options, concurrency_levels):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+            ).stdout.strip() or None
+        except Exception:
+            commit = None
+        return {
+            'commit': commit,
+            'seed': options['seed'],
+            'herds': options['herds'],
+            'animals_per_herd': options['animals_per_herd'],
+            'sensor_days': options['sensor_days'],
+            'requests': options['requests'],
+            'concurrency': concurrency_levels,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        }
+
+    def _report_changes(self, changes, max_regression):
+        regressions = []
+        for key, metrics in changes.items():
+            self.stdout.write(f'  {key}:')
+            for metric, (before, after, delta) in metrics.items():
+                self.stdout.write(f'    {metric}: {before} → {after} ({delta:+.1f}%)' if delta is not None
+                                  else f'    {metric}: {before} → {after}')
+            if max_regression is None:
+                continue
+            p95_delta = metrics['p95_ms'][2]
+            throughput_delta = metrics['throughput_rps'][2]
+            if p95_delta is not None and p95_delta > max_regression:
+                regressions.append(f'{key} p95 {p95_delta:+.1f}%')
+            if throughput_delta is not None and throughput_delta < -max_regression:
+                regressions.append(f'{key} rendimiento {throughput_delta:+.1f}%')
+            if metrics['queries_mean'][1] > metrics['queries_mean'][0]:
+                regressions.append(f'{key} consultas {metrics["queries_mean"][0]} → {metrics["queries_mean"][1]}')
+        if regressions:
+            raise CommandError('Regresiones respecto de la línea base: ' + ', '.join(regressions))
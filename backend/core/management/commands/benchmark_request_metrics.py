@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+
+from core.request_metrics import RequestMetrics, RequestMetricsMiddleware
+import core.request_metrics as request_metrics_module
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo por petición de RequestMetricsMiddleware frente a una vista vacía'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000, help='Peticiones a simular')
+        parser.add_argument('--path', default='/api/core/health/', help='Ruta a resolver para cada petición')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        request = RequestFactory().get(options['path'])
+        match = resolve(request.path_info)
+        response = HttpResponse()
+
+        def get_response(req):
+            req.resolver_match = match
+            return response
+
+        # Acumulador propio: no mezclar el benchmark con las métricas del proceso
+        original = request_metrics_module.request_metrics
+        request_metrics_module.request_metrics = RequestMetrics()
+        request_metrics_module.request_metrics._flusher.stop()
+        try:
+            middleware = RequestMetricsMiddleware(get_response)
+            baseline = self._time(get_response, request, iterations)
+            measured = self._time(middleware, request, iterations)
+        finally:
+            request_metrics_module.request_metrics = original
+
+        overhead = (measured - baseline) / iterations * 1e6
+        self.stdout.write(f'  Sin middleware: {baseline / iterations * 1e6:.2f} µs/petición')
+        self.stdout.write(f'  Con middleware: {measured / iterations * 1e6:.2f} µs/petición')
+        self.stdout.write(
+            self.style.SUCCESS(f'Costo del middleware: {overhead:.2f} µs por petición ({iterations} peticiones).')
+        )
+
+    def _time(self, handler, request, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            handler(request)
+        return time.perf_counter() - started
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from core.counters import reconcile_counters
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores materializados del dashboard desde las tablas origen'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--metric',
+            action='append',
+            dest='metrics',
+            help='Métrica a reconciliar (se puede repetir). Por defecto, todas.'
+        )
+
+    def handle(self, *args, **options):
+        repaired = reconcile_counters(options.get('metrics'))
+
+        for metric, rows in repaired.items():
+            if rows:
+                self.stdout.write(f'  {metric}: {rows} filas corregidas')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Reconciliación completa: {len(repaired)} métricas, '
+                f'{sum(repaired.values())} filas corregidas.'
+            )
+        )
@@ -27,4 +27,34 @@ class SystemMetrics(models.Model):
     class Meta:
         verbose_name = "Métrica del Sistema"
         verbose_name_plural = "Métricas del Sistema"
-        ordering = ['-date']
\ No newline at end of file
+        ordering = ['-date']
+
+class RouteMetrics(models.Model):
+    """Latencia y errores por ruta y día (ver ``core.request_metrics``).
+
+    ``histogram`` guarda los buckets log-lineales de latencia (microsegundos)
+    como ``{bucket: cantidad}``; se combinan sumando, así que los volcados de
+    varios procesos y días se agregan sin perder percentiles.
+    """
+    date = models.DateField()
+    route = models.CharField(max_length=255)
+    request_count = models.PositiveBigIntegerField(default=0)
+    client_error_count = models.PositiveBigIntegerField(default=0)
+    error_count = models.PositiveBigIntegerField(default=0, help_text="Respuestas 5xx")
+    total_time_ms = models.FloatField(default=0)
+    max_time_ms = models.FloatField(default=0)
+    query_count = models.PositiveBigIntegerField(default=0)
+    max_queries = models.PositiveIntegerField(default=0)
+    histogram = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Métrica de Ruta"
+        verbose_name_plural = "Métricas de Rutas"
+        ordering = ['-date', 'route']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'route'], name='unique_route_metrics_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.route}: {self.request_count} peticiones"
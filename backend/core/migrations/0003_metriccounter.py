@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_blockchainnetwork_crosschainmanager_starknetcontract_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=100)),
+                ('dimension', models.CharField(blank=True, default='', max_length=150)),
+                ('user_scope', models.BigIntegerField(default=0, help_text='ID del usuario propietario; 0 = global')),
+                ('value', models.DecimalField(decimal_places=8, default=0, max_digits=36)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Contador de Métrica',
+                'verbose_name_plural': 'Contadores de Métricas',
+                'indexes': [models.Index(fields=['user_scope', 'metric'], name='core_metric_scope_idx')],
+                'constraints': [models.UniqueConstraint(fields=('metric', 'dimension', 'user_scope'), name='unique_metric_counter_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_metriccounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('route', models.CharField(max_length=255)),
+                ('request_count', models.PositiveBigIntegerField(default=0)),
+                ('client_error_count', models.PositiveBigIntegerField(default=0)),
+                ('error_count', models.PositiveBigIntegerField(default=0, help_text='Respuestas 5xx')),
+                ('total_time_ms', models.FloatField(default=0)),
+                ('max_time_ms', models.FloatField(default=0)),
+                ('query_count', models.PositiveBigIntegerField(default=0)),
+                ('max_queries', models.PositiveIntegerField(default=0)),
+                ('histogram', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Métrica de Ruta',
+                'verbose_name_plural': 'Métricas de Rutas',
+                'ordering': ['-date', 'route'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'route'), name='unique_route_metrics_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_routemetrics'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='metriccounter',
+            name='unique_metric_counter_key',
+        ),
+        migrations.AddField(
+            model_name='metriccounter',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Fragmento de la clave; el valor total es la suma de fragmentos'),
+        ),
+        migrations.AddConstraint(
+            model_name='metriccounter',
+            constraint=models.UniqueConstraint(fields=('metric', 'dimension', 'user_scope', 'shard'), name='unique_metric_counter_shard'),
+        ),
+    ]
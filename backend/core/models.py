@@ -4,6 +4,7 @@ import re
 from django.core.exceptions import ValidationError
 # En core/models.py, asegúrate de tener:
 from .metrics_models import * # ← Esta línea debe estar
+from .counter_models import MetricCounter
 
 
 def validate_ethereum_address(value):
@@ -0,0 +1,135 @@
+# backend/core/query_guard.py
+"""
+Detector de consultas N+1.
+
+``QueryGuard`` es un ``execute_wrapper`` que reduce cada consulta a su huella
+(el SQL con literales, números y listas ``IN`` normalizados) y la cuenta. Una
+huella que se repite ``QUERY_GUARD_THRESHOLD`` veces o más en la misma
+petición es un N+1: se informa con el número de repeticiones y el primer
+punto del código del proyecto que la repitió (la columna del admin o el
+``SerializerMethodField`` que consulta por fila).
+
+``QueryGuardMiddleware`` aplica el detector a cada petición en desarrollo y en
+tests: con ``QUERY_GUARD = 'log'`` registra un warning y agrega la cabecera
+``X-Query-Count``; con ``'raise'`` lanza ``NPlusOneError``. Con ``None`` el
+middleware se descarta al arrancar y no cuesta nada. En tests, ``query_guard``
+envuelve un bloque y falla si hay N+1 o si se supera un presupuesto de
+consultas.
+
+Ajustes:
+- ``QUERY_GUARD``: ``None``, ``'log'`` o ``'raise'``.
+- ``QUERY_GUARD_THRESHOLD``: repeticiones de una misma huella que cuentan como N+1 (5).
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:%s|\?|NULL)(?:\s*,\s*(?:%s|\?|NULL))*\s*\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+# Frames del propio detector y del middleware de métricas, que envuelven toda consulta
+_WRAPPER_FILES = {
+    os.path.abspath(__file__).rsplit('.', 1)[0],
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'request_metrics'),
+}
+
+NPlusOne = namedtuple('NPlusOne', ['fingerprint', 'count', 'location'])
+
+
+class NPlusOneError(AssertionError):
+    """Consultas repetidas por fila o presupuesto de consultas superado."""
+
+
+def fingerprint(sql):
+    """Forma de una consulta: mismo valor para consultas que solo difieren en parámetros."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def caller_location():
+    """Primer frame del proyecto (fuera de Django y de las dependencias) en la pila actual."""
+    root = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(root) and 'site-packages' not in filename
+                and filename.rsplit('.', 1)[0] not in _WRAPPER_FILES):
+            return f"{os.path.relpath(filename, root)}:{frame.f_lineno} en {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryGuard:
+    """Cuenta consultas por huella y marca las repetidas como N+1."""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or getattr(settings, 'QUERY_GUARD_THRESHOLD', 5)
+        self.counts = Counter()
+        self.locations = {}
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        self.counts[key] += 1
+        self.total += 1
+        if self.counts[key] == 2:
+            # La primera repetición señala el bucle; la pila solo se recorre una vez por huella
+            self.locations[key] = caller_location()
+        return execute(sql, params, many, context)
+
+    def offenders(self):
+        return [
+            NPlusOne(key, count, self.locations.get(key))
+            for key, count in self.counts.most_common() if count >= self.threshold
+        ]
+
+    def report(self, label):
+        lines = [f"{label}: {self.total} consultas"]
+        for offender in self.offenders():
+            lines.append(f"  N+1 x{offender.count} en {offender.location or '?'}: {offender.fingerprint[:300]}")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def query_guard(budget=None, threshold=None, using=DEFAULT_DB_ALIAS):
+    """Fallar con ``NPlusOneError`` si el bloque repite consultas o supera ``budget``."""
+    guard = QueryGuard(threshold)
+    with connections[using].execute_wrapper(guard):
+        yield guard
+    if guard.offenders() or (budget is not None and guard.total > budget):
+        label = f"Presupuesto {budget}" if budget is not None else "Bloque"
+        raise NPlusOneError(guard.report(label))
+
+
+class QueryGuardMiddleware:
+    """Aplica ``QueryGuard`` a cada petición según ``QUERY_GUARD``."""
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, 'QUERY_GUARD', None)
+        if not self.mode:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        guard = QueryGuard()
+        with connection.execute_wrapper(guard):
+            response = self.get_response(request)
+        response['X-Query-Count'] = str(guard.total)
+        if guard.offenders():
+            message = guard.report(f"{request.method} {request.path}")
+            if self.mode == 'raise':
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,281 @@
+# backend/core/request_metrics.py
+"""
+Latencia, errores y consultas por ruta, medidos en un middleware.
+
+``RequestMetricsMiddleware`` mide cada petición con ``perf_counter_ns``, cuenta
+sus consultas con un ``execute_wrapper`` y acumula por ruta (método + patrón
+de URL) en memoria: conteos por clase de estado, tiempo total y máximo, y un
+histograma log-lineal de latencia. El costo por petición es de unos pocos
+microsegundos (``manage.py benchmark_request_metrics``).
+
+Un hilo vuelca lo acumulado cada ``REQUEST_METRICS_FLUSH_INTERVAL`` segundos
+(``None`` desactiva el hilo), y una última vez al terminar el proceso, a
+``RouteMetrics`` (una fila por ruta y día) y
+recalcula ``avg_response_time`` y ``error_rate`` de ``SystemMetrics``. Los
+histogramas se combinan sumando buckets, así que p50/p95/p99 valen para
+cualquier rango de días y cualquier número de procesos.
+"""
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .background import PeriodicThread
+from .metrics_models import RouteMetrics, SystemMetrics
+
+logger = logging.getLogger(__name__)
+
+# Buckets con 2% de crecimiento: error relativo de ~1% en cualquier percentil
+BUCKET_SCALE = 1 / math.log(1.02)
+UNMATCHED_ROUTE = '<sin ruta>'
+
+
+# ==============================================================================
+# HISTOGRAMA
+# ==============================================================================
+
+class LatencyHistogram:
+    """Histograma log-lineal de latencias en microsegundos; se combina sumando."""
+
+    __slots__ = ('buckets', 'count')
+
+    def __init__(self, buckets=None):
+        self.buckets = defaultdict(int)
+        self.count = 0
+        for bucket, count in (buckets or {}).items():
+            self.buckets[int(bucket)] += count
+            self.count += count
+
+    def record(self, micros):
+        self.buckets[int(math.log1p(micros) * BUCKET_SCALE)] += 1
+        self.count += 1
+
+    def merge(self, other):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] += count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Percentil ``q`` (0-1) en milisegundos; None si está vacío."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return math.expm1((bucket + 0.5) / BUCKET_SCALE) / 1000
+        return None
+
+    def to_json(self):
+        return {str(bucket): count for bucket, count in self.buckets.items()}
+
+
+class RouteStats:
+    __slots__ = ('requests', 'client_errors', 'errors', 'total_us', 'max_us', 'queries', 'max_queries', 'histogram')
+
+    def __init__(self):
+        self.requests = self.client_errors = self.errors = 0
+        self.total_us = self.max_us = self.queries = self.max_queries = 0
+        self.histogram = LatencyHistogram()
+
+    def add(self, micros, status_code, queries):
+        self.requests += 1
+        if status_code >= 500:
+            self.errors += 1
+        elif status_code >= 400:
+            self.client_errors += 1
+        self.total_us += micros
+        if micros > self.max_us:
+            self.max_us = micros
+        self.queries += queries
+        if queries > self.max_queries:
+            self.max_queries = queries
+        self.histogram.record(micros)
+
+
+# ==============================================================================
+# ACUMULADOR
+# ==============================================================================
+
+class RequestMetrics:
+    """Estadísticas por ruta en memoria del proceso, volcadas por lotes."""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flusher = PeriodicThread(
+            'request-metrics-flush', self.flush, 'REQUEST_METRICS_FLUSH_INTERVAL', default=30,
+            error='Error volcando métricas de peticiones', run_at_exit=True,
+        )
+
+    def record(self, route, micros, status_code, queries):
+        with self._lock:
+            stats = self._pending.get(route)
+            if stats is None:
+                stats = self._pending[route] = RouteStats()
+            stats.add(micros, status_code, queries)
+        self._flusher.ensure()
+
+    def pending(self):
+        """Copia de lo acumulado y aún no volcado: ``{ruta: RouteStats}``."""
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self, today=None):
+        """Volcar lo acumulado a ``RouteMetrics`` y ``SystemMetrics``; devuelve las peticiones."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        today = today or timezone.localdate()
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                RouteMetrics.objects.bulk_create(
+                    [RouteMetrics(date=today, route=route) for route in pending], ignore_conflicts=True
+                )
+                rows = list(RouteMetrics.objects.select_for_update().filter(date=today, route__in=list(pending)))
+                for row in rows:
+                    stats = pending[row.route]
+                    row.request_count += stats.requests
+                    row.client_error_count += stats.client_errors
+                    row.error_count += stats.errors
+                    row.total_time_ms += stats.total_us / 1000
+                    row.max_time_ms = max(row.max_time_ms, stats.max_us / 1000)
+                    row.query_count += stats.queries
+                    row.max_queries = max(row.max_queries, stats.max_queries)
+                    row.histogram = LatencyHistogram(row.histogram).merge(stats.histogram).to_json()
+                    row.updated_at = now
+                RouteMetrics.objects.bulk_update(rows, [
+                    'request_count', 'client_error_count', 'error_count', 'total_time_ms', 'max_time_ms',
+                    'query_count', 'max_queries', 'histogram', 'updated_at'
+                ])
+                totals = RouteMetrics.objects.filter(date=today).aggregate(
+                    requests=Sum('request_count'), errors=Sum('error_count'), time=Sum('total_time_ms')
+                )
+                SystemMetrics.objects.update_or_create(date=today, defaults={
+                    'avg_response_time': totals['time'] / totals['requests'],
+                    'error_rate': totals['errors'] * 100.0 / totals['requests'],
+                })
+        except Exception:
+            # Devolver lo pendiente para el próximo volcado
+            with self._lock:
+                for route, stats in pending.items():
+                    current = self._pending.setdefault(route, RouteStats())
+                    _merge_stats(current, stats)
+            raise
+        return sum(stats.requests for stats in pending.values())
+
+
+def _merge_stats(target, stats):
+    target.requests += stats.requests
+    target.client_errors += stats.client_errors
+    target.errors += stats.errors
+    target.total_us += stats.total_us
+    target.max_us = max(target.max_us, stats.max_us)
+    target.queries += stats.queries
+    target.max_queries = max(target.max_queries, stats.max_queries)
+    target.histogram.merge(stats.histogram)
+
+
+request_metrics = RequestMetrics()
+
+
+# ==============================================================================
+# MIDDLEWARE
+# ==============================================================================
+
+class _QueryCounter:
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class RequestMetricsMiddleware:
+    """Mide latencia, estado y consultas de cada petición por ruta."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        started = time.perf_counter_ns()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = (time.perf_counter_ns() - started) // 1000
+        match = request.resolver_match
+        route = f"{request.method} /{match.route}" if match is not None else f"{request.method} {UNMATCHED_ROUTE}"
+        request_metrics.record(route, elapsed, response.status_code, counter.count)
+        return response
+
+
+# ==============================================================================
+# CONSULTA
+# ==============================================================================
+
+def performance_summary(days=1, limit=20):
+    """Latencia y errores de los últimos ``days`` días, global y por ruta.
+
+    Combina lo volcado en ``RouteMetrics`` con lo pendiente del proceso.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    routes = {}
+    for row in RouteMetrics.objects.filter(date__gte=since).values_list(
+            'route', 'request_count', 'client_error_count', 'error_count', 'total_time_ms', 'max_time_ms',
+            'query_count', 'max_queries', 'histogram'):
+        stats = routes.setdefault(row[0], RouteStats())
+        _merge_stats(stats, _stats_from_row(*row[1:]))
+    for route, pending in request_metrics.pending().items():
+        _merge_stats(routes.setdefault(route, RouteStats()), pending)
+
+    overall = RouteStats()
+    for stats in routes.values():
+        _merge_stats(overall, stats)
+    endpoints = sorted(routes.items(), key=lambda item: item[1].requests, reverse=True)[:limit]
+    return {
+        **_describe(overall),
+        'days': days,
+        'endpoints': [{'route': route, **_describe(stats)} for route, stats in endpoints],
+    }
+
+
+def _stats_from_row(requests, client_errors, errors, total_ms, max_ms, queries, max_queries, histogram):
+    stats = RouteStats()
+    stats.requests, stats.client_errors, stats.errors = requests, client_errors, errors
+    stats.total_us, stats.max_us = total_ms * 1000, max_ms * 1000
+    stats.queries, stats.max_queries = queries, max_queries
+    stats.histogram = LatencyHistogram(histogram)
+    return stats
+
+
+def _describe(stats):
+    requests = stats.requests
+    return {
+        'requests': requests,
+        'avg_response_time_ms': round(stats.total_us / requests / 1000, 3) if requests else None,
+        'p50_ms': _round(stats.histogram.quantile(0.50)),
+        'p95_ms': _round(stats.histogram.quantile(0.95)),
+        'p99_ms': _round(stats.histogram.quantile(0.99)),
+        'max_ms': round(stats.max_us / 1000, 3),
+        'error_rate_pct': round(stats.errors * 100.0 / requests, 3) if requests else 0,
+        'client_error_rate_pct': round(stats.client_errors * 100.0 / requests, 3) if requests else 0,
+        'avg_queries': round(stats.queries / requests, 2) if requests else 0,
+        'max_queries': stats.max_queries,
+    }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
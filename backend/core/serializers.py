@@ -127,6 +127,13 @@ class HealthCheckSerializer(serializers.Serializer):
     uptime = serializers.DurationField()
     memory_usage = serializers.DecimalField(max_digits=8, decimal_places=2, min_value=Decimal('0'))
     cpu_usage = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=Decimal('0'), max_value=Decimal('100'))
+    disk_usage = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=Decimal('0'), max_value=Decimal('100'))
+    database_latency_ms = serializers.FloatField(allow_null=True)
+    blockchain_latency_ms = serializers.FloatField(allow_null=True)
+    # Antigüedad de la muestra (ver core.health)
+    sampled_at = serializers.DateTimeField()
+    age_seconds = serializers.FloatField()
+    stale = serializers.BooleanField()
 
 class SystemConfigSerializer(serializers.Serializer):
     """Serializer para configuración del sistema"""
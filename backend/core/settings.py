@@ -84,6 +84,34 @@ else:
         }
     }
 
+# ==============================================================================
+# CACHÉ COMPARTIDA
+# ==============================================================================
+
+# Cuotas de consumidores, caché de respuestas públicas, versiones de datos y
+# pronósticos deben verse igual desde todos los workers: con una caché por
+# proceso las cuotas mensuales se multiplican por el número de workers.
+# Fuera de DEBUG se exige Redis (REDIS_URL), que además da incr atómico. En
+# desarrollo, sin Redis, cada proceso usa su propia caché en memoria y se
+# pierden esas garantías entre procesos (cuotas, versiones, libros de órdenes).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'ganadochain',
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ganadochain',
+        }
+    }
+else:
+    raise ValueError("REDIS_URL no está configurada: la caché compartida es obligatoria fuera de DEBUG")
+
 # ==============================================================================
 # APLICACIONES Y MIDDLEWARE
 # ==============================================================================
@@ -121,6 +149,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.request_metrics.RequestMetricsMiddleware',  # Primero: mide la petición completa
+    'core.query_guard.QueryGuardMiddleware',  # Solo activo con QUERY_GUARD
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Para static files en producción
@@ -187,6 +217,93 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'core.exceptions.custom_exception_handler',
 }
 
+# Contadores del dashboard (core/counters.py): filas por clave entre las que se
+# reparten los incrementos para no bloquear una única fila global
+METRIC_COUNTER_SHARDS = 16
+
+# Cuotas de consumidores (consumer/quota.py): ráfaga por nivel, consultas
+# mensuales que cada proceso reserva por UPDATE y volcado a la base de datos
+CONSUMER_QUOTA_BURST = {
+    'BASIC': '10/minute',
+    'PREMIUM': '60/minute',
+    'EXPERT': '120/minute',
+    'ENTERPRISE': '600/minute',
+}
+CONSUMER_QUOTA_BLOCK = 20
+CONSUMER_QUOTA_FLUSH_INTERVAL = 10
+
+# QR por animal (consumer/qr_assets.py): max-age de la redirección de
+# animal/<id>/qr/, cuyo destino cambia con el animal, y de los archivos
+# qr/assets/<hash>.<formato>, inmutables
+QR_CACHE_MAX_AGE = 60
+QR_ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Materializador de niveles QR (consumer/materializer.py): segundos entre
+# reconciliaciones de marcas persistidas y certificaciones vencidas (None = nunca)
+QR_MATERIALIZE_RECONCILE_INTERVAL = 300
+
+# Motor del mercado (market/engine.py): segundos entre barridos de listados vencidos
+MARKET_EXPIRY_INTERVAL = 60
+
+# Gobernanza (governance/engine.py): balanceOf por lote JSON-RPC al tomar snapshots
+# y poder de voto mínimo para el quórum
+GOVERNANCE_SNAPSHOT_BATCH_SIZE = 500
+GOVERNANCE_QUORUM = 1000
+
+# Cubo analítico (analytics/cube.py): segundos entre refrescos incrementales
+# (None = sin hilo; queda el comando refresh_analytics_cube) y margen releído
+# detrás de la marca de agua (ids o segundos) para filas confirmadas fuera de orden
+ANALYTICS_CUBE_REFRESH_INTERVAL = 300
+ANALYTICS_CUBE_ID_OVERLAP = 1000
+ANALYTICS_CUBE_TIME_OVERLAP = 300
+
+# Pronósticos (analytics/forecasting.py): ids finales releídos en cada ajuste
+# incremental para sumar filas confirmadas fuera de orden
+ANALYTICS_FORECAST_ID_OVERLAP = 500
+
+# Muestreo de salud (core/health.py): segundos entre muestras (None = sin hilo)
+# y muestras guardadas en el buffer circular
+HEALTH_SAMPLE_INTERVAL = 15
+HEALTH_SAMPLE_HISTORY = 240
+
+# Métricas por ruta (core/request_metrics.py): segundos entre volcados a
+# RouteMetrics (None = sin hilo)
+REQUEST_METRICS_FLUSH_INTERVAL = 30
+
+# Detector de N+1 (core/query_guard.py): None, 'log' o 'raise', y repeticiones
+# de una misma consulta por petición que cuentan como N+1
+QUERY_GUARD = 'log' if DEBUG else None
+QUERY_GUARD_THRESHOLD = 5
+
+# Listas del admin para tablas grandes (core/admin_changelist.py): por debajo
+# de este número de filas se cuenta exacto; por encima, estimación del planificador
+ADMIN_EXACT_COUNT_LIMIT = 10000
+# Mientras el cubo de analytics no tenga filas de la fuente, la jerarquía de
+# fechas solo lee de la tabla estos últimos días
+ADMIN_ROLLUP_FALLBACK_DAYS = 30
+
+# Vencimientos de certificaciones (certification/expiry.py): días de aviso,
+# backend de resúmenes (Console, File o Mail) y período de `scan_certification_expiry --loop`
+CERTIFICATION_EXPIRY_WARNING_DAYS = 30
+CERTIFICATION_DIGEST_BACKEND = os.getenv('CERTIFICATION_DIGEST_BACKEND', 'certification.expiry.ConsoleDigestBackend')
+CERTIFICATION_DIGEST_FILE = os.getenv('CERTIFICATION_DIGEST_FILE', str(BASE_DIR / 'logs' / 'certification_digests.jsonl'))
+CERTIFICATION_EXPIRY_SCAN_INTERVAL = 24 * 3600
+
+# Emisión de certificados por lotes (certification/issuance.py): registro por red
+# (una raíz Merkle por lote y red; las redes sin registro no se usan),
+# certificaciones por lote, reintentos por red (espera inicial en segundos,
+# que se duplica en cada fallo, e intentos antes de abandonar la red) y
+# segundos entre emisiones del hilo en segundo plano (None = sin hilo; queda
+# el comando issue_certificates)
+CERTIFICATION_REGISTRY_ADDRESSES = {
+    'POLYGON': os.getenv('CERTIFICATION_REGISTRY_ADDRESS'),
+    'STARKNET': os.getenv('STARKNET_CERTIFICATION_REGISTRY_ADDRESS'),
+}
+CERTIFICATION_ISSUANCE_BATCH_SIZE = 500
+CERTIFICATION_ISSUANCE_RETRY_DELAY = 60
+CERTIFICATION_ISSUANCE_MAX_ATTEMPTS = 8
+CERTIFICATION_ISSUANCE_INTERVAL = 60
+
 # Configuración Simple JWT mejorada
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -512,6 +629,12 @@ ADMIN_WALLET_ADDRESS = BLOCKCHAIN_CONFIG['ADMIN_WALLET']
 
 # Variables críticas del .env
 ADMIN_PRIVATE_KEY = os.getenv('ADMIN_PRIVATE_KEY')
+# Clave con la que se firman las raíces Merkle de las pruebas públicas
+PROOF_SIGNING_KEY = os.getenv('PROOF_SIGNING_KEY')
+# Distribuidor de recompensas por épocas (rewards/distribution.py)
+REWARD_DISTRIBUTOR_ADDRESS = validate_ethereum_address(os.getenv('REWARD_DISTRIBUTOR_ADDRESS'))
+REWARD_TOKEN_DECIMALS = 18
+REWARD_CLAIM_SYNC_BLOCKS = 5000
 INFURA_PROJECT_ID = os.getenv('INFURA_PROJECT_ID')
 IPFS_API_URL = os.getenv('IPFS_API_URL', '/ip4/127.0.0.1/tcp/5001')
 IOT_API_KEY = os.getenv('IOT_API_KEY', 'default-iot-key')
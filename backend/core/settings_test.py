@@ -55,9 +55,18 @@ INSTALLED_APPS = [
     'iot',
     'blockchain',
     'core',
+    'market',
+    'governance',
+    'consumer',
+    'rewards',
+    'analytics',
+    'reports',
+    'certification',
 ]
 
 MIDDLEWARE = [
+    'core.request_metrics.RequestMetricsMiddleware',
+    'core.query_guard.QueryGuardMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -134,6 +143,16 @@ TRANSACTION_TIMEOUT = 30  # Reducido para tests
 SYNC_INTERVAL = 10  # Reducido para tests
 HEALTH_CHECK_INTERVAL = 60  # Reducido para tests
 MAX_RETRIES = 2  # Reducido para tests
+# Sin hilos de volcado en segundo plano: los tests llaman flush() explícitamente
+CONSUMER_QUOTA_FLUSH_INTERVAL = None
+SCAN_ANALYTICS_FLUSH_INTERVAL = None
+ANALYTICS_CUBE_REFRESH_INTERVAL = None
+QR_MATERIALIZE_DEBOUNCE = None
+MARKET_EXPIRY_INTERVAL = None
+CERTIFICATION_ISSUANCE_INTERVAL = None
+HEALTH_SAMPLE_INTERVAL = None
+REQUEST_METRICS_FLUSH_INTERVAL = None
+QUERY_GUARD = 'log'
 VERSION = '1.0.0-test'
 
 CONTRACTS_DIR = os.path.join(BASE_DIR, '../artifacts/contracts')
@@ -7,7 +7,7 @@ def mock_web3():
 
 def mock_psutil():
     """Mock para psutil"""
-    return patch.multiple('core.views.psutil',
+    return patch.multiple('core.health.psutil',
         virtual_memory=MagicMock(return_value=MagicMock(percent=50.0)),
         cpu_percent=MagicMock(return_value=25.0),
         disk_usage=MagicMock(return_value=MagicMock(percent=60.0)),
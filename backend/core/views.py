@@ -6,6 +6,7 @@ from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.db.models import Q, Count, Avg, Sum
 from django.conf import settings
+from .health import health_sampler
 from .metrics_models import SystemMetrics
 from .serializers import (
     SystemMetricsSerializer,
@@ -19,68 +20,11 @@ from .serializers import (
     PaginationSerializer
 )
 import logging
-import psutil
 import os
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
-# AGREGAR ESTAS FUNCIONES AL PRINCIPIO DEL ARCHIVO, después de los imports
-
-def check_database_health():
-    """Verificar salud de la base de datos"""
-    try:
-        from django.db import connection
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-        return True
-    except Exception as e:
-        logger.error(f"Database health check failed: {str(e)}")
-        return False
-
-def check_blockchain_health():
-    """Verificar salud de la blockchain"""
-    try:
-        from web3 import Web3
-        from web3.exceptions import Web3ConnectionError  # ← CAMBIAR ESTA LÍNEA
-        w3 = Web3(Web3.HTTPProvider(settings.BLOCKCHAIN_RPC_URL))
-        return w3.is_connected()
-    except (Web3ConnectionError, Exception) as e:
-        logger.error(f"Blockchain health check failed: {str(e)}")
-        return False
-
-def check_iot_health():
-    """Verificar salud de dispositivos IoT"""
-    try:
-        # Placeholder - implementar verificación real
-        return True
-    except Exception as e:
-        logger.error(f"IoT health check failed: {str(e)}")
-        return False
-
-def get_system_uptime():
-    """Obtener uptime del sistema"""
-    try:
-        with open('/proc/uptime', 'r') as f:
-            uptime_seconds = float(f.readline().split()[0])
-            return timedelta(seconds=uptime_seconds)
-    except:
-        return timedelta(seconds=0)
-
-def get_system_metrics():
-    """Obtener métricas del sistema"""
-    memory = psutil.virtual_memory()
-    cpu_usage = psutil.cpu_percent(interval=1)
-    disk_usage = psutil.disk_usage('/').percent
-    net_connections = len(psutil.net_connections())
-    
-    return {
-        'memory_usage': memory.percent,
-        'cpu_usage': cpu_usage,
-        'disk_usage': disk_usage,
-        'active_connections': net_connections
-    }
-
 class SystemMetricsViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para métricas del sistema"""
     serializer_class = SystemMetricsSerializer
@@ -163,24 +107,23 @@ class HealthCheckView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def get(self, request):
-        # Verificar diferentes componentes
-        database_status = check_database_health()
-        blockchain_status = check_blockchain_health()
-        iot_status = check_iot_health()
-        
-        # Obtener métricas del sistema
-        system_metrics = get_system_metrics()
-        uptime = get_system_uptime()
+        # Última muestra del hilo de salud: sin RPC ni syscalls bloqueantes en la petición
+        version = settings.VERSION if hasattr(settings, 'VERSION') else '1.0.0'
+        snapshot = health_sampler.latest()
+        if snapshot is None:
+            return Response({
+                'status': 'starting',
+                'timestamp': timezone.now(),
+                'version': version,
+                'stale': True,
+            })
         
+        healthy = all([snapshot['database'], snapshot['blockchain'], snapshot['iot_devices']])
         health_data = {
-            'status': 'healthy' if all([database_status, blockchain_status, iot_status]) else 'degraded',
+            **snapshot,
+            'status': 'healthy' if healthy and not snapshot['stale'] else 'degraded',
             'timestamp': timezone.now(),
-            'database': database_status,
-            'blockchain': blockchain_status,
-            'iot_devices': iot_status,
-            'version': settings.VERSION if hasattr(settings, 'VERSION') else '1.0.0',
-            'uptime': uptime,
-            **system_metrics  # Desempaquetar todas las métricas
+            'version': version,
         }
         
         serializer = HealthCheckSerializer(health_data)
@@ -213,82 +156,66 @@ class DashboardStatsView(APIView):
     """Vista para estadísticas del dashboard"""
     permission_classes = [permissions.IsAuthenticated]
     
+    DASHBOARD_METRICS = (
+        'cattle.animals', 'cattle.animals.health_status',
+        'cattle.batches', 'cattle.batches.status',
+        'iot.devices', 'iot.devices.status', 'iot.devices.low_battery',
+        'users.users', 'blockchain.tx_pool.status', 'blockchain.interactions.status',
+    )
+    
     def get(self, request):
-        from django.apps import apps
+        from blockchain.models import NetworkState
+        from .counters import load_counters
+        
+        # Contadores materializados: globales para administradores, propios para el resto
+        counters = load_counters(
+            self.DASHBOARD_METRICS,
+            user=None if request.user.is_superuser else request.user
+        )
         
-        # Importar modelos de otras apps
-        Animal = apps.get_model('cattle', 'Animal')
-        Batch = apps.get_model('cattle', 'Batch')
-        IoTDevice = apps.get_model('iot', 'IoTDevice')
-        User = apps.get_model('users', 'User')
-        BlockchainEvent = apps.get_model('blockchain', 'BlockchainEvent')
-        ContractInteraction = apps.get_model('blockchain', 'ContractInteraction')
-        TransactionPool = apps.get_model('blockchain', 'TransactionPool')
+        stats = {
+            'total_animals': counters.count('cattle.animals'),
+            'total_batches': counters.count('cattle.batches'),
+            'total_devices': counters.count('iot.devices'),
+            # Un usuario sin privilegios sólo se ve a sí mismo
+            'total_users': counters.count('users.users') if request.user.is_superuser else 1,
+            
+            'healthy_animals': counters.count('cattle.animals.health_status', 'HEALTHY'),
+            'sick_animals': counters.count('cattle.animals.health_status', 'SICK'),
+            'under_observation': counters.count('cattle.animals.health_status', 'UNDER_OBSERVATION'),
+            
+            'active_batches': counters.count('cattle.batches.status', 'CREATED'),
+            'delivered_batches': counters.count('cattle.batches.status', 'DELIVERED'),
+            'in_transit_batches': counters.count('cattle.batches.status', 'IN_TRANSIT'),
+            
+            'online_devices': counters.count('iot.devices.status', 'ACTIVE'),
+            'offline_devices': counters.count('iot.devices.status', 'INACTIVE'),
+            'low_battery_devices': counters.count('iot.devices.low_battery'),
+            
+            'pending_transactions': 0,  # Placeholder
+            'confirmed_transactions': 0,  # Placeholder
+            'failed_transactions': 0,    # Placeholder
+            
+            'current_gas_price': 0,
+            'avg_block_time': 2.1,  # Polygon Amoy
+            'network_status': 'online'
+        }
         
-        # Obtener estadísticas basadas en el rol del usuario
         if request.user.is_superuser:
             # Estadísticas globales para administradores
-            stats = {
-                'total_animals': Animal.objects.count(),
-                'total_batches': Batch.objects.count(),
-                'total_devices': IoTDevice.objects.count(),
-                'total_users': User.objects.count(),
-                
-                'healthy_animals': Animal.objects.filter(health_status='HEALTHY').count(),
-                'sick_animals': Animal.objects.filter(health_status='SICK').count(),
-                'under_observation': Animal.objects.filter(health_status='UNDER_OBSERVATION').count(),
-                
-                'active_batches': Batch.objects.filter(status='CREATED').count(),
-                'delivered_batches': Batch.objects.filter(status='DELIVERED').count(),
-                'in_transit_batches': Batch.objects.filter(status='IN_TRANSIT').count(),
-                
-                'online_devices': IoTDevice.objects.filter(status='ACTIVE').count(),
-                'offline_devices': IoTDevice.objects.filter(status='INACTIVE').count(),
-                'low_battery_devices': IoTDevice.objects.filter(battery_level__lt=20).count(),
-                
-                'pending_transactions': TransactionPool.objects.filter(status='PENDING').count(),
-                'confirmed_transactions': ContractInteraction.objects.filter(status='SUCCESS').count(),
-                'failed_transactions': ContractInteraction.objects.filter(status='FAILED').count(),
-                
-                'current_gas_price': 0,  # Se obtendría del servicio de blockchain
-                'avg_block_time': 2.1,  # Polygon Amoy
-                'network_status': 'online'
-            }
-        else:
-            # Estadísticas específicas del usuario
-            stats = {
-                'total_animals': Animal.objects.filter(owner=request.user).count(),
-                'total_batches': Batch.objects.filter(created_by=request.user).count(),
-                'total_devices': IoTDevice.objects.filter(owner=request.user).count(),
-                
-                'healthy_animals': Animal.objects.filter(owner=request.user, health_status='HEALTHY').count(),
-                'sick_animals': Animal.objects.filter(owner=request.user, health_status='SICK').count(),
-                'under_observation': Animal.objects.filter(owner=request.user, health_status='UNDER_OBSERVATION').count(),
-                
-                'active_batches': Batch.objects.filter(created_by=request.user, status='CREATED').count(),
-                'delivered_batches': Batch.objects.filter(created_by=request.user, status='DELIVERED').count(),
-                'in_transit_batches': Batch.objects.filter(created_by=request.user, status='IN_TRANSIT').count(),
-                
-                'online_devices': IoTDevice.objects.filter(owner=request.user, status='ACTIVE').count(),
-                'offline_devices': IoTDevice.objects.filter(owner=request.user, status='INACTIVE').count(),
-                'low_battery_devices': IoTDevice.objects.filter(owner=request.user, battery_level__lt=20).count(),
-                
-                'pending_transactions': 0,  # Placeholder
-                'confirmed_transactions': 0,  # Placeholder
-                'failed_transactions': 0,    # Placeholder
-                
-                'current_gas_price': 0,
-                'avg_block_time': 2.1,
-                'network_status': 'online'
-            }
+            stats.update({
+                'pending_transactions': counters.count('blockchain.tx_pool.status', 'PENDING'),
+                'confirmed_transactions': counters.count('blockchain.interactions.status', 'SUCCESS'),
+                'failed_transactions': counters.count('blockchain.interactions.status', 'FAILED'),
+            })
         
-        # Intentar obtener gas price actual
-        try:
-            from web3 import Web3
-            w3 = Web3(Web3.HTTPProvider(settings.BLOCKCHAIN_RPC_URL))
-            stats['current_gas_price'] = w3.eth.gas_price
-        except:
-            pass
+        # Gas price del último estado de red sincronizado (sin RPC por request)
+        network = NetworkState.objects.order_by('-last_sync_time').values(
+            'average_gas_price', 'block_time'
+        ).first()
+        if network:
+            stats['current_gas_price'] = network['average_gas_price']
+            stats['avg_block_time'] = network['block_time']
         
         serializer = DashboardStatsSerializer(stats)
         return Response(serializer.data)
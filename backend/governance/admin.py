@@ -1,3 +1,26 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ProposalTally, VotingPowerSnapshot
+
+
+@admin.register(ProposalTally)
+class ProposalTallyAdmin(admin.ModelAdmin):
+    list_display = [
+        'proposal', 'snapshot_block', 'eligible_voters', 'eligible_power',
+        'yes_power', 'no_power', 'abstain_power', 'snapshot_taken_at'
+    ]
+    list_select_related = ['proposal']
+    search_fields = ['proposal__title']
+    readonly_fields = [
+        'proposal', 'snapshot_block', 'snapshot_taken_at', 'eligible_voters', 'eligible_power',
+        'yes_votes', 'no_votes', 'abstain_votes', 'yes_power', 'no_power', 'abstain_power'
+    ]
+
+
+@admin.register(VotingPowerSnapshot)
+class VotingPowerSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['proposal', 'user', 'wallet_address', 'token_balance', 'staked_amount', 'voting_power']
+    list_select_related = ['proposal', 'user']
+    search_fields = ['wallet_address', 'user__username', 'proposal__title']
+    raw_id_fields = ['proposal', 'user']
+    readonly_fields = ['token_balance', 'staked_amount', 'voting_power']
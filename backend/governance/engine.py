@@ -0,0 +1,231 @@
+# backend/governance/engine.py
+"""
+Poder de voto por snapshot y conteos incrementales de propuestas.
+
+Al abrirse una propuesta (estado ACTIVE) ``take_snapshot`` fija un bloque,
+lee en lotes JSON-RPC el balance del token de cada wallet en ese bloque, le
+suma lo stakeado y guarda el resultado en ``VotingPowerSnapshot``. Votar
+resuelve el poder con una búsqueda por (propuesta, usuario) y suma el voto a
+``ProposalTally`` con un UPDATE atómico, así que leer el resultado de una
+propuesta es una fila sin importar cuántos votantes tenga.
+
+Ajustes:
+    GOVERNANCE_SNAPSHOT_BATCH_SIZE   llamadas ``balanceOf`` por lote (500)
+    GOVERNANCE_QUORUM                poder de voto mínimo para quórum (1000)
+"""
+import hashlib
+import logging
+import time
+from decimal import ROUND_DOWN, Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from blockchain.models import GovernanceProposal, Vote
+from users.models import User
+from users.reputation_models import StakingPool
+from .models import ProposalTally, VotingPowerSnapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_WRITE_BATCH_SIZE = 1000
+POWER_PLACES = Decimal('0.01')
+
+ERC20_BALANCE_ABI = [{
+    'name': 'balanceOf',
+    'type': 'function',
+    'stateMutability': 'view',
+    'inputs': [{'name': 'account', 'type': 'address'}],
+    'outputs': [{'name': '', 'type': 'uint256'}],
+}]
+
+# Columnas de ProposalTally por valor de voto
+TALLY_FIELDS = {
+    True: ('yes_votes', 'yes_power'),
+    False: ('no_votes', 'no_power'),
+    None: ('abstain_votes', 'abstain_power'),
+}
+
+
+class GovernanceError(Exception):
+    """El voto o el snapshot no son válidos."""
+
+
+class TokenBalanceSource:
+    """Balances de ``GanadoToken`` en un bloque fijo, pedidos en lotes JSON-RPC."""
+
+    def __init__(self, w3=None, token_address=None, batch_size=None, decimals=None):
+        from web3 import Web3
+
+        self.w3 = w3 or Web3(Web3.HTTPProvider(settings.BLOCKCHAIN_RPC_URL))
+        self.contract = self.w3.eth.contract(
+            address=Web3.to_checksum_address(token_address or settings.GANADO_TOKEN_ADDRESS), abi=ERC20_BALANCE_ABI
+        )
+        self.batch_size = batch_size or getattr(settings, 'GOVERNANCE_SNAPSHOT_BATCH_SIZE', 500)
+        self.decimals = decimals if decimals is not None else getattr(settings, 'REWARD_TOKEN_DECIMALS', 18)
+
+    def block_number(self):
+        return self.w3.eth.block_number
+
+    def balances(self, addresses, block):
+        """``{dirección: balance en tokens}`` en ``block``."""
+        from web3 import Web3
+
+        result = {}
+        for start in range(0, len(addresses), self.batch_size):
+            chunk = addresses[start:start + self.batch_size]
+            with self.w3.batch_requests() as batch:
+                for address in chunk:
+                    batch.add(self.contract.functions.balanceOf(Web3.to_checksum_address(address)).call(block_identifier=block))
+                values = batch.execute()
+            for address, value in zip(chunk, values):
+                result[address] = Decimal(value).scaleb(-self.decimals)
+        return result
+
+
+def simulated_vote_hash(proposal_id, voter_id):
+    # Hasta registrar los votos en el contrato de gobernanza, un hash único con formato de transacción
+    return '0x' + hashlib.sha256(f'vote:{proposal_id}:{voter_id}:{time.time_ns()}'.encode()).hexdigest()
+
+
+# ==============================================================================
+# SNAPSHOT
+# ==============================================================================
+
+def take_snapshot(proposal, source=None, block=None):
+    """Fijar el poder de voto de cada wallet para la propuesta; idempotente.
+
+    Devuelve el ``ProposalTally`` de la propuesta.
+    """
+    existing = ProposalTally.objects.filter(proposal=proposal).first()
+    if existing is not None:
+        return existing
+
+    source = source or TokenBalanceSource()
+    block = source.block_number() if block is None else block
+    holders = list(
+        User.objects.exclude(wallet_address__isnull=True).exclude(wallet_address='')
+        .values_list('id', 'wallet_address')
+    )
+    staked = dict(
+        StakingPool.objects.filter(is_active=True).values_list('user_id').annotate(total=Sum('tokens_staked'))
+    )
+    balances = source.balances([wallet for _, wallet in holders], block)
+
+    rows = []
+    for user_id, wallet in holders:
+        balance = balances.get(wallet) or Decimal('0')
+        stake = staked.get(user_id) or Decimal('0')
+        power = (balance + stake).quantize(POWER_PLACES, rounding=ROUND_DOWN)
+        if power > 0:
+            rows.append(VotingPowerSnapshot(
+                proposal=proposal, user_id=user_id, wallet_address=wallet,
+                token_balance=balance, staked_amount=stake, voting_power=power
+            ))
+
+    try:
+        with transaction.atomic():
+            tally = ProposalTally.objects.create(
+                proposal=proposal,
+                snapshot_block=block,
+                eligible_voters=len(rows),
+                eligible_power=sum((row.voting_power for row in rows), Decimal('0')),
+            )
+            VotingPowerSnapshot.objects.bulk_create(rows, batch_size=SNAPSHOT_WRITE_BATCH_SIZE)
+    except IntegrityError:
+        # Otro proceso tomó el snapshot primero
+        return ProposalTally.objects.get(proposal=proposal)
+    logger.info(f"Snapshot de la propuesta {proposal.id} en el bloque {block}: {len(rows)} votantes")
+    return tally
+
+
+def voting_power(proposal, user):
+    """Poder de voto del usuario en la propuesta (una búsqueda indexada)."""
+    power = VotingPowerSnapshot.objects.filter(proposal=proposal, user=user).values_list('voting_power', flat=True).first()
+    return power or Decimal('0')
+
+
+# ==============================================================================
+# VOTOS Y CONTEOS
+# ==============================================================================
+
+def cast_vote(proposal, user, vote_value):
+    """Registrar el voto con el poder del snapshot y sumarlo al conteo."""
+    if not ProposalTally.objects.filter(proposal=proposal).exists():
+        raise GovernanceError('La propuesta aún no tiene snapshot de poder de voto')
+    power = voting_power(proposal, user)
+    if power <= 0:
+        raise GovernanceError('No tenías poder de voto al abrirse la propuesta')
+
+    count_field, power_field = TALLY_FIELDS[vote_value]
+    try:
+        with transaction.atomic():
+            vote = Vote.objects.create(
+                proposal=proposal,
+                voter=user,
+                vote_value=vote_value,
+                voting_power=power,
+                blockchain_vote_hash=simulated_vote_hash(proposal.id, user.id)
+            )
+            ProposalTally.objects.filter(proposal=proposal).update(**{
+                count_field: F(count_field) + 1,
+                power_field: F(power_field) + power,
+            })
+    except IntegrityError:
+        raise GovernanceError('Ya has votado en esta propuesta')
+    return vote
+
+
+def quorum():
+    return Decimal(str(getattr(settings, 'GOVERNANCE_QUORUM', 1000)))
+
+
+def tally_summary(tally):
+    """Resultados de la propuesta a partir de su fila de conteo."""
+    total_votes = tally.total_votes
+    decided_power = tally.yes_power + tally.no_power
+    return {
+        'snapshot_block': tally.snapshot_block,
+        'eligible_voters': tally.eligible_voters,
+        'eligible_power': float(tally.eligible_power),
+        'total_votes': total_votes,
+        'yes_votes': tally.yes_votes,
+        'no_votes': tally.no_votes,
+        'abstain_votes': tally.abstain_votes,
+        'yes_percentage': (tally.yes_votes / total_votes * 100) if total_votes > 0 else 0,
+        'no_percentage': (tally.no_votes / total_votes * 100) if total_votes > 0 else 0,
+        'voting_power_total': float(tally.total_power),
+        'voting_power_yes': float(tally.yes_power),
+        'voting_power_no': float(tally.no_power),
+        'voting_power_abstain': float(tally.abstain_power),
+        'approval_percentage': float(tally.yes_power / decided_power * 100) if decided_power > 0 else 0,
+        'turnout_percentage': float(tally.total_power / tally.eligible_power * 100) if tally.eligible_power > 0 else 0,
+        'quorum_met': tally.total_power >= quorum(),
+    }
+
+
+def rebuild_tally(proposal):
+    """Recalcular el conteo desde los votos (reparación); una consulta agregada."""
+    totals = Vote.objects.filter(proposal=proposal).aggregate(
+        yes_votes=Count('id', filter=Q(vote_value=True)),
+        no_votes=Count('id', filter=Q(vote_value=False)),
+        abstain_votes=Count('id', filter=Q(vote_value__isnull=True)),
+        yes_power=Sum('voting_power', filter=Q(vote_value=True)),
+        no_power=Sum('voting_power', filter=Q(vote_value=False)),
+        abstain_power=Sum('voting_power', filter=Q(vote_value__isnull=True)),
+    )
+    ProposalTally.objects.filter(proposal=proposal).update(
+        **{field: value or 0 for field, value in totals.items()}
+    )
+    return ProposalTally.objects.get(proposal=proposal)
+
+
+def snapshot_active_proposals(source=None):
+    """Tomar el snapshot de las propuestas activas que aún no lo tienen."""
+    pending = list(GovernanceProposal.objects.filter(status='ACTIVE', tally__isnull=True))
+    if pending:
+        source = source or TokenBalanceSource()
+    for proposal in pending:
+        take_snapshot(proposal, source)
+    return len(pending)
@@ -0,0 +1,24 @@
+# governance/management/commands/snapshot_proposals.py
+from django.core.management.base import BaseCommand
+
+from blockchain.models import GovernanceProposal
+from governance.engine import rebuild_tally, snapshot_active_proposals
+
+
+class Command(BaseCommand):
+    help = 'Toma el snapshot de poder de voto de las propuestas activas que no lo tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild-tallies', action='store_true', help='Recalcular los conteos desde los votos')
+
+    def handle(self, *args, **options):
+        taken = snapshot_active_proposals()
+        self.stdout.write(f'{taken} snapshots tomados')
+
+        if options['rebuild_tallies']:
+            proposals = GovernanceProposal.objects.filter(tally__isnull=False)
+            for proposal in proposals:
+                rebuild_tally(proposal)
+            self.stdout.write(f'{proposals.count()} conteos recalculados')
+
+        self.stdout.write(self.style.SUCCESS('Snapshots de gobernanza al día'))
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('blockchain', '0009_alter_vote_vote_value'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProposalTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_block', models.BigIntegerField(blank=True, null=True)),
+                ('snapshot_taken_at', models.DateTimeField(auto_now_add=True)),
+                ('eligible_voters', models.PositiveIntegerField(default=0)),
+                ('eligible_power', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('yes_votes', models.PositiveIntegerField(default=0)),
+                ('no_votes', models.PositiveIntegerField(default=0)),
+                ('abstain_votes', models.PositiveIntegerField(default=0)),
+                ('yes_power', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('no_power', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('abstain_power', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('proposal', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tally', to='blockchain.governanceproposal')),
+            ],
+            options={
+                'verbose_name': 'Conteo de Propuesta',
+                'verbose_name_plural': 'Conteos de Propuestas',
+                'db_table': 'governance_proposal_tally',
+            },
+        ),
+        migrations.CreateModel(
+            name='VotingPowerSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wallet_address', models.CharField(max_length=42)),
+                ('token_balance', models.DecimalField(decimal_places=18, default=0, max_digits=38)),
+                ('staked_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('voting_power', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('proposal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='power_snapshots', to='blockchain.governanceproposal')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='voting_power_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Poder de Voto',
+                'verbose_name_plural': 'Snapshots de Poder de Voto',
+                'db_table': 'governance_voting_power_snapshot',
+                'unique_together': {('proposal', 'user')},
+            },
+        ),
+    ]
@@ -1,3 +1,51 @@
 from django.db import models
 
-# Create your models here.
+
+class VotingPowerSnapshot(models.Model):
+    """Poder de voto de un usuario fijado al abrir una propuesta"""
+    proposal = models.ForeignKey('blockchain.GovernanceProposal', on_delete=models.CASCADE, related_name='power_snapshots')
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='voting_power_snapshots')
+    wallet_address = models.CharField(max_length=42)
+    token_balance = models.DecimalField(max_digits=38, decimal_places=18, default=0)
+    staked_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    voting_power = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        db_table = 'governance_voting_power_snapshot'
+        unique_together = ['proposal', 'user']
+        verbose_name = "Snapshot de Poder de Voto"
+        verbose_name_plural = "Snapshots de Poder de Voto"
+
+    def __str__(self):
+        return f"{self.proposal_id} - {self.user_id}: {self.voting_power}"
+
+
+class ProposalTally(models.Model):
+    """Conteo acumulado de una propuesta; cada voto lo actualiza con un UPDATE atómico"""
+    proposal = models.OneToOneField('blockchain.GovernanceProposal', on_delete=models.CASCADE, related_name='tally')
+    snapshot_block = models.BigIntegerField(null=True, blank=True)
+    snapshot_taken_at = models.DateTimeField(auto_now_add=True)
+    eligible_voters = models.PositiveIntegerField(default=0)
+    eligible_power = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    yes_votes = models.PositiveIntegerField(default=0)
+    no_votes = models.PositiveIntegerField(default=0)
+    abstain_votes = models.PositiveIntegerField(default=0)
+    yes_power = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    no_power = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    abstain_power = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'governance_proposal_tally'
+        verbose_name = "Conteo de Propuesta"
+        verbose_name_plural = "Conteos de Propuestas"
+
+    def __str__(self):
+        return f"{self.proposal_id}: {self.yes_power} / {self.no_power} / {self.abstain_power}"
+
+    @property
+    def total_votes(self):
+        return self.yes_votes + self.no_votes + self.abstain_votes
+
+    @property
+    def total_power(self):
+        return self.yes_power + self.no_power + self.abstain_power
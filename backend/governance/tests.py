@@ -1,3 +1,106 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blockchain.models import GovernanceProposal
+from rewards.staking import open_stake
+from users.models import User
+from .engine import GovernanceError, cast_vote, rebuild_tally, take_snapshot, voting_power
+from .models import ProposalTally
+
+
+class FakeBalanceSource:
+    def __init__(self, balances):
+        self.calls = 0
+        self._balances = balances
+
+    def block_number(self):
+        return 4242
+
+    def balances(self, addresses, block):
+        self.calls += 1
+        return {address: self._balances.get(address, Decimal('0')) for address in addresses}
+
+
+class GovernanceEngineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [
+            User.objects.create_user(
+                username=f'voter{index}',
+                email=f'voter{index}@example.com',
+                password='testpass123',
+                wallet_address='0x%040x' % (index + 500)
+            )
+            for index in range(4)
+        ]
+        self.admin = User.objects.create_superuser(
+            username='govadmin', email='govadmin@example.com', password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        open_stake(self.users[1], Decimal('250.00'), 30)
+        self.source = FakeBalanceSource({
+            self.users[0].wallet_address: Decimal('600.5'),
+            self.users[1].wallet_address: Decimal('100'),
+            self.users[2].wallet_address: Decimal('300'),
+        })
+        now = timezone.now()
+        self.proposal = GovernanceProposal.objects.create(
+            title='Cambiar comisión', description='Bajar la comisión al 1%', proposal_type='PARAMETER_CHANGE',
+            proposed_by=self.admin, voting_start=now - timedelta(hours=1), voting_end=now + timedelta(days=3),
+            status='ACTIVE'
+        )
+
+    def test_snapshot_sets_power_from_balance_and_stake(self):
+        tally = take_snapshot(self.proposal, self.source)
+
+        self.assertEqual(tally.snapshot_block, 4242)
+        self.assertEqual(tally.eligible_voters, 3)
+        self.assertEqual(tally.eligible_power, Decimal('1250.50'))
+        self.assertEqual(voting_power(self.proposal, self.users[1]), Decimal('350.00'))
+        self.assertEqual(voting_power(self.proposal, self.users[3]), Decimal('0'))
+        self.assertEqual(take_snapshot(self.proposal, self.source).pk, tally.pk)
+        self.assertEqual(self.source.calls, 1)
+
+    def test_votes_update_tally_atomically(self):
+        take_snapshot(self.proposal, self.source)
+        cast_vote(self.proposal, self.users[0], True)
+        cast_vote(self.proposal, self.users[1], False)
+        cast_vote(self.proposal, self.users[2], None)
+
+        with self.assertRaises(GovernanceError):
+            cast_vote(self.proposal, self.users[0], False)
+        with self.assertRaises(GovernanceError):
+            cast_vote(self.proposal, self.users[3], True)
+
+        tally = ProposalTally.objects.get(proposal=self.proposal)
+        self.assertEqual((tally.yes_votes, tally.no_votes, tally.abstain_votes), (1, 1, 1))
+        self.assertEqual((tally.yes_power, tally.no_power, tally.abstain_power),
+                         (Decimal('600.50'), Decimal('350.00'), Decimal('300.00')))
+        rebuilt = rebuild_tally(self.proposal)
+        self.assertEqual((rebuilt.yes_power, rebuilt.no_power, rebuilt.abstain_power),
+                         (tally.yes_power, tally.no_power, tally.abstain_power))
+
+    def test_vote_and_stats_endpoints(self):
+        take_snapshot(self.proposal, self.source)
+        self.client.force_authenticate(user=self.users[0])
+        url = reverse('governance:governanceproposal-vote', args=[self.proposal.pk])
+
+        response = self.client.post(url, {'proposal': self.proposal.pk, 'vote_value': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['voting_power'], 600.5)
+        self.assertEqual(self.client.post(url, {'proposal': self.proposal.pk, 'vote_value': True}, format='json').status_code, 400)
 
-# Create your tests here.
+        stats_url = reverse('governance:proposal-detail-stats', args=[self.proposal.pk])
+        with CaptureQueriesContext(connection) as queries:
+            stats = self.client.get(stats_url)
+        self.assertEqual(stats.data['voting_power_yes'], 600.5)
+        self.assertEqual(stats.data['total_votes'], 1)
+        self.assertFalse(stats.data['quorum_met'])
+        self.assertLessEqual(len(queries), 3)
@@ -5,7 +5,7 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Q, Sum, Avg
+from django.db.models import Count, Sum, Avg
 from django.contrib.auth import get_user_model
 
 # Importaciones corregidas desde las ubicaciones correctas
@@ -18,6 +18,7 @@ from blockchain.serializers import (
     ProposalParameterSerializer
 )
 from users.models import User
+from .engine import GovernanceError, cast_vote, quorum, take_snapshot, tally_summary
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,7 +33,7 @@ class GovernanceProposalViewSet(viewsets.ModelViewSet):
         return GovernanceProposalSerializer
     
     def get_queryset(self):
-        queryset = GovernanceProposal.objects.all()
+        queryset = GovernanceProposal.objects.select_related('tally')
         
         status_filter = self.request.query_params.get('status')
         proposal_type = self.request.query_params.get('type')
@@ -91,6 +92,11 @@ class GovernanceProposalViewSet(viewsets.ModelViewSet):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
+        if 'vote_value' not in request.data:
+            return Response({
+                'vote_value': ['Este campo es requerido (null para abstenerse).']
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         vote_value = serializer.validated_data['vote_value']
         
         # Validaciones de la propuesta
@@ -105,35 +111,20 @@ class GovernanceProposalViewSet(viewsets.ModelViewSet):
                 'error': 'Fuera del período de votación'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verificar si ya votó
-        existing_vote = Vote.objects.filter(proposal=proposal, voter=request.user).first()
-        if existing_vote:
-            return Response({
-                'error': 'Ya has votado en esta propuesta'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
         try:
-            # Aquí iría la lógica de blockchain para obtener el voting power
-            # En producción, se conectaría con el contrato inteligente
-            voting_power = 1.0  # Esto vendría de blockchain
-            
-            # Crear voto
-            vote = Vote.objects.create(
-                proposal=proposal,
-                voter=request.user,
-                vote_value=vote_value,
-                voting_power=voting_power,
-                blockchain_vote_hash=f"0x{hash(str(timezone.now()) + str(proposal.id))[:64]}"
-            )
+            # El poder de voto sale del snapshot tomado al abrir la propuesta
+            vote = cast_vote(proposal, request.user, vote_value)
             
             return Response({
                 'success': True, 
                 'message': 'Voto registrado exitosamente',
                 'vote_id': vote.id,
                 'vote_value': vote_value,
-                'voting_power': voting_power
+                'voting_power': float(vote.voting_power)
             })
             
+        except GovernanceError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error registrando voto: {str(e)}")
             return Response({
@@ -150,6 +141,16 @@ class GovernanceProposalViewSet(viewsets.ModelViewSet):
                 'error': 'Estado inválido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if new_status == 'ACTIVE':
+            # Abrir la votación fija el poder de voto en el bloque actual
+            try:
+                take_snapshot(proposal)
+            except Exception as e:
+                logger.error(f"Error tomando snapshot de la propuesta {proposal.id}: {str(e)}")
+                return Response({
+                    'error': f'Error tomando snapshot de poder de voto: {str(e)}'
+                }, status=status.HTTP_502_BAD_GATEWAY)
+        
         proposal.status = new_status
         proposal.save()
         
@@ -192,10 +193,22 @@ class VoteViewSet(viewsets.ReadOnlyModelViewSet):
 class ProposalStatsView(APIView):
     permission_classes = [IsAuthenticated]
     
-    def get(self, request, proposal_id=None):
+    def get(self, request, proposal_id=None, **kwargs):
         if proposal_id:
-            proposal = get_object_or_404(GovernanceProposal, id=proposal_id)
+            proposal = get_object_or_404(GovernanceProposal.objects.select_related('tally'), id=proposal_id)
             
+            tally = getattr(proposal, 'tally', None)
+            if tally is not None:
+                # Conteo acumulado: una fila sin importar cuántos votantes haya
+                stats = {
+                    'proposal_id': proposal.id,
+                    'proposal_title': proposal.title,
+                    'unique_voters': tally.total_votes,
+                    **tally_summary(tally)
+                }
+                return Response(stats)
+            
+            # Propuestas sin snapshot: se cuentan los votos
             votes = Vote.objects.filter(proposal=proposal)
             total_votes = votes.count()
             
@@ -217,20 +230,28 @@ class ProposalStatsView(APIView):
             return Response(stats)
         
         else:
-            # Stats generales
-            total_proposals = GovernanceProposal.objects.count()
+            # Stats generales desde contadores materializados
+            from core.counters import load_counters, count_dimensions
+            
+            counters = load_counters([
+                'governance.proposals', 'governance.proposals.status',
+                'governance.proposals.type', 'governance.votes', 'users.users',
+            ])
+            proposals_by_status = counters.breakdown('governance.proposals.status')
+            unique_voters = count_dimensions('governance.votes.voter')
+            total_users = counters.count('users.users')
             
             stats = {
-                'total_proposals': total_proposals,
-                'proposals_by_status': dict(GovernanceProposal.objects.values_list('status').annotate(count=Count('id'))),
-                'proposals_by_type': dict(GovernanceProposal.objects.values_list('proposal_type').annotate(count=Count('id'))),
-                'active_proposals': GovernanceProposal.objects.filter(status='ACTIVE').count(),
-                'completed_proposals': GovernanceProposal.objects.filter(
-                    Q(status='APPROVED') | Q(status='REJECTED') | Q(status='EXECUTED')
-                ).count(),
-                'total_votes': Vote.objects.count(),
-                'unique_voters': Vote.objects.values('voter').distinct().count(),
-                'participation_rate': (Vote.objects.values('voter').distinct().count() / User.objects.count() * 100) if User.objects.count() > 0 else 0
+                'total_proposals': counters.count('governance.proposals'),
+                'proposals_by_status': proposals_by_status,
+                'proposals_by_type': counters.breakdown('governance.proposals.type'),
+                'active_proposals': proposals_by_status.get('ACTIVE', 0),
+                'completed_proposals': sum(
+                    proposals_by_status.get(s, 0) for s in ('APPROVED', 'REJECTED', 'EXECUTED')
+                ),
+                'total_votes': counters.count('governance.votes'),
+                'unique_voters': unique_voters,
+                'participation_rate': (unique_voters / total_users * 100) if total_users > 0 else 0
             }
             
             return Response(stats)
@@ -239,7 +260,7 @@ class ProposalStatsView(APIView):
         # Lógica para verificar si se alcanzó el quórum
         # Esto debería venir de blockchain o configuración
         total_voting_power = float(votes.aggregate(total=Sum('voting_power'))['total'] or 0)
-        return total_voting_power >= 1000  # Ejemplo de quórum
+        return total_voting_power >= float(quorum())
 
 class UserVotingStatsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -3,6 +3,7 @@ from django.utils.html import format_html
 from django.urls import reverse
 from .models import IoTDevice, GPSData, HealthSensorData, DeviceEvent, DeviceConfiguration
 from .analytics_models import DeviceAnalytics
+from core.admin_changelist import LargeTableAdminMixin, RecentPeriodFilter
 import json
 
 @admin.register(IoTDevice)
@@ -140,17 +141,22 @@ class IoTDeviceAdmin(admin.ModelAdmin):
     analytics_link.short_description = 'Analítica'
 
 @admin.register(GPSData)
-class GPSDataAdmin(admin.ModelAdmin):
+class GPSDataAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'device_id', 'animal_link', 'coordinates_display',
         'accuracy_display', 'speed_display', 'timestamp',
         'is_accurate_display', 'google_maps_link', 'blockchain_linked_display'
     ]
     
+    list_annotations = {'device_code': 'device__device_id', 'animal_ear_tag': 'animal__ear_tag'}
+    
     list_filter = [
-        'device__device_type', 'timestamp', 'recorded_at'
+        RecentPeriodFilter, 'device__device_type'
     ]
     
+    date_hierarchy = 'timestamp'
+    rollup_source = 'GPS'
+    
     search_fields = [
         'device__device_id', 'animal__ear_tag', 'animal__breed',
         'blockchain_hash'
@@ -192,14 +198,15 @@ class GPSDataAdmin(admin.ModelAdmin):
         }),
     )
     
+    # Código de dispositivo y caravana salen de list_annotations: sin cargar las relaciones
     def device_id(self, obj):
-        return obj.device.device_id
+        return obj.device_code
     device_id.short_description = 'Dispositivo'
     
     def animal_link(self, obj):
-        if obj.animal:
-            url = reverse('admin:cattle_animal_change', args=[obj.animal.id])
-            return format_html('<a href="{}">{}</a>', url, obj.animal.ear_tag)
+        if obj.animal_id:
+            url = reverse('admin:cattle_animal_change', args=[obj.animal_id])
+            return format_html('<a href="{}">{}</a>', url, obj.animal_ear_tag)
         return "—"
     animal_link.short_description = 'Animal'
     
@@ -259,17 +266,22 @@ class GPSDataAdmin(admin.ModelAdmin):
     polyscan_link.short_description = 'Transacción'
 
 @admin.register(HealthSensorData)
-class HealthSensorDataAdmin(admin.ModelAdmin):
+class HealthSensorDataAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'device_id', 'animal_link', 'temperature_display',
         'heart_rate_display', 'movement_display', 'timestamp',
         'health_alert_display', 'has_anomalies_display', 'blockchain_linked_display'
     ]
     
+    list_annotations = {'device_code': 'device__device_id', 'animal_ear_tag': 'animal__ear_tag'}
+    
     list_filter = [
-        'health_alert', 'processed', 'timestamp'
+        RecentPeriodFilter, 'health_alert', 'processed'
     ]
     
+    date_hierarchy = 'timestamp'
+    rollup_source = 'SENSOR'
+    
     search_fields = [
         'device__device_id', 'animal__ear_tag', 'animal__breed',
         'blockchain_hash'
@@ -317,14 +329,15 @@ class HealthSensorDataAdmin(admin.ModelAdmin):
         }),
     )
     
+    # Código de dispositivo y caravana salen de list_annotations: sin cargar las relaciones
     def device_id(self, obj):
-        return obj.device.device_id
+        return obj.device_code
     device_id.short_description = 'Dispositivo'
     
     def animal_link(self, obj):
-        if obj.animal:
-            url = reverse('admin:cattle_animal_change', args=[obj.animal.id])
-            return format_html('<a href="{}">{}</a>', url, obj.animal.ear_tag)
+        if obj.animal_id:
+            url = reverse('admin:cattle_animal_change', args=[obj.animal_id])
+            return format_html('<a href="{}">{}</a>', url, obj.animal_ear_tag)
         return "—"
     animal_link.short_description = 'Animal'
     
@@ -45,7 +45,7 @@ class IsIoTDevice(permissions.BasePermission):
                 device = IoTDevice.objects.get(
                     device_id=device_id,
                     auth_token=device_token,  # Necesitarías añadir este campo al modelo
-                    is_active=True
+                    status='ACTIVE'
                 )
                 request.device = device  # Almacenar dispositivo en la request
                 return True
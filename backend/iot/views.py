@@ -495,7 +495,7 @@ class IoTDataIngestView(APIView):
                         rumination_time=health_data.get('rumination_time'),
                         feeding_activity=health_data.get('feeding_activity'),
                         respiratory_rate=health_data.get('respiratory_rate'),
-                        posture=health_data.get('posture'),
+                        posture=health_data.get('posture', ''),
                         ambient_temperature=health_data.get('ambient_temperature'),
                         humidity=health_data.get('humidity'),
                         timestamp=health_data.get('timestamp', timezone.now())
@@ -643,22 +643,28 @@ class IoTStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        user_devices = IoTDevice.objects.filter(owner=request.user)
+        from core.counters import load_counters
+        
+        counters = load_counters([
+            'iot.devices', 'iot.devices.status', 'iot.devices.type',
+            'iot.devices.low_battery', 'iot.devices.battery_reported', 'iot.devices.battery_sum',
+            'iot.gps_data', 'iot.health_data', 'iot.health_data.alerts',
+            'iot.device_events', 'iot.device_events.unresolved',
+        ], user=request.user)
         
         stats = {
-            'total_devices': user_devices.count(),
-            'active_devices': user_devices.filter(status='ACTIVE').count(),
-            'inactive_devices': user_devices.filter(status='INACTIVE').count(),
-            'maintenance_devices': user_devices.filter(status='MAINTENANCE').count(),
-            'total_gps_data': GPSData.objects.filter(animal__owner=request.user).count(),
-            'total_health_data': HealthSensorData.objects.filter(animal__owner=request.user).count(),
-            'health_alerts': HealthSensorData.objects.filter(animal__owner=request.user, health_alert=True).count(),
-            'unresolved_events': DeviceEvent.objects.filter(device__owner=request.user, resolved=False).count(),
-            'devices_by_type': dict(user_devices.values_list('device_type').annotate(count=Count('id'))),
-            'recent_activity': DeviceEvent.objects.filter(device__owner=request.user)
-                              .order_by('-timestamp')[:5].count(),
-            'avg_battery_level': user_devices.aggregate(avg=Avg('battery_level'))['avg'] or 0,
-            'low_battery_devices': user_devices.filter(battery_level__lt=20).count()
+            'total_devices': counters.count('iot.devices'),
+            'active_devices': counters.count('iot.devices.status', 'ACTIVE'),
+            'inactive_devices': counters.count('iot.devices.status', 'INACTIVE'),
+            'maintenance_devices': counters.count('iot.devices.status', 'MAINTENANCE'),
+            'total_gps_data': counters.count('iot.gps_data'),
+            'total_health_data': counters.count('iot.health_data'),
+            'health_alerts': counters.count('iot.health_data.alerts'),
+            'unresolved_events': counters.count('iot.device_events.unresolved'),
+            'devices_by_type': counters.breakdown('iot.devices.type'),
+            'recent_activity': min(counters.count('iot.device_events'), 5),
+            'avg_battery_level': counters.average('iot.devices.battery_sum', 'iot.devices.battery_reported'),
+            'low_battery_devices': counters.count('iot.devices.low_battery')
         }
         
         return Response(stats)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class MarketConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'market'
+
+    def ready(self):
+        from .candles import connect_candle_signals
+        from .engine import connect_market_signals
+
+        connect_market_signals()
+        connect_candle_signals()
@@ -0,0 +1,209 @@
+# backend/market/candles.py
+"""
+Velas OHLC del mercado a 1 hora, 1 día y 1 semana por raza y moneda.
+
+Cada trade completado actualiza sus tres velas dentro de la misma
+transacción con una inserción ``ignore_conflicts`` y un UPDATE por
+resolución (``Greatest``/``Least`` para máximo y mínimo; apertura y cierre
+por ID de trade). Los cambios posteriores de estado o precio de un trade no
+se propagan: ``rebuild_candles`` regenera todo en una sola pasada por los
+trades ordenados por fecha.
+
+Los intervalos diarios y semanales (lunes) siguen ``TIME_ZONE``.
+"""
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, F, Sum, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from blockchain.market_models import PriceCandle, Trade
+
+RESOLUTIONS = ('1h', '1d', '1w')
+REBUILD_BATCH_SIZE = 1000
+
+Candle = namedtuple('Candle', 'bucket_start open high low close volume trade_count')
+
+
+def bucket_start(moment, resolution):
+    local = timezone.localtime(moment)
+    if resolution == '1h':
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == '1d':
+        return day
+    if resolution == '1w':
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"Resolución no soportada: {resolution}")
+
+
+# ==============================================================================
+# ACTUALIZACIÓN INCREMENTAL
+# ==============================================================================
+
+def record_trade(trade_id, trade_date, price, currency, breed):
+    """Sumar un trade a sus velas; 4 consultas sin importar el volumen."""
+    breed = breed or ''
+    buckets = {resolution: bucket_start(trade_date, resolution) for resolution in RESOLUTIONS}
+    with transaction.atomic():
+        PriceCandle.objects.bulk_create([
+            PriceCandle(
+                resolution=resolution, bucket_start=start, breed=breed, currency=currency,
+                open=price, high=price, low=price, close=price,
+                open_trade_id=trade_id, close_trade_id=trade_id
+            )
+            for resolution, start in buckets.items()
+        ], ignore_conflicts=True)
+        # La fila recién creada pasa por el mismo UPDATE: volumen y conteo empiezan en cero
+        for resolution, start in buckets.items():
+            PriceCandle.objects.filter(
+                resolution=resolution, bucket_start=start, breed=breed, currency=currency
+            ).update(
+                open=Case(When(open_trade_id__gt=trade_id, then=price), default=F('open')),
+                close=Case(When(close_trade_id__lt=trade_id, then=price), default=F('close')),
+                open_trade_id=Least('open_trade_id', trade_id, output_field=BigIntegerField()),
+                close_trade_id=Greatest('close_trade_id', trade_id, output_field=BigIntegerField()),
+                high=Greatest('high', price),
+                low=Least('low', price),
+                volume=F('volume') + price,
+                trade_count=F('trade_count') + 1,
+            )
+
+
+def _trade_saved(sender, instance, created, **kwargs):
+    if not created or instance.status != 'COMPLETED':
+        return
+    try:
+        breed = instance.listing.animal.breed
+    except Exception:
+        breed = ''
+    record_trade(instance.pk, instance.trade_date, instance.price, instance.currency, breed)
+
+
+def connect_candle_signals():
+    from django.db.models.signals import post_save
+
+    post_save.connect(_trade_saved, sender=Trade, dispatch_uid='market_candles_trade_save')
+
+
+# ==============================================================================
+# RECONSTRUCCIÓN
+# ==============================================================================
+
+def rebuild_candles(since=None):
+    """Regenerar las velas desde los trades en una pasada; devuelve cuántas escribió.
+
+    Los trades se recorren por fecha, así que una vela queda cerrada en cuanto
+    aparece un trade posterior a su intervalo y se escribe por lotes.
+    """
+    trades = Trade.objects.filter(status='COMPLETED')
+    stale = PriceCandle.objects.all()
+    if since is not None:
+        # Empezar en el inicio de la semana para no dejar velas semanales a medias
+        since = bucket_start(since, '1w')
+        trades = trades.filter(trade_date__gte=since)
+        stale = stale.filter(bucket_start__gte=since)
+    rows = trades.order_by('trade_date', 'id').values_list(
+        'id', 'trade_date', 'price', 'currency', 'listing__animal__breed'
+    ).iterator(chunk_size=REBUILD_BATCH_SIZE)
+
+    written = 0
+    open_candles = {}
+    finished = []
+    with transaction.atomic():
+        stale.delete()
+        for trade_id, trade_date, price, currency, breed in rows:
+            for resolution in RESOLUTIONS:
+                start = bucket_start(trade_date, resolution)
+                key = (resolution, breed or '', currency)
+                candle = open_candles.get(key)
+                if candle is not None and candle.bucket_start != start:
+                    finished.append(candle)
+                    candle = None
+                if candle is None:
+                    candle = open_candles[key] = PriceCandle(
+                        resolution=resolution, bucket_start=start, breed=breed or '', currency=currency,
+                        open=price, high=price, low=price, close=price, volume=Decimal('0'),
+                        trade_count=0, open_trade_id=trade_id, close_trade_id=trade_id
+                    )
+                candle.high = max(candle.high, price)
+                candle.low = min(candle.low, price)
+                candle.close = price
+                candle.close_trade_id = trade_id
+                candle.volume += price
+                candle.trade_count += 1
+            if len(finished) >= REBUILD_BATCH_SIZE:
+                PriceCandle.objects.bulk_create(finished)
+                written += len(finished)
+                finished = []
+        finished.extend(open_candles.values())
+        PriceCandle.objects.bulk_create(finished, batch_size=REBUILD_BATCH_SIZE)
+        written += len(finished)
+    return written
+
+
+# ==============================================================================
+# CONSULTA
+# ==============================================================================
+
+def candle_range(resolution, currency, start=None, end=None, breed=None, limit=None):
+    """Velas del intervalo en orden temporal; sin raza se combinan todas."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolución no soportada: {resolution}")
+    rows = PriceCandle.objects.filter(resolution=resolution, currency=currency)
+    if breed is not None:
+        rows = rows.filter(breed=breed)
+    if start is not None:
+        rows = rows.filter(bucket_start__gte=bucket_start(start, resolution))
+    if end is not None:
+        rows = rows.filter(bucket_start__lt=end)
+    if limit and start is None:
+        # Últimas ``limit`` ventanas: el corte se busca en SQL por el índice
+        # en orden descendente en lugar de leer toda la historia
+        recent = list(rows.order_by('-bucket_start').values_list('bucket_start', flat=True).distinct()[:limit])
+        if not recent:
+            return []
+        rows = rows.filter(bucket_start__gte=recent[-1])
+
+    merged = {}
+    for row in rows.order_by('bucket_start').values_list(
+        'bucket_start', 'open', 'high', 'low', 'close', 'volume', 'trade_count', 'open_trade_id', 'close_trade_id'
+    ):
+        moment, open_, high, low, close, volume, count, first_id, last_id = row
+        current = merged.get(moment)
+        if current is None:
+            merged[moment] = [open_, high, low, close, volume, count, first_id, last_id]
+            continue
+        if first_id < current[6]:
+            current[0], current[6] = open_, first_id
+        if last_id > current[7]:
+            current[3], current[7] = close, last_id
+        current[1] = max(current[1], high)
+        current[2] = min(current[2], low)
+        current[4] += volume
+        current[5] += count
+
+    candles = [Candle(moment, *values[:6]) for moment, values in sorted(merged.items())]
+    return candles[-limit:] if limit else candles
+
+
+def daily_summary(since, until=None):
+    """Precio medio, trades y volumen por día y moneda desde las velas diarias."""
+    rows = PriceCandle.objects.filter(resolution='1d', bucket_start__gte=bucket_start(since, '1d'))
+    if until is not None:
+        rows = rows.filter(bucket_start__lt=until)
+    summary = []
+    for row in rows.values('bucket_start', 'currency').annotate(
+        trades=Sum('trade_count'), total_volume=Sum('volume')
+    ).order_by('bucket_start', 'currency'):
+        summary.append({
+            'date': timezone.localtime(row['bucket_start']).date(),
+            'currency': row['currency'],
+            'avg_price': row['total_volume'] / row['trades'] if row['trades'] else None,
+            'trade_count': row['trades'],
+            'total_volume': row['total_volume'],
+        })
+    return summary
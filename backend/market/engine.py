@@ -0,0 +1,451 @@
+# backend/market/engine.py
+"""
+Motor del mercado ganadero en memoria.
+
+Mantiene los listados activos y las órdenes de compra abiertas en las
+estructuras ordenadas de ``market.orderbook``: búsquedas por rango de precio,
+raza y moneda y consultas top-N sin tocar la base de datos. El libro se
+construye desde la base de datos en el primer uso y se actualiza con señales
+tras cada commit, así que solo refleja datos confirmados.
+
+Cada proceso tiene su propio libro. Cada cambio confirmado incrementa además
+una versión en la caché compartida y deja ahí qué listado u orden cambió;
+antes de cada consulta el motor compara esa versión con la suya y relee los
+cambios que no vio (hasta ``MAX_REPLAY``) o, si faltan, reconstruye el libro.
+
+Los vencimientos se programan en una rueda de temporización; un hilo la
+avanza cada ``MARKET_EXPIRY_INTERVAL`` segundos (None = sin hilo) y desactiva
+los listados vencidos. Las consultas descartan igualmente los vencidos aunque
+el hilo aún no haya pasado.
+
+El cruce usa el precio del listado (el comprador nunca paga más que su
+máximo) y bloquea listado y orden con ``select_for_update``: el índice solo
+propone candidatos, la base de datos decide.
+"""
+import hashlib
+import logging
+import threading
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from blockchain.market_models import BuyOrder, MarketListing, Trade
+from core.background import PeriodicThread
+
+from .orderbook import Bid, BidBook, Listing, ListingBook, TimingWheel, normalize_breed
+
+logger = logging.getLogger(__name__)
+
+PLATFORM_FEE = Decimal('0.02')
+WHEEL_TICK_SECONDS = 60
+WHEEL_SLOTS = 1440
+
+# Sincronización entre procesos por la caché compartida
+VERSION_KEY = 'market-engine:version'
+CHANGE_PREFIX = 'market-engine:change:'
+CHANGE_TTL = 3600
+MAX_REPLAY = 1000
+
+LISTING_FIELDS = ('id', 'price', 'currency', 'animal__breed', 'expiration_date', 'seller_id', 'animal_id')
+ORDER_FIELDS = ('id', 'max_price', 'currency', 'breed', 'quantity', 'filled_quantity',
+                'buyer_id', 'created_at', 'expiration_date')
+
+
+class TradeError(Exception):
+    """El trade no puede ejecutarse (listado no disponible, orden inválida...)."""
+
+
+def _listing(row):
+    listing_id, price, currency, breed, expires, seller_id, animal_id = row
+    return Listing(listing_id, price, currency, breed, expires.timestamp(), seller_id, animal_id)
+
+
+def _bid(row):
+    order_id, max_price, currency, breed, quantity, filled, buyer_id, created, expires = row
+    return Bid(order_id, max_price, currency, breed, quantity - filled, buyer_id,
+               created.timestamp(), expires.timestamp() if expires else None)
+
+
+def simulated_transaction_hash(listing_id, buyer_id):
+    # Hasta integrar el contrato de mercado, un hash único con formato de transacción
+    return '0x' + hashlib.sha256(f'{listing_id}:{buyer_id}:{time.time_ns()}'.encode()).hexdigest()
+
+
+class MarketEngine:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._expirer = PeriodicThread(
+            'market-expiry', self.expire, 'MARKET_EXPIRY_INTERVAL', default=60,
+            error='Error expirando listados del mercado',
+        )
+        self._version = None
+        self.listings = ListingBook()
+        self.bids = BidBook()
+        self.wheel = TimingWheel(WHEEL_TICK_SECONDS, WHEEL_SLOTS, time.time())
+
+    # --------------------------------------------------------------------------
+    # Carga y sincronización
+    # --------------------------------------------------------------------------
+
+    def rebuild(self):
+        """Reconstruir el libro completo desde la base de datos."""
+        now = timezone.now()
+        listing_rows = MarketListing.objects.filter(
+            is_active=True, expiration_date__gt=now
+        ).values_list(*LISTING_FIELDS).iterator(chunk_size=5000)
+        order_rows = BuyOrder.objects.filter(status='OPEN').values_list(*ORDER_FIELDS)
+
+        listings, bids = ListingBook(), BidBook()
+        wheel = TimingWheel(WHEEL_TICK_SECONDS, WHEEL_SLOTS, now.timestamp())
+        for row in listing_rows:
+            listing = listings.add(_listing(row))
+            wheel.schedule(listing.id, listing.expires_at)
+        for row in order_rows:
+            bid = _bid(row)
+            if bid.remaining > 0:
+                bids.add(bid)
+
+        with self._lock:
+            self.listings, self.bids, self.wheel = listings, bids, wheel
+            self._loaded = True
+        self._expirer.ensure()
+        return len(listings), len(bids)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    # Versión leída antes que la base: un cambio intermedio se vuelve a aplicar
+                    self._version = self._shared_version()
+                    self.rebuild()
+            return
+        self._sync()
+
+    def reset(self):
+        """Olvidar el libro; se reconstruye en el próximo uso."""
+        with self._lock:
+            self._loaded = False
+            self._version = None
+            self.listings, self.bids = ListingBook(), BidBook()
+            self.wheel = TimingWheel(WHEEL_TICK_SECONDS, WHEEL_SLOTS, time.time())
+
+    def listing_changed(self, listing_id):
+        """Releer un listado tras un commit y actualizar el índice."""
+        if not self._loaded:
+            return
+        row = MarketListing.objects.filter(
+            pk=listing_id, is_active=True, expiration_date__gt=timezone.now()
+        ).values_list(*LISTING_FIELDS).first()
+        with self._lock:
+            if row is None:
+                self.listings.remove(listing_id)
+                self.wheel.cancel(listing_id)
+            else:
+                listing = self.listings.add(_listing(row))
+                self.wheel.schedule(listing.id, listing.expires_at)
+
+    def animal_changed(self, animal_id):
+        listing_id = self.listings.by_animal.get(animal_id)
+        if listing_id is not None:
+            self.listing_changed(listing_id)
+            self.publish('listing', listing_id)
+
+    def order_changed(self, order_id):
+        if not self._loaded:
+            return
+        row = BuyOrder.objects.filter(pk=order_id, status='OPEN').values_list(*ORDER_FIELDS).first()
+        bid = _bid(row) if row else None
+        with self._lock:
+            if bid is None or bid.remaining <= 0:
+                self.bids.remove(order_id)
+            else:
+                self.bids.add(bid)
+
+    # --------------------------------------------------------------------------
+    # Sincronización entre procesos
+    # --------------------------------------------------------------------------
+
+    def _shared_version(self):
+        """Versión en la caché compartida; ``None`` si la caché no la guarda."""
+        try:
+            version = cache.get(VERSION_KEY)
+            if version is None:
+                # Perdida o nueva: un valor nunca visto obliga a reconstruir
+                cache.add(VERSION_KEY, time.time_ns(), None)
+                version = cache.get(VERSION_KEY)
+            return version
+        except Exception as e:
+            logger.error(f"Error leyendo la versión del mercado: {str(e)}")
+            return None
+
+    def publish(self, kind, object_id):
+        """Anunciar a los demás procesos un cambio confirmado (``listing`` u ``order``)."""
+        try:
+            try:
+                version = cache.incr(VERSION_KEY)
+            except ValueError:
+                cache.add(VERSION_KEY, time.time_ns(), None)
+                return
+            cache.set(f'{CHANGE_PREFIX}{version}', (kind, object_id), CHANGE_TTL)
+        except Exception as e:
+            logger.error(f"Error publicando cambio del mercado: {str(e)}")
+            return
+        with self._lock:
+            # Cambio propio ya aplicado y sin otros en medio: no hay nada que releer
+            if self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def _sync(self):
+        """Aplicar los cambios publicados por otros procesos desde la última consulta."""
+        seen = self._version
+        current = self._shared_version()
+        if current is None or current == seen:
+            return
+        if seen is not None and 0 < current - seen <= MAX_REPLAY:
+            keys = [f'{CHANGE_PREFIX}{version}' for version in range(seen + 1, current + 1)]
+            try:
+                changes = cache.get_many(keys)
+            except Exception as e:
+                logger.error(f"Error leyendo cambios del mercado: {str(e)}")
+                changes = {}
+            if len(changes) == len(keys):
+                for kind, object_id in changes.values():
+                    if kind == 'listing':
+                        self.listing_changed(object_id)
+                    else:
+                        self.order_changed(object_id)
+                with self._lock:
+                    if self._version == seen:
+                        self._version = current
+                return
+        with self._lock:
+            self._version = current
+            self.rebuild()
+
+    # --------------------------------------------------------------------------
+    # Consultas
+    # --------------------------------------------------------------------------
+
+    def search(self, currency=None, breed=None, min_price=None, max_price=None, limit=None,
+               seller=None, animal=None):
+        """Listados activos en orden de precio ascendente."""
+        self._ensure_loaded()
+        with self._lock:
+            return self.listings.search(currency, breed, min_price, max_price, limit, now=time.time(),
+                                        seller=seller, animal=animal)
+
+    def top(self, n=10, currency=None, breed=None):
+        """Mejores ``n`` ofertas de venta y de compra (libro de órdenes)."""
+        self._ensure_loaded()
+        now = time.time()
+        with self._lock:
+            asks = self.listings.search(currency, breed, limit=n, now=now)
+            bids = []
+            for key, index in self.bids.by_market.items():
+                if (currency is None or key[1] == currency) and (not breed or key[0] == normalize_breed(breed)):
+                    bids.extend(self.bids.bids[bid_id] for _, _, bid_id in index[:n])
+        live = [bid for bid in bids if bid.expires_at is None or bid.expires_at > now]
+        live.sort(key=BidBook._key)
+        return asks, live[:n]
+
+    def price_range(self, currency=None):
+        """Precio mínimo y máximo de los listados activos; ``(None, None)`` si no hay."""
+        self._ensure_loaded()
+        with self._lock:
+            indexes = [index for index in self.listings._indexes(currency) if index]
+            if not indexes:
+                return None, None
+            return min(index[0][0] for index in indexes), max(index[-1][0] for index in indexes)
+
+    # --------------------------------------------------------------------------
+    # Vencimientos
+    # --------------------------------------------------------------------------
+
+    def expire(self, now=None):
+        """Avanzar la rueda y desactivar los listados vencidos; devuelve cuántos."""
+        self._ensure_loaded()
+        now = now or timezone.now()
+        stale_orders = list(BuyOrder.objects.filter(status='OPEN', expiration_date__lte=now).values_list('pk', flat=True))
+        if stale_orders:
+            BuyOrder.objects.filter(pk__in=stale_orders).update(status='EXPIRED')
+            # update() no dispara señales
+            for order_id in stale_orders:
+                self.publish('order', order_id)
+        with self._lock:
+            due = self.wheel.advance(now.timestamp())
+            for listing_id in due:
+                self.listings.remove(listing_id)
+            for order_id in stale_orders:
+                self.bids.remove(order_id)
+        if not due:
+            return 0
+        # Guardado por fila: los contadores del mercado siguen a post_save
+        expired = 0
+        for listing in MarketListing.objects.filter(pk__in=due, is_active=True, expiration_date__lte=now):
+            listing.is_active = False
+            listing.save(update_fields=['is_active'])
+            expired += 1
+        return expired
+
+    # --------------------------------------------------------------------------
+    # Ejecución y cruce
+    # --------------------------------------------------------------------------
+
+    def execute_trade(self, listing_id, buyer, buy_order_id=None):
+        """Comprar un listado al precio publicado; lanza ``TradeError`` si no se puede."""
+        with transaction.atomic():
+            listing = MarketListing.objects.select_for_update().select_related('animal').filter(
+                pk=listing_id, is_active=True, expiration_date__gt=timezone.now()
+            ).first()
+            if listing is None:
+                raise TradeError('El listado no está disponible')
+            if listing.seller_id == buyer.pk:
+                raise TradeError('No puedes comprar tu propio listado')
+
+            order = None
+            if buy_order_id is not None:
+                order = BuyOrder.objects.select_for_update().filter(pk=buy_order_id, buyer=buyer).first()
+                if order is None or order.status != 'OPEN' or order.remaining <= 0:
+                    raise TradeError('La orden de compra no está abierta')
+                if listing.price > order.max_price or listing.currency != order.currency:
+                    raise TradeError('El listado no cumple la orden de compra')
+
+            trade = Trade.objects.create(
+                listing=listing,
+                buyer=buyer,
+                buy_order=order,
+                price=listing.price,
+                currency=listing.currency,
+                platform_fee=(listing.price * PLATFORM_FEE).quantize(Decimal('0.01')),
+                status='COMPLETED',
+                transaction_hash=simulated_transaction_hash(listing.pk, buyer.pk),
+            )
+
+            listing.is_active = False
+            listing.save(update_fields=['is_active'])
+
+            # Transferir la propiedad del animal (esto sería en blockchain)
+            animal = listing.animal
+            animal.owner = buyer
+            animal.save()
+
+            if order is not None:
+                order.filled_quantity += 1
+                if order.remaining <= 0:
+                    order.status = 'FILLED'
+                order.save(update_fields=['filled_quantity', 'status'])
+
+        # Retirar ya el listado para que otro cruce no lo proponga antes del commit
+        with self._lock:
+            self.listings.remove(listing.pk)
+            self.wheel.cancel(listing.pk)
+        return trade
+
+    def match_order(self, order_id):
+        """Cruzar una orden de compra con los listados más baratos que acepta."""
+        self._ensure_loaded()
+        order = BuyOrder.objects.select_related('buyer').filter(pk=order_id, status='OPEN').first()
+        if order is None:
+            return []
+        with self._lock:
+            candidates = self.listings.search(
+                order.currency, order.breed or None, max_price=order.max_price, now=time.time(),
+                exclude_seller=order.buyer_id, exact=True, limit=order.remaining * 2 + 5
+            )
+
+        trades = []
+        for listing in candidates:
+            if len(trades) >= order.remaining:
+                break
+            try:
+                trades.append(self.execute_trade(listing.id, order.buyer, order.pk))
+            except TradeError:
+                continue
+        if trades:
+            self._refresh_bid(order.pk)
+        return trades
+
+    def match_listing(self, listing_id):
+        """Vender un listado nuevo a la mejor orden de compra que lo acepta."""
+        self._ensure_loaded()
+        row = MarketListing.objects.filter(
+            pk=listing_id, is_active=True, expiration_date__gt=timezone.now()
+        ).values_list(*LISTING_FIELDS).first()
+        if row is None:
+            return None
+        listing = _listing(row)
+        listing = listing._replace(breed=normalize_breed(listing.breed))
+        with self._lock:
+            candidates = list(self.bids.best_for(listing, now=time.time()))
+
+        for bid in candidates:
+            order = BuyOrder.objects.select_related('buyer').filter(pk=bid.id).first()
+            if order is None:
+                continue
+            try:
+                trade = self.execute_trade(listing_id, order.buyer, order.pk)
+            except TradeError:
+                continue
+            self._refresh_bid(order.pk)
+            return trade
+        return None
+
+    def _refresh_bid(self, order_id):
+        row = BuyOrder.objects.filter(pk=order_id, status='OPEN').values_list(*ORDER_FIELDS).first()
+        bid = _bid(row) if row else None
+        with self._lock:
+            if bid is None or bid.remaining <= 0:
+                self.bids.remove(order_id)
+            else:
+                self.bids.add(bid)
+
+
+market_engine = MarketEngine()
+
+
+# ==============================================================================
+# SEÑALES
+# ==============================================================================
+
+# La clave se copia antes: tras un borrado Django deja ``instance.pk`` en None
+
+def _listing_committed(listing_id):
+    market_engine.listing_changed(listing_id)
+    market_engine.publish('listing', listing_id)
+
+
+def _order_committed(order_id):
+    market_engine.order_changed(order_id)
+    market_engine.publish('order', order_id)
+
+
+def _listing_saved(sender, instance, **kwargs):
+    listing_id = instance.pk
+    transaction.on_commit(lambda: _listing_committed(listing_id))
+
+
+def _animal_saved(sender, instance, **kwargs):
+    animal_id = instance.pk
+    if animal_id in market_engine.listings.by_animal:
+        transaction.on_commit(lambda: market_engine.animal_changed(animal_id))
+
+
+def _order_saved(sender, instance, **kwargs):
+    order_id = instance.pk
+    transaction.on_commit(lambda: _order_committed(order_id))
+
+
+def connect_market_signals():
+    from django.db.models.signals import post_delete, post_save
+
+    from cattle.models import Animal
+
+    post_save.connect(_listing_saved, sender=MarketListing, dispatch_uid='market_engine_listing_save')
+    post_delete.connect(_listing_saved, sender=MarketListing, dispatch_uid='market_engine_listing_delete')
+    post_save.connect(_animal_saved, sender=Animal, dispatch_uid='market_engine_animal_save')
+    post_save.connect(_order_saved, sender=BuyOrder, dispatch_uid='market_engine_order_save')
+    post_delete.connect(_order_saved, sender=BuyOrder, dispatch_uid='market_engine_order_delete')
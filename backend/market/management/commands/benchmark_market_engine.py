@@ -0,0 +1,85 @@
+# market/management/commands/benchmark_market_engine.py
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from market.orderbook import Bid, BidBook, Listing, ListingBook, TimingWheel
+
+BREEDS = ['Angus', 'Hereford', 'Brahman', 'Holstein', 'Brangus', 'Limousin', 'Charolais', 'Simmental']
+CURRENCIES = ['USDC', 'DAI', 'MATIC']
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia del libro de órdenes del mercado con listados sintéticos en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=100000, help='Listados sintéticos')
+        parser.add_argument('--queries', type=int, default=10000, help='Consultas por tipo')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _timed(self, label, count, func):
+        started = time.perf_counter()
+        for _ in range(count):
+            func()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label}: {elapsed * 1e6 / count:.2f} µs/op')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        size, queries = options['listings'], options['queries']
+        now = time.time()
+
+        listings = [
+            Listing(
+                index, Decimal(rng.randrange(50000, 500000)) / 100, rng.choice(CURRENCIES), rng.choice(BREEDS),
+                now + rng.uniform(60, 90 * 86400), rng.randrange(5000), index
+            )
+            for index in range(size)
+        ]
+        book = ListingBook()
+        wheel = TimingWheel(now=now)
+        started = time.perf_counter()
+        for listing in listings:
+            book.add(listing)
+            wheel.schedule(listing.id, listing.expires_at)
+        self.stdout.write(f'Carga de {size} listados: {(time.perf_counter() - started) * 1e6 / size:.2f} µs/listado')
+
+        def price_range():
+            low = Decimal(rng.randrange(50000, 450000)) / 100
+            book.search(rng.choice(CURRENCIES), min_price=low, max_price=low + 50, limit=50, now=now)
+
+        def breed_range():
+            low = Decimal(rng.randrange(50000, 450000)) / 100
+            book.search(rng.choice(CURRENCIES), rng.choice(BREEDS), low, low + 500, limit=50, now=now)
+
+        self._timed('Rango de precio (50 resultados)', queries, price_range)
+        self._timed('Rango por raza y moneda', queries, breed_range)
+        self._timed('Top-10 por moneda', queries, lambda: book.search(rng.choice(CURRENCIES), limit=10, now=now))
+        self._timed('Top-10 por subcadena de raza', queries,
+                    lambda: book.search(breed=rng.choice(BREEDS)[:3], limit=10, now=now))
+
+        def churn():
+            listing = listings[rng.randrange(size)]
+            book.remove(listing.id)
+            book.add(listing._replace(price=listing.price + 1))
+            wheel.schedule(listing.id, listing.expires_at)
+
+        self._timed('Actualización de listado', queries, churn)
+
+        bids = BidBook()
+        for index in range(1000):
+            bids.add(Bid(index, Decimal(rng.randrange(50000, 500000)) / 100, rng.choice(CURRENCIES),
+                         rng.choice(BREEDS + ['']), 1, 10000 + index, now + index, None))
+        self._timed('Mejor orden de compra para un listado', queries,
+                    lambda: next(bids.best_for(book.listings[rng.randrange(size)], now=now), None))
+
+        started = time.perf_counter()
+        expired = wheel.advance(now + 86400)
+        self.stdout.write(
+            f'Rueda: {len(expired)} vencidos en 1 día simulado, '
+            f'{(time.perf_counter() - started) * 1e3:.2f} ms'
+        )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark del mercado completado'))
@@ -0,0 +1,29 @@
+# market/management/commands/rebuild_price_candles.py
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from market.candles import rebuild_candles
+
+
+class Command(BaseCommand):
+    help = 'Regenera las velas OHLC del mercado a partir de los trades en una sola pasada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Fecha (AAAA-MM-DD) desde la que regenerar; se redondea al inicio de su semana. '
+                 'Por defecto, todo el historial.'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = timezone.make_aware(datetime.datetime.strptime(options['since'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('--since debe tener formato AAAA-MM-DD')
+
+        written = rebuild_candles(since)
+        self.stdout.write(self.style.SUCCESS(f'{written} velas regeneradas'))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 21:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('cattle', '0008_animalmultichain_animalnftmirror'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InternationalMarket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country', models.CharField(max_length=100)),
+                ('import_requirements', models.JSONField()),
+                ('certification_requirements', models.JSONField()),
+                ('tariff_codes', models.JSONField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExportCertificate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('certificate_data', models.JSONField()),
+                ('blockchain_hash', models.CharField(max_length=255)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cattle.batch')),
+                ('issued_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('destination_market', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='market.internationalmarket')),
+            ],
+        ),
+    ]
@@ -0,0 +1,192 @@
+# backend/market/orderbook.py
+"""
+Estructuras en memoria del mercado (sin Django): libro de listados
+indexado por precio, raza y moneda, libro de órdenes de compra y rueda de
+temporización para los vencimientos.
+
+Todas las claves de orden incluyen el ID como desempate, así que dos
+listados al mismo precio se sirven por antigüedad (prioridad precio-tiempo).
+"""
+from collections import namedtuple
+from decimal import Decimal
+from heapq import merge
+
+from sortedcontainers import SortedList
+
+Listing = namedtuple('Listing', 'id price currency breed expires_at seller_id animal_id')
+Bid = namedtuple('Bid', 'id max_price currency breed remaining buyer_id created_at expires_at')
+
+ANY_BREED = ''
+
+
+def normalize_breed(breed):
+    return (breed or '').strip().casefold()
+
+
+class TimingWheel:
+    """Rueda de temporización con vueltas (hashed timing wheel).
+
+    ``schedule`` y ``cancel`` son O(1); ``advance`` recorre solo los
+    casilleros de los ticks transcurridos. Los plazos más largos que una
+    vuelta completa se guardan con un contador de vueltas restantes.
+    """
+
+    def __init__(self, tick_seconds=60, slots=1440, now=0.0):
+        self.tick = tick_seconds
+        self.slots = [dict() for _ in range(slots)]
+        self.current_tick = int(now // tick_seconds)
+        self.location = {}
+
+    def __len__(self):
+        return len(self.location)
+
+    def schedule(self, key, when):
+        self.cancel(key)
+        target = max(int(when // self.tick), self.current_tick + 1)
+        distance = target - self.current_tick
+        slot = target % len(self.slots)
+        self.slots[slot][key] = (distance - 1) // len(self.slots)
+        self.location[key] = slot
+
+    def cancel(self, key):
+        slot = self.location.pop(key, None)
+        if slot is not None:
+            self.slots[slot].pop(key, None)
+
+    def advance(self, now):
+        """Avanzar hasta ``now``; devuelve las claves vencidas."""
+        expired = []
+        target = int(now // self.tick)
+        while self.current_tick < target:
+            self.current_tick += 1
+            bucket = self.slots[self.current_tick % len(self.slots)]
+            for key, rounds in list(bucket.items()):
+                if rounds <= 0:
+                    del bucket[key]
+                    del self.location[key]
+                    expired.append(key)
+                else:
+                    bucket[key] = rounds - 1
+        return expired
+
+
+class ListingBook:
+    """Listados activos ordenados por precio por moneda y por (raza, moneda)."""
+
+    def __init__(self):
+        self.listings = {}
+        self.by_currency = {}
+        self.by_breed = {}
+        self.by_animal = {}
+
+    def __len__(self):
+        return len(self.listings)
+
+    @staticmethod
+    def _key(listing):
+        return (listing.price, listing.id)
+
+    def add(self, listing):
+        self.remove(listing.id)
+        listing = listing._replace(breed=normalize_breed(listing.breed))
+        self.listings[listing.id] = listing
+        self.by_currency.setdefault(listing.currency, SortedList()).add(self._key(listing))
+        self.by_breed.setdefault((listing.breed, listing.currency), SortedList()).add(self._key(listing))
+        self.by_animal[listing.animal_id] = listing.id
+        return listing
+
+    def remove(self, listing_id):
+        listing = self.listings.pop(listing_id, None)
+        if listing is None:
+            return None
+        self.by_currency[listing.currency].discard(self._key(listing))
+        self.by_breed[(listing.breed, listing.currency)].discard(self._key(listing))
+        if self.by_animal.get(listing.animal_id) == listing_id:
+            del self.by_animal[listing.animal_id]
+        return listing
+
+    def _indexes(self, currency=None, breed=None, exact=False):
+        """Índices a recorrer; ``breed`` busca por subcadena como ``icontains``
+        salvo con ``exact``."""
+        if breed and exact:
+            return [index for key, index in self.by_breed.items()
+                    if key[0] == normalize_breed(breed) and (currency is None or key[1] == currency)]
+        if breed:
+            needle = normalize_breed(breed)
+            return [
+                index for (indexed_breed, indexed_currency), index in self.by_breed.items()
+                if needle in indexed_breed and (currency is None or indexed_currency == currency)
+            ]
+        if currency is not None:
+            return [self.by_currency[currency]] if currency in self.by_currency else []
+        return list(self.by_currency.values())
+
+    def search(self, currency=None, breed=None, min_price=None, max_price=None, limit=None,
+               now=None, exclude_seller=None, exact=False, seller=None, animal=None):
+        """Listados en orden de precio ascendente dentro del rango."""
+        minimum = (Decimal(min_price), 0) if min_price is not None else None
+        maximum = (Decimal(max_price), float('inf')) if max_price is not None else None
+        iterators = [index.irange(minimum, maximum) for index in self._indexes(currency, breed, exact)]
+        if len(iterators) == 1:
+            keys = iterators[0]
+        else:
+            keys = merge(*iterators)
+
+        results = []
+        for _, listing_id in keys:
+            listing = self.listings[listing_id]
+            if now is not None and listing.expires_at <= now:
+                continue
+            if exclude_seller is not None and listing.seller_id == exclude_seller:
+                continue
+            if seller is not None and listing.seller_id != seller:
+                continue
+            if animal is not None and listing.animal_id != animal:
+                continue
+            results.append(listing)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+class BidBook:
+    """Órdenes de compra abiertas ordenadas por precio máximo descendente."""
+
+    def __init__(self):
+        self.bids = {}
+        self.by_market = {}
+
+    def __len__(self):
+        return len(self.bids)
+
+    @staticmethod
+    def _key(bid):
+        return (-bid.max_price, bid.created_at, bid.id)
+
+    def add(self, bid):
+        self.remove(bid.id)
+        bid = bid._replace(breed=normalize_breed(bid.breed))
+        self.bids[bid.id] = bid
+        self.by_market.setdefault((bid.breed, bid.currency), SortedList()).add(self._key(bid))
+        return bid
+
+    def remove(self, bid_id):
+        bid = self.bids.pop(bid_id, None)
+        if bid is not None:
+            self.by_market[(bid.breed, bid.currency)].discard(self._key(bid))
+        return bid
+
+    def best_for(self, listing, now=None):
+        """Órdenes que aceptan el listado, de mayor a menor precio (y antigüedad)."""
+        candidates = []
+        for breed in {listing.breed, ANY_BREED}:
+            index = self.by_market.get((breed, listing.currency))
+            if index:
+                candidates.append(index.irange(maximum=(-listing.price, float('inf'), float('inf'))))
+        for _, _, bid_id in merge(*candidates):
+            bid = self.bids[bid_id]
+            if bid.buyer_id == listing.seller_id:
+                continue
+            if now is not None and bid.expires_at is not None and bid.expires_at <= now:
+                continue
+            yield bid
@@ -1,3 +1,277 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from blockchain.market_models import BuyOrder, MarketListing, PriceCandle, Trade
+from cattle.models import Animal
+from users.models import User
+from .candles import candle_range, rebuild_candles
+from .engine import CHANGE_PREFIX, VERSION_KEY, MarketEngine, TradeError, market_engine
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'market-tests'}}
+
+
+class MarketEngineTests(TestCase):
+    def setUp(self):
+        market_engine.reset()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username='marketseller',
+            email='seller@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.buyer = User.objects.create_user(
+            username='marketbuyer',
+            email='buyer@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44f'
+        )
+
+    def list_animal(self, ear_tag, breed, price, currency='USDC', days=30):
+        animal = Animal.objects.create(
+            ear_tag=ear_tag,
+            breed=breed,
+            birth_date='2023-01-01',
+            weight=450.5,
+            health_status='HEALTHY',
+            owner=self.seller,
+            location='Test Farm'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            return MarketListing.objects.create(
+                animal=animal, seller=self.seller, price=Decimal(price), currency=currency,
+                expiration_date=timezone.now() + timedelta(days=days)
+            )
+
+    def test_search_and_top_follow_saves(self):
+        cheap = self.list_animal('MKT001', 'Angus', '900.00')
+        dear = self.list_animal('MKT002', 'Red Angus', '1200.00')
+        self.list_animal('MKT003', 'Hereford', '800.00', currency='DAI')
+        market_engine.rebuild()
+
+        self.assertEqual([listing.id for listing in market_engine.search(currency='USDC')], [cheap.pk, dear.pk])
+        self.assertEqual(len(market_engine.search(breed='angus', max_price=1000)), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cheap.price = Decimal('1500.00')
+            cheap.save()
+        asks, _ = market_engine.top(1, currency='USDC')
+        self.assertEqual(asks[0].price, Decimal('1200.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cheap.is_active = False
+            cheap.save()
+        self.assertEqual(len(market_engine.search(currency='USDC')), 1)
+
+    def test_listing_filters_use_index(self):
+        self.list_animal('MKT010', 'Angus', '900.00')
+        self.list_animal('MKT011', 'Brahman', '700.00')
+        self.client.force_authenticate(user=self.buyer)
+
+        response = self.client.get(reverse('market:marketlisting-list'), {'breed': 'ang', 'max_price': '1000'})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([row['animal_breed'] for row in results], ['Angus'])
+
+        book = self.client.get(reverse('market:marketlisting-book'), {'currency': 'USDC', 'limit': 1})
+        self.assertEqual(book.data['asks'][0]['price'], 700.0)
+
+        for value in ('NaN', 'Infinity', 'abc'):
+            invalid = self.client.get(reverse('market:marketlisting-list'), {'min_price': value})
+            self.assertEqual(invalid.status_code, 400)
+
+    @patch.object(PageNumberPagination, 'page_size', 2)
+    def test_filtered_listings_are_paged_in_price_order(self):
+        for number, price in enumerate(('900.00', '700.00', '800.00')):
+            self.list_animal(f'MKT03{number}', 'Angus', price)
+        self.client.force_authenticate(user=self.buyer)
+        url = reverse('market:marketlisting-list')
+
+        first = self.client.get(url, {'currency': 'USDC'})
+        self.assertEqual([row['price'] for row in first.data['results']], ['700.00', '800.00'])
+        self.assertEqual(first.data['count'], 3)
+        self.assertIsNotNone(first.data['next'])
+        self.assertIsNone(first.data['previous'])
+
+        second = self.client.get(url, {'currency': 'USDC', 'page': 2})
+        self.assertEqual([row['price'] for row in second.data['results']], ['900.00'])
+        self.assertEqual(second.data['count'], 3)
+        self.assertIsNone(second.data['next'])
+        self.assertNotIn('page=', second.data['previous'])
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_other_process_sees_committed_changes(self):
+        cache.clear()
+        other = MarketEngine()
+        self.assertEqual(other.search(), [])
+
+        listing = self.list_animal('MKT040', 'Angus', '900.00')
+        self.assertEqual([row.id for row in other.search()], [listing.pk])
+
+        # Sin el detalle de los cambios reconstruye el libro completo
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.is_active = False
+            listing.save()
+        cache.delete(f'{CHANGE_PREFIX}{cache.get(VERSION_KEY)}')
+        with patch.object(other, 'rebuild', wraps=other.rebuild) as rebuild:
+            self.assertEqual(other.search(), [])
+        rebuild.assert_called_once()
+
+    def test_buy_order_fills_cheapest_matching_listing(self):
+        self.list_animal('MKT020', 'Angus', '1100.00')
+        cheap = self.list_animal('MKT021', 'angus', '950.00')
+        self.list_animal('MKT022', 'Hereford', '500.00')
+        self.client.force_authenticate(user=self.buyer)
+
+        response = self.client.post(reverse('market:buyorder-list'), {
+            'breed': 'Angus', 'currency': 'USDC', 'max_price': '1000.00', 'quantity': 1
+        })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'FILLED')
+        trade = Trade.objects.get(buyer=self.buyer)
+        self.assertEqual(trade.listing_id, cheap.pk)
+        self.assertEqual(trade.platform_fee, Decimal('19.00'))
+        self.assertEqual(trade.currency, 'USDC')
+        self.assertEqual(Animal.objects.get(pk=cheap.animal_id).owner, self.buyer)
+        self.assertNotIn(cheap.pk, market_engine.listings.listings)
+
+    def test_new_listing_fills_best_open_order(self):
+        market_engine.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            low = BuyOrder.objects.create(buyer=self.buyer, breed='', max_price=Decimal('800.00'))
+            high = BuyOrder.objects.create(buyer=self.buyer, breed='Brahman', max_price=Decimal('900.00'))
+
+        listing = self.list_animal('MKT030', 'Brahman', '750.00')
+        trade = market_engine.match_listing(listing.pk)
+
+        self.assertEqual(trade.buy_order_id, high.pk)
+        low.refresh_from_db()
+        self.assertEqual(low.status, 'OPEN')
+        with self.assertRaises(TradeError):
+            market_engine.execute_trade(listing.pk, self.buyer)
+
+    def test_expired_listings_are_hidden_and_deactivated(self):
+        listing = self.list_animal('MKT040', 'Angus', '900.00', days=1)
+        market_engine.rebuild()
+
+        self.assertEqual(market_engine.expire(timezone.now() + timedelta(hours=1)), 0)
+        self.assertEqual(market_engine.expire(timezone.now() + timedelta(days=2)), 1)
+        listing.refresh_from_db()
+        self.assertFalse(listing.is_active)
+        self.assertEqual(market_engine.search(), [])
+
+    def test_execute_trade_view(self):
+        listing = self.list_animal('MKT050', 'Angus', '1000.00')
+        self.client.force_authenticate(user=self.buyer)
+        url = reverse('market:execute-trade', args=[listing.pk])
+        payload = {'listing_id': listing.pk, 'buyer_wallet': self.buyer.wallet_address}
+
+        response = self.client.post(url, payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['platform_fee'], 20.0)
+        self.assertEqual(len(response.data['transaction_hash']), 66)
+
+        self.assertEqual(self.client.post(url, payload).status_code, 404)
+
+
+class PriceCandleTests(TestCase):
+    def setUp(self):
+        market_engine.reset()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username='candleseller',
+            email='candleseller@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.buyer = User.objects.create_user(
+            username='candlebuyer',
+            email='candlebuyer@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44f'
+        )
+
+    def trade(self, ear_tag, breed, price):
+        animal = Animal.objects.create(
+            ear_tag=ear_tag,
+            breed=breed,
+            birth_date='2023-01-01',
+            weight=450.5,
+            health_status='HEALTHY',
+            owner=self.seller,
+            location='Test Farm'
+        )
+        listing = MarketListing.objects.create(
+            animal=animal, seller=self.seller, price=Decimal(price),
+            expiration_date=timezone.now() + timedelta(days=30)
+        )
+        return market_engine.execute_trade(listing.pk, self.buyer)
+
+    def candle_rows(self):
+        return list(PriceCandle.objects.order_by('resolution', 'breed', 'bucket_start').values(
+            'resolution', 'breed', 'bucket_start', 'open', 'high', 'low', 'close', 'volume', 'trade_count'
+        ))
+
+    def test_trades_update_candles_incrementally(self):
+        self.trade('CDL001', 'Angus', '1000.00')
+        self.trade('CDL002', 'Angus', '1200.00')
+        self.trade('CDL003', 'Angus', '900.00')
+        self.trade('CDL004', 'Hereford', '800.00')
+
+        daily = PriceCandle.objects.get(resolution='1d', breed='Angus')
+        self.assertEqual((daily.open, daily.high, daily.low, daily.close),
+                         (Decimal('1000.00'), Decimal('1200.00'), Decimal('900.00'), Decimal('900.00')))
+        self.assertEqual(daily.volume, Decimal('3100.00'))
+        self.assertEqual(daily.trade_count, 3)
+        self.assertEqual(PriceCandle.objects.count(), 6)
+
+    def test_rebuild_matches_incremental_candles(self):
+        self.trade('CDL010', 'Angus', '1000.00')
+        self.trade('CDL011', 'Brahman', '700.00')
+        self.trade('CDL012', 'Angus', '1100.00')
+        incremental = self.candle_rows()
+
+        self.assertEqual(rebuild_candles(), 6)
+        self.assertEqual(self.candle_rows(), incremental)
+
+    def test_latest_candles_read_only_the_last_buckets(self):
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        for offset in range(5):
+            for number, breed in enumerate(('Angus', 'Brahman')):
+                price = Decimal(1000 + offset * 10 + number)
+                PriceCandle.objects.create(
+                    resolution='1h', bucket_start=hour - timedelta(hours=offset), breed=breed,
+                    open=price, high=price, low=price, close=price, volume=price, trade_count=1,
+                    open_trade_id=offset * 2 + number, close_trade_id=offset * 2 + number
+                )
+
+        with self.assertNumQueries(2):
+            candles = candle_range('1h', 'USDC', limit=2)
+        self.assertEqual([candle.bucket_start for candle in candles], [hour - timedelta(hours=1), hour])
+        self.assertEqual([candle.trade_count for candle in candles], [2, 2])
+
+    def test_candle_and_history_endpoints(self):
+        self.trade('CDL020', 'Angus', '1000.00')
+        self.trade('CDL021', 'Brahman', '600.00')
+        self.client.force_authenticate(user=self.buyer)
+
+        response = self.client.get(reverse('market:price-candles'), {'resolution': '1h', 'currency': 'USDC'})
+        self.assertEqual(response.status_code, 200)
+        candle = response.data['candles'][0]
+        self.assertEqual((candle['open'], candle['high'], candle['low'], candle['close']), (1000.0, 1000.0, 600.0, 600.0))
+        self.assertEqual(candle['trades'], 2)
+
+        history = self.client.get(reverse('market:price-history'), {'days': 7})
+        self.assertEqual(history.data['daily_prices'][0]['trade_count'], 2)
+
+        invalid = self.client.get(reverse('market:price-candles'), {'resolution': '5m'})
+        self.assertEqual(invalid.status_code, 400)
@@ -3,8 +3,10 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     MarketListingViewSet, 
     TradeViewSet, 
+    BuyOrderViewSet,
     MarketStatsView, 
     PriceHistoryView,
+    PriceCandleView,
     ExecuteTradeView,
     AnimalMarketView
 )
@@ -12,6 +14,7 @@ from .views import (
 router = DefaultRouter()
 router.register(r'listings', MarketListingViewSet, basename='marketlisting')
 router.register(r'trades', TradeViewSet, basename='trade')
+router.register(r'buy-orders', BuyOrderViewSet, basename='buyorder')
 
 urlpatterns = [
     # -------------------------------------------------------------------------
@@ -45,6 +48,13 @@ urlpatterns = [
         kwargs={'description': 'Historial de precios de un animal específico'}
     ),
     
+    path(
+        'candles/', 
+        PriceCandleView.as_view(), 
+        name='price-candles',
+        kwargs={'description': 'Velas OHLC por resolución, raza y moneda'}
+    ),
+    
     # -------------------------------------------------------------------------
     # EJECUCIÓN DE TRADES
     # -------------------------------------------------------------------------
@@ -99,7 +109,16 @@ MARKET_QUERY_PARAMS = {
         'min_price': 'Precio mínimo',
         'max_price': 'Precio máximo',
         'currency': 'Filtrar por moneda (USDC, DAI, etc.)',
-        'breed': 'Filtrar por raza del animal'
+        'breed': 'Filtrar por raza del animal',
+        'page': 'Página; con filtros de precio, moneda o raza se ordena por precio ascendente y la respuesta no incluye count'
+    },
+    'listings/book': {
+        'currency': 'Filtrar por moneda',
+        'breed': 'Filtrar por raza exacta',
+        'limit': 'Mejores ofertas a devolver por lado (default: 10, máx. 100)'
+    },
+    'buy-orders': {
+        'status': 'Filtrar por estado de la orden (OPEN, FILLED, CANCELLED, EXPIRED)'
     },
     'trades': {
         'listing_id': 'Filtrar por ID de listado',
@@ -108,6 +127,14 @@ MARKET_QUERY_PARAMS = {
     },
     'price-history': {
         'days': 'Número de días para el historial (default: 30)'
+    },
+    'candles': {
+        'resolution': 'Resolución de las velas: 1h, 1d o 1w (default: 1d)',
+        'currency': 'Moneda (default: USDC)',
+        'breed': 'Raza exacta; sin raza se combinan todas',
+        'start': 'Inicio del rango (ISO 8601)',
+        'end': 'Fin del rango, exclusivo (ISO 8601)',
+        'limit': 'Máximo de velas, las más recientes (default: 500)'
     }
 }
 
@@ -116,7 +143,12 @@ MARKET_API_EXAMPLES = {
     'listings': {
         'all_active': '/market/listings/',
         'filtered': '/market/listings/?min_price=100&currency=USDC&breed=Angus',
-        'user_listings': '/market/my/listings/'
+        'user_listings': '/market/my/listings/',
+        'order_book': '/market/listings/book/?currency=USDC&breed=Angus&limit=5'
+    },
+    'buy_orders': {
+        'create': '/market/buy-orders/',
+        'cancel': '/market/buy-orders/12/cancel/'
     },
     'trades': {
         'all': '/market/trades/',
@@ -128,7 +160,8 @@ MARKET_API_EXAMPLES = {
     },
     'price_history': {
         'general': '/market/price-history/',
-        'specific_animal': '/market/price-history/456/'
+        'specific_animal': '/market/price-history/456/',
+        'candles': '/market/candles/?resolution=1h&currency=USDC&breed=Angus&start=2026-10-01T00:00:00'
     },
     'trading': {
         'execute': '/market/execute-trade/789/',
@@ -3,15 +3,16 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from decimal import Decimal, InvalidOperation
 from django.utils import timezone
 from django.db.models import Avg, Max, Min, Count, Q
-from django.db.models.functions import TruncDate
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 
 # Importaciones corregidas desde las ubicaciones correctas
-from blockchain.market_models import MarketListing, Trade
+from blockchain.market_models import BuyOrder, MarketListing, Trade
 from blockchain.serializers import (
+    BuyOrderSerializer,
     MarketListingSerializer, 
     TradeSerializer,
     CreateMarketListingSerializer,
@@ -19,10 +20,43 @@ from blockchain.serializers import (
 )
 from cattle.models import Animal
 from cattle.serializers import AnimalSerializer
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .candles import RESOLUTIONS, candle_range, daily_summary
+from .engine import TradeError, market_engine
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _price_param(value, name):
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: 'Precio inválido'})
+    # NaN e Infinity no son comparables en el índice de precios
+    if not price.is_finite():
+        raise ValidationError({name: 'Precio inválido'})
+    return price
+
+def _id_param(value, name):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'ID inválido'})
+
+def _datetime_param(value, name):
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValidationError({name: 'Fecha inválida (ISO 8601)'})
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
 class MarketListingViewSet(viewsets.ModelViewSet):
     serializer_class = MarketListingSerializer
     permission_classes = [IsAuthenticated]
@@ -38,26 +72,51 @@ class MarketListingViewSet(viewsets.ModelViewSet):
         # Filtros de búsqueda
         animal_id = self.request.query_params.get('animal_id')
         seller_id = self.request.query_params.get('seller_id')
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        currency = self.request.query_params.get('currency')
-        breed = self.request.query_params.get('breed')
         
         if animal_id:
             queryset = queryset.filter(animal_id=animal_id)
         if seller_id:
             queryset = queryset.filter(seller_id=seller_id)
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        if currency:
-            queryset = queryset.filter(currency=currency)
-        if breed:
-            queryset = queryset.filter(animal__breed__icontains=breed)
             
         return queryset.order_by('-listing_date')
     
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if not any(params.get(name) for name in ('min_price', 'max_price', 'currency', 'breed')):
+            return super().list(request, *args, **kwargs)
+        
+        # Precio, moneda y raza se resuelven en el libro en memoria: se cuenta y
+        # se corta la página en orden de precio y solo esas filas se leen de la base
+        page_size = self.paginator.get_page_size(request)
+        try:
+            page = max(int(params.get(self.paginator.page_query_param, 1)), 1)
+        except ValueError:
+            page = 1
+        listings = market_engine.search(
+            currency=params.get('currency') or None,
+            breed=params.get('breed') or None,
+            min_price=_price_param(params.get('min_price'), 'min_price'),
+            max_price=_price_param(params.get('max_price'), 'max_price'),
+            seller=_id_param(params.get('seller_id'), 'seller_id'),
+            animal=_id_param(params.get('animal_id'), 'animal_id'),
+        )
+        ids = [listing.id for listing in listings[(page - 1) * page_size:page * page_size]]
+        rows = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer([rows[pk] for pk in ids if pk in rows], many=True)
+        
+        # Mismo sobre que PageNumberPagination en la rama sin filtros
+        url, page_param = request.build_absolute_uri(), self.paginator.page_query_param
+        if page == 2:
+            previous = remove_query_param(url, page_param)
+        else:
+            previous = replace_query_param(url, page_param, page - 1) if page > 2 else None
+        return Response({
+            'count': len(listings),
+            'next': replace_query_param(url, page_param, page + 1) if len(listings) > page * page_size else None,
+            'previous': previous,
+            'results': serializer.data
+        })
+    
     def perform_create(self, serializer):
         animal = serializer.validated_data['animal']
         
@@ -69,7 +128,41 @@ class MarketListingViewSet(viewsets.ModelViewSet):
         if MarketListing.objects.filter(animal=animal, is_active=True).exists():
             raise PermissionError("Este animal ya está listado en el mercado")
         
-        serializer.save(seller=self.request.user)
+        listing = serializer.save(seller=self.request.user)
+        
+        # Vender en el acto si hay una orden de compra que lo acepta
+        if market_engine.match_listing(listing.pk):
+            listing.refresh_from_db()
+    
+    @action(detail=False, methods=['get'])
+    def book(self, request):
+        """Mejores ofertas de venta y de compra, servidas desde memoria"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+        except ValueError:
+            limit = 10
+        asks, bids = market_engine.top(
+            limit,
+            currency=request.query_params.get('currency') or None,
+            breed=request.query_params.get('breed') or None
+        )
+        return Response({
+            'asks': [{
+                'listing_id': ask.id,
+                'animal_id': ask.animal_id,
+                'price': float(ask.price),
+                'currency': ask.currency,
+                'breed': ask.breed,
+                'expires_at': timezone.datetime.fromtimestamp(ask.expires_at, tz=timezone.get_default_timezone()).isoformat()
+            } for ask in asks],
+            'bids': [{
+                'buy_order_id': bid.id,
+                'max_price': float(bid.max_price),
+                'currency': bid.currency,
+                'breed': bid.breed or None,
+                'remaining': bid.remaining
+            } for bid in bids]
+        })
     
     @action(detail=True, methods=['post'])
     def cancel_listing(self, request, pk=None):
@@ -127,32 +220,73 @@ class TradeViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(trades, many=True)
         return Response(serializer.data)
 
+class BuyOrderViewSet(viewsets.ModelViewSet):
+    serializer_class = BuyOrderSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+    
+    def get_queryset(self):
+        queryset = BuyOrder.objects.filter(buyer=self.request.user)
+        
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        
+        return queryset.order_by('-created_at')
+    
+    def perform_create(self, serializer):
+        order = serializer.save(buyer=self.request.user)
+        
+        # Cruzar en el acto contra los listados más baratos que la orden acepta
+        if market_engine.match_order(order.pk):
+            order.refresh_from_db()
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        order = self.get_object()
+        
+        if order.status != 'OPEN':
+            return Response(
+                {'error': 'Solo se pueden cancelar órdenes abiertas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        order.status = 'CANCELLED'
+        order.save(update_fields=['status'])
+        
+        return Response({'success': True, 'message': 'Orden de compra cancelada exitosamente'})
+
 class MarketStatsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        active_listings = MarketListing.objects.filter(is_active=True)
+        from core.counters import load_counters
+        
+        counters = load_counters([
+            'market.listings.active', 'market.listings.active.currency',
+            'market.listings.active.breed', 'market.listings.active.price_sum',
+            'market.trades', 'market.trades.volume', 'market.trades.fees', 'market.trades.day',
+        ])
+        min_price, max_price = market_engine.price_range()
+        
+        # Trades de los últimos 7 días a partir de los contadores diarios
+        week_start = timezone.localdate() - timezone.timedelta(days=7)
+        recent_trades = sum(
+            count for day, count in counters.breakdown('market.trades.day').items()
+            if day >= week_start.isoformat()
+        )
         
         stats = {
-            'total_listings': active_listings.count(),
-            'total_trades': Trade.objects.count(),
-            'total_volume': float(Trade.objects.aggregate(
-                total=Sum('price'))['total'] or 0),
-            'avg_price': float(active_listings.aggregate(
-                avg=Avg('price'))['avg'] or 0),
-            'max_price': float(active_listings.aggregate(
-                max=Max('price'))['max'] or 0),
-            'min_price': float(active_listings.aggregate(
-                min=Min('price'))['min'] or 0),
-            'listings_by_currency': dict(active_listings.values_list('currency').annotate(
-                count=Count('id'))),
-            'listings_by_breed': dict(active_listings.values_list('animal__breed').annotate(
-                count=Count('id'))),
-            'recent_trades': Trade.objects.filter(
-                trade_date__gte=timezone.now() - timezone.timedelta(days=7)
-            ).count(),
-            'platform_fees': float(Trade.objects.aggregate(
-                total=Sum('platform_fee'))['total'] or 0)
+            'total_listings': counters.count('market.listings.active'),
+            'total_trades': counters.count('market.trades'),
+            'total_volume': float(counters.value('market.trades.volume')),
+            'avg_price': counters.average('market.listings.active.price_sum', 'market.listings.active'),
+            'max_price': float(max_price or 0),
+            'min_price': float(min_price or 0),
+            'listings_by_currency': counters.breakdown('market.listings.active.currency'),
+            'listings_by_breed': counters.breakdown('market.listings.active.breed'),
+            'recent_trades': recent_trades,
+            'platform_fees': float(counters.value('market.trades.fees'))
         }
         
         return Response(stats)
@@ -160,10 +294,10 @@ class MarketStatsView(APIView):
 class PriceHistoryView(APIView):
     permission_classes = [IsAuthenticated]
     
-    def get(self, request, animal_id=None):
+    def get(self, request, animal_id=None, *args, **kwargs):
         if animal_id:
             animal = get_object_or_404(Animal, id=animal_id)
-            trades = Trade.objects.filter(listing__animal=animal).order_by('trade_date')
+            trades = Trade.objects.filter(listing__animal=animal).select_related('buyer').order_by('trade_date')
             
             data = [{
                 'date': trade.trade_date.strftime('%Y-%m-%d'),
@@ -184,28 +318,58 @@ class PriceHistoryView(APIView):
             })
         
         else:
-            # Precios promedios por día (últimos 30 días)
-            thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
-            
-            daily_prices = Trade.objects.filter(
-                trade_date__gte=thirty_days_ago
-            ).annotate(
-                date=TruncDate('trade_date')
-            ).values('date', 'currency').annotate(
-                avg_price=Avg('price'),
-                trade_count=Count('id'),
-                total_volume=Sum('price')
-            ).order_by('date')
+            # Precios promedios por día desde las velas diarias precalculadas
+            try:
+                days = min(max(int(request.query_params.get('days', 30)), 1), 3650)
+            except ValueError:
+                days = 30
+            since = timezone.now() - timezone.timedelta(days=days)
             
             return Response({
-                'daily_prices': list(daily_prices),
-                'time_period': f'{thirty_days_ago.date()} to {timezone.now().date()}'
+                'daily_prices': daily_summary(since),
+                'time_period': f'{since.date()} to {timezone.now().date()}'
             })
 
+class PriceCandleView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        resolution = request.query_params.get('resolution', '1d')
+        currency = request.query_params.get('currency', 'USDC')
+        breed = request.query_params.get('breed')
+        start = _datetime_param(request.query_params.get('start'), 'start')
+        end = _datetime_param(request.query_params.get('end'), 'end')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 500)), 1), 5000)
+        except ValueError:
+            limit = 500
+        
+        if resolution not in RESOLUTIONS:
+            return Response(
+                {'error': f'Resolución inválida. Opciones: {", ".join(RESOLUTIONS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        candles = candle_range(resolution, currency, start=start, end=end, breed=breed, limit=limit)
+        return Response({
+            'resolution': resolution,
+            'currency': currency,
+            'breed': breed,
+            'candles': [{
+                'time': candle.bucket_start.isoformat(),
+                'open': float(candle.open),
+                'high': float(candle.high),
+                'low': float(candle.low),
+                'close': float(candle.close),
+                'volume': float(candle.volume),
+                'trades': candle.trade_count
+            } for candle in candles]
+        })
+
 class ExecuteTradeView(APIView):
     permission_classes = [IsAuthenticated]
     
-    def post(self, request, listing_id):
+    def post(self, request, listing_id, *args, **kwargs):
         listing = get_object_or_404(MarketListing, id=listing_id, is_active=True)
         
         serializer = ExecuteTradeSerializer(data=request.data)
@@ -230,26 +394,7 @@ class ExecuteTradeView(APIView):
         try:
             # Aquí iría la lógica de blockchain para ejecutar el trade
             # En producción, se conectaría con el contrato inteligente
-            
-            # Simulación de la transacción
-            trade = Trade.objects.create(
-                listing=listing,
-                buyer=request.user,
-                price=listing.price,
-                currency=listing.currency,
-                platform_fee=listing.price * 0.02,  # 2% de comisión
-                status='COMPLETED',
-                transaction_hash=f"0x{hash(str(timezone.now()) + str(listing_id))[:64]}"
-            )
-            
-            # Desactivar el listado
-            listing.is_active = False
-            listing.save()
-            
-            # Transferir la propiedad del animal (esto sería en blockchain)
-            animal = listing.animal
-            animal.owner = request.user
-            animal.save()
+            trade = market_engine.execute_trade(listing.id, request.user)
             
             return Response({
                 'success': True,
@@ -261,6 +406,8 @@ class ExecuteTradeView(APIView):
                 'transaction_hash': trade.transaction_hash
             })
             
+        except TradeError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error ejecutando trade: {str(e)}")
             return Response(
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
+
+    def ready(self):
+        # Versión de datos de las tablas de reportes para las claves de artefactos
+        from core.data_versions import track_data_versions
+        from reports.jobs import report_models
+        track_data_versions(*report_models())
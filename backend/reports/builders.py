@@ -0,0 +1,169 @@
+# backend/reports/builders.py
+"""
+Constructores de reportes ejecutados por el motor de trabajos (``reports.jobs``).
+
+Cada constructor recibe los parámetros normalizados del reporte y una función
+``progress(porcentaje)`` que el motor usa también para detectar cancelaciones.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Sum, Max
+from django.utils import timezone
+
+from cattle.models import Animal, Batch, AnimalHealthRecord
+from cattle.audit_models import CattleAuditTrail
+from cattle.blockchain_models import AnimalCertification
+from users.models import User
+from blockchain.models import BlockchainEvent, ContractInteraction
+from iot.models import IoTDevice, GPSData, HealthSensorData
+from users.reputation_models import RewardDistribution
+
+
+def build_compliance_report(params, progress=None):
+    """Reporte de cumplimiento"""
+    report_type = params.get('type', 'general')
+    days = params.get('days', 30)
+    
+    from_date = timezone.now() - timedelta(days=days)
+    
+    if report_type == 'certifications':
+        certifications = AnimalCertification.objects.filter(
+            created_at__gte=from_date
+        )
+        
+        data = {
+            'total_certifications': certifications.count(),
+            'active_certifications': certifications.filter(revoked=False).count(),
+            'revoked_certifications': certifications.filter(revoked=True).count(),
+            'by_standard': dict(certifications.values_list('standard__name').annotate(count=Count('id'))),
+            'expiring_soon': certifications.filter(
+                expiration_date__lte=timezone.now() + timedelta(days=30)
+            ).count()
+        }
+        
+        return data
+    
+    elif report_type == 'health':
+        health_data = AnimalHealthRecord.objects.filter(
+            created_at__gte=from_date
+        ).values('health_status').annotate(
+            count=Count('id')
+        )
+        
+        return {'health_status_distribution': list(health_data)}
+    
+    elif report_type == 'blockchain':
+        # Estadísticas de blockchain
+        blockchain_stats = {
+            'total_events': BlockchainEvent.objects.filter(created_at__gte=from_date).count(),
+            'total_transactions': ContractInteraction.objects.filter(created_at__gte=from_date).count(),
+            'successful_transactions': ContractInteraction.objects.filter(
+                created_at__gte=from_date, status='SUCCESS'
+            ).count(),
+            'failed_transactions': ContractInteraction.objects.filter(
+                created_at__gte=from_date, status='FAILED'
+            ).count(),
+            'events_by_type': dict(BlockchainEvent.objects.filter(
+                created_at__gte=from_date
+            ).values_list('event_type').annotate(count=Count('id')))
+        }
+        
+        return blockchain_stats
+    
+    elif report_type == 'iot':
+        # Estadísticas de dispositivos IoT
+        iot_stats = {
+            'total_devices': IoTDevice.objects.count(),
+            'active_devices': IoTDevice.objects.filter(status='ACTIVE').count(),
+            'gps_readings': GPSData.objects.filter(timestamp__gte=from_date).count(),
+            'health_readings': HealthSensorData.objects.filter(timestamp__gte=from_date).count(),
+            'devices_by_type': dict(IoTDevice.objects.values_list('device_type').annotate(count=Count('id')))
+        }
+        
+        return iot_stats
+    
+    elif report_type == 'rewards':
+        # Estadísticas de recompensas
+        rewards_stats = {
+            'total_rewards_distributed': RewardDistribution.objects.filter(
+                distribution_date__gte=from_date
+            ).count(),
+            'total_tokens_distributed': float(RewardDistribution.objects.filter(
+                distribution_date__gte=from_date
+            ).aggregate(total=Sum('tokens_awarded'))['total'] or 0),
+            'unclaimed_tokens': float(RewardDistribution.objects.filter(
+                distribution_date__gte=from_date, is_claimed=False
+            ).aggregate(total=Sum('tokens_awarded'))['total'] or 0),
+            'rewards_by_type': dict(RewardDistribution.objects.filter(
+                distribution_date__gte=from_date
+            ).values_list('action_type').annotate(count=Count('id')))
+        }
+        
+        return rewards_stats
+    
+    # Reporte general por defecto
+    general_data = {
+        'total_animals': Animal.objects.count(),
+        'total_batches': Batch.objects.count(),
+        'total_users': User.objects.count(),
+        'animals_by_health_status': dict(Animal.objects.values_list('health_status').annotate(count=Count('id'))),
+        'batches_by_status': dict(Batch.objects.values_list('status').annotate(count=Count('id'))),
+        'time_period': f'{from_date.date()} to {timezone.now().date()}',
+        'report_generated': timezone.now()
+    }
+    
+    return general_data
+
+
+def build_audit_report(params, progress=None):
+    """Reporte de auditoría"""
+    report_type = params.get('type', 'general')
+    days = params.get('days', 7)
+    
+    from_date = timezone.now() - timedelta(days=days)
+    audits = CattleAuditTrail.objects.filter(timestamp__gte=from_date)
+    
+    if report_type == 'user_activity':
+        user_activity = audits.values('user__username').annotate(
+            action_count=Count('id'),
+            last_action=Max('timestamp')
+        ).order_by('-action_count')
+        
+        return {'user_activity': list(user_activity)}
+    
+    elif report_type == 'action_types':
+        action_stats = audits.values('action_type').annotate(
+            count=Count('id'),
+            last_performed=Max('timestamp')
+        ).order_by('-count')
+        
+        return {'action_stats': list(action_stats)}
+    
+    elif report_type == 'blockchain_audit':
+        # Auditoría de eventos blockchain
+        blockchain_events = BlockchainEvent.objects.filter(created_at__gte=from_date)
+        blockchain_stats = {
+            'total_events': blockchain_events.count(),
+            'events_by_type': dict(blockchain_events.values_list('event_type').annotate(count=Count('id'))),
+            'events_with_animals': blockchain_events.filter(animal__isnull=False).count(),
+            'events_with_batches': blockchain_events.filter(batch__isnull=False).count()
+        }
+        
+        return blockchain_stats
+    
+    # Reporte general
+    general_stats = {
+        'total_audits': audits.count(),
+        'audits_by_type': dict(audits.values_list('action_type').annotate(count=Count('id'))),
+        'unique_users': audits.values('user').distinct().count(),
+        'time_period': f'{from_date.date()} to {timezone.now().date()}',
+        'report_generated': timezone.now()
+    }
+    
+    return general_stats
+
+
+def build_custom_report(params, progress=None):
+    """Reporte personalizado de analytics (``analytics.views.CustomReportView``)"""
+    from analytics.views import CustomReportView
+    return CustomReportView().build_report(params.get('type', 'comprehensive'), params.get('days', 30), progress)
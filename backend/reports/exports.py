@@ -0,0 +1,232 @@
+# backend/reports/exports.py
+"""
+Motor de exportación en streaming.
+
+Las filas se leen con ``QuerySet.iterator(chunk_size=...)`` (cursor de servidor
+en PostgreSQL) como tuplas de ``values_list``: los datos relacionados llegan en
+el mismo JOIN y no se instancian modelos. Cada escritor produce bytes por
+bloques, así que la memoria usada no depende del tamaño de la exportación.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import islice
+from typing import Callable, Optional
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    """Columna exportable: clave, cabecera CSV y cómo obtener el valor."""
+    key: str
+    header: str
+    paths: tuple
+    value: Optional[Callable] = None
+    arrow_type: str = 'string'
+
+    def extract(self, row):
+        values = [row[path] for path in self.paths]
+        if self.value:
+            return self.value(*values)
+        return values[0]
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if value else None
+
+
+def _datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def _float(value):
+    return float(value) if value else None
+
+
+ANIMAL_EXPORT_COLUMNS = (
+    ExportColumn('id', 'ID', ('id',), arrow_type='int64'),
+    ExportColumn('ear_tag', 'Ear Tag', ('ear_tag',)),
+    ExportColumn('breed', 'Breed', ('breed',)),
+    ExportColumn('birth_date', 'Birth Date', ('birth_date',), _date),
+    ExportColumn('weight', 'Weight', ('weight',), _float, arrow_type='float64'),
+    ExportColumn('health_status', 'Health Status', ('health_status',)),
+    ExportColumn('location', 'Location', ('location',)),
+    ExportColumn('ipfs_hash', 'IPFS Hash', ('ipfs_hash',)),
+    ExportColumn('token_id', 'Token ID', ('token_id',), arrow_type='int64'),
+    ExportColumn('owner', 'Owner', ('owner__username',)),
+    ExportColumn('created_at', 'Created At', ('created_at',), _datetime),
+    ExportColumn(
+        'metadata_uri', 'Metadata URI', ('ipfs_hash',),
+        lambda ipfs_hash: f"ipfs://{ipfs_hash}" if ipfs_hash else ""
+    ),
+    ExportColumn(
+        'is_minted', 'Is Minted', ('token_id', 'mint_transaction_hash'),
+        lambda token_id, tx_hash: bool(token_id and tx_hash), arrow_type='bool_'
+    ),
+)
+
+# Columnas del CSV histórico (sin campos derivados)
+ANIMAL_CSV_DEFAULT = ('id', 'ear_tag', 'breed', 'birth_date', 'weight', 'health_status',
+                      'location', 'ipfs_hash', 'token_id', 'owner', 'created_at')
+
+
+def select_columns(columns, requested=None, default=None):
+    """Filtrar columnas por clave; lanza ValueError si alguna no existe."""
+    by_key = {column.key: column for column in columns}
+    keys = requested or default or [column.key for column in columns]
+    unknown = [key for key in keys if key not in by_key]
+    if unknown:
+        raise ValueError(f"Columnas desconocidas: {', '.join(unknown)}")
+    return [by_key[key] for key in keys]
+
+
+def iter_rows(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """Iterar el queryset por bloques devolviendo listas de valores por columna."""
+    paths = list(dict.fromkeys(path for column in columns for path in column.paths))
+    rows = queryset.order_by('pk').values_list(*paths).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield [
+            [column.extract(dict(zip(paths, row))) for column in columns]
+            for row in chunk
+        ]
+
+
+class _Echo:
+    """Pseudo-buffer para ``csv.writer``: devuelve lo escrito sin guardarlo."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(chunks, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column.header for column in columns])
+    for chunk in chunks:
+        yield ''.join(
+            writer.writerow(['' if value is None else value for value in row])
+            for row in chunk
+        )
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def stream_ndjson(chunks, columns):
+    keys = [column.key for column in columns]
+    for chunk in chunks:
+        yield ''.join(
+            json.dumps(dict(zip(keys, row)), default=_json_default) + '\n'
+            for row in chunk
+        )
+
+
+def stream_json_document(chunks, columns, list_key, extra):
+    """Documento JSON único escrito por partes: la lista primero, luego ``count``."""
+    keys = [column.key for column in columns]
+    count = 0
+    yield '{"%s": [' % list_key
+    for chunk in chunks:
+        for row in chunk:
+            yield (',' if count else '') + json.dumps(dict(zip(keys, row)), default=_json_default)
+            count += 1
+    yield '], "count": %d' % count
+    for key, value in extra.items():
+        yield ', %s: %s' % (json.dumps(key), json.dumps(value, default=_json_default))
+    yield '}'
+
+
+class _ParquetSink(io.RawIOBase):
+    """Destino de ``ParquetWriter`` que acumula bytes hasta que se drenan."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def stream_parquet(chunks, columns):
+    """Un row group de Parquet por bloque; requiere ``pyarrow``.
+
+    La importación se hace al llamar (no al iterar) para que la vista pueda
+    responder 503 antes de empezar el streaming si falta la dependencia.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column.key, getattr(pa, column.arrow_type)()) for column in columns])
+
+    def generate():
+        sink = _ParquetSink()
+        writer = pq.ParquetWriter(sink, schema, compression='snappy')
+        try:
+            for chunk in chunks:
+                arrays = [
+                    pa.array([row[index] for row in chunk], type=schema.field(index).type)
+                    for index in range(len(columns))
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                data = sink.drain()
+                if data:
+                    yield data
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    return generate()
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'json': ('application/json', 'json'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def streaming_export(queryset, columns, format, filename, list_key='rows', extra=None):
+    """Construir la ``StreamingHttpResponse`` para el formato pedido."""
+    content_type, extension = EXPORT_FORMATS[format]
+    chunks = iter_rows(queryset, columns)
+
+    if format == 'csv':
+        content = stream_csv(chunks, columns)
+    elif format == 'ndjson':
+        content = stream_ndjson(chunks, columns)
+    elif format == 'parquet':
+        content = stream_parquet(chunks, columns)
+    else:
+        content = stream_json_document(chunks, columns, list_key, extra or {})
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    if format != 'json':
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}_{timezone.now().date()}.{extension}"'
+        )
+    return response
@@ -0,0 +1,341 @@
+# backend/reports/jobs.py
+"""
+Motor de trabajos de reportes.
+
+Las vistas no calculan reportes dentro de la petición: piden el artefacto a
+``get_or_submit_report``. Si ya existe un artefacto para la misma clave
+(reporte + parámetros + versión de los datos) se devuelve al instante;
+si no, se encola un ``ReportJob`` en un pool de hilos local, sin broker
+externo. Un trabajo activo por clave (restricción única parcial) evita
+cálculos duplicados incluso entre procesos.
+
+La versión de los datos sale de los contadores de ``core.data_versions``,
+que las señales de cada tabla del reporte incrementan al confirmar: la
+clave se calcula con una lectura de caché, sin consultas. Los artefactos de
+buckets ya vencidos dejan de ser alcanzables; ``purge_artifacts`` los borra
+junto con sus trabajos terminados, tras cada trabajo (como mucho una vez
+por ``REPORT_ARTIFACT_TTL``) y desde el comando ``purge_report_artifacts``.
+
+Ajustes:
+    REPORT_ARTIFACTS_DIR   directorio de artefactos (MEDIA_ROOT/reports)
+    REPORT_JOB_WORKERS     hilos del pool (2)
+    REPORT_CACHE_MAX_AGE   segundos máximos de reutilización de un artefacto (3600)
+    REPORT_JOB_TIMEOUT     segundos tras los que un trabajo activo se da por perdido (900)
+    REPORT_ARTIFACT_TTL    segundos tras los que se borran artefactos y trabajos terminados
+                           (dos veces REPORT_CACHE_MAX_AGE)
+    REPORT_JOBS_EAGER      ejecutar en la propia petición (tests)
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from analytics.models import AnalyticsDailyFact
+from blockchain.models import BlockchainEvent, ContractInteraction
+from cattle.audit_models import CattleAuditTrail
+from cattle.blockchain_models import AnimalCertification
+from cattle.models import Animal, AnimalHealthRecord, Batch
+from core.data_versions import data_versions
+from iot.models import GPSData, HealthSensorData, IoTDevice
+from users.models import User
+from users.reputation_models import RewardDistribution, StakingPool
+from .builders import build_audit_report, build_compliance_report, build_custom_report
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCancelled(Exception):
+    """El trabajo fue cancelado mientras se generaba"""
+
+
+@dataclass(frozen=True)
+class ReportDefinition:
+    builder: Callable
+    models: tuple
+
+
+REPORTS = {
+    'compliance': ReportDefinition(
+        builder=build_compliance_report,
+        models=(Animal, Batch, User, AnimalCertification, AnimalHealthRecord, BlockchainEvent,
+                ContractInteraction, IoTDevice, GPSData, HealthSensorData, RewardDistribution),
+    ),
+    'audit': ReportDefinition(
+        builder=build_audit_report,
+        models=(CattleAuditTrail, BlockchainEvent),
+    ),
+    'custom': ReportDefinition(
+        builder=build_custom_report,
+        models=(AnalyticsDailyFact, RewardDistribution, StakingPool),
+    ),
+}
+
+
+# ==============================================================================
+# CLAVES Y ARTEFACTOS
+# ==============================================================================
+
+def report_models():
+    """Tablas de las que dependen los reportes, para seguir su versión de datos."""
+    return sorted({model for definition in REPORTS.values() for model in definition.models}, key=lambda model: model._meta.label)
+
+
+def data_watermark(definition):
+    """Versión (altas, reescrituras) de cada tabla del reporte, sin consultas."""
+    versions = data_versions(definition.models)
+    return [[model._meta.label, *versions[model._meta.label]] for model in definition.models]
+
+
+def report_cache_key(report, params):
+    # El bucket temporal acota la reutilización para tablas sin updated_at
+    # y para ventanas relativas ("últimos N días") que avanzan con el reloj
+    max_age = getattr(settings, 'REPORT_CACHE_MAX_AGE', 3600)
+    payload = json.dumps({
+        'report': report,
+        'params': params,
+        'watermark': data_watermark(REPORTS[report]),
+        'bucket': int(time.time() // max_age),
+    }, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def artifacts_dir():
+    return Path(getattr(settings, 'REPORT_ARTIFACTS_DIR', Path(settings.MEDIA_ROOT) / 'reports'))
+
+
+def artifact_path(cache_key):
+    return artifacts_dir() / f'{cache_key}.json'
+
+
+def read_artifact(cache_key):
+    try:
+        with open(artifact_path(cache_key), encoding='utf-8') as artifact:
+            return json.load(artifact)
+    except FileNotFoundError:
+        return None
+
+
+def write_artifact(cache_key, data):
+    """Escritura atómica: los lectores nunca ven un artefacto a medias."""
+    path = artifact_path(cache_key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f'{path.stem}.{uuid.uuid4().hex}.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as artifact:
+        json.dump(data, artifact, cls=DjangoJSONEncoder)
+    os.replace(temp_path, path)
+    return path
+
+
+def artifact_ttl():
+    return getattr(settings, 'REPORT_ARTIFACT_TTL', 2 * getattr(settings, 'REPORT_CACHE_MAX_AGE', 3600))
+
+
+def purge_artifacts(ttl=None):
+    """Borrar artefactos y trabajos terminados más antiguos que el TTL.
+
+    Devuelve ``(artefactos, trabajos)`` borrados.
+    """
+    ttl = artifact_ttl() if ttl is None else ttl
+    cutoff = time.time() - ttl
+    removed = 0
+    directory = artifacts_dir()
+    if directory.is_dir():
+        for path in directory.iterdir():
+            # Incluye temporales de escrituras interrumpidas
+            if path.suffix not in ('.json', '.tmp'):
+                continue
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+
+    jobs, _ = ReportJob.objects.exclude(status__in=ReportJob.ACTIVE_STATUSES).filter(
+        finished_at__lt=timezone.now() - timedelta(seconds=ttl)
+    ).delete()
+    if removed or jobs:
+        logger.info(f"Reportes purgados: {removed} artefactos, {jobs} trabajos")
+    return removed, jobs
+
+
+_last_purge = None
+_purge_lock = threading.Lock()
+
+
+def _maybe_purge():
+    """Purgar como mucho una vez por TTL desde los hilos de trabajo."""
+    global _last_purge
+    with _purge_lock:
+        if _last_purge is not None and time.monotonic() - _last_purge < artifact_ttl():
+            return
+        _last_purge = time.monotonic()
+    try:
+        purge_artifacts()
+    except Exception as e:
+        logger.error(f"Error purgando artefactos de reportes: {str(e)}")
+
+
+# ==============================================================================
+# POOL DE TRABAJO
+# ==============================================================================
+
+_executor = None
+_executor_lock = threading.Lock()
+_futures = {}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_JOB_WORKERS', 2),
+                thread_name_prefix='report-job'
+            )
+        return _executor
+
+
+def _run_in_worker(job_id):
+    try:
+        run_job(job_id)
+        _maybe_purge()
+    finally:
+        # Cada hilo abre su propia conexión; se cierra al terminar el trabajo
+        connections.close_all()
+
+
+def _enqueue(job_id):
+    future = _get_executor().submit(_run_in_worker, job_id)
+    _futures[job_id] = future
+    future.add_done_callback(lambda _: _futures.pop(job_id, None))
+
+
+def run_job(job_id):
+    """Generar el reporte de un trabajo pendiente y guardar su artefacto."""
+    started = ReportJob.objects.filter(pk=job_id, status=ReportJob.STATUS_PENDING).update(
+        status=ReportJob.STATUS_RUNNING, started_at=timezone.now()
+    )
+    if not started:
+        return
+    job = ReportJob.objects.get(pk=job_id)
+    active = ReportJob.objects.filter(pk=job_id, status=ReportJob.STATUS_RUNNING)
+
+    def progress(percentage):
+        if ReportJob.objects.filter(pk=job_id, status=ReportJob.STATUS_CANCELLED).exists():
+            raise ReportCancelled()
+        active.update(progress=min(int(percentage), 99))
+
+    try:
+        data = REPORTS[job.report].builder(job.params, progress)
+        progress(99)
+        path = write_artifact(job.cache_key, data)
+        active.update(
+            status=ReportJob.STATUS_COMPLETED,
+            progress=100,
+            artifact_path=str(path),
+            finished_at=timezone.now()
+        )
+    except ReportCancelled:
+        logger.info(f"Reporte {job_id} cancelado durante la generación")
+    except Exception as e:
+        logger.error(f"Error generando reporte {job_id}: {str(e)}")
+        active.update(
+            status=ReportJob.STATUS_FAILED,
+            error_message=str(e),
+            finished_at=timezone.now()
+        )
+
+
+# ==============================================================================
+# API
+# ==============================================================================
+
+def _expire_stale_job(cache_key):
+    """Liberar la clave si el trabajo activo quedó huérfano (p. ej. reinicio)."""
+    timeout = getattr(settings, 'REPORT_JOB_TIMEOUT', 900)
+    return ReportJob.objects.filter(
+        cache_key=cache_key,
+        status__in=ReportJob.ACTIVE_STATUSES,
+        created_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(
+        status=ReportJob.STATUS_FAILED,
+        error_message='Trabajo expirado sin completar',
+        finished_at=timezone.now()
+    )
+
+
+def submit_report(report, params, user=None, cache_key=None):
+    """Encolar un reporte; si ya hay uno activo con la misma clave, devolverlo."""
+    cache_key = cache_key or report_cache_key(report, params)
+
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                job = ReportJob.objects.create(
+                    report=report,
+                    params=params,
+                    cache_key=cache_key,
+                    requested_by=user if user and user.is_authenticated else None
+                )
+            break
+        except IntegrityError:
+            existing = ReportJob.objects.filter(
+                cache_key=cache_key, status__in=ReportJob.ACTIVE_STATUSES
+            ).first()
+            if existing and not _expire_stale_job(cache_key):
+                return existing
+    else:
+        raise RuntimeError(f"No se pudo encolar el reporte {report}")
+
+    if getattr(settings, 'REPORT_JOBS_EAGER', False):
+        run_job(job.pk)
+        job.refresh_from_db()
+    else:
+        transaction.on_commit(lambda: _enqueue(job.pk))
+    return job
+
+
+def get_or_submit_report(report, params, user=None):
+    """Devolver ``(datos, None)`` si hay artefacto o ``(None, trabajo)`` si se encoló."""
+    cache_key = report_cache_key(report, params)
+    data = read_artifact(cache_key)
+    if data is not None:
+        return data, None
+
+    job = submit_report(report, params, user=user, cache_key=cache_key)
+    if job.status == ReportJob.STATUS_COMPLETED:
+        return read_artifact(cache_key), job
+    return None, job
+
+
+def job_result(job):
+    if job.status != ReportJob.STATUS_COMPLETED:
+        return None
+    return read_artifact(job.cache_key)
+
+
+def cancel_job(job):
+    """Cancelar un trabajo activo. Devuelve False si ya había terminado."""
+    cancelled = ReportJob.objects.filter(
+        pk=job.pk, status__in=ReportJob.ACTIVE_STATUSES
+    ).update(status=ReportJob.STATUS_CANCELLED, finished_at=timezone.now())
+
+    future = _futures.get(job.pk)
+    if future:
+        future.cancel()
+    return bool(cancelled)
@@ -0,0 +1,77 @@
+import time
+import tracemalloc
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from reports.exports import (
+    ANIMAL_EXPORT_COLUMNS, EXPORT_CHUNK_SIZE, stream_csv, stream_json_document,
+    stream_ndjson, stream_parquet
+)
+
+WRITERS = {
+    'csv': lambda chunks, columns: stream_csv(chunks, columns),
+    'ndjson': lambda chunks, columns: stream_ndjson(chunks, columns),
+    'json': lambda chunks, columns: stream_json_document(chunks, columns, 'animals', {}),
+    'parquet': lambda chunks, columns: stream_parquet(chunks, columns),
+}
+
+
+def synthetic_chunks(rows, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """Filas sintéticas con la forma de ``values_list`` de Animal, sin base de datos."""
+    sample = {
+        'id': 0, 'ear_tag': '', 'breed': 'Angus', 'birth_date': date(2023, 1, 1),
+        'weight': Decimal('450.50'), 'health_status': 'HEALTHY', 'location': 'Granja',
+        'ipfs_hash': 'Qm' + 'x' * 44, 'token_id': None, 'owner__username': 'productor',
+        'created_at': datetime(2025, 1, 1, 12, 0), 'mint_transaction_hash': '',
+    }
+    generated = iter(range(rows))
+    while True:
+        ids = list(islice(generated, chunk_size))
+        if not ids:
+            return
+        chunk = []
+        for pk in ids:
+            row = dict(sample, id=pk, ear_tag=f'AR{pk:08d}', token_id=pk if pk % 2 else None)
+            chunk.append([column.extract(row) for column in columns])
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempo y memoria pico de los escritores de exportación en streaming'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Filas a exportar')
+        parser.add_argument(
+            '--format',
+            action='append',
+            dest='formats',
+            choices=sorted(WRITERS),
+            help='Formato a medir (se puede repetir). Por defecto, todos.'
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        columns = list(ANIMAL_EXPORT_COLUMNS)
+
+        for format in options.get('formats') or sorted(WRITERS):
+            try:
+                stream = WRITERS[format](synthetic_chunks(rows, columns), columns)
+            except ImportError as e:
+                self.stdout.write(self.style.WARNING(f'  {format}: omitido ({str(e)})'))
+                continue
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            written = sum(len(part) for part in stream)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f'  {format}: {rows} filas, {written / 1024 / 1024:.1f} MB en {elapsed:.2f}s, '
+                f'memoria pico {peak / 1024 / 1024:.1f} MB'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark de exportación completado.'))
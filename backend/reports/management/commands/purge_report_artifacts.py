@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from reports.jobs import artifact_ttl, purge_artifacts
+
+class Command(BaseCommand):
+    help = 'Borra artefactos de reportes y trabajos terminados más antiguos que REPORT_ARTIFACT_TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ttl',
+            type=int,
+            help=f'Antigüedad mínima en segundos (por defecto, {artifact_ttl()})'
+        )
+
+    def handle(self, *args, **options):
+        artifacts, jobs = purge_artifacts(options.get('ttl'))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Reportes purgados: {artifacts} artefactos, {jobs} trabajos.')
+        )
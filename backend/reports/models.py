@@ -1,3 +1,72 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+
+
+class ReportJob(models.Model):
+    """Trabajo de generación de reporte en segundo plano.
+
+    ``cache_key`` resume el reporte, sus parámetros y la marca de agua de los
+    datos; dos solicitudes idénticas comparten artefacto y, mientras uno está
+    en curso, comparten también el trabajo.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_COMPLETED = 'COMPLETED'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CANCELLED = 'CANCELLED'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En Ejecución'),
+        (STATUS_COMPLETED, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+        (STATUS_CANCELLED, 'Cancelado'),
+    ]
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+    REPORT_CHOICES = [
+        ('compliance', 'Cumplimiento'),
+        ('audit', 'Auditoría'),
+        ('custom', 'Personalizado'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.CharField(max_length=20, choices=REPORT_CHOICES)
+    params = models.JSONField(default=dict)
+    cache_key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)
+    artifact_path = models.CharField(max_length=500, blank=True)
+    error_message = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='report_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo de Reporte"
+        verbose_name_plural = "Trabajos de Reportes"
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cache_key'],
+                condition=Q(status__in=['PENDING', 'RUNNING']),
+                name='unique_active_report_job'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.report} {self.params} - {self.get_status_display()} ({self.progress}%)"
 
-# Create your models here.
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
@@ -0,0 +1,13 @@
+from rest_framework import serializers
+from .models import ReportJob
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    requested_by_username = serializers.CharField(source='requested_by.username', read_only=True)
+    
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report', 'params', 'status', 'progress', 'error_message',
+            'requested_by_username', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
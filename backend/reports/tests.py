@@ -1,3 +1,200 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cattle.models import Animal
+from users.models import User
+from .jobs import (
+    cancel_job, get_or_submit_report, purge_artifacts, report_cache_key, run_job, submit_report
+)
+from .models import ReportJob
+
+
+class ExportAnimalDataTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='exporter',
+            email='export@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.client.force_authenticate(user=self.user)
+        for index in range(3):
+            Animal.objects.create(
+                ear_tag=f'EXP00{index}',
+                breed='Angus',
+                birth_date='2023-01-01',
+                weight=450.5,
+                health_status='HEALTHY',
+                owner=self.user,
+                location='Test Farm'
+            )
+        self.url = reverse('reports:export-animal-data')
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(
+            part if isinstance(part, bytes) else part.encode() for part in response.streaming_content
+        ).decode()
+
+    def test_csv_export_streams_rows(self):
+        response = self.client.get(self.url, {'export_format': 'csv'})
+
+        lines = self.read(response).strip().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['ID', 'Ear Tag', 'Breed'])
+        self.assertEqual(len(lines), 4)
+        self.assertIn('exporter', lines[1])
+
+    def test_ndjson_export_with_column_selection(self):
+        response = self.client.get(self.url, {'export_format': 'ndjson', 'fields': 'ear_tag,owner'})
+
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(set(rows[0]), {'ear_tag', 'owner'})
+
+    def test_json_export_keeps_document_shape(self):
+        response = self.client.get(self.url, {'export_format': 'json'})
+
+        document = json.loads(self.read(response))
+        self.assertEqual(document['count'], 3)
+        self.assertEqual(document['exported_by'], 'exporter')
+        self.assertEqual(document['animals'][0]['weight'], 450.5)
+
+    def test_unknown_column_is_rejected(self):
+        response = self.client.get(self.url, {'export_format': 'csv', 'fields': 'ear_tag,secret'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'reports-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExportReportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin = User.objects.create_user(
+            username='reportadmin',
+            email='reportadmin@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e',
+            is_staff=True
+        )
+        self.client.force_authenticate(user=admin)
+
+    def test_report_exports_are_served(self):
+        url = reverse('reports:export-report')
+
+        for report_type in ('compliance', 'financial'):
+            response = self.client.get(url, {'type': report_type, 'export_format': 'csv'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(self.client.get(url, {'type': 'compliance', 'export_format': 'pdf'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('reports:financial-report')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('reports:system-health-report')).status_code, 200)
+
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.artifacts = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.artifacts, ignore_errors=True)
+        self.settings_override = override_settings(REPORT_ARTIFACTS_DIR=self.artifacts)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            username='reportadmin',
+            email='reports@example.com',
+            password='testpass123',
+            wallet_address='0x742d35Cc6634C0532925a3b844Bc454e4438f44e'
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse('reports:compliance-report')
+
+    def test_request_is_queued_without_computing(self):
+        response = self.client.get(self.url, {'type': 'general'})
+
+        self.assertEqual(response.status_code, 202)
+        job = ReportJob.objects.get(pk=response.data['job']['id'])
+        self.assertEqual(job.status, ReportJob.STATUS_PENDING)
+
+    def test_identical_requests_share_active_job(self):
+        first = submit_report('compliance', {'type': 'general', 'days': 30})
+        second = submit_report('compliance', {'type': 'general', 'days': 30})
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+    @override_settings(REPORT_JOBS_EAGER=True)
+    def test_completed_artifact_is_reused(self):
+        first = self.client.get(self.url, {'type': 'general'})
+        second = self.client.get(self.url, {'type': 'general'})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+        job = ReportJob.objects.get()
+        detail = self.client.get(reverse('reports:report-job-detail', args=[job.pk]))
+        self.assertEqual(detail.data['progress'], 100)
+        self.assertEqual(detail.data['result']['total_users'], 1)
+
+    def test_new_data_invalidates_artifact(self):
+        params = {'type': 'general', 'days': 30}
+        run_job(submit_report('compliance', params).pk)
+
+        data, job = get_or_submit_report('compliance', params)
+        self.assertIsNone(job)
+        self.assertEqual(data['total_animals'], 0)
+
+        # La versión de datos cambia al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            Animal.objects.create(
+                ear_tag='RPT001', breed='Angus', birth_date='2023-01-01', weight=450.5,
+                health_status='HEALTHY', owner=self.admin, location='Test Farm'
+            )
+
+        with self.assertNumQueries(0):
+            report_cache_key('compliance', params)
+        data, job = get_or_submit_report('compliance', params)
+        self.assertIsNone(data)
+        self.assertEqual(job.status, ReportJob.STATUS_PENDING)
+
+    def test_purge_removes_expired_artifacts_and_jobs(self):
+        job = submit_report('compliance', {'type': 'general', 'days': 30})
+        run_job(job.pk)
+        job.refresh_from_db()
+        fresh = Path(self.artifacts) / 'fresh.json'
+        fresh.write_text('{}')
+
+        expired = time.time() - 3600
+        os.utime(job.artifact_path, (expired, expired))
+        ReportJob.objects.filter(pk=job.pk).update(finished_at=job.finished_at - timedelta(hours=1))
+
+        self.assertEqual(purge_artifacts(ttl=60), (1, 1))
+        self.assertFalse(os.path.exists(job.artifact_path))
+        self.assertTrue(fresh.exists())
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_cancel_stops_pending_job(self):
+        job = submit_report('compliance', {'type': 'iot', 'days': 30})
+
+        response = self.client.post(reverse('reports:report-job-cancel', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.STATUS_CANCELLED)
+        self.assertFalse(cancel_job(job))
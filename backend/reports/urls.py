@@ -6,7 +6,9 @@ from .views import (
     AuditReportGenerator,
     FinancialReportView,
     SystemHealthReportView,
-    ExportReportView
+    ExportReportView,
+    ReportJobDetailView,
+    ReportJobCancelView
 )
 
 # Router para endpoints que podrían convertirse en ViewSets en el futuro
@@ -34,7 +36,7 @@ urlpatterns = [
         'export/animals/',
         ExportAnimalDataView.as_view(),
         name='export-animal-data',
-        kwargs={'description': 'Exportar datos de animales. Parámetros: format, animal_ids[]'}
+        kwargs={'description': 'Exportar datos de animales. Parámetros: export_format, animal_ids[]'}
     ),
     
     # -------------------------------------------------------------------------
@@ -74,7 +76,23 @@ urlpatterns = [
         'export/report/',
         ExportReportView.as_view(),
         name='export-report',
-        kwargs={'description': 'Exportar reportes. Parámetros: type, format'}
+        kwargs={'description': 'Exportar reportes. Parámetros: type, export_format'}
+    ),
+    
+    # -------------------------------------------------------------------------
+    # TRABAJOS DE REPORTES EN SEGUNDO PLANO
+    # -------------------------------------------------------------------------
+    path(
+        'jobs/<uuid:job_id>/',
+        ReportJobDetailView.as_view(),
+        name='report-job-detail',
+        kwargs={'description': 'Estado, progreso y resultado de un trabajo de reporte'}
+    ),
+    path(
+        'jobs/<uuid:job_id>/cancel/',
+        ReportJobCancelView.as_view(),
+        name='report-job-cancel',
+        kwargs={'description': 'Cancelar un trabajo de reporte en curso'}
     ),
     
     # -------------------------------------------------------------------------
@@ -109,7 +127,7 @@ REPORT_PARAMETERS_DOCS = {
         'days': 'Número de días (default: 30)'
     },
     'export_animals': {
-        'format': ['json', 'csv'],
+        'export_format': ['json', 'csv', 'ndjson', 'parquet'],
         'animal_ids': 'Lista de IDs de animales separados por coma'
     },
     'audit': {
@@ -121,7 +139,7 @@ REPORT_PARAMETERS_DOCS = {
     },
     'export_report': {
         'type': ['compliance', 'financial'],
-        'format': ['json', 'csv']
+        'export_format': ['csv']
     }
 }
 
@@ -133,9 +151,9 @@ API_USAGE_EXAMPLES = {
         'json_response': '/reports/compliance/?type=health&format=json'
     },
     'export': {
-        'animals_csv': '/reports/export/animals/?format=csv',
-        'animals_json': '/reports/export/animals/?format=json&animal_ids=1,2,3',
-        'report_financial': '/reports/export/report/?type=financial&format=csv'
+        'animals_csv': '/reports/export/animals/?export_format=csv',
+        'animals_json': '/reports/export/animals/?export_format=json&animal_ids=1,2,3',
+        'report_financial': '/reports/export/report/?type=financial&export_format=csv'
     },
     'api_endpoints': {
         'compliance_quick': '/reports/api/compliance/quick/?type=blockchain',
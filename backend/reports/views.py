@@ -1,240 +1,104 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework import status
 from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Count, Sum, Max
+from django.db.models import Avg, Sum
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 import csv
 import json
 from datetime import datetime, timedelta
 
 # Importaciones corregidas desde las ubicaciones correctas
-from cattle.models import Animal, Batch, AnimalHealthRecord
-from cattle.audit_models import CattleAuditTrail
+from cattle.models import Animal
 from cattle.blockchain_models import AnimalCertification, CertificationStandard
 from users.models import User
 from blockchain.models import BlockchainEvent, ContractInteraction
 from iot.models import IoTDevice, GPSData, HealthSensorData
 from users.reputation_models import RewardDistribution, StakingPool
+from .jobs import cancel_job, get_or_submit_report, job_result
+from .models import ReportJob
+from .serializers import ReportJobSerializer
+from .exports import (
+    ANIMAL_CSV_DEFAULT, ANIMAL_EXPORT_COLUMNS, EXPORT_FORMATS, select_columns, streaming_export
+)
+
+def report_job_response(report, params, user):
+    """Responder con el artefacto en caché o con el trabajo encolado (202)"""
+    data, job = get_or_submit_report(report, params, user=user)
+    if data is not None:
+        return Response(data)
+    
+    return Response({
+        'success': True,
+        'job': ReportJobSerializer(job).data,
+        'status_url': reverse('reports:report-job-detail', args=[job.pk])
+    }, status=status.HTTP_202_ACCEPTED)
 
 class ComplianceReportView(APIView):
     permission_classes = [IsAdminUser]
     
-    def get(self, request):
-        report_type = request.query_params.get('type', 'general')
-        days = int(request.query_params.get('days', 30))
-        
-        from_date = timezone.now() - timedelta(days=days)
-        
-        if report_type == 'certifications':
-            certifications = AnimalCertification.objects.filter(
-                created_at__gte=from_date
-            )
-            
-            data = {
-                'total_certifications': certifications.count(),
-                'active_certifications': certifications.filter(revoked=False).count(),
-                'revoked_certifications': certifications.filter(revoked=True).count(),
-                'by_standard': dict(certifications.values_list('standard__name').annotate(count=Count('id'))),
-                'expiring_soon': certifications.filter(
-                    expiration_date__lte=timezone.now() + timedelta(days=30)
-                ).count()
-            }
-            
-            return Response(data)
-        
-        elif report_type == 'health':
-            health_data = AnimalHealthRecord.objects.filter(
-                created_at__gte=from_date
-            ).values('health_status').annotate(
-                count=Count('id')
-            )
-            
-            return Response({'health_status_distribution': list(health_data)})
-        
-        elif report_type == 'blockchain':
-            # Estadísticas de blockchain
-            blockchain_stats = {
-                'total_events': BlockchainEvent.objects.filter(created_at__gte=from_date).count(),
-                'total_transactions': ContractInteraction.objects.filter(created_at__gte=from_date).count(),
-                'successful_transactions': ContractInteraction.objects.filter(
-                    created_at__gte=from_date, status='SUCCESS'
-                ).count(),
-                'failed_transactions': ContractInteraction.objects.filter(
-                    created_at__gte=from_date, status='FAILED'
-                ).count(),
-                'events_by_type': dict(BlockchainEvent.objects.filter(
-                    created_at__gte=from_date
-                ).values_list('event_type').annotate(count=Count('id')))
-            }
-            
-            return Response(blockchain_stats)
-        
-        elif report_type == 'iot':
-            # Estadísticas de dispositivos IoT
-            iot_stats = {
-                'total_devices': IoTDevice.objects.count(),
-                'active_devices': IoTDevice.objects.filter(status='ACTIVE').count(),
-                'gps_readings': GPSData.objects.filter(timestamp__gte=from_date).count(),
-                'health_readings': HealthSensorData.objects.filter(timestamp__gte=from_date).count(),
-                'devices_by_type': dict(IoTDevice.objects.values_list('device_type').annotate(count=Count('id')))
-            }
-            
-            return Response(iot_stats)
-        
-        elif report_type == 'rewards':
-            # Estadísticas de recompensas
-            rewards_stats = {
-                'total_rewards_distributed': RewardDistribution.objects.filter(
-                    distribution_date__gte=from_date
-                ).count(),
-                'total_tokens_distributed': float(RewardDistribution.objects.filter(
-                    distribution_date__gte=from_date
-                ).aggregate(total=Sum('tokens_awarded'))['total'] or 0),
-                'unclaimed_tokens': float(RewardDistribution.objects.filter(
-                    distribution_date__gte=from_date, is_claimed=False
-                ).aggregate(total=Sum('tokens_awarded'))['total'] or 0),
-                'rewards_by_type': dict(RewardDistribution.objects.filter(
-                    distribution_date__gte=from_date
-                ).values_list('action_type').annotate(count=Count('id')))
-            }
-            
-            return Response(rewards_stats)
-        
-        # Reporte general por defecto
-        general_data = {
-            'total_animals': Animal.objects.count(),
-            'total_batches': Batch.objects.count(),
-            'total_users': User.objects.count(),
-            'animals_by_health_status': dict(Animal.objects.values_list('health_status').annotate(count=Count('id'))),
-            'batches_by_status': dict(Batch.objects.values_list('status').annotate(count=Count('id'))),
-            'time_period': f'{from_date.date()} to {timezone.now().date()}',
-            'report_generated': timezone.now()
+    def get(self, request, *args, **kwargs):
+        params = {
+            'type': request.query_params.get('type', 'general'),
+            'days': int(request.query_params.get('days', 30))
         }
-        
-        return Response(general_data)
+        return report_job_response('compliance', params, request.user)
 
 class ExportAnimalDataView(APIView):
+    """Exportación de animales en streaming (csv, ndjson, json, parquet)"""
     permission_classes = [IsAuthenticated]
     
-    def get(self, request):
-        format = request.query_params.get('format', 'json')
+    def get(self, request, *args, **kwargs):
+        # ``format`` lo reserva DRF para elegir renderer (URL_FORMAT_OVERRIDE)
+        export_format = request.query_params.get('export_format', 'json')
         animal_ids = request.GET.getlist('animal_ids')
+        fields = request.query_params.get('fields')
         
-        if animal_ids:
-            animals = Animal.objects.filter(id__in=animal_ids, owner=request.user)
-        else:
-            animals = Animal.objects.filter(owner=request.user)
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': f'Formato no soportado: {export_format}'}, status=400)
         
-        if format == 'csv':
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="animal_data_export_{timezone.now().date()}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow([
-                'ID', 'Ear Tag', 'Breed', 'Birth Date', 'Weight', 
-                'Health Status', 'Location', 'IPFS Hash', 'Token ID',
-                'Owner', 'Created At'
-            ])
-            
-            for animal in animals:
-                writer.writerow([
-                    animal.id,
-                    animal.ear_tag,
-                    animal.breed,
-                    animal.birth_date.strftime('%Y-%m-%d') if animal.birth_date else '',
-                    animal.weight,
-                    animal.health_status,
-                    animal.location,
-                    animal.ipfs_hash,
-                    animal.token_id,
-                    animal.owner.username if animal.owner else '',
-                    animal.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-            
-            return response
+        animals = Animal.objects.filter(owner=request.user)
+        if animal_ids:
+            animals = animals.filter(id__in=animal_ids)
         
-        else:  # JSON
-            data = [
-                {
-                    'id': animal.id,
-                    'ear_tag': animal.ear_tag,
-                    'breed': animal.breed,
-                    'birth_date': animal.birth_date.strftime('%Y-%m-%d') if animal.birth_date else None,
-                    'weight': float(animal.weight) if animal.weight else None,
-                    'health_status': animal.health_status,
-                    'location': animal.location,
-                    'ipfs_hash': animal.ipfs_hash,
-                    'token_id': animal.token_id,
-                    'owner': animal.owner.username if animal.owner else None,
-                    'created_at': animal.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    'metadata_uri': animal.metadata_uri,
-                    'is_minted': animal.is_minted
+        try:
+            columns = select_columns(
+                ANIMAL_EXPORT_COLUMNS,
+                requested=fields.split(',') if fields else None,
+                default=ANIMAL_CSV_DEFAULT if export_format == 'csv' else None
+            )
+            return streaming_export(
+                animals, columns, export_format, 'animal_data_export',
+                list_key='animals',
+                extra={
+                    'export_date': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'exported_by': request.user.username
                 }
-                for animal in animals
-            ]
-            
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        except ImportError:
             return Response({
-                'animals': data, 
-                'count': len(data),
-                'export_date': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'exported_by': request.user.username
-            })
+                'error': 'Exportación Parquet no disponible: pyarrow no está instalado'
+            }, status=503)
 
 class AuditReportGenerator(APIView):
     permission_classes = [IsAdminUser]
     
-    def get(self, request):
-        report_type = request.query_params.get('type', 'general')
-        days = int(request.query_params.get('days', 7))
-        
-        from_date = timezone.now() - timedelta(days=days)
-        audits = CattleAuditTrail.objects.filter(timestamp__gte=from_date)
-        
-        if report_type == 'user_activity':
-            user_activity = audits.values('user__username').annotate(
-                action_count=Count('id'),
-                last_action=Max('timestamp')
-            ).order_by('-action_count')
-            
-            return Response({'user_activity': list(user_activity)})
-        
-        elif report_type == 'action_types':
-            action_stats = audits.values('action_type').annotate(
-                count=Count('id'),
-                last_performed=Max('timestamp')
-            ).order_by('-count')
-            
-            return Response({'action_stats': list(action_stats)})
-        
-        elif report_type == 'blockchain_audit':
-            # Auditoría de eventos blockchain
-            blockchain_events = BlockchainEvent.objects.filter(created_at__gte=from_date)
-            blockchain_stats = {
-                'total_events': blockchain_events.count(),
-                'events_by_type': dict(blockchain_events.values_list('event_type').annotate(count=Count('id'))),
-                'events_with_animals': blockchain_events.filter(animal__isnull=False).count(),
-                'events_with_batches': blockchain_events.filter(batch__isnull=False).count()
-            }
-            
-            return Response(blockchain_stats)
-        
-        # Reporte general
-        general_stats = {
-            'total_audits': audits.count(),
-            'audits_by_type': dict(audits.values_list('action_type').annotate(count=Count('id'))),
-            'unique_users': audits.values('user').distinct().count(),
-            'time_period': f'{from_date.date()} to {timezone.now().date()}',
-            'report_generated': timezone.now()
+    def get(self, request, *args, **kwargs):
+        params = {
+            'type': request.query_params.get('type', 'general'),
+            'days': int(request.query_params.get('days', 7))
         }
-        
-        return Response(general_stats)
+        return report_job_response('audit', params, request.user)
 
 class FinancialReportView(APIView):
     permission_classes = [IsAdminUser]
     
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
         days = int(request.query_params.get('days', 30))
         from_date = timezone.now() - timedelta(days=days)
         
@@ -287,7 +151,7 @@ class FinancialReportView(APIView):
 class SystemHealthReportView(APIView):
     permission_classes = [IsAdminUser]
     
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
         # Reporte de salud del sistema
         health_report = {
             'database': {
@@ -324,14 +188,14 @@ class SystemHealthReportView(APIView):
 class ExportReportView(APIView):
     permission_classes = [IsAdminUser]
     
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
         report_type = request.query_params.get('type', 'compliance')
-        format = request.query_params.get('format', 'csv')
+        export_format = request.query_params.get('export_format', 'csv')
         days = int(request.query_params.get('days', 30))
         
         from_date = timezone.now() - timedelta(days=days)
         
-        if report_type == 'compliance' and format == 'csv':
+        if report_type == 'compliance' and export_format == 'csv':
             response = HttpResponse(content_type='text/csv')
             response['Content-Disposition'] = f'attachment; filename="compliance_report_{timezone.now().date()}.csv"'
             
@@ -349,7 +213,7 @@ class ExportReportView(APIView):
             
             return response
         
-        elif report_type == 'financial' and format == 'csv':
+        elif report_type == 'financial' and export_format == 'csv':
             response = HttpResponse(content_type='text/csv')
             response['Content-Disposition'] = f'attachment; filename="financial_report_{timezone.now().date()}.csv"'
             
@@ -366,4 +230,30 @@ class ExportReportView(APIView):
             
             return response
         
-        return Response({'error': 'Tipo de reporte o formato no soportado'}, status=400)
\ No newline at end of file
+        return Response({'error': 'Tipo de reporte o formato no soportado'}, status=400)
+
+class ReportJobDetailView(APIView):
+    """Estado, progreso y resultado de un trabajo de reporte"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request, job_id, *args, **kwargs):
+        job = get_object_or_404(ReportJob, pk=job_id)
+        data = ReportJobSerializer(job).data
+        if job.status == ReportJob.STATUS_COMPLETED:
+            data['result'] = job_result(job)
+        return Response(data)
+
+class ReportJobCancelView(APIView):
+    """Cancelar un trabajo de reporte pendiente o en ejecución"""
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request, job_id, *args, **kwargs):
+        job = get_object_or_404(ReportJob, pk=job_id)
+        if not cancel_job(job):
+            return Response({
+                'success': False,
+                'error': f'El trabajo ya terminó con estado {job.status}'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        job.refresh_from_db()
+        return Response({'success': True, 'job': ReportJobSerializer(job).data})
@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import RewardAllocation, RewardEpoch
+
+
+@admin.register(RewardEpoch)
+class RewardEpochAdmin(admin.ModelAdmin):
+    list_display = ['number', 'status', 'recipient_count', 'total_amount', 'merkle_root', 'published_at']
+    list_filter = ['status']
+    readonly_fields = [
+        'merkle_root', 'total_amount', 'recipient_count', 'watermark',
+        'commit_transaction_hash', 'created_at', 'published_at', 'published_block'
+    ]
+
+
+@admin.register(RewardAllocation)
+class RewardAllocationAdmin(admin.ModelAdmin):
+    list_display = ['epoch', 'index', 'user', 'wallet_address', 'amount', 'claimed_at']
+    list_filter = ['epoch']
+    search_fields = ['wallet_address', 'user__email']
+    raw_id_fields = ['user']
+    readonly_fields = ['epoch', 'index', 'wallet_address', 'amount', 'proof']
@@ -0,0 +1,347 @@
+# backend/rewards/distribution.py
+"""
+Distribución de recompensas por épocas con reclamos Merkle.
+
+``compute_epoch`` agrega en la base de datos las ``RewardDistribution``
+pendientes por usuario (una consulta), arma el árbol Merkle, escribe las
+asignaciones con sus pruebas en bloque y marca las recompensas incluidas con
+un solo UPDATE. ``publish_epoch`` publica la raíz en
+``GanadoRewardDistributorUpgradeable`` en una sola transacción, sin importar
+cuántos destinatarios tenga la época; cada usuario reclama después con su
+prueba.
+
+Entregar la prueba no cambia nada: una asignación (y sus ``RewardDistribution``)
+solo queda reclamada cuando ``sync_claims`` lee el evento ``Claimed`` del
+contrato, con el hash de esa transacción. Cada época guarda el bloque en que
+se publicó su raíz (antes no puede haber reclamos) y hasta qué bloque se
+revisaron sus reclamos.
+
+Las hojas y los pares siguen ``MerkleProof`` de OpenZeppelin:
+``keccak256(bytes.concat(keccak256(abi.encode(index, account, amount))))`` y
+pares ordenados antes de hashear.
+
+Ajustes:
+    REWARD_DISTRIBUTOR_ADDRESS   dirección del contrato distribuidor
+    REWARD_TOKEN_DECIMALS        decimales del token (18)
+    REWARD_CLAIM_SYNC_BLOCKS     bloques por consulta de eventos ``Claimed`` (5000)
+"""
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+from eth_abi import encode
+from eth_utils import keccak, to_checksum_address
+
+from users.reputation_models import RewardDistribution
+from .models import RewardAllocation, RewardEpoch
+
+logger = logging.getLogger(__name__)
+
+ALLOCATION_BATCH_SIZE = 1000
+
+DISTRIBUTOR_ABI = [{
+    'name': 'publishRoot',
+    'type': 'function',
+    'stateMutability': 'nonpayable',
+    'inputs': [
+        {'name': 'epoch', 'type': 'uint256'},
+        {'name': 'root', 'type': 'bytes32'},
+        {'name': 'total', 'type': 'uint256'},
+    ],
+    'outputs': [],
+}, {
+    'name': 'Claimed',
+    'type': 'event',
+    'anonymous': False,
+    'inputs': [
+        {'name': 'epoch', 'type': 'uint256', 'indexed': True},
+        {'name': 'index', 'type': 'uint256', 'indexed': False},
+        {'name': 'account', 'type': 'address', 'indexed': True},
+        {'name': 'amount', 'type': 'uint256', 'indexed': False},
+    ],
+}]
+
+
+class DistributionError(Exception):
+    """La época no puede calcularse, publicarse o reclamarse."""
+
+
+# ==============================================================================
+# ÁRBOL MERKLE
+# ==============================================================================
+
+def to_wei(amount):
+    return int(Decimal(amount).scaleb(getattr(settings, 'REWARD_TOKEN_DECIMALS', 18)))
+
+
+def allocation_leaf(index, account, amount_wei):
+    return keccak(keccak(encode(['uint256', 'address', 'uint256'], [index, to_checksum_address(account), amount_wei])))
+
+
+def hash_pair(a, b):
+    return keccak(a + b if a < b else b + a)
+
+
+def build_layers(leaves):
+    """Capas del árbol desde las hojas; un nodo sin pareja sube tal cual."""
+    layers = [list(leaves)]
+    while len(layers[-1]) > 1:
+        level = layers[-1]
+        layers.append([
+            hash_pair(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ])
+    return layers
+
+
+def merkle_proof(layers, index):
+    proof = []
+    for level in layers[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling])
+        index //= 2
+    return proof
+
+
+def verify_proof(proof, root, leaf):
+    node = leaf
+    for sibling in proof:
+        node = hash_pair(node, sibling)
+    return node == root
+
+
+# ==============================================================================
+# ÉPOCAS
+# ==============================================================================
+
+def compute_epoch(number=None):
+    """Crear una época con las recompensas pendientes; None si no hay nada que pagar.
+
+    Las recompensas de usuarios sin wallet quedan pendientes para otra época.
+    """
+    with transaction.atomic():
+        last = RewardEpoch.objects.select_for_update().order_by('-number').first()
+        number = number or (last.number + 1 if last else 1)
+
+        pending = RewardDistribution.objects.filter(epoch__isnull=True, is_claimed=False).exclude(
+            user__wallet_address__isnull=True).exclude(user__wallet_address='')
+        watermark = pending.aggregate(last=Max('id'))['last']
+        if watermark is None:
+            return None
+        pending = pending.filter(id__lte=watermark)
+
+        totals = list(
+            pending.values('user_id', 'user__wallet_address').annotate(amount=Sum('tokens_awarded'))
+            .filter(amount__gt=0).order_by('user_id')
+        )
+        if not totals:
+            return None
+
+        leaves = [
+            allocation_leaf(index, row['user__wallet_address'], to_wei(row['amount']))
+            for index, row in enumerate(totals)
+        ]
+        layers = build_layers(leaves)
+        epoch = RewardEpoch.objects.create(
+            number=number,
+            merkle_root='0x' + layers[-1][0].hex(),
+            total_amount=sum(row['amount'] for row in totals),
+            recipient_count=len(totals),
+            watermark=watermark,
+        )
+        RewardAllocation.objects.bulk_create([
+            RewardAllocation(
+                epoch=epoch,
+                user_id=row['user_id'],
+                wallet_address=to_checksum_address(row['user__wallet_address']),
+                index=index,
+                amount=row['amount'],
+                proof=['0x' + node.hex() for node in merkle_proof(layers, index)],
+            )
+            for index, row in enumerate(totals)
+        ], batch_size=ALLOCATION_BATCH_SIZE)
+        pending.update(epoch=epoch)
+    return epoch
+
+
+class Web3RootPublisher:
+    """Publica raíces en el contrato distribuidor vía web3.
+
+    Con ``private_key`` firma localmente (como ``BlockchainService``); con
+    ``sender`` usa una cuenta desbloqueada del nodo (p. ej. eth-tester).
+    """
+
+    def __init__(self, w3=None, address=None, private_key=None, sender=None, timeout=120):
+        from web3 import Web3
+
+        self.w3 = w3 or Web3(Web3.HTTPProvider(settings.BLOCKCHAIN_RPC_URL))
+        address = address or getattr(settings, 'REWARD_DISTRIBUTOR_ADDRESS', None)
+        if not address:
+            raise DistributionError('REWARD_DISTRIBUTOR_ADDRESS no está configurada')
+        self.contract = self.w3.eth.contract(address=Web3.to_checksum_address(address), abi=DISTRIBUTOR_ABI)
+        if private_key is None and sender is None:
+            private_key = settings.ADMIN_PRIVATE_KEY
+        self.private_key = private_key
+        self.sender = sender
+        self.timeout = timeout
+
+    def publish_root(self, number, root, total_wei):
+        """Enviar ``publishRoot``; devuelve el hash y el bloque de la transacción."""
+        call = self.contract.functions.publishRoot(number, bytes.fromhex(root[2:]), total_wei)
+        if self.private_key:
+            account = self.w3.eth.account.from_key(self.private_key)
+            transaction_data = call.build_transaction({
+                'from': account.address,
+                'nonce': self.w3.eth.get_transaction_count(account.address, 'pending'),
+                'gas': 120000,
+                'gasPrice': self.w3.eth.gas_price,
+            })
+            signed = account.sign_transaction(transaction_data)
+            tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        else:
+            tx_hash = call.transact({'from': self.sender, 'gas': 120000})
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.timeout)
+        if receipt['status'] != 1:
+            raise DistributionError(f'La publicación de la época {number} falló en cadena')
+        return self.w3.to_hex(tx_hash), receipt['blockNumber']
+
+
+def publish_epoch(epoch, publisher=None):
+    """Publicar la raíz de la época en una transacción; devuelve el hash."""
+    if epoch.status == 'PUBLISHED':
+        raise DistributionError(f'La época {epoch.number} ya fue publicada')
+    publisher = publisher or Web3RootPublisher()
+    tx_hash, block = publisher.publish_root(epoch.number, epoch.merkle_root, to_wei(epoch.total_amount))
+    # Los reclamos de la época empiezan en el bloque de publicación
+    RewardEpoch.objects.filter(pk=epoch.pk, status='DRAFT').update(
+        status='PUBLISHED', commit_transaction_hash=tx_hash, published_at=timezone.now(),
+        published_block=block, claims_synced_block=block - 1
+    )
+    RewardDistribution.objects.filter(epoch=epoch).update(transaction_hash=tx_hash)
+    epoch.refresh_from_db()
+    return tx_hash
+
+
+# ==============================================================================
+# RECLAMOS
+# ==============================================================================
+
+def claim_payload(allocation):
+    """Argumentos de ``claim`` en el contrato para una asignación."""
+    return {
+        'epoch': allocation.epoch.number,
+        'index': allocation.index,
+        'account': allocation.wallet_address,
+        'amount': float(allocation.amount),
+        'amount_wei': str(to_wei(allocation.amount)),
+        'proof': allocation.proof,
+        'merkle_root': allocation.epoch.merkle_root,
+        'distributor': getattr(settings, 'REWARD_DISTRIBUTOR_ADDRESS', None),
+    }
+
+
+def claim_epochs(user, epoch_ids):
+    """Asignaciones del usuario (con su prueba) en esas épocas publicadas.
+
+    Solo lee: pedir la prueba dos veces devuelve lo mismo. El reclamo queda
+    registrado cuando ``sync_claims`` ve el evento ``Claimed`` en cadena.
+    """
+    allocations = list(
+        RewardAllocation.objects.select_related('epoch').filter(
+            user=user, epoch_id__in=epoch_ids, epoch__status='PUBLISHED'
+        ).order_by('epoch__number')
+    )
+    if len(allocations) != len(set(epoch_ids)):
+        raise DistributionError('Hay recompensas que aún no pertenecen a una época publicada')
+    return allocations
+
+
+class Web3ClaimReader:
+    """Lee los eventos ``Claimed`` del contrato distribuidor vía web3."""
+
+    def __init__(self, w3=None, address=None):
+        from web3 import Web3
+
+        self.w3 = w3 or Web3(Web3.HTTPProvider(settings.BLOCKCHAIN_RPC_URL))
+        address = address or getattr(settings, 'REWARD_DISTRIBUTOR_ADDRESS', None)
+        if not address:
+            raise DistributionError('REWARD_DISTRIBUTOR_ADDRESS no está configurada')
+        self.contract = self.w3.eth.contract(address=Web3.to_checksum_address(address), abi=DISTRIBUTOR_ABI)
+
+    def latest_block(self):
+        return self.w3.eth.block_number
+
+    def claimed(self, from_block, to_block):
+        return [{
+            'epoch': log['args']['epoch'],
+            'index': log['args']['index'],
+            'account': log['args']['account'],
+            'amount_wei': log['args']['amount'],
+            'transaction_hash': self.w3.to_hex(log['transactionHash']),
+        } for log in self.contract.events.Claimed.get_logs(from_block=from_block, to_block=to_block)]
+
+
+def _apply_claims(events):
+    """Registrar eventos ``Claimed``; devuelve cuántas asignaciones quedaron reclamadas."""
+    claimed = 0
+    with transaction.atomic():
+        for event in events:
+            allocation = RewardAllocation.objects.select_for_update().select_related('epoch').filter(
+                epoch__number=event['epoch'], index=event['index'], claimed_at__isnull=True
+            ).first()
+            if allocation is None:
+                continue
+            if (to_checksum_address(event['account']) != allocation.wallet_address
+                    or event['amount_wei'] != to_wei(allocation.amount)):
+                logger.error(
+                    f"Error sincronizando reclamo {event['transaction_hash']}: no coincide con la "
+                    f"asignación {allocation.index} de la época {allocation.epoch.number}"
+                )
+                continue
+            RewardAllocation.objects.filter(pk=allocation.pk).update(
+                claimed_at=timezone.now(), claim_transaction_hash=event['transaction_hash']
+            )
+            RewardDistribution.objects.filter(user_id=allocation.user_id, epoch_id=allocation.epoch_id).update(
+                is_claimed=True
+            )
+            claimed += 1
+    return claimed
+
+
+def sync_claims(reader=None):
+    """Leer los eventos ``Claimed`` nuevos y marcar las asignaciones reclamadas.
+
+    Solo se revisan las épocas publicadas con asignaciones pendientes, desde el
+    menor bloque que alguna de ellas no haya visto (la primera vez, el bloque
+    en que se publicó su raíz). Devuelve cuántas
+    asignaciones quedaron reclamadas.
+    """
+    epochs = RewardEpoch.objects.filter(status='PUBLISHED', allocations__claimed_at__isnull=True).distinct()
+    start = epochs.aggregate(start=Min('claims_synced_block'))['start']
+    if start is None:
+        return 0
+    epoch_ids = list(epochs.values_list('pk', flat=True))
+
+    reader = reader or Web3ClaimReader()
+    latest = reader.latest_block()
+    step = getattr(settings, 'REWARD_CLAIM_SYNC_BLOCKS', 5000)
+    claimed = 0
+    from_block = start + 1
+    while from_block <= latest:
+        to_block = min(from_block + step - 1, latest)
+        claimed += _apply_claims(reader.claimed(from_block, to_block))
+        RewardEpoch.objects.filter(pk__in=epoch_ids, claims_synced_block__lt=to_block).update(
+            claims_synced_block=to_block
+        )
+        from_block = to_block + 1
+    return claimed
+
+
+def verify_allocation(allocation):
+    leaf = allocation_leaf(allocation.index, allocation.wallet_address, to_wei(allocation.amount))
+    proof = [bytes.fromhex(node[2:]) for node in allocation.proof]
+    return verify_proof(proof, bytes.fromhex(allocation.epoch.merkle_root[2:]), leaf)
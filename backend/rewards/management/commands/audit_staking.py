@@ -0,0 +1,29 @@
+# rewards/management/commands/audit_staking.py
+from django.core.management.base import BaseCommand
+
+from rewards.staking import audit_tier, reconcile_tiers
+from users.reputation_models import StakingTier
+
+
+class Command(BaseCommand):
+    help = 'Recalcula con numpy las recompensas de todos los stakes y compara con los acumuladores de cada nivel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reconcile', action='store_true', help='Reescribir totales y conteos de los niveles desde los stakes')
+
+    def handle(self, *args, **options):
+        if options['reconcile']:
+            self.stdout.write(f'{reconcile_tiers()} niveles conciliados')
+
+        for tier in StakingTier.objects.all():
+            report = audit_tier(tier)
+            self.stdout.write(
+                f"{report['duration_days']} días ({report['apy']}%): {report['stakers']} stakers, "
+                f"{report['total_staked']:.2f} stakeados, {report['pending_rewards']:.2f} pendientes"
+            )
+            if abs(report['staked_drift']) >= 0.01 or report['count_drift']:
+                self.stdout.write(self.style.WARNING(
+                    f"  Descuadre: {report['staked_drift']:+.2f} tokens, {report['count_drift']:+d} stakers"
+                ))
+
+        self.stdout.write(self.style.SUCCESS('Auditoría de staking completada'))
@@ -0,0 +1,30 @@
+# rewards/management/commands/close_reward_epoch.py
+from django.core.management.base import BaseCommand, CommandError
+
+from rewards.distribution import DistributionError, compute_epoch, publish_epoch
+
+
+class Command(BaseCommand):
+    help = 'Agrega las recompensas pendientes en una época Merkle y, opcionalmente, publica su raíz'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--publish', action='store_true', help='Publicar la raíz en cadena (una transacción)')
+
+    def handle(self, *args, **options):
+        epoch = compute_epoch()
+        if epoch is None:
+            self.stdout.write('No hay recompensas pendientes')
+            return
+
+        self.stdout.write(
+            f'Época {epoch.number}: {epoch.recipient_count} destinatarios, '
+            f'{epoch.total_amount} tokens, raíz {epoch.merkle_root}'
+        )
+        if options['publish']:
+            try:
+                tx_hash = publish_epoch(epoch)
+            except DistributionError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f'Raíz publicada en {tx_hash}')
+
+        self.stdout.write(self.style.SUCCESS(f'Época {epoch.number} cerrada'))
@@ -0,0 +1,15 @@
+# rewards/management/commands/sync_reward_claims.py
+from django.core.management.base import BaseCommand, CommandError
+
+from rewards.distribution import DistributionError, sync_claims
+
+
+class Command(BaseCommand):
+    help = 'Marca como reclamadas las asignaciones cuyo evento Claimed ya está en cadena'
+
+    def handle(self, *args, **options):
+        try:
+            claimed = sync_claims()
+        except DistributionError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'{claimed} asignaciones reclamadas en cadena'))
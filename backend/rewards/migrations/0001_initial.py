@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RewardEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(unique=True, verbose_name='Número de época')),
+                ('status', models.CharField(choices=[('DRAFT', 'Borrador'), ('PUBLISHED', 'Publicada')], default='DRAFT', max_length=10)),
+                ('merkle_root', models.CharField(blank=True, max_length=66, verbose_name='Raíz Merkle')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('recipient_count', models.PositiveIntegerField(default=0)),
+                ('watermark', models.BigIntegerField(default=0, verbose_name='Última recompensa incluida')),
+                ('commit_transaction_hash', models.CharField(blank=True, max_length=66)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Época de Recompensas',
+                'verbose_name_plural': 'Épocas de Recompensas',
+                'db_table': 'rewards_epoch',
+                'ordering': ['-number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RewardAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wallet_address', models.CharField(max_length=42)),
+                ('index', models.PositiveIntegerField(verbose_name='Índice de hoja')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=30)),
+                ('proof', models.JSONField(default=list, verbose_name='Prueba Merkle')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('claim_transaction_hash', models.CharField(blank=True, max_length=66)),
+                ('epoch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='rewards.rewardepoch')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reward_allocations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Asignación de Recompensa',
+                'verbose_name_plural': 'Asignaciones de Recompensas',
+                'db_table': 'rewards_allocation',
+                'constraints': [
+                    models.UniqueConstraint(fields=('epoch', 'index'), name='unique_allocation_index'),
+                    models.UniqueConstraint(fields=('epoch', 'user'), name='unique_allocation_user'),
+                ],
+            },
+        ),
+    ]
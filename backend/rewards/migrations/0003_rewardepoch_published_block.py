@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0002_rewardepoch_claims_synced_block'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rewardepoch',
+            name='published_block',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Bloque de publicación'),
+        ),
+    ]
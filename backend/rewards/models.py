@@ -1,3 +1,59 @@
+# backend/rewards/models.py
 from django.db import models
 
-# Create your models here.
+
+class RewardEpoch(models.Model):
+    """Época de distribución: una raíz Merkle publicada en una sola transacción.
+
+    La construye ``rewards.distribution.compute_epoch`` agregando las
+    ``RewardDistribution`` pendientes hasta ``watermark``.
+    """
+    STATUS_CHOICES = [
+        ('DRAFT', 'Borrador'),
+        ('PUBLISHED', 'Publicada'),
+    ]
+
+    number = models.PositiveIntegerField(unique=True, verbose_name="Número de época")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='DRAFT')
+    merkle_root = models.CharField(max_length=66, blank=True, verbose_name="Raíz Merkle")
+    total_amount = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    recipient_count = models.PositiveIntegerField(default=0)
+    watermark = models.BigIntegerField(default=0, verbose_name="Última recompensa incluida")
+    commit_transaction_hash = models.CharField(max_length=66, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+    published_block = models.BigIntegerField(null=True, blank=True, verbose_name="Bloque de publicación")
+    claims_synced_block = models.BigIntegerField(default=0, verbose_name="Último bloque de reclamos sincronizado")
+
+    class Meta:
+        db_table = 'rewards_epoch'
+        verbose_name = "Época de Recompensas"
+        verbose_name_plural = "Épocas de Recompensas"
+        ordering = ['-number']
+
+    def __str__(self):
+        return f"Época {self.number} ({self.recipient_count} destinatarios, {self.total_amount})"
+
+
+class RewardAllocation(models.Model):
+    """Asignación de un usuario en una época: una hoja del árbol Merkle."""
+    epoch = models.ForeignKey(RewardEpoch, on_delete=models.CASCADE, related_name='allocations')
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='reward_allocations')
+    wallet_address = models.CharField(max_length=42)
+    index = models.PositiveIntegerField(verbose_name="Índice de hoja")
+    amount = models.DecimalField(max_digits=30, decimal_places=2)
+    proof = models.JSONField(default=list, verbose_name="Prueba Merkle")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    claim_transaction_hash = models.CharField(max_length=66, blank=True)
+
+    class Meta:
+        db_table = 'rewards_allocation'
+        verbose_name = "Asignación de Recompensa"
+        verbose_name_plural = "Asignaciones de Recompensas"
+        constraints = [
+            models.UniqueConstraint(fields=['epoch', 'index'], name='unique_allocation_index'),
+            models.UniqueConstraint(fields=['epoch', 'user'], name='unique_allocation_user'),
+        ]
+
+    def __str__(self):
+        return f"Época {self.epoch_id} #{self.index}: {self.amount} → {self.wallet_address}"
@@ -0,0 +1,34 @@
+from rest_framework import serializers
+
+from .models import RewardAllocation, RewardEpoch
+
+
+class RewardEpochSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    polyscan_url = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = RewardEpoch
+        fields = [
+            'id', 'number', 'status', 'status_display', 'merkle_root', 'total_amount',
+            'recipient_count', 'watermark', 'commit_transaction_hash', 'polyscan_url',
+            'created_at', 'published_at'
+        ]
+        read_only_fields = fields
+
+    def get_polyscan_url(self, obj):
+        if obj.commit_transaction_hash:
+            return f"https://polygonscan.com/tx/{obj.commit_transaction_hash}"
+        return None
+
+
+class RewardAllocationSerializer(serializers.ModelSerializer):
+    epoch_number = serializers.IntegerField(source='epoch.number', read_only=True)
+
+    class Meta:
+        model = RewardAllocation
+        fields = [
+            'id', 'epoch', 'epoch_number', 'wallet_address', 'index', 'amount',
+            'proof', 'claimed_at', 'claim_transaction_hash'
+        ]
+        read_only_fields = fields
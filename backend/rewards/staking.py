@@ -0,0 +1,241 @@
+# backend/rewards/staking.py
+"""
+Motor de staking con acumulador de recompensa por token.
+
+Cada ``StakingTier`` (una duración y su APY) guarda ``reward_per_token``: lo
+que un token stakeado ha ganado desde que existe el nivel. Cada stake guarda
+el valor que ya liquidó (``reward_per_token_paid``), así que su recompensa
+pendiente es ``tokens * (reward_per_token - reward_per_token_paid)``. Stake,
+unstake, reclamo y cambio de APY liquidan solo el nivel y el stake tocados:
+O(1) sin importar cuántos stakers haya.
+
+``audit_tier`` recalcula con numpy las recompensas de todos los stakes de un
+nivel en una pasada para auditorías y conciliación.
+"""
+from datetime import timedelta
+from decimal import ROUND_DOWN, Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from users.reputation_models import StakingPool, StakingTier
+
+# APY por duración; otras duraciones usan DEFAULT_APY
+APY_BY_DURATION = {
+    30: Decimal('5.00'),    # 30 días: 5% APY
+    90: Decimal('8.00'),    # 90 días: 8% APY
+    180: Decimal('12.00'),  # 180 días: 12% APY
+    365: Decimal('15.00'),  # 365 días: 15% APY
+}
+DEFAULT_APY = Decimal('5.00')
+
+YEAR_SECONDS = Decimal(365 * 24 * 3600)
+ACCUMULATOR_PLACES = Decimal('1e-18')
+TOKEN_PLACES = Decimal('0.01')
+
+
+class StakingError(Exception):
+    """La operación de staking no es válida."""
+
+
+# ==============================================================================
+# ACUMULADOR
+# ==============================================================================
+
+def accrued_per_token(tier, now):
+    """``reward_per_token`` del nivel en ``now`` sin escribir nada."""
+    seconds = max((now - tier.last_update).total_seconds(), 0)
+    growth = tier.apy / 100 * Decimal(str(seconds)) / YEAR_SECONDS
+    return (tier.reward_per_token + growth).quantize(ACCUMULATOR_PLACES, rounding=ROUND_DOWN)
+
+
+def _settle_tier(tier, now):
+    tier.reward_per_token = accrued_per_token(tier, now)
+    tier.last_update = now
+
+
+def _settle_stake(stake, reward_per_token):
+    if stake.is_active:
+        owed = stake.tokens_staked * (reward_per_token - stake.reward_per_token_paid)
+        stake.rewards_earned += owed.quantize(TOKEN_PLACES, rounding=ROUND_DOWN)
+    stake.reward_per_token_paid = reward_per_token
+
+
+def pending_rewards(stake, now=None):
+    """Recompensas ganadas y no reclamadas de un stake, sin bloquear filas."""
+    earned = stake.rewards_earned
+    if stake.is_active and stake.tier is not None:
+        owed = stake.tokens_staked * (accrued_per_token(stake.tier, now or timezone.now()) - stake.reward_per_token_paid)
+        earned += owed.quantize(TOKEN_PLACES, rounding=ROUND_DOWN)
+    return earned - stake.rewards_claimed
+
+
+def _locked_tier(duration_days):
+    tier = StakingTier.objects.select_for_update().filter(duration_days=duration_days).first()
+    if tier is None:
+        StakingTier.objects.get_or_create(duration_days=duration_days, defaults={
+            'apy': APY_BY_DURATION.get(duration_days, DEFAULT_APY), 'last_update': timezone.now()
+        })
+        tier = StakingTier.objects.select_for_update().get(duration_days=duration_days)
+    return tier
+
+
+def _locked_stake(stake_id, now):
+    stake = StakingPool.objects.select_for_update().get(pk=stake_id)
+    if stake.tier_id is None:
+        # Stakes anteriores al motor: se adhieren al nivel de su duración desde ahora
+        tier = _locked_tier(stake.staking_duration)
+        stake.tier = tier
+        if stake.is_active:
+            tier.total_staked += stake.tokens_staked
+            tier.staker_count += 1
+        stake.reward_per_token_paid = accrued_per_token(tier, now)
+    else:
+        stake.tier = StakingTier.objects.select_for_update().get(pk=stake.tier_id)
+    return stake
+
+
+# ==============================================================================
+# OPERACIONES
+# ==============================================================================
+
+def open_stake(user, amount, duration_days, blockchain_staking_id=None):
+    """Abrir un stake en el nivel de su duración."""
+    amount = Decimal(amount)
+    if amount <= 0:
+        raise StakingError('La cantidad debe ser positiva')
+    now = timezone.now()
+    with transaction.atomic():
+        tier = _locked_tier(duration_days)
+        _settle_tier(tier, now)
+        tier.total_staked += amount
+        tier.staker_count += 1
+        tier.save(update_fields=['reward_per_token', 'last_update', 'total_staked', 'staker_count'])
+        return StakingPool.objects.create(
+            user=user,
+            tier=tier,
+            tokens_staked=amount,
+            staking_start=now,
+            staking_duration=duration_days,
+            apy=tier.apy,
+            rewards_earned=0,
+            reward_per_token_paid=tier.reward_per_token,
+            blockchain_staking_id=blockchain_staking_id,
+        )
+
+
+def update_stake(stake_id, amount):
+    """Cambiar la cantidad stakeada liquidando antes lo ganado."""
+    amount = Decimal(amount)
+    if amount <= 0:
+        raise StakingError('La cantidad debe ser positiva')
+    now = timezone.now()
+    with transaction.atomic():
+        stake = _locked_stake(stake_id, now)
+        if not stake.is_active:
+            raise StakingError('El stake ya fue retirado')
+        tier = stake.tier
+        _settle_tier(tier, now)
+        _settle_stake(stake, tier.reward_per_token)
+        tier.total_staked += amount - stake.tokens_staked
+        stake.tokens_staked = amount
+        tier.save(update_fields=['reward_per_token', 'last_update', 'total_staked', 'staker_count'])
+        stake.save(update_fields=['tier', 'tokens_staked', 'rewards_earned', 'reward_per_token_paid'])
+    return stake
+
+
+def unstake(stake_id, enforce_lock=True):
+    """Retirar un stake; deja de acumular y conserva lo ganado para reclamar."""
+    now = timezone.now()
+    with transaction.atomic():
+        stake = _locked_stake(stake_id, now)
+        if not stake.is_active:
+            raise StakingError('El stake ya fue retirado')
+        if enforce_lock and now < stake.staking_start + timedelta(days=stake.staking_duration):
+            raise StakingError('El período de staking aún no ha terminado')
+        tier = stake.tier
+        _settle_tier(tier, now)
+        _settle_stake(stake, tier.reward_per_token)
+        tier.total_staked -= stake.tokens_staked
+        tier.staker_count -= 1
+        stake.is_active = False
+        tier.save(update_fields=['reward_per_token', 'last_update', 'total_staked', 'staker_count'])
+        stake.save(update_fields=['tier', 'rewards_earned', 'reward_per_token_paid', 'is_active'])
+    return stake
+
+
+def claim(stake_id):
+    """Marcar como reclamado lo ganado hasta ahora; devuelve la cantidad."""
+    now = timezone.now()
+    with transaction.atomic():
+        stake = _locked_stake(stake_id, now)
+        tier = stake.tier
+        _settle_tier(tier, now)
+        _settle_stake(stake, tier.reward_per_token)
+        amount = stake.rewards_earned - stake.rewards_claimed
+        stake.rewards_claimed = stake.rewards_earned
+        tier.save(update_fields=['reward_per_token', 'last_update', 'total_staked', 'staker_count'])
+        stake.save(update_fields=['tier', 'rewards_earned', 'rewards_claimed', 'reward_per_token_paid'])
+    return amount
+
+
+def set_apy(duration_days, apy):
+    """Cambiar el APY de un nivel: liquida el acumulador y no toca los stakes."""
+    now = timezone.now()
+    with transaction.atomic():
+        tier = _locked_tier(duration_days)
+        _settle_tier(tier, now)
+        tier.apy = Decimal(apy)
+        tier.save(update_fields=['reward_per_token', 'last_update', 'apy'])
+    return tier
+
+
+# ==============================================================================
+# AUDITORÍA
+# ==============================================================================
+
+def audit_tier(tier, now=None):
+    """Recalcular con numpy las recompensas de todos los stakes activos del nivel.
+
+    Devuelve los totales, la diferencia entre los contadores del nivel y los
+    stakes, y los arreglos por stake (``ids``, ``pending``) para conciliación.
+    """
+    reward_per_token = float(accrued_per_token(tier, now or timezone.now()))
+    rows = StakingPool.objects.filter(tier=tier, is_active=True).values_list(
+        'id', 'tokens_staked', 'reward_per_token_paid', 'rewards_earned', 'rewards_claimed'
+    )
+    data = np.array(list(rows.iterator(chunk_size=5000)), dtype=np.float64).reshape(-1, 5)
+    ids, tokens, paid, earned, claimed = data.T
+    pending = earned - claimed + tokens * (reward_per_token - paid)
+    total_staked = float(tokens.sum())
+    return {
+        'duration_days': tier.duration_days,
+        'apy': float(tier.apy),
+        'stakers': int(len(ids)),
+        'total_staked': total_staked,
+        'pending_rewards': float(pending.sum()),
+        'staked_drift': float(tier.total_staked) - total_staked,
+        'count_drift': tier.staker_count - int(len(ids)),
+        'ids': ids.astype(np.int64),
+        'pending': pending,
+    }
+
+
+def reconcile_tiers():
+    """Reescribir ``total_staked`` y ``staker_count`` de cada nivel desde sus stakes."""
+    totals = {
+        row['tier_id']: row
+        for row in StakingPool.objects.filter(is_active=True, tier__isnull=False).values('tier_id').annotate(
+            total=Sum('tokens_staked'), count=Count('id')
+        )
+    }
+    with transaction.atomic():
+        tiers = list(StakingTier.objects.select_for_update())
+        for tier in tiers:
+            row = totals.get(tier.pk, {})
+            tier.total_staked = row.get('total') or 0
+            tier.staker_count = row.get('count') or 0
+        StakingTier.objects.bulk_update(tiers, ['total_staked', 'staker_count'])
+    return len(tiers)
@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     RewardDistributionViewSet, 
+    RewardEpochViewSet,
     StakingPoolViewSet, 
     RewardClaimView,
     BulkRewardClaimView,
@@ -16,6 +17,7 @@ from .views import (
 router = DefaultRouter()
 router.register(r'rewards', RewardDistributionViewSet, basename='reward')  # Add basename here
 router.register(r'staking', StakingPoolViewSet, basename='staking-pool')   # Add basename here too
+router.register(r'epochs', RewardEpochViewSet, basename='reward-epoch')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,9 +1,9 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.db.models import Sum, Avg, Count
 from django.contrib.auth import get_user_model
@@ -11,6 +11,10 @@ from django.contrib.auth import get_user_model
 # Importaciones corregidas desde las ubicaciones correctas
 from users.models import User
 from users.reputation_models import RewardDistribution, StakingPool, ReputationScore
+from .distribution import DistributionError, claim_epochs, claim_payload, compute_epoch, publish_epoch
+from .models import RewardAllocation, RewardEpoch
+from .staking import StakingError, claim as claim_staking_rewards, open_stake, unstake, update_stake
+from .serializers import RewardAllocationSerializer, RewardEpochSerializer
 from users.serializers import (
     RewardDistributionSerializer, 
     StakingPoolSerializer,
@@ -51,7 +55,7 @@ class StakingPoolViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        queryset = StakingPool.objects.all()
+        queryset = StakingPool.objects.select_related('user', 'tier')
         
         if not self.request.user.is_staff:
             queryset = queryset.filter(user=self.request.user)
@@ -59,32 +63,123 @@ class StakingPoolViewSet(viewsets.ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # El stake entra por el motor para quedar enganchado al acumulador de su nivel
+        try:
+            serializer.instance = open_stake(
+                self.request.user,
+                serializer.validated_data['tokens_staked'],
+                serializer.validated_data['staking_duration'],
+                blockchain_staking_id=serializer.validated_data.get('blockchain_staking_id')
+            )
+        except StakingError as e:
+            raise ValidationError({'error': str(e)})
+    
+    def perform_update(self, serializer):
+        amount = serializer.validated_data.pop('tokens_staked', None)
+        if amount is not None and amount != serializer.instance.tokens_staked:
+            try:
+                update_stake(serializer.instance.pk, amount)
+            except StakingError as e:
+                raise ValidationError({'error': str(e)})
+            serializer.instance.refresh_from_db()
+        serializer.save()
+    
+    @action(detail=True, methods=['post'])
+    def claim(self, request, pk=None):
+        """Reclamar las recompensas acumuladas del stake"""
+        staking_pool = self.get_object()
+        if staking_pool.user_id != request.user.id:
+            return Response({'error': 'Permiso denegado'}, status=status.HTTP_403_FORBIDDEN)
+        
+        amount = claim_staking_rewards(staking_pool.pk)
+        return Response({
+            'success': True,
+            'claimed_amount': float(amount),
+            'rewards_earned': float(StakingPool.objects.values_list('rewards_earned', flat=True).get(pk=staking_pool.pk))
+        })
+
+class RewardEpochViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = RewardEpochSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = RewardEpoch.objects.all()
+        
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(status='PUBLISHED')
+            
+        return queryset
+    
+    @action(detail=False, methods=['post'])
+    def close(self, request):
+        """Agregar las recompensas pendientes en una nueva época (solo staff)"""
+        if not request.user.is_staff:
+            return Response({'error': 'Permiso denegado'}, status=status.HTTP_403_FORBIDDEN)
+        
+        epoch = compute_epoch()
+        if epoch is None:
+            return Response({'error': 'No hay recompensas pendientes'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(self.get_serializer(epoch).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'])
+    def publish(self, request, pk=None):
+        """Publicar la raíz de la época en cadena: una transacción (solo staff)"""
+        if not request.user.is_staff:
+            return Response({'error': 'Permiso denegado'}, status=status.HTTP_403_FORBIDDEN)
+        
+        epoch = self.get_object()
+        try:
+            publish_epoch(epoch)
+        except DistributionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error publicando época {epoch.number}: {str(e)}")
+            return Response({'error': f'Error publicando época: {str(e)}'}, status=status.HTTP_502_BAD_GATEWAY)
+        
+        return Response(self.get_serializer(epoch).data)
+    
+    @action(detail=True, methods=['get'])
+    def allocation(self, request, pk=None):
+        """Asignación y prueba Merkle del usuario actual en la época"""
+        allocation = get_object_or_404(
+            RewardAllocation.objects.select_related('epoch'), epoch=self.get_object(), user=request.user
+        )
+        return Response(RewardAllocationSerializer(allocation).data)
 
 class RewardClaimView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, reward_id):
-        reward = get_object_or_404(RewardDistribution, id=reward_id, user=request.user)
+        reward = get_object_or_404(
+            RewardDistribution.objects.select_related('epoch'), id=reward_id, user=request.user
+        )
         
         if reward.is_claimed:
             return Response({
                 'error': 'Recompensa ya reclamada'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Aquí iría la lógica de blockchain para claim
+        if reward.epoch is None or reward.epoch.status != 'PUBLISHED':
+            return Response({
+                'error': 'La recompensa podrá reclamarse cuando se publique su época de distribución'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
-            # Simulación de transacción blockchain
-            # En producción, aquí se conectaría con el contrato inteligente
-            reward.is_claimed = True
-            reward.save()
+            # Se reclama la asignación completa de la época; el pago en cadena
+            # lo hace el usuario con la prueba contra la raíz publicada y la
+            # recompensa queda reclamada cuando se sincroniza el evento Claimed
+            allocation, = claim_epochs(request.user, [reward.epoch_id])
             
             return Response({
                 'success': True,
-                'message': 'Recompensa reclamada exitosamente',
-                'amount': float(reward.tokens_awarded)
+                'message': 'Prueba de reclamo lista; la recompensa quedará reclamada al confirmarse en cadena',
+                'amount': float(allocation.amount),
+                'claim': claim_payload(allocation)
             })
             
+        except DistributionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error reclamando recompensa {reward_id}: {str(e)}")
             return Response({
@@ -108,27 +203,29 @@ class BulkRewardClaimView(APIView):
             user=request.user,
             is_claimed=False
         )
+        epochs = list(rewards.values('epoch_id').annotate(count=Count('id')))
         
-        if len(rewards) != len(reward_ids):
+        if sum(row['count'] for row in epochs) != len(set(reward_ids)):
             return Response({
                 'error': 'Algunas recompensas no son válidas o ya fueron reclamadas'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            total_amount = sum(float(reward.tokens_awarded) for reward in rewards)
-            
-            # Aquí iría la lógica de blockchain para bulk claim
-            # En producción, se conectaría con el contrato inteligente
-            
-            rewards.update(is_claimed=True)
+            # Una asignación (y una prueba) por época, sin importar cuántas recompensas incluya
+            if any(row['epoch_id'] is None for row in epochs):
+                raise DistributionError('Hay recompensas que aún no pertenecen a una época publicada')
+            allocations = claim_epochs(request.user, [row['epoch_id'] for row in epochs])
             
             return Response({
                 'success': True,
-                'message': f'{len(rewards)} recompensas reclamadas exitosamente',
-                'total_amount': total_amount,
-                'wallet_address': wallet_address
+                'message': f'Pruebas de reclamo listas para {len(reward_ids)} recompensas; quedarán reclamadas al confirmarse en cadena',
+                'total_amount': float(sum(allocation.amount for allocation in allocations)),
+                'wallet_address': wallet_address,
+                'claims': [claim_payload(allocation) for allocation in allocations]
             })
             
+        except DistributionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error reclamando recompensas en bulk: {str(e)}")
             return Response({
@@ -159,25 +256,9 @@ class StakeTokensView(APIView):
             # Aquí iría la lógica de blockchain para staking
             # En producción, se conectaría con el contrato inteligente
             
-            # APY basado en la duración (ejemplo)
-            apy_map = {
-                30: 5.0,   # 30 días: 5% APY
-                90: 8.0,   # 90 días: 8% APY
-                180: 12.0, # 180 días: 12% APY
-                365: 15.0  # 365 días: 15% APY
-            }
-            
-            apy = apy_map.get(duration_days, 5.0)
-            
-            staking_pool = StakingPool.objects.create(
-                user=request.user,
-                tokens_staked=amount,
-                staking_start=timezone.now(),
-                staking_duration=duration_days,
-                apy=apy,
-                rewards_earned=0,
-                blockchain_staking_id=None  # Se asignaría después de la transacción blockchain
-            )
+            # El APY sale del nivel de la duración (ver rewards.staking.APY_BY_DURATION);
+            # blockchain_staking_id se asignaría después de la transacción blockchain
+            staking_pool = open_stake(request.user, amount, duration_days)
             
             return Response({
                 'success': True,
@@ -185,7 +266,7 @@ class StakeTokensView(APIView):
                 'staking_pool_id': staking_pool.id,
                 'amount': float(amount),
                 'duration_days': duration_days,
-                'apy': float(apy),
+                'apy': float(staking_pool.apy),
                 'wallet_address': wallet_address
             })
             
@@ -201,24 +282,13 @@ class UnstakeTokensView(APIView):
     def post(self, request, staking_pool_id):
         staking_pool = get_object_or_404(StakingPool, id=staking_pool_id, user=request.user)
         
-        # Verificar si el staking ha terminado
-        from datetime import timedelta
-        end_date = staking_pool.staking_start + timedelta(days=staking_pool.staking_duration)
-        
-        if timezone.now() < end_date:
-            return Response({
-                'error': 'El período de staking aún no ha terminado'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
         try:
             # Aquí iría la lógica de blockchain para unstaking
             # En producción, se conectaría con el contrato inteligente
             
-            # Calcular recompensas finales
-            total_rewards = float(staking_pool.tokens_staked) * float(staking_pool.apy) / 100 * staking_pool.staking_duration / 365
-            
-            staking_pool.rewards_earned = total_rewards
-            staking_pool.save()
+            # Las recompensas finales salen del acumulador del nivel
+            staking_pool = unstake(staking_pool.pk)
+            total_rewards = float(staking_pool.rewards_earned)
             
             return Response({
                 'success': True,
@@ -228,6 +298,8 @@ class UnstakeTokensView(APIView):
                 'total_amount': float(staking_pool.tokens_staked) + total_rewards
             })
             
+        except StakingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error unstakeando tokens: {str(e)}")
             return Response({
@@ -3,8 +3,9 @@ from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
 from .models import User, UserActivityLog, UserPreference, APIToken
-from .reputation_models import UserRole, ReputationScore, RewardDistribution, StakingPool
+from .reputation_models import UserRole, ReputationScore, RewardDistribution, StakingPool, StakingTier
 from .notification_models import Notification
+from core.admin_changelist import LargeTableAdminMixin, RecentPeriodFilter
 import json
 
 @admin.register(User)
@@ -202,16 +203,22 @@ class CustomUserAdmin(UserAdmin):
     staking_pool_link.short_description = 'Staking'
 
 @admin.register(UserActivityLog)
-class UserActivityLogAdmin(admin.ModelAdmin):
+class UserActivityLogAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         'user_link', 'action_display', 'severity_display',
         'ip_address', 'short_tx_hash', 'timestamp'
     ]
     
+    list_annotations = {'user_username': 'user__username'}
+    list_defer = ['metadata', 'user_agent']
+    
     list_filter = [
-        'action', 'timestamp', 'user__role'
+        RecentPeriodFilter, 'action', 'user__role'
     ]
     
+    date_hierarchy = 'timestamp'
+    rollup_source = 'USER_ACTIVITY'
+    
     search_fields = [
         'user__username', 'user__email', 'ip_address',
         'blockchain_tx_hash', 'message'
@@ -242,9 +249,9 @@ class UserActivityLogAdmin(admin.ModelAdmin):
     )
     
     def user_link(self, obj):
-        if obj.user:
-            url = reverse('admin:users_user_change', args=[obj.user.id])
-            return format_html('<a href="{}">{}</a>', url, obj.user.username)
+        if obj.user_id:
+            url = reverse('admin:users_user_change', args=[obj.user_id])
+            return format_html('<a href="{}">{}</a>', url, obj.user_username)
         return "—"
     user_link.short_description = 'Usuario'
     
@@ -297,6 +304,8 @@ class UserPreferenceAdmin(admin.ModelAdmin):
         'theme_display'
     ]
     
+    list_select_related = ['user']
+    
     list_filter = [
         'email_notifications', 'push_notifications',
         'language', 'theme'
@@ -368,6 +377,8 @@ class APITokenAdmin(admin.ModelAdmin):
         'created_at'
     ]
     
+    list_select_related = ['user']
+    
     list_filter = [
         'token_type', 'is_active', 'created_at'
     ]
@@ -452,6 +463,8 @@ class UserRoleAdmin(admin.ModelAdmin):
         'granted_at', 'expires_at_display'
     ]
     
+    list_select_related = ['user', 'granted_by']
+    
     list_filter = [
         'role_type', 'scope_type', 'is_active', 'granted_at'
     ]
@@ -557,6 +570,8 @@ class ReputationScoreAdmin(admin.ModelAdmin):
         'total_actions', 'positive_actions', 'last_calculated'
     ]
     
+    list_select_related = ['user']
+    
     list_filter = [
         'reputation_type', 'last_calculated'
     ]
@@ -640,6 +655,8 @@ class NotificationAdmin(admin.ModelAdmin):
         'priority_display', 'is_read_display', 'created_at'
     ]
     
+    list_select_related = ['user']
+    
     list_filter = [
         'notification_type', 'priority', 'is_read', 'created_at'
     ]
@@ -749,6 +766,8 @@ class RewardDistributionAdmin(admin.ModelAdmin):
         'is_claimed_display', 'polyscan_link'
     ]
     
+    list_select_related = ['user']
+    
     list_filter = [
         'action_type', 'is_claimed', 'distribution_date'
     ]
@@ -870,7 +889,7 @@ class StakingPoolAdmin(admin.ModelAdmin):
     ]
     
     list_filter = [
-        'staking_start', 'staking_duration', 'apy'
+        'is_active', 'staking_start', 'staking_duration', 'apy'
     ]
     
     search_fields = [
@@ -880,9 +899,12 @@ class StakingPoolAdmin(admin.ModelAdmin):
     readonly_fields = [
         'staking_start', 'user_link', 'staking_status',
         'staking_end_display', 'rewards_earned_display',
-        'estimated_total_rewards', 'polyscan_link'
+        'estimated_total_rewards', 'polyscan_link',
+        'tier', 'rewards_earned', 'rewards_claimed', 'reward_per_token_paid', 'is_active'
     ]
     
+    list_select_related = ['user']
+    
     fieldsets = (
         ('Información del Staking', {
             'fields': (
@@ -897,6 +919,10 @@ class StakingPoolAdmin(admin.ModelAdmin):
                 'estimated_total_rewards'
             )
         }),
+        ('Acumulador', {
+            'fields': ('tier', 'is_active', 'rewards_claimed', 'reward_per_token_paid'),
+            'classes': ('collapse',)
+        }),
         ('Blockchain', {
             'fields': ('blockchain_staking_id', 'polyscan_link'),
             'classes': ('collapse',)
@@ -962,6 +988,38 @@ class StakingPoolAdmin(admin.ModelAdmin):
             )
         return "—"
     polyscan_link.short_description = 'Blockchain'
+    
+    def save_model(self, request, obj, form, change):
+        # Los cambios de cantidad pasan por el motor para liquidar el acumulador
+        if change and 'tokens_staked' in form.changed_data:
+            from rewards.staking import update_stake
+            
+            update_stake(obj.pk, obj.tokens_staked)
+            obj.refresh_from_db(fields=['tokens_staked', 'rewards_earned', 'reward_per_token_paid', 'tier'])
+        super().save_model(request, obj, form, change)
+
+@admin.register(StakingTier)
+class StakingTierAdmin(admin.ModelAdmin):
+    list_display = [
+        'duration_days', 'apy', 'staker_count', 'total_staked', 'reward_per_token', 'last_update'
+    ]
+    
+    readonly_fields = [
+        'reward_per_token', 'last_update', 'total_staked', 'staker_count'
+    ]
+    
+    def save_model(self, request, obj, form, change):
+        # Cambiar el APY liquida antes lo acumulado con el APY anterior
+        if change and 'apy' in form.changed_data:
+            from rewards.staking import set_apy
+            
+            set_apy(form.initial['duration_days'], obj.apy)
+            obj.refresh_from_db(fields=['reward_per_token', 'last_update'])
+        if not change:
+            from django.utils import timezone
+            
+            obj.last_update = timezone.now()
+        super().save_model(request, obj, form, change)
 
 # Configuración adicional para el admin de Users
 admin.site.site_header = "🐄 GanadoChain - User Administration"
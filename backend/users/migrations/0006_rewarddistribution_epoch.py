@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0001_initial'),
+        ('users', '0005_userapicredentials_userblockchainrole_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rewarddistribution',
+            name='epoch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rewards', to='rewards.rewardepoch'),
+        ),
+    ]
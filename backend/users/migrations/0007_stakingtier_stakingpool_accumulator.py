@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_tiers(apps, schema_editor):
+    """Un nivel por duración existente; los stakes previos acumulan desde aquí."""
+    StakingPool = apps.get_model('users', 'StakingPool')
+    StakingTier = apps.get_model('users', 'StakingTier')
+    now = timezone.now()
+    rows = StakingPool.objects.values('staking_duration').annotate(
+        apy=models.Max('apy'), total=models.Sum('tokens_staked'), count=models.Count('id')
+    )
+    for row in rows:
+        tier = StakingTier.objects.create(
+            duration_days=row['staking_duration'], apy=row['apy'], last_update=now,
+            total_staked=row['total'], staker_count=row['count']
+        )
+        StakingPool.objects.filter(staking_duration=row['staking_duration']).update(tier=tier)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_rewarddistribution_epoch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StakingTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duration_days', models.PositiveIntegerField(unique=True)),
+                ('apy', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('reward_per_token', models.DecimalField(decimal_places=18, default=0, max_digits=38)),
+                ('last_update', models.DateTimeField()),
+                ('total_staked', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('staker_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Nivel de Staking',
+                'verbose_name_plural': 'Niveles de Staking',
+                'db_table': 'users_staking_tier',
+                'ordering': ['duration_days'],
+            },
+        ),
+        migrations.AddField(
+            model_name='stakingpool',
+            name='tier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stakes', to='users.stakingtier'),
+        ),
+        migrations.AddField(
+            model_name='stakingpool',
+            name='rewards_claimed',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='stakingpool',
+            name='reward_per_token_paid',
+            field=models.DecimalField(decimal_places=18, default=0, max_digits=38),
+        ),
+        migrations.AddField(
+            model_name='stakingpool',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(create_tiers, migrations.RunPython.noop),
+    ]
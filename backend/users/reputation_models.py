@@ -116,17 +116,40 @@ class RewardDistribution(models.Model):
     distribution_date = models.DateTimeField(auto_now_add=True)
     transaction_hash = models.CharField(max_length=255)
     is_claimed = models.BooleanField(default=False)
+    epoch = models.ForeignKey('rewards.RewardEpoch', on_delete=models.SET_NULL, null=True, blank=True, related_name='rewards')
 
     class Meta:
         db_table = 'users_reward_distribution'
 
+class StakingTier(models.Model):
+    """Acumulador de recompensas compartido por los stakes de una misma duración"""
+    duration_days = models.PositiveIntegerField(unique=True)
+    apy = models.DecimalField(max_digits=5, decimal_places=2)
+    reward_per_token = models.DecimalField(max_digits=38, decimal_places=18, default=0)
+    last_update = models.DateTimeField()
+    total_staked = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    staker_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'users_staking_tier'
+        ordering = ['duration_days']
+        verbose_name = "Nivel de Staking"
+        verbose_name_plural = "Niveles de Staking"
+
+    def __str__(self):
+        return f"{self.duration_days} días - {self.apy}%"
+
 class StakingPool(models.Model):
     user = models.OneToOneField('User', on_delete=models.CASCADE, related_name='staking_pool')
+    tier = models.ForeignKey(StakingTier, on_delete=models.PROTECT, null=True, blank=True, related_name='stakes')
     tokens_staked = models.DecimalField(max_digits=20, decimal_places=2)
     staking_start = models.DateTimeField()
     staking_duration = models.IntegerField()
     apy = models.DecimalField(max_digits=5, decimal_places=2)
     rewards_earned = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    rewards_claimed = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    reward_per_token_paid = models.DecimalField(max_digits=38, decimal_places=18, default=0)
+    is_active = models.BooleanField(default=True)
     blockchain_staking_id = models.IntegerField(null=True, blank=True)
 
     class Meta:
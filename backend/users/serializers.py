@@ -523,6 +523,7 @@ class StakingPoolSerializer(serializers.ModelSerializer):
     staking_status = serializers.SerializerMethodField(read_only=True)
     days_remaining = serializers.SerializerMethodField(read_only=True)
     estimated_rewards = serializers.SerializerMethodField(read_only=True)
+    pending_rewards = serializers.SerializerMethodField(read_only=True)
     polyscan_url = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
@@ -530,14 +531,23 @@ class StakingPoolSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'user_name', 'user_email', 'user_wallet', 'tokens_staked',
             'staking_start', 'staking_duration', 'apy', 'rewards_earned',
+            'rewards_claimed', 'is_active', 'tier',
             'blockchain_staking_id', 'staking_status', 'days_remaining',
-            'estimated_rewards', 'polyscan_url'
+            'estimated_rewards', 'pending_rewards', 'polyscan_url'
         ]
+        # Dueño, inicio y APY los fija el motor de staking (rewards.staking)
         read_only_fields = [
             'staking_status', 'days_remaining', 'estimated_rewards', 'polyscan_url',
-            'user_name', 'user_email', 'user_wallet'
+            'user', 'user_name', 'user_email', 'user_wallet', 'rewards_earned', 'rewards_claimed',
+            'is_active', 'tier', 'pending_rewards', 'staking_start', 'apy'
         ]
     
+    def validate_staking_duration(self, value):
+        # La duración decide el nivel y el bloqueo: no cambia después de abrir el stake
+        if self.instance is not None and value != self.instance.staking_duration:
+            raise serializers.ValidationError('La duración de un stake abierto no puede cambiarse.')
+        return value
+    
     def get_staking_status(self, obj):
         from django.utils import timezone
         from datetime import timedelta
@@ -568,6 +578,11 @@ class StakingPoolSerializer(serializers.ModelSerializer):
             return estimated
         return 0
     
+    def get_pending_rewards(self, obj):
+        from rewards.staking import pending_rewards
+        
+        return pending_rewards(obj)
+    
     def get_polyscan_url(self, obj):
         if obj.blockchain_staking_id:
             return f"https://polygonscan.com/address/{obj.blockchain_staking_id}"
@@ -589,7 +604,7 @@ class ClaimRewardsSerializer(serializers.Serializer):
     
     def validate_reward_ids(self, value):
         # Verificar que todas las recompensas existen y pertenecen al usuario
-        from .models import RewardDistribution
+        from .reputation_models import RewardDistribution
         from django.contrib.auth import get_user_model
         
         User = get_user_model()
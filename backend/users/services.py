@@ -1,25 +1,74 @@
 # backend/users/services.py
 from django.db import models
-from .models import User, RewardDistribution, StakingPool
+from .models import User
+from .reputation_models import RewardDistribution, StakingPool
 
 class RewardService:
+    """Recompensas en libro mayor: se acumulan como ``RewardDistribution`` y se
+    pagan por épocas Merkle (``rewards.distribution``), no transferencia a transferencia."""
+
     def distribute_rewards(self, user_id, action_type, action_id, tokens):
         """Distribuir recompensas a un usuario"""
-        # Implementación aquí
-        pass
+        return RewardDistribution.objects.create(
+            user_id=user_id,
+            action_type=action_type,
+            action_id=action_id,
+            tokens_awarded=tokens,
+            transaction_hash=''
+        )
+    
+    def distribute_bulk(self, awards):
+        """Registrar muchas recompensas ``(user_id, action_type, action_id, tokens)`` en bloque"""
+        return RewardDistribution.objects.bulk_create([
+            RewardDistribution(
+                user_id=user_id, action_type=action_type, action_id=action_id,
+                tokens_awarded=tokens, transaction_hash=''
+            )
+            for user_id, action_type, action_id, tokens in awards
+        ], batch_size=1000)
+    
+    def close_epoch(self, publish=True, publisher=None):
+        """Cerrar una época con lo pendiente y publicar su raíz (una transacción)"""
+        from rewards.distribution import compute_epoch, publish_epoch
+        
+        epoch = compute_epoch()
+        if epoch is not None and publish:
+            publish_epoch(epoch, publisher)
+        return epoch
     
     def claim_rewards(self, user_id):
         """Permitir a un usuario reclamar sus recompensas"""
-        # Implementación aquí
-        pass
+        from rewards.distribution import claim_epochs
+        from rewards.models import RewardAllocation
+        
+        epoch_ids = list(RewardAllocation.objects.filter(
+            user_id=user_id, claimed_at__isnull=True, epoch__status='PUBLISHED'
+        ).values_list('epoch_id', flat=True))
+        if not epoch_ids:
+            return []
+        return claim_epochs(User.objects.get(pk=user_id), epoch_ids)
 
 class StakingService:
     def stake_tokens(self, user_id, amount, duration_days):
-        """Stake de tokens"""
-        # Implementación aquí
-        pass
+        """Stake de tokens en el nivel de su duración"""
+        from rewards.staking import open_stake
+        
+        return open_stake(User.objects.get(pk=user_id), amount, duration_days)
     
     def unstake_tokens(self, user_id):
-        """Unstake de tokens"""
-        # Implementación aquí
-        pass
\ No newline at end of file
+        """Unstake de tokens; lo ganado queda pendiente de reclamo"""
+        from rewards.staking import unstake
+        
+        return unstake(StakingPool.objects.get(user_id=user_id).pk)
+    
+    def claim_staking_rewards(self, user_id):
+        """Reclamar las recompensas acumuladas del stake del usuario"""
+        from rewards.staking import claim
+        
+        return claim(StakingPool.objects.get(user_id=user_id).pk)
+    
+    def update_apy(self, duration_days, apy):
+        """Cambiar el APY de un nivel sin recorrer sus stakes"""
+        from rewards.staking import set_apy
+        
+        return set_apy(duration_days, apy)
\ No newline at end of file
@@ -0,0 +1,56 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+import "@openzeppelin/contracts-upgradeable/access/AccessControlEnumerableUpgradeable.sol";
+import "@openzeppelin/contracts-upgradeable/proxy/utils/UUPSUpgradeable.sol";
+import "@openzeppelin/contracts-upgradeable/proxy/utils/Initializable.sol";
+import "@openzeppelin/contracts-upgradeable/utils/cryptography/MerkleProofUpgradeable.sol";
+
+/// Registro de certificaciones por lotes: el backend compromete una raíz Merkle
+/// por lote de certificados (una transacción) y cualquiera verifica un
+/// certificado con su prueba.
+/// Hoja: keccak256(bytes.concat(keccak256(abi.encode(number, entity, standard, expiry)))).
+contract GanadoCertificateRegistryUpgradeable is Initializable, AccessControlEnumerableUpgradeable, UUPSUpgradeable {
+    bytes32 public constant ISSUER_ROLE = keccak256("ISSUER_ROLE");
+    bytes32 public constant UPGRADER_ROLE = keccak256("UPGRADER_ROLE");
+
+    mapping(uint256 => bytes32) public batchRoot;
+    mapping(uint256 => uint256) public batchSize;
+    mapping(bytes32 => bool) public revoked;
+
+    event BatchCommitted(uint256 indexed batchId, bytes32 root, uint256 size);
+    event CertificateRevoked(bytes32 indexed leaf);
+
+    /// @custom:oz-upgrades-unsafe-allow constructor
+    constructor() {
+        _disableInitializers();
+    }
+
+    function initialize(address daoAdmin) public initializer {
+        __AccessControlEnumerable_init();
+        __UUPSUpgradeable_init();
+
+        _grantRole(DEFAULT_ADMIN_ROLE, daoAdmin);
+        _grantRole(ISSUER_ROLE, daoAdmin);
+        _grantRole(UPGRADER_ROLE, daoAdmin);
+    }
+
+    function commitBatch(uint256 batchId, bytes32 root, uint256 size) external onlyRole(ISSUER_ROLE) {
+        require(batchRoot[batchId] == bytes32(0), "Lote ya comprometido");
+        require(root != bytes32(0), "Raiz vacia");
+        batchRoot[batchId] = root;
+        batchSize[batchId] = size;
+        emit BatchCommitted(batchId, root, size);
+    }
+
+    function revoke(bytes32 leaf) external onlyRole(ISSUER_ROLE) {
+        revoked[leaf] = true;
+        emit CertificateRevoked(leaf);
+    }
+
+    function isCertified(uint256 batchId, bytes32 leaf, bytes32[] calldata proof) external view returns (bool) {
+        return !revoked[leaf] && MerkleProofUpgradeable.verify(proof, batchRoot[batchId], leaf);
+    }
+
+    function _authorizeUpgrade(address newImplementation) internal override onlyRole(UPGRADER_ROLE) {}
+}
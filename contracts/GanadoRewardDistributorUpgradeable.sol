@@ -0,0 +1,70 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+import "@openzeppelin/contracts-upgradeable/access/AccessControlEnumerableUpgradeable.sol";
+import "@openzeppelin/contracts-upgradeable/proxy/utils/UUPSUpgradeable.sol";
+import "@openzeppelin/contracts-upgradeable/proxy/utils/Initializable.sol";
+import "@openzeppelin/contracts-upgradeable/token/ERC20/IERC20Upgradeable.sol";
+import "@openzeppelin/contracts-upgradeable/token/ERC20/utils/SafeERC20Upgradeable.sol";
+import "@openzeppelin/contracts-upgradeable/utils/cryptography/MerkleProofUpgradeable.sol";
+
+/// Distribución de recompensas por épocas: el backend publica una raíz Merkle
+/// por época (una transacción) y cada usuario reclama su parte con su prueba.
+/// Hoja: keccak256(bytes.concat(keccak256(abi.encode(index, account, amount)))).
+contract GanadoRewardDistributorUpgradeable is Initializable, AccessControlEnumerableUpgradeable, UUPSUpgradeable {
+    using SafeERC20Upgradeable for IERC20Upgradeable;
+
+    bytes32 public constant DISTRIBUTOR_ROLE = keccak256("DISTRIBUTOR_ROLE");
+    bytes32 public constant UPGRADER_ROLE = keccak256("UPGRADER_ROLE");
+
+    IERC20Upgradeable public token;
+
+    mapping(uint256 => bytes32) public epochRoot;
+    mapping(uint256 => uint256) public epochTotal;
+    mapping(uint256 => mapping(uint256 => uint256)) private _claimedBitmap;
+
+    event RootPublished(uint256 indexed epoch, bytes32 root, uint256 total);
+    event Claimed(uint256 indexed epoch, uint256 index, address indexed account, uint256 amount);
+
+    /// @custom:oz-upgrades-unsafe-allow constructor
+    constructor() {
+        _disableInitializers();
+    }
+
+    function initialize(address daoAdmin, address token_) public initializer {
+        __AccessControlEnumerable_init();
+        __UUPSUpgradeable_init();
+
+        _grantRole(DEFAULT_ADMIN_ROLE, daoAdmin);
+        _grantRole(DISTRIBUTOR_ROLE, daoAdmin);
+        _grantRole(UPGRADER_ROLE, daoAdmin);
+
+        token = IERC20Upgradeable(token_);
+    }
+
+    function publishRoot(uint256 epoch, bytes32 root, uint256 total) external onlyRole(DISTRIBUTOR_ROLE) {
+        require(epochRoot[epoch] == bytes32(0), "Epoca ya publicada");
+        require(root != bytes32(0), "Raiz vacia");
+        epochRoot[epoch] = root;
+        epochTotal[epoch] = total;
+        emit RootPublished(epoch, root, total);
+    }
+
+    function isClaimed(uint256 epoch, uint256 index) public view returns (bool) {
+        uint256 word = _claimedBitmap[epoch][index / 256];
+        uint256 mask = 1 << (index % 256);
+        return word & mask == mask;
+    }
+
+    function claim(uint256 epoch, uint256 index, address account, uint256 amount, bytes32[] calldata proof) external {
+        require(!isClaimed(epoch, index), "Ya reclamado");
+        bytes32 leaf = keccak256(bytes.concat(keccak256(abi.encode(index, account, amount))));
+        require(MerkleProofUpgradeable.verify(proof, epochRoot[epoch], leaf), "Prueba invalida");
+
+        _claimedBitmap[epoch][index / 256] |= 1 << (index % 256);
+        token.safeTransfer(account, amount);
+        emit Claimed(epoch, index, account, amount);
+    }
+
+    function _authorizeUpgrade(address newImplementation) internal override onlyRole(UPGRADER_ROLE) {}
+}